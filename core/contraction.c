@@ -2,7 +2,10 @@
 #include "graph.h"
 #include "heap.h"
 #include "contraction.h"
+#include "snapshot.h"
 #include <stdio.h>
+#include <pthread.h>
+#include <unistd.h>
 #define TRUE 1
 #define FALSE 0
 
@@ -10,6 +13,9 @@ CH* chNew() {
     CH* ret = (CH*)malloc(sizeof(CH));
     ret->up = gNew();
     ret->down = gNew();
+    ret->payloads = NULL;
+    ret->n_payloads = 0;
+    ret->resources = NULL;
     return ret;
 }
 
@@ -24,6 +30,18 @@ Graph* chDownGraph( CH* this ) {
 void chDestroy( CH* this ) {
     gDestroyBasic( this->up, 0 );
     gDestroyBasic( this->down, 0 );
+    long i;
+    for(i=0; i<this->n_payloads; i++) {
+        if( this->payloads[i]->type == PL_COMBINATION ) {
+            comboDestroy( (Combination*)this->payloads[i] );
+        } else {
+            epDestroy( this->payloads[i] );
+        }
+    }
+    free( this->payloads );
+    if( this->resources ) {
+        snapshotResourcesDestroy( this->resources );
+    }
     free( this );
 }
 
@@ -95,7 +113,7 @@ CHPath* dist( Graph *gg, char* from_v_label, char* to_v_label, WalkOptions *wo,
     }
     
     State *dummy = stateNew(0,0);
-    ShortestPathTree* spt = gShortestPathTree( gg, from_v_label, to_v_label, dummy, wo, INFINITY, INFINITY, weightlimit );
+    ShortestPathTree* spt = gShortestPathTree( gg, from_v_label, to_v_label, dummy, wo, INFINITY, INFINITY, weightlimit, NULL, NULL );
     
     SPTVertex* curs = sptGetVertex( spt, to_v_label );
     
@@ -131,110 +149,245 @@ CHPath* dist( Graph *gg, char* from_v_label, char* to_v_label, WalkOptions *wo,
     return ret;
 }
 
-SPTVertex** gNearbyBehind( Graph *gg, Vertex *vv, int search_limit, long *n ) {
-    State* dummy = stateNew( 1, 0 );
-    WalkOptions *wo = woNew();
-    ShortestPathTree *sptout = gShortestPathTree( gg, vv->label, "bogus", dummy, wo, INFINITY, search_limit, INFINITY );
-    SPTVertex** ret = sptVertices( sptout, n );
-    
-    woDestroy( wo );
-    sptDestroy( sptout );
-    
-    return ret;
+/*
+ * WITNESS SEARCH
+ *
+ * A Dijkstra from one in-neighbor u of a vertex v being contracted, which looks for a path to each
+ * out-neighbor w of v that avoids v and is no heavier than u->v->w. It gives up past the heaviest
+ * u->v->w, after hoplimit hops, or after settling settled_limit vertices; an out-neighbor it has
+ * not reached by then gets a shortcut. Labels live in arrays indexed by vertex index and are
+ * invalidated by bumping a generation counter, so each thread keeps one WitnessSearch for the
+ * whole contraction.
+ */
+
+struct WitnessSearch {
+    long n;
+    long generation;
+    long* stamp;     //generation each label was set in, by vertex index
+    State** state;
+    int* hops;
+    long* touched;   //indices, since touched vertices may be contracted between searches
+    long n_touched;
+    Heap* heap;
+} ;
+
+WitnessSearch* wsearchNew( long n ) {
+    WitnessSearch* this = (WitnessSearch*)malloc(sizeof(WitnessSearch));
+    this->n = n;
+    this->generation = 1;
+    this->stamp = (long*)calloc( n+1, sizeof(long) );
+    this->state = (State**)calloc( n+1, sizeof(State*) );
+    this->hops = (int*)calloc( n+1, sizeof(int) );
+    this->touched = (long*)malloc( (n+1)*sizeof(long) );
+    this->n_touched = 0;
+    this->heap = heapNew( 100 );
+    return this;
 }
 
-CHPath** get_shortcuts( Graph *gg, Vertex* vv, WalkOptions* wo, int search_limit, int* n ) {
-    long n_us, n_ws;
-    int i,j;
-    
-    // GET VERTICES TO INCLUDE IN THE ALL-PAIRS SEARCH
-    State *dummy = stateNew( 0, 10000 );
-    ShortestPathTree* sptin = gShortestPathTreeRetro( gg, "bogus", vv->label, dummy, wo, 0, search_limit, INFINITY );
-    SPTVertex** us = sptVertices( sptin, &n_us );
-    State *dummy2 = stateNew( 0, 0 );
-    ShortestPathTree* sptout = gShortestPathTree( gg, vv->label, "bogus", dummy2, wo, INFINITY, search_limit, INFINITY );
-    SPTVertex** ws = sptVertices( sptout, &n_ws );
-
-    // THE RETURN ARRAY CANNOT BE LARGER THAN len(u)*len(w) PATHS
-    CHPath** ret = (CHPath**)malloc(n_us*n_ws*sizeof(CHPath*));
-    int count = 0;
-    
-    // GET PATHS c(u,v) FROM ALL us TO v
-    CHPath** cuv = (CHPath**)malloc(n_us*sizeof(CHPath*));
-    for(i=0; i<n_us; i++) {
-        cuv[i] = dist( gg, us[i]->label, vv->label, wo, INFINITY, TRUE );
-        if(cuv[i]) {
-          cuv[i]->fromv = us[i]->mirror;
-          cuv[i]->tov = vv;
+static void wsearchReset( WitnessSearch* this ) {
+    long i;
+    for(i=0; i<this->n_touched; i++) {
+        stateDestroy( this->state[this->touched[i]] );
+    }
+    this->n_touched = 0;
+    this->generation++;
+    this->heap->size = 0;
+}
+
+void wsearchDestroy( WitnessSearch* this ) {
+    wsearchReset( this );
+    heapDestroy( this->heap );
+    free( this->stamp );
+    free( this->state );
+    free( this->hops );
+    free( this->touched );
+    free( this );
+}
+
+static void wsearchLabel( WitnessSearch* this, Vertex* vv, State* state, int hops ) {
+    long i = vv->index;
+    if( this->stamp[i] == this->generation ) {
+        stateDestroy( this->state[i] );
+    } else {
+        this->stamp[i] = this->generation;
+        this->touched[this->n_touched++] = i;
+    }
+    this->state[i] = state;
+    this->hops[i] = hops;
+    heapInsert( this->heap, (void*)vv, state->weight );
+}
+
+//the weight of the lightest path found to vv, or INFINITY
+static long wsearchWeight( WitnessSearch* this, Vertex* vv ) {
+    return this->stamp[vv->index] == this->generation ? this->state[vv->index]->weight : INFINITY;
+}
+
+//searches from source, skipping avoid and the vertices flagged in skip
+static void wsearchRun( WitnessSearch* this, Vertex* source, Vertex* avoid, const char* skip, WalkOptions* wo, long weightlimit, int hoplimit, int settled_limit ) {
+    wsearchReset( this );
+    wsearchLabel( this, source, stateNew( 0, 0 ), 0 );
+
+    int settled = 0;
+    while( !heapEmpty( this->heap ) ) {
+        long weight;
+        Vertex* u = (Vertex*)heapPop( this->heap, &weight );
+        State* su = this->state[u->index];
+        if( weight > su->weight ) {
+            continue; //superseded by a lighter label
+        }
+        if( weight > weightlimit || settled++ >= settled_limit ) {
+            break;
+        }
+        if( this->hops[u->index] >= hoplimit ) {
+            continue;
+        }
+
+        ListNode* outgoing = vGetOutgoingEdgeList( u );
+        for( ; outgoing; outgoing=outgoing->next ) {
+            Edge* ee = outgoing->data;
+            Vertex* vv = ee->to;
+            if( vv == avoid || skip[vv->index] ) {
+                continue;
+            }
+
+            State* sv = eWalk( ee, su, wo );
+            if( !sv ) {
+                continue;
+            }
+            if( sv->weight >= wsearchWeight( this, vv ) ) {
+                stateDestroy( sv );
+                continue;
+            }
+            wsearchLabel( this, vv, sv, this->hops[u->index]+1 );
         }
     }
-    
-    // GET PATHS c(v,w) FROM v to ALL ws, FINDING THE MAX c(v,w)
-    CHPath** cvw = (CHPath**)malloc(n_ws*sizeof(CHPath*));
-    long max_cvw = -INFINITY;
-    for(i=0; i<n_ws; i++) {
-        cvw[i] = dist( gg, vv->label, ws[i]->label, wo, INFINITY, TRUE );
-        if( cvw[i] ) {
-            cvw[i]->fromv = vv;
-            cvw[i]->tov = ws[i]->mirror;
+}
+
+/*
+ * Finds the shortcuts needed to contract vv: one u->w for each in-neighbor u and out-neighbor w
+ * of vv with no witness path. Parallel edges are reduced to the lightest. If shortcuts is
+ * non-NULL it receives a malloc'd array of two-payload CHPaths. Returns the number of shortcuts.
+ */
+static int find_shortcuts( WitnessSearch* ctx, Vertex* vv, const char* skip, WalkOptions* wo, int hoplimit, int settled_limit, CHPath*** shortcuts ) {
+    int n_in = 0, n_out = 0;
+    Edge** ins = (Edge**)malloc( (vv->degree_in+1)*sizeof(Edge*) );
+    State** in_states = (State**)malloc( (vv->degree_in+1)*sizeof(State*) );
+    Edge** outs = (Edge**)malloc( (vv->degree_out+1)*sizeof(Edge*) );
+    State** out_states = (State**)malloc( (vv->degree_out+1)*sizeof(State*) );
+    int count = 0, cap = 0;
+    int i, j, k;
+
+    CHPath** ret = NULL;
+
+    State* s0 = stateNew( 0, 0 );
+
+    //the lightest edge from each in-neighbor
+    ListNode* incoming;
+    for( incoming=vGetIncomingEdgeList( vv ); incoming; incoming=incoming->next ) {
+        Edge* ee = incoming->data;
+        if( ee->from == vv ) {
+            continue;
         }
-        
-        if( cvw[i] && cvw[i]->length > max_cvw ) {
-            max_cvw = cvw[i]->length;
+        State* su = eWalk( ee, s0, wo );
+        if( !su ) {
+            continue;
+        }
+        for(k=0; k<n_in && ins[k]->from != ee->from; k++);
+        if( k == n_in ) {
+            n_in++;
+        } else if( in_states[k]->weight <= su->weight ) {
+            stateDestroy( su );
+            continue;
+        } else {
+            stateDestroy( in_states[k] );
         }
+        ins[k] = ee;
+        in_states[k] = su;
     }
-    
-    // FOR ALL us AND ws, SEE IF THERE IS A PATH FROM u TO w IGNORING v THAT IS SHORTER THAN THE PATH THROUGH v
-    gSetVertexEnabled( gg, vv->label, 0 );
-    
-    //FOR EACH U
-    for(i=0; i<n_us; i++) {
-        SPTVertex* u = us[i];
-        
-        //if the path c(u,v) is NULL, it means u==v; ignore
-        if(cuv[i]) {
-        
-            long cuv_length = chpLength( cuv[i] );
-            long weightlimit = cuv_length + max_cvw;
-            
-            //FOR EACH W
-            for(j=0; j<n_ws; j++) {
-                SPTVertex* w = ws[j];
-                
-                // the path c(v,w) must be non-NULL, and u!=w
-                if( cvw[j] && strcmp(u->label,w->label)!=0 ) {
-                    CHPath* duw = dist( gg, u->label, w->label, wo, weightlimit, FALSE);
-                    
-                    // IF THE PATH AROUND IS LONGER THAN THE PATH THROUGH, ADD THE PATH THROUGH TO THE SHORTCUTS
-                    if( cuv_length+chpLength(cvw[j]) < chpLength(duw) ) {
-                        CHPath* yld = chpCombine( cuv[i], cvw[j] );
-                        ret[count] = yld;
-                        count++;
+
+    for(i=0; i<n_in; i++) {
+        Vertex* u = ins[i]->from;
+
+        //the lightest u->vv->w to each out-neighbor w
+        n_out = 0;
+        long max_via = 0;
+        ListNode* outgoing;
+        for( outgoing=vGetOutgoingEdgeList( vv ); outgoing; outgoing=outgoing->next ) {
+            Edge* ee = outgoing->data;
+            if( ee->to == vv || ee->to == u ) {
+                continue;
+            }
+            State* sw = eWalk( ee, in_states[i], wo );
+            if( !sw ) {
+                continue;
+            }
+            for(k=0; k<n_out && outs[k]->to != ee->to; k++);
+            if( k == n_out ) {
+                n_out++;
+            } else if( out_states[k]->weight <= sw->weight ) {
+                stateDestroy( sw );
+                continue;
+            } else {
+                stateDestroy( out_states[k] );
+            }
+            outs[k] = ee;
+            out_states[k] = sw;
+        }
+        for(j=0; j<n_out; j++) {
+            if( out_states[j]->weight > max_via ) {
+                max_via = out_states[j]->weight;
+            }
+        }
+
+        if( n_out > 0 ) {
+            wsearchRun( ctx, u, vv, skip, wo, max_via, hoplimit, settled_limit );
+        }
+
+        for(j=0; j<n_out; j++) {
+            // IF THE PATH AROUND IS LONGER THAN THE PATH THROUGH, ADD THE PATH THROUGH TO THE SHORTCUTS
+            if( out_states[j]->weight < wsearchWeight( ctx, outs[j]->to ) ) {
+                if( shortcuts ) {
+                    if( count == cap ) {
+                        cap = cap ? cap*2 : 8;
+                        ret = (CHPath**)realloc( ret, cap*sizeof(CHPath*) );
                     }
-                    
-                    chpDestroy( duw );
+                    CHPath* shortcut = chpNew( 2, out_states[j]->weight );
+                    shortcut->payloads[0] = ins[i]->payload;
+                    shortcut->payloads[1] = outs[j]->payload;
+                    shortcut->fromv = u;
+                    shortcut->tov = outs[j]->to;
+                    ret[count] = shortcut;
                 }
+                count++;
             }
+            stateDestroy( out_states[j] );
         }
     }
-    gSetVertexEnabled( gg, vv->label, 1 );
-    
-    for(i=0; i<n_us; i++) {
-        chpDestroy( cuv[i] );
+
+    for(i=0; i<n_in; i++) {
+        stateDestroy( in_states[i] );
     }
-    free( cuv );
-    for(i=0; i<n_ws; i++) {
-        chpDestroy( cvw[i] );
+    stateDestroy( s0 );
+    free( ins );
+    free( in_states );
+    free( outs );
+    free( out_states );
+
+    if( shortcuts ) {
+        *shortcuts = ret;
     }
-    free( cvw );
-    
-    free( us );
-    free( ws );
-    
-    sptDestroy( sptin );
-    sptDestroy( sptout );
-    
-    *n = count;
+    return count;
+}
+
+CHPath** get_shortcuts( Graph *gg, Vertex* vv, WalkOptions* wo, int search_limit, int* n ) {
+    WitnessSearch* ctx = wsearchNew( gg->index_size );
+    char* skip = (char*)calloc( gg->index_size+1, sizeof(char) );
+
+    CHPath** ret;
+    *n = find_shortcuts( ctx, vv, skip, wo, search_limit, CH_DEFAULT_SETTLED_LIMIT, &ret );
+
+    free( skip );
+    wsearchDestroy( ctx );
     return ret;
 }
 
@@ -255,116 +408,515 @@ int get_importance(Vertex *vertex, int n_shortcuts) {
 
 Heap* init_priority_queue( Graph* gg, WalkOptions* wo, int search_limit ) {
     Heap* pq = heapNew( 100 );
+    WitnessSearch* ctx = wsearchNew( gg->index_size );
+    char* skip = (char*)calloc( gg->index_size+1, sizeof(char) );
 
-    long n;
-    int i;
-    Vertex** vertices = gVertices( gg, &n );
-    for(i=0; i<n; i++) {
-        Vertex* vv = vertices[i];
-        int n_shortcuts=0;
-        CHPath** shortcuts = get_shortcuts( gg, vv, wo, search_limit, &n_shortcuts );
-        int imp = get_importance( vv, n_shortcuts );
-        printf( "%s %d/%ld, prio:%d\n", vv->label, i+1, n, imp );
-        pqPush( pq, vv, imp );
-        int j;
-        for(j=0; j<n_shortcuts; j++){
-            chpDestroy( shortcuts[j] );
-        }
-        free( shortcuts );
-    }
-    free(vertices);
+    long i;
+    for(i=0; i<gg->index_size; i++) {
+        Vertex* vv = gg->vertex_index[i];
+        if( vv ) {
+            int n_shortcuts = find_shortcuts( ctx, vv, skip, wo, search_limit, CH_DEFAULT_SETTLED_LIMIT, NULL );
+            pqPush( pq, vv, get_importance( vv, n_shortcuts ) );
+        }
+    }
+
+    free( skip );
+    wsearchDestroy( ctx );
     return pq;
 }
 
+/*
+ * PARALLEL CONTRACTION
+ *
+ * Each round contracts an independent set of vertices: those whose priority is lower than that of
+ * all their neighbors, ties going to the lower vertex index. No two of them are adjacent, so their
+ * shortcuts can be found in parallel against the same graph, with witness searches kept off every
+ * vertex of the set, and then applied one vertex at a time. Priorities are only recomputed for
+ * vertices whose neighborhood changed in the last round.
+ */
+
+typedef struct {
+    Vertex** vertices;
+    long n;
+    long next;           //next vertex to hand out; taken atomically
+    const char* skip;
+    WalkOptions* wo;
+    int hoplimit;
+    int settled_limit;
+    int* n_shortcuts;    //out, by position in vertices
+    CHPath*** shortcuts; //out, by position in vertices; NULL to only count
+} CHBatch;
+
+typedef struct {
+    CHBatch* batch;
+    WitnessSearch* ctx;
+} CHWorker;
+
+static void* chWork( void* arg ) {
+    CHWorker* worker = (CHWorker*)arg;
+    CHBatch* batch = worker->batch;
+    long i;
+
+    while( (i = __sync_fetch_and_add( &batch->next, 1 )) < batch->n ) {
+        batch->n_shortcuts[i] = find_shortcuts( worker->ctx, batch->vertices[i], batch->skip, batch->wo, batch->hoplimit, batch->settled_limit, batch->shortcuts ? &batch->shortcuts[i] : NULL );
+    }
+    return NULL;
+}
 
-CH* get_contraction_hierarchies(Graph* gg, WalkOptions* wo, int search_limit) {
-    Heap* pq = init_priority_queue( gg, wo, search_limit );
+//runs find_shortcuts over the batch, with the calling thread as one of the workers
+static void chRunBatch( CHBatch* batch, WitnessSearch** contexts, int n_threads ) {
+    pthread_t* threads = (pthread_t*)malloc( n_threads*sizeof(pthread_t) );
+    CHWorker* workers = (CHWorker*)malloc( n_threads*sizeof(CHWorker) );
+    int i, n_started = 0;
+
+    if( n_threads > batch->n ) {
+        n_threads = batch->n > 0 ? batch->n : 1;
+    }
+
+    batch->next = 0;
+    for(i=0; i<n_threads; i++) {
+        workers[i].batch = batch;
+        workers[i].ctx = contexts[i];
+    }
+    for(i=1; i<n_threads; i++) {
+        if( pthread_create( &threads[n_started+1], NULL, chWork, &workers[i] ) == 0 ) {
+            n_started++;
+        }
+    }
+    chWork( &workers[0] );
+    for(i=1; i<=n_started; i++) {
+        pthread_join( threads[i], NULL );
+    }
+
+    free( threads );
+    free( workers );
+}
+
+static int chPrecedes( const long* prio, const Vertex* a, const Vertex* b ) {
+    return prio[a->index] < prio[b->index] || (prio[a->index] == prio[b->index] && a->index < b->index);
+}
+
+static int chIsLocalMin( const long* prio, Vertex* vv ) {
+    ListNode* node;
+    for( node=vGetOutgoingEdgeList( vv ); node; node=node->next ) {
+        if( node->data->to != vv && chPrecedes( prio, node->data->to, vv ) ) {
+            return FALSE;
+        }
+    }
+    for( node=vGetIncomingEdgeList( vv ); node; node=node->next ) {
+        if( node->data->from != vv && chPrecedes( prio, node->data->from, vv ) ) {
+            return FALSE;
+        }
+    }
+    return TRUE;
+}
+
+//adds vertex's shortcuts to gg, moves its edges to the hierarchy and removes it from gg
+static void chContract( CH* ch, Graph* gg, Vertex* vertex, CHPath** shortcuts, int n_shortcuts, char* dirty, WalkOptions* wo ) {
+    // ADD SHORTCUTS
+    int j;
+    State* s0 = stateNew( 0, 0 );
+    for(j=0; j<n_shortcuts; j++) {
+        Combination* shortcut_payload = pathToEdgePayload( shortcuts[j] );
+        //fill the combination's walk cache now, so witness searches on other threads only read it
+        State* warm = comboWalk( (EdgePayload*)shortcut_payload, s0, wo );
+        if( warm ) {
+            stateDestroy( warm );
+        }
+        gAddEdge( gg, shortcuts[j]->fromv->label, shortcuts[j]->tov->label, (EdgePayload*)shortcut_payload );
+    }
+    stateDestroy( s0 );
+
+    // move edges from gg to gup and gdown
+    // vertices that are still in the graph are, by definition, of higher importance than the one
+    // currently being plucked from the graph. Edges that go out are upward edges. Edges that are coming in
+    // are downward edges.
+
+    // incoming, therefore downward
+    gAddVertex( ch->down, vertex->label );
+    ListNode* incoming = vGetIncomingEdgeList( vertex );
+    while(incoming) {
+        Edge* ee = incoming->data;
+        dirty[ee->from->index] = TRUE;
+        gAddVertex( ch->down, ee->from->label );
+        gAddEdge( ch->down, ee->from->label, ee->to->label, ee->payload );
+        incoming = incoming->next;
+    }
+
+    // outgoing, therefore upward
+    gAddVertex( ch->up, vertex->label );
+    ListNode* outgoing = vGetOutgoingEdgeList( vertex );
+    while(outgoing) {
+        Edge* ee = outgoing->data;
+
+        ee->to->deleted_neighbors++;
+        dirty[ee->to->index] = TRUE;
+
+        gAddVertex( ch->up, ee->to->label );
+        gAddEdge( ch->up, ee->from->label, ee->to->label, ee->payload );
+        outgoing = outgoing->next;
+    }
+
+    gRemoveVertex( gg, vertex->label, FALSE );
+}
+
+CH* get_contraction_hierarchies(Graph* gg, WalkOptions* wo, int search_limit, int settled_limit, int n_threads, CHProgress progress) {
+    //contraction removes vertices from the graph as it goes
+    if( gIsFrozen( gg ) ) {
+        fprintf( stderr, "Cannot build contraction hierarchies from a frozen graph\n" );
+        return NULL;
+    }
+
+    if( n_threads < 1 ) {
+        n_threads = (int)sysconf( _SC_NPROCESSORS_ONLN );
+        if( n_threads < 1 ) {
+            n_threads = 1;
+        }
+    }
+    //python payloads are walked through callbacks that need the interpreter lock, which the
+    //calling thread holds
+    if( gHasPayloadType( gg, PL_EXTERNVALUE ) ) {
+        n_threads = 1;
+    }
 
     CH* ret = chNew( );
-    
-    Vertex* vertex;
-    long n = gSize( gg );
-    
-    int i = 0;
-    while( !heapEmpty(pq) ) {
-        i++;
-        
-        long prio;
-        vertex = pqPop( pq, &prio );
-        
-        // make sure priority of current vertex
-        CHPath** shortcuts;
-        int n_shortcuts;
-        while(1) {
-            shortcuts = get_shortcuts( gg, vertex, wo, search_limit, &n_shortcuts );
-            long new_prio = get_importance( vertex, n_shortcuts );
-            if(new_prio == prio) {
-                break;
-            } else {
-                printf( "updated priority %ld != old priority %ld, reevaluate\n", new_prio, prio );
-                
-                //the shortcuts are invalid; delete them
-                int k;
-                for(k=0; k<n_shortcuts; k++) {
-                    chpDestroy( shortcuts[k] );
-                }
-                free( shortcuts );
-                
-                pqPush( pq, vertex, new_prio );
-                vertex = pqPop( pq, &prio );
+
+    long n_index = gg->index_size;
+    long* prio = (long*)calloc( n_index+1, sizeof(long) );
+    char* dirty = (char*)calloc( n_index+1, sizeof(char) );
+    char* in_set = (char*)calloc( n_index+1, sizeof(char) );
+    Vertex** remaining = (Vertex**)malloc( (n_index+1)*sizeof(Vertex*) );
+    Vertex** batch_vertices = (Vertex**)malloc( (n_index+1)*sizeof(Vertex*) );
+    int* n_shortcuts = (int*)malloc( (n_index+1)*sizeof(int) );
+    CHPath*** shortcuts = (CHPath***)malloc( (n_index+1)*sizeof(CHPath**) );
+    WitnessSearch** contexts = (WitnessSearch**)malloc( n_threads*sizeof(WitnessSearch*) );
+    long i, j;
+    int k;
+
+    for(k=0; k<n_threads; k++) {
+        contexts[k] = wsearchNew( n_index );
+    }
+
+    //the up and down graphs hold every vertex, at the same index in both, so a query can go from a
+    //vertex of one to the same vertex of the other by index
+    long n_remaining = 0;
+    for(i=0; i<n_index; i++) {
+        if( gg->vertex_index[i] ) {
+            remaining[n_remaining++] = gg->vertex_index[i];
+            dirty[i] = TRUE;
+            gAddVertex( ret->up, gg->vertex_index[i]->label );
+            gAddVertex( ret->down, gg->vertex_index[i]->label );
+        }
+    }
+    long n_total = n_remaining;
+
+    CHBatch batch;
+    batch.skip = in_set;
+    batch.wo = wo;
+    batch.hoplimit = search_limit;
+    batch.settled_limit = settled_limit;
+    batch.vertices = batch_vertices;
+    batch.n_shortcuts = n_shortcuts;
+
+    while( n_remaining > 0 ) {
+        // UPDATE THE PRIORITIES OF VERTICES WHOSE NEIGHBORHOOD CHANGED
+        batch.n = 0;
+        for(i=0; i<n_remaining; i++) {
+            if( dirty[remaining[i]->index] ) {
+                batch_vertices[batch.n++] = remaining[i];
             }
         }
-        
-        printf( "%s has %d deleted neighbors\n", vertex->label, vertex->deleted_neighbors ); 
-        printf( "contract %d/%ld %s (prio:%ld) with %d shortcuts\n", i, n, vertex->label, prio, n_shortcuts );
-            
-        // ADD SHORTCUTS
-        int j;
-        for(j=0; j<n_shortcuts; j++) {
-            // ADD SHORTCUT
-            Combination* shortcut_payload = pathToEdgePayload( shortcuts[j] );
-            
-            gAddEdge( gg, shortcuts[j]->fromv->label, shortcuts[j]->tov->label, (EdgePayload*)shortcut_payload );
+        batch.shortcuts = NULL;
+        chRunBatch( &batch, contexts, n_threads );
+        for(i=0; i<batch.n; i++) {
+            Vertex* vv = batch_vertices[i];
+            prio[vv->index] = get_importance( vv, n_shortcuts[i] );
+            dirty[vv->index] = FALSE;
         }
-        
-        int k;
-        for(k=0; k<n_shortcuts; k++) {
-            chpDestroy( shortcuts[k] );
-        }
-        free( shortcuts );
-
-        // move edges from gg to gup and gdown
-        // vertices that are still in the graph are, by definition, of higher importance than the one
-        // currently being plucked from the graph. Edges that go out are upward edges. Edges that are coming in
-        // are downward edges.
-
-        // incoming, therefore downward
-        gAddVertex( ret->down, vertex->label );
-        ListNode* incoming = vGetIncomingEdgeList( vertex );
-        while(incoming) {
-            Edge* ee = incoming->data;
-            gAddVertex( ret->down, ee->from->label );
-            gAddEdge( ret->down, ee->from->label, ee->to->label, ee->payload );
-            incoming = incoming->next;
-        }
-            
-        // outgoing, therefore upward
-        gAddVertex( ret->up, vertex->label );
-        ListNode* outgoing = vGetOutgoingEdgeList( vertex );
-        while(outgoing) {
-            Edge* ee = outgoing->data;
-            
-            ee->to->deleted_neighbors++;
-            
-            gAddVertex( ret->up, ee->to->label );
-            gAddEdge( ret->up, ee->from->label, ee->to->label, ee->payload );
-            outgoing = outgoing->next;
+
+        // PICK AN INDEPENDENT SET OF LOCAL MINIMA AND FIND THEIR SHORTCUTS
+        batch.n = 0;
+        for(i=0; i<n_remaining; i++) {
+            if( chIsLocalMin( prio, remaining[i] ) ) {
+                batch_vertices[batch.n++] = remaining[i];
+                in_set[remaining[i]->index] = TRUE;
+            }
+        }
+        batch.shortcuts = shortcuts;
+        chRunBatch( &batch, contexts, n_threads );
+
+        for(i=0, j=0; i<n_remaining; i++) {
+            if( !in_set[remaining[i]->index] ) {
+                remaining[j++] = remaining[i];
+            }
+        }
+        n_remaining = j;
+
+        // CONTRACT THEM
+        for(i=0; i<batch.n; i++) {
+            Vertex* vv = batch_vertices[i];
+            in_set[vv->index] = FALSE;
+            chContract( ret, gg, vv, shortcuts[i], n_shortcuts[i], dirty, wo );
+            for(k=0; k<n_shortcuts[i]; k++) {
+                chpDestroy( shortcuts[i][k] );
+            }
+            free( shortcuts[i] );
+        }
+
+        if( progress ) {
+            progress( n_total-n_remaining, n_total );
         }
-        
-        gRemoveVertex( gg, vertex->label, FALSE );
     }
-    
-    heapDestroy( pq );
-    
+
+    for(k=0; k<n_threads; k++) {
+        wsearchDestroy( contexts[k] );
+    }
+    free( contexts );
+    free( prio );
+    free( dirty );
+    free( in_set );
+    free( remaining );
+    free( batch_vertices );
+    free( n_shortcuts );
+    free( shortcuts );
+
+    return ret;
+}
+
+/*
+ * CH QUERY
+ *
+ * An upward search from the origin on the up graph and a backward upward search from the
+ * destination on the down graph, alternating on the lighter queue. Each side stops once its
+ * queue minimum is no lighter than the best meeting weight found. A vertex that can be reached
+ * more cheaply through a labelled higher neighbor is stalled, and its edges are not relaxed.
+ */
+
+typedef struct {
+    Graph* gg;
+    int forward;
+    long offset;     //weight of the initial state
+    State** state;   //by vertex index
+    Edge** parent;
+    char* settled;
+    Heap* heap;
+} CHSearch;
+
+static void chsInit( CHSearch* this, Graph* gg, int forward ) {
+    this->gg = gg;
+    this->forward = forward;
+    this->offset = 0;
+    this->state = (State**)calloc( gg->index_size+1, sizeof(State*) );
+    this->parent = (Edge**)calloc( gg->index_size+1, sizeof(Edge*) );
+    this->settled = (char*)calloc( gg->index_size+1, sizeof(char) );
+    this->heap = heapNew( 100 );
+}
+
+static void chsDestroy( CHSearch* this ) {
+    long i;
+    for(i=0; i<this->gg->index_size; i++) {
+        if( this->state[i] ) {
+            stateDestroy( this->state[i] );
+        }
+    }
+    free( this->state );
+    free( this->parent );
+    free( this->settled );
+    heapDestroy( this->heap );
+}
+
+static void chsLabel( CHSearch* this, Vertex* vv, State* state, Edge* parent ) {
+    if( this->state[vv->index] ) {
+        stateDestroy( this->state[vv->index] );
+    }
+    this->state[vv->index] = state;
+    this->parent[vv->index] = parent;
+    heapInsert( this->heap, (void*)vv, state->weight - this->offset );
+}
+
+//the key of the lightest unsettled vertex, or INFINITY
+static long chsMin( CHSearch* this ) {
+    long key;
+    while( !heapEmpty( this->heap ) ) {
+        Vertex* vv = (Vertex*)heapMin( this->heap, &key );
+        if( !this->settled[vv->index] && key == this->state[vv->index]->weight - this->offset ) {
+            return key;
+        }
+        heapPop( this->heap, &key ); //stale entry
+    }
+    return INFINITY;
+}
+
+static State* chsWalk( CHSearch* this, Edge* ee, State* state, WalkOptions* wo ) {
+    return this->forward ? eWalk( ee, state, wo ) : eWalkBack( ee, state, wo );
+}
+
+/*
+ * TRUE if some labelled neighbor above vv reaches it more cheaply than its own label. Edges from
+ * higher vertices down to vv are kept in the other side's graph, at the same vertex indices.
+ */
+static int chsStalled( CHSearch* this, CHSearch* other, Vertex* vv, WalkOptions* wo ) {
+    EdgeIter edges;
+    edgeIterInit( &edges, other->gg, other->gg->vertex_index[vv->index], this->forward );
+    long weight = this->state[vv->index]->weight;
+    Edge* ee;
+    while( (ee = edgeIterNext( &edges )) ) {
+        State* sx = this->state[(this->forward ? ee->from : ee->to)->index];
+        if( !sx || sx->weight >= weight ) {
+            continue;
+        }
+        State* sv = chsWalk( this, ee, sx, wo );
+        if( sv ) {
+            int stalled = sv->weight < weight;
+            stateDestroy( sv );
+            if( stalled ) {
+                return TRUE;
+            }
+        }
+    }
+    return FALSE;
+}
+
+//settles the lightest vertex of this and relaxes its edges; returns it
+static Vertex* chsSettle( CHSearch* this, CHSearch* other, WalkOptions* wo ) {
+    long key;
+    Vertex* uu = (Vertex*)heapPop( this->heap, &key );
+    this->settled[uu->index] = TRUE;
+    if( chsStalled( this, other, uu, wo ) ) {
+        return uu;
+    }
+
+    State* su = this->state[uu->index];
+    EdgeIter edges;
+    edgeIterInit( &edges, this->gg, uu, !this->forward );
+    Edge* ee;
+    while( (ee = edgeIterNext( &edges )) ) {
+        Vertex* vv = this->forward ? ee->to : ee->from;
+        if( this->settled[vv->index] ) {
+            continue;
+        }
+        State* sv = chsWalk( this, ee, su, wo );
+        if( !sv ) {
+            continue;
+        }
+        if( this->state[vv->index] && sv->weight >= this->state[vv->index]->weight ) {
+            stateDestroy( sv );
+            continue;
+        }
+        chsLabel( this, vv, sv, ee );
+    }
+    return uu;
+}
+
+static int chpUnpackedSize( EdgePayload* payload ) {
+    if( payload->type != PL_COMBINATION ) {
+        return 1;
+    }
+    int i, n = 0;
+    for(i=0; i<comboN( (Combination*)payload ); i++) {
+        n += chpUnpackedSize( comboGet( (Combination*)payload, i ) );
+    }
+    return n;
+}
+
+static int chpUnpack( EdgePayload* payload, EdgePayload** dest ) {
+    if( payload->type != PL_COMBINATION ) {
+        dest[0] = payload;
+        return 1;
+    }
+    int i, n = 0;
+    for(i=0; i<comboN( (Combination*)payload ); i++) {
+        n += chpUnpack( comboGet( (Combination*)payload, i ), dest+n );
+    }
+    return n;
+}
+
+CHPath* chShortestPath( CH* this, char* from_v_label, char* to_v_label, State* init_state, WalkOptions* wo ) {
+    Vertex* origin = gGetVertex( this->up, from_v_label );
+    Vertex* target = gGetVertex( this->down, to_v_label );
+    if( !origin || !target || this->up->index_size != this->down->index_size ) {
+        return NULL;
+    }
+
+    CHSearch sides[2];
+    chsInit( &sides[0], this->up, TRUE );
+    chsInit( &sides[1], this->down, FALSE );
+    sides[0].offset = init_state->weight;
+    State* back_state = stateDup( init_state );
+    back_state->weight = 0;
+    chsLabel( &sides[0], origin, stateDup( init_state ), NULL );
+    chsLabel( &sides[1], target, back_state, NULL );
+
+    long best = INFINITY;
+    long meet = -1; //vertex index
+    while( TRUE ) {
+        long keys[2] = { chsMin( &sides[0] ), chsMin( &sides[1] ) };
+        int i = keys[1] < keys[0];
+        if( keys[i] >= best ) {
+            break;
+        }
+
+        CHSearch* side = &sides[i];
+        CHSearch* other = &sides[!i];
+        long uu = chsSettle( side, other, wo )->index;
+        if( other->state[uu] ) {
+            long weight = side->state[uu]->weight - side->offset +
+                          other->state[uu]->weight - other->offset;
+            if( weight < best ) {
+                best = weight;
+                meet = uu;
+            }
+        }
+    }
+
+    CHPath* ret = NULL;
+    if( meet != -1 ) {
+        //edges from the origin up to the meeting vertex, then from it down to the target
+        int n_edges = 0, n = 0, i;
+        Vertex* vv;
+        for( vv=this->up->vertex_index[meet]; sides[0].parent[vv->index]; vv=sides[0].parent[vv->index]->from ) {
+            n_edges++;
+        }
+        int n_up = n_edges;
+        for( vv=this->down->vertex_index[meet]; sides[1].parent[vv->index]; vv=sides[1].parent[vv->index]->to ) {
+            n_edges++;
+        }
+
+        Edge** edges = (Edge**)malloc( (n_edges+1)*sizeof(Edge*) );
+        i = n_up;
+        for( vv=this->up->vertex_index[meet]; sides[0].parent[vv->index]; vv=sides[0].parent[vv->index]->from ) {
+            edges[--i] = sides[0].parent[vv->index];
+        }
+        i = n_up;
+        for( vv=this->down->vertex_index[meet]; sides[1].parent[vv->index]; vv=sides[1].parent[vv->index]->to ) {
+            edges[i++] = sides[1].parent[vv->index];
+        }
+
+        for(i=0; i<n_edges; i++) {
+            n += chpUnpackedSize( edges[i]->payload );
+        }
+        ret = chpNew( n, best );
+        n = 0;
+        for(i=0; i<n_edges; i++) {
+            n += chpUnpack( edges[i]->payload, ret->payloads+n );
+        }
+        ret->fromv = origin;
+        ret->tov = target;
+        free( edges );
+    }
+
+    chsDestroy( &sides[0] );
+    chsDestroy( &sides[1] );
     return ret;
 }
+
+int chpN( CHPath* this ) {
+    return this->n;
+}
+
+EdgePayload* chpGetPayload( CHPath* this, int i ) {
+    if( i < 0 || i >= this->n ) {
+        return NULL;
+    }
+    return this->payloads[i];
+}
@@ -7,11 +7,23 @@ struct CHPath {
     Vertex* tov;
 } ;
 
+//up and down hold the same vertices, at the same indices
 struct CH {
     Graph* up;
     Graph* down;
+    EdgePayload** payloads; //edge payloads owned by the hierarchy, if it was loaded by chLoad
+    long n_payloads;
+    SnapshotResources* resources; //the calendars and timezones those payloads refer to
 } ;
 
+//witness searches give up after settling this many vertices unless told otherwise
+#define CH_DEFAULT_SETTLED_LIMIT 1000
+
+typedef struct WitnessSearch WitnessSearch;
+
+//called after each round of contraction with the number of vertices contracted so far
+typedef void (*CHProgress)( long n_contracted, long n_vertices );
+
 CHPath* chpNew( int n, long length ) ;
 
 long chpLength( CHPath* this ) ;
@@ -22,6 +34,11 @@ void chpDestroy( CHPath* this ) ;
     
 CHPath* dist( Graph *gg, char* from_v_label, char* to_v_label, WalkOptions *wo, long weightlimit, int return_full_path ) ;
 
+WitnessSearch* wsearchNew( long n ) ;
+
+void wsearchDestroy( WitnessSearch* this ) ;
+
+//search_limit is the hop limit of the witness searches
 CHPath** get_shortcuts( Graph *gg, Vertex* vv, WalkOptions* wo, int search_limit, int* n ) ;
 
 Heap* init_priority_queue( Graph* gg, WalkOptions* wo, int search_limit );
@@ -30,7 +47,18 @@ void pqPush( Heap *pq, Vertex* item, long priority );
 
 Vertex* pqPop( Heap *pq, long *priority ) ;
 
-CH* get_contraction_hierarchies(Graph* gg, WalkOptions* wo, int search_limit) ;
+//contracts every vertex of gg, in rounds of independent sets contracted by n_threads threads (or
+//one per processor if n_threads < 1). search_limit and settled_limit bound the hops and settled
+//vertices of each witness search. progress may be NULL.
+CH* get_contraction_hierarchies(Graph* gg, WalkOptions* wo, int search_limit, int settled_limit, int n_threads, CHProgress progress) ;
+
+//the lightest path between two vertices of the hierarchy, with shortcuts unpacked into the original
+//edge payloads, or NULL if there is none
+CHPath* chShortestPath( CH* this, char* from_v_label, char* to_v_label, State* init_state, WalkOptions* wo ) ;
+
+int chpN( CHPath* this ) ;
+
+EdgePayload* chpGetPayload( CHPath* this, int i ) ;
 
 CH* chNew(void);
 
@@ -47,6 +47,12 @@ epDestroy( EdgePayload* this ) {
     case PL_CROSSING:
       crDestroy( (Crossing*)this );
       break;
+    case PL_HEADWAYBOARD:
+      hbDestroy( (HeadwayBoard*)this );
+      break;
+    case PL_HEADWAYALIGHT:
+      haDestroy( (HeadwayAlight*)this );
+      break;
     default:
       free( this );
   }
@@ -11,8 +11,8 @@ comboNew(int cap) {
     ret->n = 0;
     ret->payloads = (EdgePayload**)malloc(cap*sizeof(EdgePayload*));
     
-    ret->cache_state_forward = NULL;
-    ret->cache_state_reverse = NULL;
+    ret->cache_forward = NULL;
+    ret->cache_reverse = NULL;
     
     ret->walk = &comboWalk;
     ret->walkBack = &comboWalkBack;
@@ -28,12 +28,41 @@ comboAdd(Combination *this, EdgePayload *ep) {
     }
 }
 
+static void
+comboCacheDestroy(ComboCache* cache) {
+    if( cache ) {
+        stateDestroy( cache->state );
+        free( cache );
+    }
+}
+
+//returns a copy of param moved along by the cache
+static State*
+comboCacheApply(const ComboCache* cache, State* param) {
+    State* ret = stateDup( cache->state );
+    ret->weight = param->weight+cache->deltaw;
+    ret->time = param->time+cache->deltat;
+    return ret;
+}
+
+//remembers how ret differs from param, unless another thread got there first
+static void
+comboCacheStore(ComboCache** slot, State* param, State* ret) {
+    ComboCache* cache = (ComboCache*)malloc(sizeof(ComboCache));
+    cache->state = stateDup( ret );
+    cache->deltaw = ret->weight - param->weight;
+    cache->deltat = ret->time - param->time;
+
+    ComboCache* expected = NULL;
+    if( !__atomic_compare_exchange_n( slot, &expected, cache, 0, __ATOMIC_RELEASE, __ATOMIC_RELAXED ) ) {
+        comboCacheDestroy( cache );
+    }
+}
+
 void
 comboDestroy(Combination* this) {
-    if( this->cache_state_forward )
-        stateDestroy( this->cache_state_forward );
-    if( this->cache_state_reverse )
-        stateDestroy( this->cache_state_reverse );
+    comboCacheDestroy( this->cache_forward );
+    comboCacheDestroy( this->cache_reverse );
     
     free( this->payloads );
     free( this );
@@ -43,11 +72,9 @@ State*
 comboWalk(EdgePayload* superthis, State* param, WalkOptions* options) {
     Combination* this = (Combination*)superthis;
     
-    if( this->cache_state_forward ) {
-        State* ret = stateDup( this->cache_state_forward );
-        ret->weight = param->weight+this->cache_deltaw_forward;
-        ret->time = param->time+this->cache_deltat_forward;
-        return ret;
+    ComboCache* cache = __atomic_load_n( &this->cache_forward, __ATOMIC_ACQUIRE );
+    if( cache ) {
+        return comboCacheApply( cache, param );
     }
     
     if( this->n == 0 ) return NULL;
@@ -61,9 +88,7 @@ comboWalk(EdgePayload* superthis, State* param, WalkOptions* options) {
         stateDestroy( intermediate );
     }
     
-    this->cache_state_forward = stateDup( ret );
-    this->cache_deltaw_forward = ret->weight - param->weight;
-    this->cache_deltat_forward = ret->time - param->time;
+    comboCacheStore( &this->cache_forward, param, ret );
     
     return ret;
 }
@@ -72,11 +97,9 @@ State*
 comboWalkBack(EdgePayload* superthis, State* param, WalkOptions* options) {
     Combination* this = (Combination*)superthis;
     
-    if( this->cache_state_reverse ) {
-        State* ret = stateDup( this->cache_state_reverse );
-        ret->weight = param->weight+this->cache_deltaw_reverse;
-        ret->time = param->time+this->cache_deltat_reverse;
-        return ret;
+    ComboCache* cache = __atomic_load_n( &this->cache_reverse, __ATOMIC_ACQUIRE );
+    if( cache ) {
+        return comboCacheApply( cache, param );
     }
     
     if( this->n == 0 ) return NULL;
@@ -90,9 +113,7 @@ comboWalkBack(EdgePayload* superthis, State* param, WalkOptions* options) {
         stateDestroy( intermediate );
     }
     
-    this->cache_state_reverse = stateDup( ret );
-    this->cache_deltaw_reverse = ret->weight - param->weight;
-    this->cache_deltat_reverse = ret->time - param->time;
+    comboCacheStore( &this->cache_reverse, param, ret );
     
     return ret;
 }
@@ -4,6 +4,14 @@
 
 //---------------DECLARATIONS FOR COMBINATION CLASS---------------------
 
+//the change a walk across the combination made to a state, remembered after its first walk. Caches
+//are published atomically, so concurrent searches may walk the same combination.
+typedef struct ComboCache {
+  long deltaw;
+  long deltat;
+  State* state;
+} ComboCache;
+
 struct Combination {
   edgepayload_t type;
   long external_id;
@@ -14,13 +22,9 @@ struct Combination {
   int n;
   EdgePayload** payloads;
 
-  long cache_deltaw_forward;
-  long cache_deltat_forward;
-  State *cache_state_forward;
-  long cache_deltaw_reverse;
-  long cache_deltat_reverse;
-  State *cache_state_reverse;
-    
+  ComboCache* cache_forward;
+  ComboCache* cache_reverse;
+
 } ;
 
 Combination*
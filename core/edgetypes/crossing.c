@@ -10,6 +10,10 @@ crNew( ) {
   ret->n = 0;
   ret->crossing_times = NULL;
   ret->crossing_time_trip_ids = NULL;
+  ret->crossing_time_trips = NULL;
+  ret->index.mask = 0;
+  ret->index.trips = NULL;
+  ret->index.positions = NULL;
     
   ret->walk = &crWalk;
   ret->walkBack = &crWalkBack;
@@ -19,65 +23,69 @@ crNew( ) {
 
 void
 crDestroy(Crossing* this) {
-    int i;
-    for(i=0; i<this->n; i++) {
-        free(this->crossing_time_trip_ids[i]);
-    }
     free(this->crossing_time_trip_ids);
+    free(this->crossing_time_trips);
+    tiClear(&this->index);
     free(this->crossing_times);
     free(this);
 }
 
 void
 crAddCrossingTime(Crossing* this, char* trip_id, int crossing_time) {
+    int trip = tripIntern(trip_id);
+    
     // init the trip_id, depart list
     if(this->n==0) {
         this->crossing_times = (int*)malloc(sizeof(int));
         this->crossing_time_trip_ids = (char**)malloc(sizeof(char*));
+        this->crossing_time_trips = (int*)malloc(sizeof(int));
         
         this->crossing_times[0] = crossing_time;
         
-        int n = strlen(trip_id)+1;
-        this->crossing_time_trip_ids[0] = (char*)malloc(sizeof(char)*(n));
-        memcpy(this->crossing_time_trip_ids[0], trip_id, n);
+        this->crossing_time_trip_ids[0] = tripId(trip);
+        this->crossing_time_trips[0] = trip;
         
     } else {
         //allocate new, expanded lists with size enough for the extra departure
         int* next_crossing_times = (int*)malloc((this->n+1)*sizeof(int));
         char** next_crossing_time_trip_ids = (char**)malloc((this->n+1)*sizeof(char*));
+        int* next_crossing_time_trips = (int*)malloc((this->n+1)*sizeof(int));
         
         //copy old list to new list up to insertion point
         int i;
         for(i=0; i<this->n; i++) {
             next_crossing_times[i] = this->crossing_times[i];
             next_crossing_time_trip_ids[i] = this->crossing_time_trip_ids[i];
+            next_crossing_time_trips[i] = this->crossing_time_trips[i];
         }
         
         //copy new departure into lists
         next_crossing_times[this->n] = crossing_time;
-        int strn = strlen(trip_id)+1;
-        next_crossing_time_trip_ids[this->n] = (char*)malloc(sizeof(char)*(strn));
-        memcpy(next_crossing_time_trip_ids[this->n], trip_id, strn);
+        next_crossing_time_trip_ids[this->n] = tripId(trip);
+        next_crossing_time_trips[this->n] = trip;
         
         //free and replace old lists
         free(this->crossing_times);
         free(this->crossing_time_trip_ids);
+        free(this->crossing_time_trips);
         this->crossing_times = next_crossing_times;
         this->crossing_time_trip_ids = next_crossing_time_trip_ids;
+        this->crossing_time_trips = next_crossing_time_trips;
     }
     
     this->n += 1;
+    tiBuild(&this->index, this->crossing_time_trips, this->n);
 }
 
 int
 crGetCrossingTime(Crossing* this, char* trip_id) {
-    int i;
-    for(i=0; i<this->n; i++) {
-        if( strcmp(this->crossing_time_trip_ids[i], trip_id)==0 ) {
-            return this->crossing_times[i];
-        }
-    }
-    return -1;
+    return crGetCrossingTimeByTrip(this, tripLookup(trip_id));
+}
+
+int
+crGetCrossingTimeByTrip(Crossing* this, int trip) {
+    int i = tiGet(&this->index, trip);
+    return i == -1 ? -1 : this->crossing_times[i];
 }
 
 char*
@@ -107,12 +115,12 @@ crWalk( EdgePayload* superthis, State* state, WalkOptions* options ) {
     Crossing* this = (Crossing*)superthis;
     
     // the state must have a trip_id, or else we don't know how long they'll spend on the bus
-    if( state->trip_id==NULL ) {
+    if( state->trip==NO_TRIP ) {
         return NULL;
     }
     
     // get the crossing time as a function of the trip
-    int crossing_time = crGetCrossingTime( this, state->trip_id );
+    int crossing_time = crGetCrossingTimeByTrip( this, state->trip );
     
     // bail if you're on a trip that doesn't cross this crossing
     if(crossing_time==-1) {
@@ -142,12 +150,12 @@ crWalkBack( EdgePayload* superthis, State* state, WalkOptions* options ) {
     Crossing* this = (Crossing*)superthis;
     
     // the state must have a trip_id, or else we don't know how long they'll spend on the bus
-    if( state->trip_id==NULL ) {
+    if( state->trip==NO_TRIP ) {
         return NULL;
     }
     
     // get the crossing time as a function of the trip
-    int crossing_time = crGetCrossingTime( this, state->trip_id );
+    int crossing_time = crGetCrossingTimeByTrip( this, state->trip );
     
     // bail if you're on a trip that doesn't cross this crossing
     if(crossing_time==-1) {
@@ -10,7 +10,9 @@ struct Crossing {
     State* (*walkBack)(struct EdgePayload*, struct State*, struct WalkOptions*);
     
     int* crossing_times;
-    char** crossing_time_trip_ids;
+    char** crossing_time_trip_ids;  //interned
+    int* crossing_time_trips;       //trip indices of the crossing_time_trip_ids
+    TripIndex index;
     int n;
 } ;
 
@@ -26,6 +28,9 @@ crAddCrossingTime(Crossing* this, char* trip_id, int crossing_time);
 int
 crGetCrossingTime(Crossing* this, char* trip_id);
 
+int
+crGetCrossingTimeByTrip(Crossing* this, int trip);
+
 char*
 crGetCrossingTimeTripIdByIndex(Crossing* this, int i);
 
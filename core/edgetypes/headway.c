@@ -12,9 +12,8 @@ headwayNew(int begin_time, int end_time, int wait_period, int transit, char* tri
     ret->end_time = end_time;
     ret->wait_period = wait_period;
     ret->transit = transit;
-    int n = strlen(trip_id)+1;
-    ret->trip_id = (char*)malloc(sizeof(char)*(n));
-    memcpy(ret->trip_id, trip_id, n);
+    ret->trip = tripIntern(trip_id);
+    ret->trip_id = tripId(ret->trip);
     ret->calendar = calendar;
     ret->timezone = timezone;
     ret->agency = agency;
@@ -29,7 +28,6 @@ headwayNew(int begin_time, int end_time, int wait_period, int transit, char* tri
 
 void
 headwayDestroy(Headway* tokill) {
-  free(tokill->trip_id);
   free(tokill);
 }
 
@@ -96,8 +94,7 @@ headwayWalkGeneral(EdgePayload* superthis, State* state, WalkOptions* options, i
     //if this is a transfer
     if( !state->prev_edge ||
         state->prev_edge->type != PL_HEADWAY  ||    //the last edge wasn't a bus
-        !((Headway*)state->prev_edge)->trip_id               ||    //it was a bus, but the trip_id was NULL
-        strcmp( ((Headway*)state->prev_edge)->trip_id, this->trip_id ) != 0 )  { //the current and previous trip_ids are not the same
+        ((Headway*)state->prev_edge)->trip != this->trip )  { //the current and previous trip_ids are not the same
 
       transfer_penalty = options->transfer_penalty; //penalty of making a transfer; flat rate. "all things being equal, transferring costs a little"
 
@@ -116,8 +113,7 @@ headwayWalkGeneral(EdgePayload* superthis, State* state, WalkOptions* options, i
             wait = this->begin_time - adjusted_time;
         } else if( !state->prev_edge ||
             (state->prev_edge->type != PL_HEADWAY)  ||    //the last edge wasn't a bus
-            !((Headway*)state->prev_edge)->trip_id               ||    //it was a bus, but the trip_id was NULL
-            strcmp( ((Headway*)state->prev_edge)->trip_id, this->trip_id ) != 0 )  { //the current and previous trip_ids are not the same
+            ((Headway*)state->prev_edge)->trip != this->trip )  { //the current and previous trip_ids are not the same
             wait = this->wait_period;
         }
         
@@ -139,8 +135,7 @@ headwayWalkGeneral(EdgePayload* superthis, State* state, WalkOptions* options, i
             wait = adjusted_time - this->begin_time;
         } else if( !state->prev_edge ||
             (state->prev_edge->type != PL_HEADWAY)  ||    //the last edge wasn't a bus
-            !((Headway*)state->prev_edge)->trip_id               ||    //it was a bus, but the trip_id was NULL
-            strcmp( ((Headway*)state->prev_edge)->trip_id, this->trip_id ) != 0 )  { //the current and previous trip_ids are not the same
+            ((Headway*)state->prev_edge)->trip != this->trip )  { //the current and previous trip_ids are not the same
             wait = this->wait_period;
         }
         
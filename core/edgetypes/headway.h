@@ -13,7 +13,8 @@ struct Headway {
   int end_time;
   int wait_period;
   int transit;
-  char* trip_id;
+  char* trip_id;                //interned
+  int trip;
   ServiceCalendar* calendar;
   Timezone* timezone;
   int agency;
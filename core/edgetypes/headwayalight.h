@@ -10,7 +10,8 @@ struct HeadwayAlight {
     State* (*walkBack)(struct EdgePayload*, struct State*, struct WalkOptions*);
     
     ServiceId service_id;
-    char* trip_id;
+    char* trip_id;                //interned
+    int trip;
     int start_time;
     int end_time;
     int headway_secs;
@@ -8,9 +8,8 @@ hbNew(  ServiceId service_id, ServiceCalendar* calendar, Timezone* timezone, int
   ret->external_id = 0;
   ret->type = PL_HEADWAYBOARD;
 
-  int n = strlen(trip_id)+1;
-  ret->trip_id = (char*)malloc(sizeof(char)*(n));
-  memcpy(ret->trip_id, trip_id, n);
+  ret->trip = tripIntern(trip_id);
+  ret->trip_id = tripId(ret->trip);
   ret->start_time = start_time;
   ret->end_time = end_time;
   ret->headway_secs = headway_secs;
@@ -28,7 +27,6 @@ hbNew(  ServiceId service_id, ServiceCalendar* calendar, Timezone* timezone, int
 
 void
 hbDestroy(HeadwayBoard* this) {
-  free( this->trip_id );
   free( this );
 }
 
@@ -132,6 +130,7 @@ hbWalk( EdgePayload* superthis, State* state, WalkOptions* options ) {
     ret->weight += options->transfer_penalty;
     
     ret->trip_id = this->trip_id;
+    ret->trip = this->trip;
     
     // Make sure the service period caches are updated if we've traveled over a service period boundary
     int i;
@@ -155,6 +154,7 @@ hbWalkBack(EdgePayload* superthis, State* state, WalkOptions* options) {
     ret->time   -= wait;
     ret->weight += wait; //transfer penalty
     ret->trip_id = NULL;
+    ret->trip = NO_TRIP;
     
     return ret;
 }
@@ -11,6 +11,10 @@ alNew( ServiceId service_id, ServiceCalendar* calendar, Timezone* timezone, int
   ret->n = 0;
   ret->arrivals = NULL;
   ret->trip_ids = NULL;
+  ret->trips = NULL;
+  ret->index.mask = 0;
+  ret->index.trips = NULL;
+  ret->index.positions = NULL;
   ret->stop_sequences = NULL;
     
   ret->calendar = calendar;
@@ -28,13 +32,11 @@ alNew( ServiceId service_id, ServiceCalendar* calendar, Timezone* timezone, int
 
 void
 alDestroy(TripAlight* this) {
-  int i;
-  for(i=0; i<this->n; i++) {
-    free(this->trip_ids[i]);
-  }
   if(this->trip_ids) {
     free(this->trip_ids);
   }
+  free(this->trips);
+  tiClear(&this->index);
   if(this->arrivals){
     free(this->arrivals);
   }
@@ -74,23 +76,26 @@ alAddAlighting(TripAlight* this, char* trip_id, int arrival, int stop_sequence)
     if (arrival > SECS_IN_DAY+this->overage)
         this->overage = arrival-SECS_IN_DAY;
     
+    int trip = tripIntern(trip_id);
+    
     // init the trip_id, depart list
     if(this->n==0) {
         this->arrivals = (int*)malloc(sizeof(int));
         this->trip_ids = (char**)malloc(sizeof(char*));
+        this->trips = (int*)malloc(sizeof(int));
         this->stop_sequences = (int*)malloc(sizeof(int));
         
         this->arrivals[0] = arrival;
         this->stop_sequences[0] = stop_sequence;
         
-        int n = strlen(trip_id)+1;
-        this->trip_ids[0] = (char*)malloc(sizeof(char)*(n));
-        memcpy(this->trip_ids[0], trip_id, n);
+        this->trips[0] = trip;
+        this->trip_ids[0] = tripId(trip);
         
     } else {
         //allocate new, expanded lists with size enough for the extra departure
         int* next_arrivals = (int*)malloc((this->n+1)*sizeof(int));
         char** next_trip_ids = (char**)malloc((this->n+1)*sizeof(char*));
+        int* next_trips = (int*)malloc((this->n+1)*sizeof(int));
         int* next_stop_sequences = (int*)malloc((this->n+1)*sizeof(int));
         
         //find insertion point
@@ -101,33 +106,37 @@ alAddAlighting(TripAlight* this, char* trip_id, int arrival, int stop_sequence)
         for(i=0; i<m; i++) {
             next_arrivals[i] = this->arrivals[i];
             next_trip_ids[i] = this->trip_ids[i];
+            next_trips[i] = this->trips[i];
             next_stop_sequences[i] = this->stop_sequences[i];
         }
         
         //copy new departure into lists
         next_arrivals[m] = arrival;
-        int strn = strlen(trip_id)+1;
-        next_trip_ids[m] = (char*)malloc(sizeof(char)*(strn));
-        memcpy(next_trip_ids[m], trip_id, strn);
+        next_trip_ids[m] = tripId(trip);
+        next_trips[m] = trip;
         next_stop_sequences[m] = stop_sequence;
         
         //copy old list to new list from insertion point on
         for(i=m; i<this->n; i++) {
             next_arrivals[i+1] = this->arrivals[i];
             next_trip_ids[i+1] = this->trip_ids[i];
+            next_trips[i+1] = this->trips[i];
             next_stop_sequences[i+1] = this->stop_sequences[i];
         }
         
         //free and replace old lists
         free(this->arrivals);
         free(this->trip_ids);
+        free(this->trips);
         free(this->stop_sequences);
         this->arrivals = next_arrivals;
         this->trip_ids = next_trip_ids;
+        this->trips = next_trips;
         this->stop_sequences = next_stop_sequences;
     }
     
     this->n += 1;
+    tiBuild(&this->index, this->trips, this->n);
 }
 
 char*
@@ -197,20 +206,19 @@ int
 alGetAlightingIndexByTripId(TripAlight* this, char* trip_id) {
     /* returns the boarding index of the alighting with the given trip_id */
     
-    int i;
-    for(i=0; i<this->n; i++) {
-        if( strcmp(this->trip_ids[i], trip_id)==0 ) {
-            return i;
-        }
-    }
-    
-    return -1; 
+    return alGetAlightingIndexByTrip(this, tripLookup(trip_id));
+}
+
+int
+alGetAlightingIndexByTrip(TripAlight* this, int trip) {
+    return tiGet(&this->index, trip);
 }
 
 State*
 alWalk(EdgePayload* this, State* state, WalkOptions* options) {
     State* ret = stateDup( state );
     ret->trip_id = NULL;
+    ret->trip = NO_TRIP;
     
     return ret;
 }
@@ -284,6 +292,7 @@ alWalkBack( EdgePayload* superthis, State* state, WalkOptions* options ) {
     ret->weight += options->transfer_penalty;
     
     ret->trip_id = this->trip_ids[last_alighting_index];
+    ret->trip = this->trips[last_alighting_index];
     
     // Make sure the service period caches are updated if we've traveled over a service period boundary
     int i;
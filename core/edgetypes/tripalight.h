@@ -11,7 +11,9 @@ struct TripAlight {
     
     int n;
     int* arrivals;
-    char** trip_ids;
+    char** trip_ids;              //interned
+    int* trips;                   //trip indices of the trip_ids
+    TripIndex index;
     int* stop_sequences;
     
     ServiceCalendar* calendar;
@@ -67,6 +69,9 @@ alGetOverage(TripAlight* this);
 int
 alGetAlightingIndexByTripId(TripAlight* this, char* trip_id);
 
+int
+alGetAlightingIndexByTrip(TripAlight* this, int trip);
+
 State*
 alWalk(EdgePayload* this, State* state, WalkOptions* options);
 
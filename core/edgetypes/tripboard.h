@@ -13,7 +13,9 @@ struct TripBoard {
     
     int n;
     int* departs;
-    char** trip_ids;
+    char** trip_ids;              //interned
+    int* trips;                   //trip indices of the trip_ids
+    TripIndex index;
     int* stop_sequences;
     
     ServiceCalendar* calendar;
@@ -75,4 +77,7 @@ tbWalkBack( EdgePayload* superthis, State* state, WalkOptions* options );
 int
 tbGetBoardingIndexByTripId(TripBoard* this, char* trip_id);
 
+int
+tbGetBoardingIndexByTrip(TripBoard* this, int trip);
+
 #endif
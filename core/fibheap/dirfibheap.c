@@ -4,31 +4,27 @@
 #include "../graph.h"
 #include "dirfibheap.h"
 #include <stdlib.h>
-#include "../hashtable/hashtable_gs.h"
-#include "../hashtable/hashtable.h"
 
 dirfibheap_t 
-dirfibheap_new(long initSize)
+dirfibheap_new(long n_vertices)
 {
   dirfibheap_t ret = (dirfibheap_t)malloc( sizeof(struct dirfibheap) );
   ret->heap = fibheap_new();
-  ret->dir = create_hashtable_string(initSize);
+  ret->size = n_vertices;
+  ret->dir = (fibnode_t*)calloc( n_vertices+1, sizeof(fibnode_t) );
   return ret;
 }
 
 fibnode_t
 dirfibheap_insert_or_dec_key( dirfibheap_t self, Vertex* vtx, fibheapkey_t priority )
 {
-  char* key = vtx->label;
-  
-  fibnode_t fibnode = hashtable_search( self->dir, key );
+  fibnode_t fibnode = self->dir[vtx->index];
 
   if( fibnode ) {
     fibheap_replace_key( self->heap, fibnode, priority );
   } else {
     fibnode = fibheap_insert( self->heap, priority, (void*)vtx );
-    hashtable_insert_string(self->dir, key, fibnode);
-
+    self->dir[vtx->index] = fibnode;
   }
   return fibnode;
 }
@@ -38,13 +34,13 @@ dirfibheap_extract_min( dirfibheap_t self )
 {
   Vertex* best = (Vertex*)fibheap_extract_min( self->heap );
   if(best) 
-    hashtable_remove(self->dir, best->label);
+    self->dir[best->index] = NULL;
   return best;
 }
 
 fibnode_t
-dirfibheap_get_fibnode( dirfibheap_t self, char* key ) {
-  return hashtable_search( self->dir, key );
+dirfibheap_get_fibnode( dirfibheap_t self, Vertex* vtx ) {
+  return self->dir[vtx->index];
 }
 
 int
@@ -55,7 +51,7 @@ dirfibheap_empty( dirfibheap_t self ) {
 void
 dirfibheap_delete( dirfibheap_t self )
 {
-  hashtable_destroy( self->dir, 0 ); //do not delete values in queue
+  free( self->dir ); //do not delete values in queue
   fibheap_delete( self->heap );
   free( self );
 }
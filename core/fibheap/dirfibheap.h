@@ -2,16 +2,17 @@
 #define DIRFIBHEAP_H
 
 struct dirfibheap {
-  struct hashtable *dir;
+  fibnode_t *dir; //fibnodes of queued vertices, by vertex index
+  long size;
   struct fibheap *heap;
 };
 
 typedef struct dirfibheap* dirfibheap_t;
 
-extern dirfibheap_t dirfibheap_new(long initSize);
+extern dirfibheap_t dirfibheap_new(long n_vertices);
 extern fibnode_t dirfibheap_insert_or_dec_key ( dirfibheap_t , Vertex* , fibheapkey_t );
 extern Vertex* dirfibheap_extract_min ( dirfibheap_t );
-extern fibnode_t dirfibheap_get_fibnode( dirfibheap_t self, char* key );
+extern fibnode_t dirfibheap_get_fibnode( dirfibheap_t self, Vertex* vtx );
 extern int dirfibheap_empty( dirfibheap_t );
 extern void dirfibheap_delete ( dirfibheap_t );
 
@@ -3,9 +3,15 @@
 #include "graph.h"
 #include "fibheap/fibheap.h"
 #include "fibheap/dirfibheap.h"
+#include "vertexqueue.h"
+#include "heuristic.h"
+#include "searchworkspace.h"
+#include "snapshot.h"
 
+#include <pthread.h>
 #include <stddef.h>
 #include <string.h>
+#include <unistd.h>
 #include "hashtable/hashtable_gs.h"
 #include "hashtable/hashtable_itr.h"
 
@@ -22,12 +28,71 @@ gNew() {
   Graph *this = (Graph*)malloc(sizeof(Graph));
   this->vertices = create_hashtable_string(16); //TODO: find a better number.
 
+  this->index_cap = 16;
+  this->index_size = 0;
+  this->vertex_index = (Vertex**)malloc(this->index_cap*sizeof(Vertex*));
+
+  this->finalized = 0;
+  this->time_dependent = 0;
+  this->out_offsets = NULL;
+  this->out_edges = NULL;
+  this->in_offsets = NULL;
+  this->in_edges = NULL;
+
+  this->frozen = 0;
+  this->arena = NULL;
+  this->packed_edges = NULL;
+  this->resources = NULL;
+
   return this;
 }
 
+void
+gFreeAdjacency( Graph* this ) {
+  //a frozen graph's adjacency arrays are part of its arena
+  if( this->frozen ) {
+    return;
+  }
+
+  free( this->out_offsets );
+  free( this->out_edges );
+  free( this->in_offsets );
+  free( this->in_edges );
+  this->out_offsets = NULL;
+  this->out_edges = NULL;
+  this->in_offsets = NULL;
+  this->in_edges = NULL;
+  this->finalized = 0;
+}
+
+static void
+gDestroyFrozen( Graph* this, int free_edge_payloads ) {
+  long i;
+  long n_edges = this->out_offsets[this->index_size];
+
+  if( free_edge_payloads ) {
+    for(i=0; i<n_edges; i++) {
+      epDestroy( this->packed_edges[i].payload );
+    }
+  }
+
+  hashtable_destroy( this->vertices, 0 );
+  free( this->vertex_index );
+  free( this->arena );
+  if( this->resources ) {
+    snapshotResourcesDestroy( this->resources );
+  }
+  free( this );
+}
+
 void
 gDestroyBasic( Graph* this, int free_edge_payloads ) {
 
+  if( this->frozen ) {
+    gDestroyFrozen( this, free_edge_payloads );
+    return;
+  }
+
   //destroy each vertex contained within
   struct hashtable_itr *itr = hashtable_iterator(this->vertices);
   int next_exists = hashtable_count(this->vertices);
@@ -41,6 +106,12 @@ gDestroyBasic( Graph* this, int free_edge_payloads ) {
   free(itr);
   //destroy the table
   hashtable_destroy( this->vertices, 0 );
+  //destroy the integer index and adjacency arrays
+  free( this->vertex_index );
+  gFreeAdjacency( this );
+  if( this->resources ) {
+    snapshotResourcesDestroy( this->resources );
+  }
   //destroy the graph object itself
   free( this );
 
@@ -54,9 +125,24 @@ gDestroy( Graph* this ) {
 Vertex*
 gAddVertex( Graph* this, const char *label ) {
   Vertex* exists = gGetVertex( this, label );
+  if( !exists && this->frozen ) {
+    fprintf( stderr, "Cannot add vertex \"%s\" to a frozen graph\n", label );
+    return NULL;
+  }
   if( !exists ) {
-    exists = vNew( label );
+    exists = vNew( (char*)label );
     hashtable_insert_string( this->vertices, label, exists );
+
+    //hand out the next integer index
+    if( this->index_size == this->index_cap ) {
+      this->index_cap *= 2;
+      this->vertex_index = (Vertex**)realloc( this->vertex_index, this->index_cap*sizeof(Vertex*) );
+    }
+    exists->index = this->index_size;
+    this->vertex_index[this->index_size] = exists;
+    this->index_size++;
+
+    this->finalized = 0;
   }
 
   return exists;
@@ -68,8 +154,15 @@ gRemoveVertex( Graph* this, const char *label, int free_edge_payloads ) {
     if(!exists) {
         return;
     }
+    if( this->frozen ) {
+        fprintf( stderr, "Cannot remove vertex \"%s\" from a frozen graph\n", label );
+        return;
+    }
     
     hashtable_remove( this->vertices, label );
+    //leave a hole in the index; gFinalize closes it
+    this->vertex_index[exists->index] = NULL;
+    this->finalized = 0;
     vDestroy( exists, free_edge_payloads );
 }
 
@@ -94,9 +187,38 @@ gAddEdge( Graph* this, const char *from, const char *to, EdgePayload *payload )
   if(!(vtx_from && vtx_to))
     return NULL;
 
+  if( this->frozen ) {
+    fprintf( stderr, "Cannot add edge \"%s\"->\"%s\" to a frozen graph\n", from, to );
+    return NULL;
+  }
+
+  this->finalized = 0;
   return vLink( vtx_from, vtx_to, payload );
 }
 
+long
+gAddEdges( Graph* this, const char **from, const char **to, EdgePayload **payloads, long n, int add_vertices ) {
+  long i;
+  if( n == 0 )
+    return 0;
+  if( this->frozen ) {
+    fprintf( stderr, "Cannot add edges to a frozen graph\n" );
+    return 0;
+  }
+
+  this->finalized = 0;
+  for (i = 0; i < n; i++) {
+    Vertex* vtx_from = add_vertices ? gAddVertex( this, from[i] ) : gGetVertex( this, from[i] );
+    Vertex* vtx_to   = add_vertices ? gAddVertex( this, to[i] )   : gGetVertex( this, to[i] );
+
+    if(!(vtx_from && vtx_to))
+      return i;
+
+    vLink( vtx_from, vtx_to, payloads[i] );
+  }
+  return n;
+}
+
 Vertex**
 gVertices( const Graph* this, long* num_vertices ) {
   unsigned int nn = hashtable_count(this->vertices);
@@ -119,12 +241,538 @@ gVertices( const Graph* this, long* num_vertices ) {
   return ret;
 }
 
+//payloads whose walk only depends on the edge and the walk options, never on the time of day
+static int
+epIsTimeIndependent( const EdgePayload* payload ) {
+  switch( payload->type ) {
+    case PL_STREET:
+    case PL_LINK:
+    case PL_EGRESS:
+    case PL_ELAPSE_TIME:
+      return 1;
+    default:
+      return 0;
+  }
+}
+
+void
+gFinalize( Graph* this ) {
+  long i;
+  long n = 0;
+  long n_out = 0;
+  long n_in = 0;
+
+  //a frozen graph is always finalized
+  if( this->frozen ) {
+    return;
+  }
+
+  //compact the index, closing the holes left by removed vertices
+  for(i=0; i<this->index_size; i++) {
+    Vertex* vv = this->vertex_index[i];
+    if( vv ) {
+      vv->index = n;
+      this->vertex_index[n] = vv;
+      n_out += vv->degree_out;
+      n_in += vv->degree_in;
+      n++;
+    }
+  }
+  this->index_size = n;
+
+  //lay the edge lists out as compressed sparse rows, in edge list order
+  gFreeAdjacency( this );
+  this->out_offsets = (long*)malloc((n+1)*sizeof(long));
+  this->in_offsets = (long*)malloc((n+1)*sizeof(long));
+  this->out_edges = (Edge**)malloc((n_out+1)*sizeof(Edge*));
+  this->in_edges = (Edge**)malloc((n_in+1)*sizeof(Edge*));
+
+  long out_pos = 0;
+  long in_pos = 0;
+  this->time_dependent = 0;
+  for(i=0; i<n; i++) {
+    Vertex* vv = this->vertex_index[i];
+
+    this->out_offsets[i] = out_pos;
+    ListNode* outgoing = vGetOutgoingEdgeList( vv );
+    while( outgoing ) {
+      if( !epIsTimeIndependent( outgoing->data->payload ) ) {
+        this->time_dependent = 1;
+      }
+      this->out_edges[out_pos++] = outgoing->data;
+      outgoing = outgoing->next;
+    }
+
+    this->in_offsets[i] = in_pos;
+    ListNode* incoming = vGetIncomingEdgeList( vv );
+    while( incoming ) {
+      this->in_edges[in_pos++] = incoming->data;
+      incoming = incoming->next;
+    }
+  }
+  this->out_offsets[n] = out_pos;
+  this->in_offsets[n] = in_pos;
+
+  this->finalized = 1;
+}
+
+int
+gIsFinalized( const Graph* this ) {
+  return this->finalized;
+}
+
+int
+gIsTimeDependent( const Graph* this ) {
+  long i;
+
+  if( this->finalized ) {
+    return this->time_dependent;
+  }
+
+  for(i=0; i<this->index_size; i++) {
+    if( !this->vertex_index[i] ) {
+      continue;
+    }
+    ListNode* outgoing = vGetOutgoingEdgeList( this->vertex_index[i] );
+    while( outgoing ) {
+      if( !epIsTimeIndependent( outgoing->data->payload ) ) {
+        return 1;
+      }
+      outgoing = outgoing->next;
+    }
+  }
+  return 0;
+}
+
+/*
+ * Packs the vertices and edges described by spec into a single arena and points this at it,
+ * replacing its label table and index. Whatever this held before is not freed.
+ */
+static void
+gPack( Graph* this, const FrozenGraphSpec* spec ) {
+  long i, j;
+
+  long n = spec->n_vertices;
+  long n_edges = spec->out_offsets[n];
+  size_t label_bytes = 0;
+  for(i=0; i<n; i++) {
+    label_bytes += strlen( spec->labels[i] )+1;
+  }
+
+  //lay the arena out by decreasing alignment, labels last
+  size_t vertices_size = n*sizeof(Vertex);
+  size_t edges_size = n_edges*sizeof(Edge);
+  size_t in_edges_size = n_edges*sizeof(Edge*);
+  size_t offsets_size = (n+1)*sizeof(long);
+  size_t nodes_size = (2*n+2*n_edges)*sizeof(ListNode);
+  char* arena = (char*)malloc( vertices_size+edges_size+in_edges_size+2*offsets_size+nodes_size+label_bytes+1 );
+
+  Vertex* vertices = (Vertex*)arena;
+  Edge* edges = (Edge*)(arena+vertices_size);
+  Edge** in_edges = (Edge**)(arena+vertices_size+edges_size);
+  long* out_offsets = (long*)(arena+vertices_size+edges_size+in_edges_size);
+  long* in_offsets = (long*)(arena+vertices_size+edges_size+in_edges_size+offsets_size);
+  ListNode* nodes = (ListNode*)(arena+vertices_size+edges_size+in_edges_size+2*offsets_size);
+  char* labels = arena+vertices_size+edges_size+in_edges_size+2*offsets_size+nodes_size;
+
+  memcpy( out_offsets, spec->out_offsets, offsets_size );
+
+  //the edges, contiguous in outgoing CSR order
+  this->time_dependent = 0;
+  for(i=0; i<n; i++) {
+    for(j=out_offsets[i]; j<out_offsets[i+1]; j++) {
+      edges[j].from = vertices+i;
+      edges[j].to = vertices+spec->targets[j];
+      edges[j].payload = spec->payloads[j];
+      edges[j].enabled = spec->enabled ? spec->enabled[j] : TRUE;
+      if( !epIsTimeIndependent( edges[j].payload ) ) {
+        this->time_dependent = 1;
+      }
+    }
+  }
+
+  //the incoming edges, in the given order or else by source
+  if( spec->in_offsets ) {
+    memcpy( in_offsets, spec->in_offsets, offsets_size );
+    for(j=0; j<n_edges; j++) {
+      in_edges[j] = edges+spec->in_edges[j];
+    }
+  } else {
+    memset( in_offsets, 0, offsets_size );
+    for(j=0; j<n_edges; j++) {
+      in_offsets[spec->targets[j]+1]++;
+    }
+    for(i=0; i<n; i++) {
+      in_offsets[i+1] += in_offsets[i];
+    }
+    long* cursor = (long*)malloc( (n+1)*sizeof(long) );
+    memcpy( cursor, in_offsets, offsets_size );
+    for(j=0; j<n_edges; j++) {
+      in_edges[cursor[spec->targets[j]]++] = edges+j;
+    }
+    free( cursor );
+  }
+
+  //the vertices, with edge lists over the packed edges
+  ListNode* node = nodes;
+  char* label = labels;
+  for(i=0; i<n; i++) {
+    Vertex* vv = vertices+i;
+
+    vv->degree_out = out_offsets[i+1]-out_offsets[i];
+    vv->degree_in = in_offsets[i+1]-in_offsets[i];
+    vv->deleted_neighbors = spec->deleted_neighbors ? spec->deleted_neighbors[i] : 0;
+    vv->index = i;
+    vv->has_coordinates = spec->has_coordinates ? spec->has_coordinates[i] : FALSE;
+    vv->lat = vv->has_coordinates ? spec->lat[i] : 0;
+    vv->lon = vv->has_coordinates ? spec->lon[i] : 0;
+    vv->label = label;
+    strcpy( label, spec->labels[i] );
+    label += strlen( spec->labels[i] )+1;
+
+    vv->outgoing = node++;
+    vv->outgoing->data = NULL;
+    ListNode* tail = vv->outgoing;
+    for(j=out_offsets[i]; j<out_offsets[i+1]; j++) {
+      tail->next = node++;
+      tail = tail->next;
+      tail->data = edges+j;
+    }
+    tail->next = NULL;
+
+    vv->incoming = node++;
+    vv->incoming->data = NULL;
+    tail = vv->incoming;
+    for(j=in_offsets[i]; j<in_offsets[i+1]; j++) {
+      tail->next = node++;
+      tail = tail->next;
+      tail->data = in_edges[j];
+    }
+    tail->next = NULL;
+  }
+
+  //index and label table over the packed vertices
+  this->index_cap = n > 16 ? n : 16;
+  this->index_size = n;
+  this->vertex_index = (Vertex**)realloc( this->vertex_index, this->index_cap*sizeof(Vertex*) );
+  hashtable_destroy( this->vertices, 0 );
+  this->vertices = create_hashtable_string( n > 16 ? n : 16 );
+  for(i=0; i<n; i++) {
+    this->vertex_index[i] = vertices+i;
+    hashtable_insert_string( this->vertices, vertices[i].label, vertices+i );
+  }
+
+  this->out_offsets = out_offsets;
+  this->out_edges = NULL;
+  this->in_offsets = in_offsets;
+  this->in_edges = in_edges;
+  this->packed_edges = edges;
+  this->arena = arena;
+  this->finalized = 1;
+  this->frozen = 1;
+}
+
+Graph*
+gNewFrozen( const FrozenGraphSpec* spec ) {
+  Graph* this = gNew();
+  gPack( this, spec );
+  return this;
+}
+
+void
+gFreeze( Graph* this ) {
+  long i, j;
+
+  if( this->frozen ) {
+    return;
+  }
+
+  gFinalize( this );
+
+  long n = this->index_size;
+  long n_edges = this->out_offsets[n];
+
+  FrozenGraphSpec spec;
+  spec.n_vertices = n;
+  spec.labels = (char**)malloc( (n+1)*sizeof(char*) );
+  spec.has_coordinates = (int*)malloc( (n+1)*sizeof(int) );
+  spec.lat = (double*)malloc( (n+1)*sizeof(double) );
+  spec.lon = (double*)malloc( (n+1)*sizeof(double) );
+  spec.deleted_neighbors = (int*)malloc( (n+1)*sizeof(int) );
+  spec.out_offsets = this->out_offsets;
+  spec.targets = (long*)malloc( (n_edges+1)*sizeof(long) );
+  spec.payloads = (EdgePayload**)malloc( (n_edges+1)*sizeof(EdgePayload*) );
+  spec.enabled = (int*)malloc( (n_edges+1)*sizeof(int) );
+  spec.in_offsets = this->in_offsets;
+  spec.in_edges = (long*)malloc( (n_edges+1)*sizeof(long) );
+
+  Vertex** old_vertices = (Vertex**)malloc( (n+1)*sizeof(Vertex*) );
+  for(i=0; i<n; i++) {
+    Vertex* old = this->vertex_index[i];
+    old_vertices[i] = old;
+    spec.labels[i] = old->label;
+    spec.has_coordinates[i] = old->has_coordinates;
+    spec.lat[i] = old->lat;
+    spec.lon[i] = old->lon;
+    spec.deleted_neighbors[i] = old->deleted_neighbors;
+  }
+
+  //the old edge's 'enabled' field is overwritten with its position in the outgoing order once
+  //copied, so the incoming arrays can be translated below
+  for(j=0; j<n_edges; j++) {
+    Edge* old = this->out_edges[j];
+    spec.targets[j] = old->to->index;
+    spec.payloads[j] = old->payload;
+    spec.enabled[j] = old->enabled;
+    old->enabled = j;
+  }
+  for(j=0; j<n_edges; j++) {
+    spec.in_edges[j] = this->in_edges[j]->enabled;
+  }
+
+  long* old_out_offsets = this->out_offsets;
+  Edge** old_out_edges = this->out_edges;
+  long* old_in_offsets = this->in_offsets;
+  Edge** old_in_edges = this->in_edges;
+  gPack( this, &spec );
+
+  //release the old vertices, edges, list nodes and adjacency; the payloads are carried over
+  for(i=0; i<n; i++) {
+    Vertex* old = old_vertices[i];
+    ListNode* curr = old->outgoing;
+    while( curr ) {
+      ListNode* next = curr->next;
+      if( curr->data ) {
+        free( curr->data );
+      }
+      free( curr );
+      curr = next;
+    }
+    curr = old->incoming;
+    while( curr ) {
+      ListNode* next = curr->next;
+      free( curr );
+      curr = next;
+    }
+    free( old->label );
+    free( old );
+  }
+  free( old_out_offsets );
+  free( old_out_edges );
+  free( old_in_offsets );
+  free( old_in_edges );
+
+  free( old_vertices );
+  free( spec.labels );
+  free( spec.has_coordinates );
+  free( spec.lat );
+  free( spec.lon );
+  free( spec.deleted_neighbors );
+  free( spec.targets );
+  free( spec.payloads );
+  free( spec.enabled );
+  free( spec.in_edges );
+}
+
+int
+gIsFrozen( const Graph* this ) {
+  return this->frozen;
+}
+
+long
+gIndexSize( const Graph* this ) {
+  return this->index_size;
+}
+
+Vertex*
+gGetVertexByIndex( const Graph* this, long index ) {
+  if( index < 0 || index >= this->index_size ) {
+    return NULL;
+  }
+  return this->vertex_index[index];
+}
+
+static void
+sptReserveIndex( ShortestPathTree* this, long index_size ) {
+  free( this->vertex_index );
+  this->vertex_index = (SPTVertex**)calloc( index_size+1, sizeof(SPTVertex*) );
+  this->index_size = index_size;
+  this->n_indexed = 0;
+}
+
+static inline SPTVertex*
+sptGetIndexed( const ShortestPathTree* this, long index ) {
+  if( this->workspace ) {
+    return wsGetVertex( this->workspace, index );
+  }
+  return this->vertex_index[index];
+}
+
+static inline Edge*
+sptSetParent( ShortestPathTree* this, SPTVertex* vtx, SPTVertex* parent, EdgePayload* payload ) {
+  if( this->workspace ) {
+    return wsSetParent( this->workspace, vtx, parent, payload );
+  }
+  return sptvSetParent( vtx, parent, payload );
+}
+
 #undef RETRO
 #include "router.c"
 #define RETRO
 #include "router.c"
 #undef RETRO
 
+ShortestPathTree*
+gShortestPathBidirectional( Graph* this, char *from, char *to, State* init_state, WalkOptions* options, long maxtime, int hoplimit, long weightlimit, SearchWorkspace* workspace ) {
+  Vertex* origin_v = gGetVertex( this, from );
+  Vertex* target_v = to ? gGetVertex( this, to ) : NULL;
+
+  //the weights of the two halves only add up to the weight of the whole path when they depend on
+  //neither the time of day nor, through turn penalties, the edge walked before
+  if( !origin_v || !target_v || options->turn_penalty != 0 || gIsTimeDependent( this ) ) {
+    return gShortestPathTree( this, from, to, init_state, options, maxtime, hoplimit, weightlimit, NULL, workspace );
+  }
+
+  //trees[0] grows forward from the origin, trees[1] backward from the target
+  ShortestPathTree* trees[2];
+  VertexQueue* queues[2];
+  long settled[2] = {0, 0}; //weight of the vertex last settled by each half
+  int side;
+  for(side=0; side<2; side++) {
+    if( side == 0 && workspace ) {
+      if( !(trees[side] = wsAcquire( workspace, this )) ) {
+        fprintf( stderr, "Search workspace still holds the tree of a previous search\n" );
+        return NULL;
+      }
+      queues[side] = wsQueue( workspace, (vqtype_t)options->queue_type );
+      continue;
+    }
+    trees[side] = sptNew();
+    sptReserveIndex( trees[side], this->index_size );
+    queues[side] = vqNew( (vqtype_t)options->queue_type, this->index_size );
+  }
+
+  sptAddVertex( trees[0], origin_v, 0 )->state = init_state;
+  vqInsertOrDecKey( queues[0], origin_v, 0 );
+
+  State* final_state = stateDup( init_state );
+  final_state->weight = 0;
+  final_state->dist_walked = 0;
+  final_state->prev_edge = NULL;
+  sptAddVertex( trees[1], target_v, 0 )->state = final_state;
+  vqInsertOrDecKey( queues[1], target_v, 0 );
+
+  //lightest origin-to-target weight seen so far, and the vertex where its halves meet
+  long best = INFINITY;
+  Vertex* meet = NULL;
+  if( origin_v == target_v ) {
+    best = 0;
+    meet = origin_v;
+  }
+
+  side = 1;
+  while( !vqEmpty( queues[0] ) && !vqEmpty( queues[1] ) ) {
+    //no unsettled vertex can be part of a lighter path
+    if( settled[0] + settled[1] >= best ) {
+      break;
+    }
+
+    side = !side;
+    Vertex* u = vqExtractMin( queues[side] );
+    SPTVertex* spt_u = sptGetIndexed( trees[side], u->index );
+    State* du = spt_u->state;
+    settled[side] = du->weight;
+
+    if( spt_u->hop >= hoplimit || du->weight > weightlimit || (side == 0 && du->time > maxtime) ) {
+      break;
+    }
+
+    EdgeIter edges;
+    edgeIterInit( &edges, this, u, side );
+    Edge* edge;
+    while( (edge = edgeIterNext( &edges )) ) {
+      Vertex* v = side ? edge->from : edge->to;
+      SPTVertex* spt_v = sptGetIndexed( trees[side], v->index );
+      long old_w = spt_v ? spt_v->state->weight : INFINITY;
+
+      State* new_dv = side ? eWalkBack( edge, du, options ) : eWalk( edge, du, options );
+      if( !new_dv ) {
+        continue;
+      }
+      if( new_dv->weight < du->weight || new_dv->weight >= old_w ) {
+        stateDestroy( new_dv );
+        continue;
+      }
+
+      vqInsertOrDecKey( queues[side], v, new_dv->weight );
+      if( !spt_v ) {
+        spt_v = sptAddVertex( trees[side], v, spt_u->hop+1 );
+      }
+      if( spt_v->state ) {
+        stateDestroy( spt_v->state );
+      }
+      spt_v->state = new_dv;
+      sptSetParent( trees[side], spt_v, spt_u, edge->payload );
+
+      SPTVertex* other = sptGetIndexed( trees[!side], v->index );
+      if( other && new_dv->weight + other->state->weight < best ) {
+        best = new_dv->weight + other->state->weight;
+        meet = v;
+      }
+    }
+  }
+
+  if( !workspace ) {
+    vqDestroy( queues[0] );
+  }
+  vqDestroy( queues[1] );
+
+  //graft the backward half onto the forward tree, walking its edges forward from the meeting vertex
+  ShortestPathTree* spt = trees[0];
+  if( meet ) {
+    SPTVertex* curr = sptGetIndexed( spt, meet->index );
+    SPTVertex* back = sptGetIndexed( trees[1], meet->index );
+    while( (back->degree_in > 0) ) {
+      Edge* parent = sptvGetParent( back );
+      SPTVertex* back_next = (SPTVertex*)parent->from;
+      State* new_state = epWalk( parent->payload, curr->state, options );
+      if( !new_state ) {
+        break;
+      }
+
+      SPTVertex* spt_next = sptGetIndexed( spt, back_next->mirror->index );
+      if( spt_next && spt_next->state->weight <= new_state->weight ) {
+        //the forward tree already reaches it at least as cheaply
+        stateDestroy( new_state );
+      } else {
+        if( !spt_next ) {
+          spt_next = sptAddVertex( spt, back_next->mirror, curr->hop+1 );
+        }
+        if( spt_next->state ) {
+          stateDestroy( spt_next->state );
+        }
+        spt_next->state = new_state;
+        spt_next->hop = curr->hop+1;
+        sptSetParent( spt, spt_next, curr, parent->payload );
+      }
+
+      curr = spt_next;
+      back = back_next;
+    }
+  }
+  sptDestroy( trees[1] );
+
+  //walking past max_walk makes street weights depend on the distance walked before them
+  SPTVertex* spt_target = sptGetIndexed( spt, target_v->index );
+  if( meet && spt_target && spt_target->state->dist_walked > options->max_walk ) {
+    sptGetIndexed( spt, origin_v->index )->state = NULL; //hand init_state over to the fallback
+    sptDestroy( spt );
+    return gShortestPathTree( this, from, to, init_state, options, maxtime, hoplimit, weightlimit, NULL, workspace );
+  }
+
+  return spt;
+}
+
 #define LARGEST_ROUTE_SIZE 10000
 
 State*
@@ -143,10 +791,10 @@ gShortestPath( Graph* this, char *from, char *to, State* init_state, int directi
   ShortestPathTree *raw_tree;
   SPTVertex *curr;
   if(direction) {
-    raw_tree = gShortestPathTree( this, from, to, init_state, options, timelimit, hoplimit, weightlimit );
+    raw_tree = gShortestPathTree( this, from, to, init_state, options, timelimit, hoplimit, weightlimit, NULL, NULL );
     curr = sptGetVertex( raw_tree, to );
   } else {
-    raw_tree = gShortestPathTreeRetro( this, from, to, init_state, options, timelimit, hoplimit, weightlimit );
+    raw_tree = gShortestPathTreeRetro( this, from, to, init_state, options, timelimit, hoplimit, weightlimit, NULL, NULL );
     curr = sptGetVertex( raw_tree, from );
   }
 
@@ -208,9 +856,157 @@ gShortestPath( Graph* this, char *from, char *to, State* init_state, int directi
   return ret;
 }
 
+int
+gHasPayloadType( const Graph* this, edgepayload_t type ) {
+  long i;
+  for(i=0; i<this->index_size; i++) {
+    if( !this->vertex_index[i] ) {
+      continue;
+    }
+    EdgeIter edges;
+    edgeIterInit( &edges, this, this->vertex_index[i], 0 );
+    Edge* edge;
+    while( (edge = edgeIterNext( &edges )) ) {
+      if( edge->payload->type == type ) {
+        return 1;
+      }
+    }
+  }
+  return 0;
+}
+
+/*
+ * TRAVEL TIME MATRIX
+ *
+ * Each thread takes the next origin, grows a full tree from it in its own workspace and copies out
+ * the states of the destinations, so only the origin counter is shared.
+ */
+
+typedef struct MatrixWork {
+  Graph* graph;
+  char** origins;
+  long n_origins;
+  Vertex** destinations;
+  long n_destinations;
+  State* init_state;
+  WalkOptions* options;
+  long maxtime;
+  long* times;
+  long* weights;
+  long next_origin;
+} MatrixWork;
+
+static void*
+gMatrixWork( void* arg ) {
+  MatrixWork* work = (MatrixWork*)arg;
+  SearchWorkspace* workspace = wsNew();
+  long i, j;
+
+  while( (i = __atomic_fetch_add( &work->next_origin, 1, __ATOMIC_RELAXED )) < work->n_origins ) {
+    long* times = work->times + i*work->n_destinations;
+    long* weights = work->weights + i*work->n_destinations;
+    for(j=0; j<work->n_destinations; j++) {
+      times[j] = -1;
+      weights[j] = -1;
+    }
+
+    if( !gGetVertex( work->graph, work->origins[i] ) ) {
+      continue;
+    }
+    ShortestPathTree* spt = gShortestPathTree( work->graph, work->origins[i], NULL, stateDup( work->init_state ), work->options, work->maxtime, INFINITY, INFINITY, NULL, workspace );
+    for(j=0; j<work->n_destinations; j++) {
+      SPTVertex* spt_v = work->destinations[j] ? sptGetIndexed( spt, work->destinations[j]->index ) : NULL;
+      if( spt_v ) {
+        times[j] = spt_v->state->time - work->init_state->time;
+        weights[j] = spt_v->state->weight;
+      }
+    }
+    sptDestroy( spt );
+  }
+
+  wsDestroy( workspace );
+  return NULL;
+}
+
+void
+gTravelTimeMatrix( Graph* this, char** origins, long n_origins, char** destinations, long n_destinations, State* init_state, WalkOptions* options, long maxtime, int n_threads, long* times, long* weights ) {
+  long i;
+  MatrixWork work = {this, origins, n_origins, NULL, n_destinations, init_state, options, maxtime, times, weights, 0};
+
+  work.destinations = (Vertex**)malloc( (n_destinations+1)*sizeof(Vertex*) );
+  for(i=0; i<n_destinations; i++) {
+    work.destinations[i] = gGetVertex( this, destinations[i] );
+  }
+
+  if( n_threads < 1 ) {
+    n_threads = (int)sysconf( _SC_NPROCESSORS_ONLN );
+  }
+  if( n_threads > n_origins ) {
+    n_threads = (int)n_origins;
+  }
+  //python payloads need the interpreter lock, which the calling thread may hold
+  if( gHasPayloadType( this, PL_EXTERNVALUE ) ) {
+    n_threads = 1;
+  }
+
+  //the calling thread is one of the workers
+  pthread_t* threads = (pthread_t*)malloc( (n_threads+1)*sizeof(pthread_t) );
+  int n_started = 0;
+  while( n_started < n_threads-1 && pthread_create( &threads[n_started], NULL, gMatrixWork, &work ) == 0 ) {
+    n_started++;
+  }
+  gMatrixWork( &work );
+  for(i=0; i<n_started; i++) {
+    pthread_join( threads[i], NULL );
+  }
+
+  free( threads );
+  free( work.destinations );
+}
+
+long
+gShortestPathArrays( Graph* this, char* from, State* init_state, WalkOptions* options, long maxtime, int hoplimit, long weightlimit, SearchWorkspace* workspace, long* times, long* weights, long* parents, EdgePayload** parent_payloads ) {
+  //the tree is only read here, so it's grown in a workspace that's thrown away if not given one
+  SearchWorkspace* own_workspace = workspace ? NULL : wsNew();
+  ShortestPathTree* spt = gShortestPathTree( this, from, NULL, init_state, options, maxtime, hoplimit, weightlimit, NULL, workspace ? workspace : own_workspace );
+  if( own_workspace && !spt ) {
+    wsDestroy( own_workspace );
+  }
+  if( !spt ) {
+    stateDestroy( init_state );
+    return -1;
+  }
+
+  long i, n_reached = 0;
+  for(i=0; i<this->index_size; i++) {
+    SPTVertex* spt_v = sptGetIndexed( spt, i );
+    times[i] = -1;
+    weights[i] = -1;
+    parents[i] = -1;
+    parent_payloads[i] = NULL;
+    if( !spt_v ) {
+      continue;
+    }
+
+    n_reached++;
+    times[i] = spt_v->state->time;
+    weights[i] = spt_v->state->weight;
+    ListNode* incoming = vGetIncomingEdgeList( (Vertex*)spt_v );
+    if( incoming ) {
+      Edge* edge = liGetData( incoming );
+      parents[i] = ((SPTVertex*)eGetFrom( edge ))->mirror->index;
+      parent_payloads[i] = edge->payload;
+    }
+  }
+
+  sptDestroy( spt );
+  if( own_workspace ) wsDestroy( own_workspace );
+  return n_reached;
+}
+
 Path *
 sptPathRetro(Graph* g, char* origin_label) {
-  Vertex* curr = gGetVertex(g, origin_label);
+  Vertex* curr = (Vertex*)sptGetVertex((ShortestPathTree*)g, origin_label);
   ListNode* incoming = NULL;
   Edge* edge = NULL;
     
@@ -260,12 +1056,33 @@ gSetVertexEnabled( Graph *this, char *label, int enabled ) {
 
 ShortestPathTree*
 sptNew() {
-    return (ShortestPathTree*)gNew();
+    ShortestPathTree *this = (ShortestPathTree*)malloc(sizeof(ShortestPathTree));
+    this->vertices = create_hashtable_string(16);
+    this->vertex_index = NULL;
+    this->index_size = 0;
+    this->n_indexed = 0;
+    this->indexed_labels = NULL;
+    this->workspace = NULL;
+
+    return this;
 }
 
 void
 sptDestroy( ShortestPathTree *this ) {
+  //the workspace keeps the tree and its vertices for the next search
+  if( this->workspace ) {
+    wsRelease( this->workspace );
+    return;
+  }
+
   //destroy each vertex contained within
+  long i;
+  for(i=0; i<this->index_size; i++) {
+    if( this->vertex_index[i] ) {
+      sptvDestroy( this->vertex_index[i] );
+    }
+  }
+
   struct hashtable_itr *itr = hashtable_iterator(this->vertices);
   int next_exists = hashtable_count(this->vertices);
 
@@ -276,18 +1093,56 @@ sptDestroy( ShortestPathTree *this ) {
   }
 
   free(itr);
-  //destroy the table
+  //destroy the tables
   hashtable_destroy( this->vertices, 0 );
+  if( this->indexed_labels ) {
+    hashtable_destroy( this->indexed_labels, 0 );
+  }
+  free( this->vertex_index );
   //destroy the graph object itself
   free( this );
 }
 
+//the indexed vertices by label, built by the first lookup by label
+static struct hashtable*
+sptIndexedLabels( ShortestPathTree* this ) {
+  if( !this->indexed_labels ) {
+    this->indexed_labels = create_hashtable_string( this->n_indexed > 16 ? this->n_indexed : 16 );
+    long i;
+    for(i=0; i<this->index_size; i++) {
+      if( this->vertex_index[i] ) {
+        hashtable_insert_string( this->indexed_labels, this->vertex_index[i]->mirror->label, this->vertex_index[i] );
+      }
+    }
+  }
+  return this->indexed_labels;
+}
+
 SPTVertex*
 sptAddVertex( ShortestPathTree *this, Vertex *mirror, int hop ) {
-  SPTVertex* exists = sptGetVertex( this, mirror->label );
+  if( this->workspace ) {
+    return wsAddVertex( this->workspace, mirror, hop );
+  }
+
+  //vertices without an index are looked up by label
+  if( mirror->index < 0 || mirror->index >= this->index_size ) {
+    SPTVertex* exists = hashtable_search( this->vertices, mirror->label );
+    if( !exists ) {
+      exists = sptvNew( mirror, hop );
+      hashtable_insert_string( this->vertices, mirror->label, exists );
+    }
+    return exists;
+  }
+
+  SPTVertex* exists = this->vertex_index[mirror->index];
   if( !exists ) {
     exists = sptvNew( mirror, hop );
-    hashtable_insert_string( this->vertices, mirror->label, exists );
+    this->vertex_index[mirror->index] = exists;
+    this->n_indexed++;
+    //labels are only hashed once something has looked a vertex up by one
+    if( this->indexed_labels ) {
+      hashtable_insert_string( this->indexed_labels, mirror->label, exists );
+    }
   }
 
   return exists;
@@ -299,14 +1154,36 @@ sptRemoveVertex( ShortestPathTree *this, char *label ) {
     if(!exists) {
         return;
     }
+
+    if( this->workspace ) {
+      wsRemoveVertex( this->workspace, exists );
+      return;
+    }
     
-    hashtable_remove( this->vertices, label );
+    long index = exists->mirror->index;
+    if( index >= 0 && index < this->index_size && this->vertex_index[index] == exists ) {
+      this->vertex_index[index] = NULL;
+      this->n_indexed--;
+      if( this->indexed_labels ) {
+        hashtable_remove( this->indexed_labels, label );
+      }
+    } else {
+      hashtable_remove( this->vertices, label );
+    }
     sptvDestroy( exists );
 }
 
 SPTVertex*
 sptGetVertex( ShortestPathTree *this, char *label ) {
-    return (SPTVertex*)gGetVertex( (Graph*)this, label );
+    if( this->workspace ) {
+      Vertex* mirror = gGetVertex( this->workspace->graph, label );
+      return mirror ? wsGetVertex( this->workspace, mirror->index ) : NULL;
+    }
+    SPTVertex* ret = hashtable_search( this->vertices, label );
+    if( ret || !this->n_indexed ) {
+      return ret;
+    }
+    return hashtable_search( sptIndexedLabels( this ), label );
 }
 
 Edge*
@@ -317,17 +1194,48 @@ sptAddEdge( ShortestPathTree *this, char *from, char *to, EdgePayload *payload )
   if(!(vtx_from && vtx_to))
     return NULL;
 
+  //workspace vertices only have room for their parent edge
+  if( this->workspace ) {
+    fprintf( stderr, "Cannot add edge \"%s\"->\"%s\" to a tree held by a search workspace\n", from, to );
+    return NULL;
+  }
+
   return sptvLink( vtx_from, vtx_to, payload );
 }
 
 SPTVertex**
 sptVertices( ShortestPathTree *this, long* num_vertices ) {
-    return (SPTVertex**)gVertices( (Graph*)this, num_vertices );
+    if( this->workspace ) {
+      return wsVertices( this->workspace, num_vertices );
+    }
+
+    long n = sptSize( this );
+    SPTVertex** ret = (SPTVertex**)malloc( (n+1)*sizeof(SPTVertex*) );
+    long i, j = 0;
+    for(i=0; i<this->index_size; i++) {
+      if( this->vertex_index[i] ) {
+        ret[j++] = this->vertex_index[i];
+      }
+    }
+
+    struct hashtable_itr *itr = hashtable_iterator(this->vertices);
+    int next_exists = hashtable_count(this->vertices);
+    while(itr && next_exists) {
+      ret[j++] = hashtable_iterator_value( itr );
+      next_exists = hashtable_iterator_advance( itr );
+    }
+    free(itr);
+
+    *num_vertices = n;
+    return ret;
 }
 
 long
 sptSize( ShortestPathTree* this ) {
-    return gSize( (Graph*)this );
+    if( this->workspace ) {
+      return this->workspace->n_touched;
+    }
+    return this->n_indexed + hashtable_count( this->vertices );
 }
 
 
@@ -351,6 +1259,10 @@ vNew( char* label ) {
     Vertex *this = (Vertex *)malloc(sizeof(Vertex)) ;
 
     vInit( this, label );
+    this->index = -1; //not yet part of a graph
+    this->has_coordinates = 0;
+    this->lat = 0;
+    this->lon = 0;
 
 
     return this ;
@@ -445,6 +1357,33 @@ vDegreeIn( const Vertex* this ) {
     return this->degree_in;
 }
 
+long
+vGetIndex( const Vertex* this ) {
+    return this->index;
+}
+
+void
+vSetCoordinates( Vertex* this, double lat, double lon ) {
+    this->has_coordinates = 1;
+    this->lat = lat;
+    this->lon = lon;
+}
+
+int
+vHasCoordinates( const Vertex* this ) {
+    return this->has_coordinates;
+}
+
+double
+vGetLat( const Vertex* this ) {
+    return this->lat;
+}
+
+double
+vGetLon( const Vertex* this ) {
+    return this->lon;
+}
+
 //SPTVERTEX METHODS
 
 SPTVertex *
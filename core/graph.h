@@ -3,10 +3,68 @@
 
 struct Graph {
    struct hashtable* vertices;
+
+   // dense integer index of the vertices; vertex_index[v->index] == v
+   Vertex** vertex_index;
+   long index_size;
+   long index_cap;
+
+   // compressed sparse row adjacency, built by gFinalize and valid while finalized is set.
+   // The edges of the vertex with index i are out_edges[out_offsets[i]] to out_edges[out_offsets[i+1]-1]
+   int finalized;
+   long* out_offsets;
+   Edge** out_edges;
+   long* in_offsets;
+   Edge** in_edges;
+
+   // whether any edge payload's walk depends on the time of day, as of the last gFinalize
+   int time_dependent;
+
+   // set by gFreeze. Vertices, edges, edge list nodes, labels and the CSR arrays then all live
+   // in one arena, and the outgoing edges of the vertex with index i are the contiguous structs
+   // packed_edges[out_offsets[i]] to packed_edges[out_offsets[i+1]-1]
+   int frozen;
+   void* arena;
+   Edge* packed_edges;
+
+   // the service calendars and timezones of a graph read by gLoadSnapshot, destroyed with it
+   SnapshotResources* resources;
+};
+
+// the flat description of a graph that gNewFrozen packs into an arena. The outgoing edges of the
+// vertex with index i are out_offsets[i] to out_offsets[i+1]-1, going to targets[j] with payload
+// payloads[j]. Incoming edges are ordered by source unless in_offsets and in_edges, indices of
+// outgoing edges, are given. The other optional arrays may also be NULL.
+struct FrozenGraphSpec {
+   long n_vertices;
+   char** labels;
+   int* has_coordinates;   //optional, with lat and lon
+   double* lat;
+   double* lon;
+   int* deleted_neighbors; //optional
+   long* out_offsets;
+   long* targets;
+   EdgePayload** payloads;
+   int* enabled;           //optional, all enabled
+   long* in_offsets;       //optional, with in_edges
+   long* in_edges;
 };
 
 struct ShortestPathTree {
+   // the vertices whose mirror has no index in vertex_index, by label
    struct hashtable* vertices;
+
+   // SPT vertices indexed by the integer index of the graph vertex they mirror, n_indexed of them
+   SPTVertex** vertex_index;
+   long index_size;
+   long n_indexed;
+
+   // the indexed vertices by label, built by the first lookup by label and kept up to date after
+   // it, so searches never hash labels
+   struct hashtable* indexed_labels;
+
+   // set when the tree's vertices live in a SearchWorkspace instead of the hashtable
+   SearchWorkspace* workspace;
 };
 
 //for shortest path trees
@@ -28,6 +86,12 @@ struct Vertex {
    char* label;
     
    int deleted_neighbors;
+   long index;
+
+   // coordinates in degrees, if has_coordinates is set
+   int has_coordinates;
+   double lat;
+   double lon;
 } ;
 
 struct SPTVertex {
@@ -74,22 +138,82 @@ gAddVertices( Graph* this, const char **labels, int n );
 Edge*
 gAddEdge( Graph* this, const char *from, const char *to, EdgePayload *payload );
 
+//links from[i] to to[i] with payloads[i] for each of the n edges, adding their vertices first if
+//add_vertices is set. Returns the number of edges added, which is less than n if edge i couldn't be
+//added because a vertex is missing or the graph is frozen.
+long
+gAddEdges( Graph* this, const char **from, const char **to, EdgePayload **payloads, long n, int add_vertices );
+
 Vertex**
 gVertices( const Graph* this, long* num_vertices );
 
 ShortestPathTree*
-gShortestPathTree( Graph* this, char *from, char *to, State* init_state, WalkOptions* options, long maxtime, int hoplimit, long weightlimit );
+gShortestPathTree( Graph* this, char *from, char *to, State* init_state, WalkOptions* options, long maxtime, int hoplimit, long weightlimit, Heuristic* heuristic, SearchWorkspace* workspace );
+
+ShortestPathTree*
+gShortestPathTreeRetro( Graph* this, char *from, char *to, State* init_state, WalkOptions* options, long mintime, int hoplimit, long weightlimit, Heuristic* heuristic, SearchWorkspace* workspace );
 
+//meets a forward and a retro search in the middle. Falls back to gShortestPathTree when the
+//weights of the two halves do not simply add up, such as on graphs with time-dependent payloads.
+//A workspace, if given, holds the returned forward tree.
 ShortestPathTree*
-gShortestPathTreeRetro( Graph* this, char *from, char *to, State* init_state, WalkOptions* options, long mintime, int hoplimit, long weightlimit );
+gShortestPathBidirectional( Graph* this, char *from, char *to, State* init_state, WalkOptions* options, long maxtime, int hoplimit, long weightlimit, SearchWorkspace* workspace );
 
 //direction specifies forward or retro routing
 State*
 gShortestPath( Graph* this, char *from, char *to, State* init_state, int direction, long *size, WalkOptions* options, long timelimit, int hoplimit, long weightlimit );
 
+//whether any edge of the graph carries a payload of the given type
+int
+gHasPayloadType( const Graph* this, edgepayload_t type );
+
+//grows a shortest path tree from each of the n_origins origins, with a copy of init_state, and
+//writes the seconds and weight it takes to reach each destination to times and weights at
+//[i*n_destinations+j], or -1 if the destination can't be reached before maxtime. Origins are
+//shared among n_threads threads, one per processor if 0; graphs with python payloads are searched
+//by the calling thread alone.
+void
+gTravelTimeMatrix( Graph* this, char** origins, long n_origins, char** destinations, long n_destinations, State* init_state, WalkOptions* options, long maxtime, int n_threads, long* times, long* weights );
+
+//grows a shortest path tree from the origin, taking over init_state, and writes the arrival time
+//and weight of each vertex, the vertex index of its parent in the tree and the payload of the edge
+//from its parent to the arrays at its vertex index; the arrays hold gIndexSize() elements. Vertices
+//not reached, and the parent of the origin, are -1 or NULL. The tree itself is not kept. Returns the
+//number of vertices reached, or -1 if there's no such origin.
+long
+gShortestPathArrays( Graph* this, char* from, State* init_state, WalkOptions* options, long maxtime, int hoplimit, long weightlimit, SearchWorkspace* workspace, long* times, long* weights, long* parents, EdgePayload** parent_payloads );
+
 long
 gSize( Graph* this );
 
+void
+gFinalize( Graph* this );
+
+void
+gFreeAdjacency( Graph* this );
+
+int
+gIsFinalized( const Graph* this );
+
+int
+gIsTimeDependent( const Graph* this );
+
+void
+gFreeze( Graph* this );
+
+Graph*
+gNewFrozen( const FrozenGraphSpec* spec );
+
+int
+gIsFrozen( const Graph* this );
+
+//one more than the largest vertex index
+long
+gIndexSize( const Graph* this );
+
+Vertex*
+gGetVertexByIndex( const Graph* this, long index );
+
 void
 gSetVertexEnabled( Graph *this, char *label, int enabled );
 
@@ -161,6 +285,21 @@ vDegreeOut( const Vertex* this );
 int
 vDegreeIn( const Vertex* this );
 
+long
+vGetIndex( const Vertex* this );
+
+void
+vSetCoordinates( Vertex* this, double lat, double lon );
+
+int
+vHasCoordinates( const Vertex* this );
+
+double
+vGetLat( const Vertex* this );
+
+double
+vGetLon( const Vertex* this );
+
 //SPTVERTEX FUNCTIONS
 
 SPTVertex *
@@ -241,4 +380,56 @@ eGetEnabled(const Edge *this);
 void
 eSetEnabled(Edge *this, int enabled);
 
+/*
+ * Iterates over the outgoing or incoming edges of a vertex. A frozen graph's outgoing edges
+ * are read straight out of the packed edge array, a finalized graph is walked over its CSR
+ * arrays, and otherwise the vertex's edge lists are followed.
+ */
+typedef struct {
+  ListNode* node;
+  Edge** next;
+  Edge** end;
+  Edge* packed;
+  Edge* packed_end;
+} EdgeIter;
+
+static inline void
+edgeIterInit( EdgeIter* it, const Graph* this, const Vertex* vv, int incoming ) {
+  it->packed = NULL;
+  it->packed_end = NULL;
+  if( this->frozen && !incoming ) {
+    it->packed = this->packed_edges + this->out_offsets[vv->index];
+    it->packed_end = this->packed_edges + this->out_offsets[vv->index+1];
+    it->next = NULL;
+    it->end = NULL;
+    it->node = NULL;
+  } else if( this->finalized ) {
+    long* offsets = incoming ? this->in_offsets : this->out_offsets;
+    Edge** edges = incoming ? this->in_edges : this->out_edges;
+    it->next = edges + offsets[vv->index];
+    it->end = edges + offsets[vv->index+1];
+    it->node = NULL;
+  } else {
+    it->next = NULL;
+    it->end = NULL;
+    it->node = incoming ? vGetIncomingEdgeList( vv ) : vGetOutgoingEdgeList( vv );
+  }
+}
+
+static inline Edge*
+edgeIterNext( EdgeIter* it ) {
+  if( it->packed != it->packed_end ) {
+    return it->packed++;
+  }
+  if( it->next != it->end ) {
+    return *(it->next++);
+  }
+  if( it->node ) {
+    Edge* ret = it->node->data;
+    it->node = it->node->next;
+    return ret;
+  }
+  return NULL;
+}
+
 #endif
@@ -20,6 +20,8 @@ typedef struct Vertex Vertex;
 typedef struct Edge Edge;
 typedef struct ListNode ListNode;
 typedef struct Graph Graph;
+typedef struct FrozenGraphSpec FrozenGraphSpec;
+typedef struct SnapshotResources SnapshotResources;
 typedef struct Path Path;
 typedef struct Vector Vector;
 typedef struct SPTVertex SPTVertex;
@@ -30,6 +32,7 @@ typedef struct ServicePeriod ServicePeriod;
 typedef struct ServiceCalendar ServiceCalendar;
 typedef struct Timezone Timezone;
 typedef struct TimezonePeriod TimezonePeriod;
+typedef struct TripIndex TripIndex;
 
 // edgetypes
 typedef struct Link Link;
@@ -48,6 +51,14 @@ typedef struct CHPath CHPath;
 typedef struct CH CH;
 typedef struct Heap Heap;
 typedef struct HeapNode HeapNode;
+typedef struct VertexQueue VertexQueue;
+typedef struct Heuristic Heuristic;
+typedef struct SearchWorkspace SearchWorkspace;
+typedef struct Raptor Raptor;
+typedef struct RaptorResult RaptorResult;
+typedef struct ParetoLabel ParetoLabel;
+typedef struct ParetoBag ParetoBag;
+typedef struct ParetoSearch ParetoSearch;
 
 typedef struct PayloadMethods PayloadMethods;
 typedef struct CustomPayload CustomPayload;
@@ -71,6 +82,7 @@ typedef enum {
   PL_COMBINATION
 } edgepayload_t;
 
+#include "tripid.h"
 #include "state.h"
 #include "walkoptions.h"
 #include "edgetypes/elapsehelpers.h"
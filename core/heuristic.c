@@ -0,0 +1,53 @@
+#include <math.h>
+#include <stdlib.h>
+#undef INFINITY //graphserver.h has its own, integral INFINITY
+
+#include "graphserver.h"
+#include "graph.h"
+#include "heuristic.h"
+
+//the smallest radius of curvature of the WGS84 ellipsoid, so great-circle distances over this
+//sphere never exceed ellipsoidal distances such as vincenty's
+#define MIN_EARTH_RADIUS 6335439.0
+
+double
+greatCircleDistance( double lat1, double lon1, double lat2, double lon2 ) {
+  double phi1 = lat1*M_PI/180;
+  double phi2 = lat2*M_PI/180;
+  double dphi = phi2-phi1;
+  double dlambda = (lon2-lon1)*M_PI/180;
+
+  double a = sin(dphi/2)*sin(dphi/2) + cos(phi1)*cos(phi2)*sin(dlambda/2)*sin(dlambda/2);
+  return 2*MIN_EARTH_RADIUS*asin( sqrt( a > 1 ? 1 : a ) );
+}
+
+static long
+greatCircleEstimate( Heuristic* this, const Vertex* from, const Vertex* to ) {
+  if( !from->has_coordinates || !to->has_coordinates ) {
+    return 0;
+  }
+  return (long)( greatCircleDistance( from->lat, from->lon, to->lat, to->lon )/this->max_speed );
+}
+
+Heuristic*
+heurNewGreatCircle( double max_speed ) {
+  Heuristic* this = (Heuristic*)malloc( sizeof(Heuristic) );
+  this->estimate = greatCircleEstimate;
+  this->max_speed = max_speed;
+  return this;
+}
+
+void
+heurDestroy( Heuristic* this ) {
+  free( this );
+}
+
+long
+heurEstimate( Heuristic* this, const Vertex* from, const Vertex* to ) {
+  return this->estimate( this, from, to );
+}
+
+double
+heurGetMaxSpeed( Heuristic* this ) {
+  return this->max_speed;
+}
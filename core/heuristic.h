@@ -0,0 +1,33 @@
+#ifndef HEURISTIC_H
+#define HEURISTIC_H
+
+/*
+ * A lower bound on the weight of getting from one vertex to another, used to direct the router
+ * toward its target (A*). The bound must never overestimate, or the router may return
+ * suboptimal paths.
+ */
+
+struct Heuristic {
+  long (*estimate)(struct Heuristic*, const Vertex*, const Vertex*);
+  double max_speed;
+};
+
+//great-circle distance between the vertices' coordinates divided by max_speed, the largest
+//distance in meters that any edge covers per unit of weight. Vertices without coordinates
+//are estimated at 0.
+Heuristic*
+heurNewGreatCircle( double max_speed );
+
+void
+heurDestroy( Heuristic* this );
+
+long
+heurEstimate( Heuristic* this, const Vertex* from, const Vertex* to );
+
+double
+heurGetMaxSpeed( Heuristic* this );
+
+double
+greatCircleDistance( double lat1, double lon1, double lat2, double lon2 );
+
+#endif
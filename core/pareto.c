@@ -0,0 +1,210 @@
+#include "graphserver.h"
+#include "graph.h"
+#include "heap.h"
+#include "pareto.h"
+
+#include <stdio.h>
+#include <stdlib.h>
+
+//whether a is no worse than b on every criterion
+static inline int
+psDominates( int criteria, const State* a, const State* b ) {
+  if( (criteria & PARETO_WEIGHT) && a->weight > b->weight ) return 0;
+  if( (criteria & PARETO_TIME) && a->time > b->time ) return 0;
+  if( (criteria & PARETO_TRANSFERS) && a->num_transfers > b->num_transfers ) return 0;
+  if( (criteria & PARETO_WALK) && a->dist_walked > b->dist_walked ) return 0;
+  return 1;
+}
+
+static long
+psAddLabel( ParetoSearch* this, State* state, long parent, EdgePayload* payload, Vertex* vertex, int hop ) {
+  if( this->n_labels == this->labels_cap ) {
+    this->labels_cap *= 2;
+    this->labels = (ParetoLabel*)realloc( this->labels, this->labels_cap*sizeof(ParetoLabel) );
+  }
+  ParetoLabel* label = this->labels + this->n_labels;
+  label->state = state;
+  label->parent = parent;
+  label->payload = payload;
+  label->vertex = vertex;
+  label->hop = hop;
+  label->dropped = 0;
+  return this->n_labels++;
+}
+
+//whether any label in the bag is no worse than the state
+static int
+psBagBeats( const ParetoSearch* this, const ParetoBag* bag, const State* state ) {
+  int i;
+  for(i=0; i<bag->n; i++) {
+    if( psDominates( this->criteria, this->labels[bag->labels[i]].state, state ) ) {
+      return 1;
+    }
+  }
+  return 0;
+}
+
+//puts the state in the vertex's bag unless it's beaten there, dropping the labels it beats. Returns
+//the new label, or -1 if the state wasn't kept, in which case it's destroyed.
+static long
+psOffer( ParetoSearch* this, Vertex* v, State* state, long parent, EdgePayload* payload, int hop, const ParetoBag* target_bag ) {
+  ParetoBag* bag = this->bags + v->index;
+  int i, j;
+
+  if( (target_bag && psBagBeats( this, target_bag, state )) || psBagBeats( this, bag, state ) ) {
+    stateDestroy( state );
+    return -1;
+  }
+
+  if( !bag->labels ) {
+    bag->labels = (long*)malloc( this->max_labels*sizeof(long) );
+  }
+  for(i=0, j=0; i<bag->n; i++) {
+    ParetoLabel* old = this->labels + bag->labels[i];
+    if( psDominates( this->criteria, state, old->state ) ) {
+      old->dropped = 1;
+    } else {
+      bag->labels[j++] = bag->labels[i];
+    }
+  }
+  bag->n = j;
+
+  //a full bag keeps its lightest labels
+  if( bag->n == this->max_labels ) {
+    ParetoLabel* heaviest = this->labels + bag->labels[bag->n-1];
+    if( heaviest->state->weight <= state->weight ) {
+      stateDestroy( state );
+      return -1;
+    }
+    heaviest->dropped = 1;
+    bag->n--;
+  }
+
+  long ret = psAddLabel( this, state, parent, payload, v, hop );
+  for(i=bag->n; i>0 && this->labels[bag->labels[i-1]].state->weight > state->weight; i--) {
+    bag->labels[i] = bag->labels[i-1];
+  }
+  bag->labels[i] = ret;
+  bag->n++;
+  return ret;
+}
+
+ParetoSearch*
+gParetoSearch( Graph* this, char* from, char* to, State* init_state, WalkOptions* options, int criteria, int max_labels, long maxtime, int hoplimit, long weightlimit ) {
+  Vertex* origin_v = gGetVertex( this, from );
+  if( origin_v == NULL ) {
+    return NULL;
+  }
+  Vertex* target_v = to ? gGetVertex( this, to ) : NULL;
+
+  ParetoSearch* ret = (ParetoSearch*)malloc( sizeof(ParetoSearch) );
+  ret->graph = this;
+  ret->criteria = criteria;
+  ret->max_labels = max_labels > 0 ? max_labels : 1;
+  ret->labels_cap = 64;
+  ret->labels = (ParetoLabel*)malloc( ret->labels_cap*sizeof(ParetoLabel) );
+  ret->n_labels = 0;
+  ret->index_size = this->index_size;
+  ret->bags = (ParetoBag*)calloc( this->index_size+1, sizeof(ParetoBag) );
+  const ParetoBag* target_bag = target_v ? ret->bags + target_v->index : NULL;
+
+  //labels are walked from lightest first; the heap holds label numbers
+  Heap* q = heapNew( 64 );
+  long origin = psOffer( ret, origin_v, init_state, -1, NULL, 0, NULL );
+  heapInsert( q, (void*)origin, init_state->weight );
+
+  while( !heapEmpty( q ) ) {
+    long weight;
+    long u = (long)heapPop( q, &weight );
+    ParetoLabel* label = ret->labels + u;
+
+    if( label->dropped || label->vertex == target_v ) {
+      continue;
+    }
+    if( weight > weightlimit ) {
+      break;
+    }
+    if( label->hop >= hoplimit || label->state->time > maxtime ) {
+      continue;
+    }
+
+    Vertex* vu = label->vertex;
+    State* du = label->state;
+    int hop = label->hop;
+    EdgeIter edges;
+    edgeIterInit( &edges, this, vu, 0 );
+    Edge* edge;
+    while( (edge = edgeIterNext( &edges )) ) {
+      State* new_dv = eWalk( edge, du, options );
+      if( !new_dv ) {
+        continue;
+      }
+      if( new_dv->weight < du->weight ) {
+        fprintf(stderr, "Negative weight (%s(%ld) -> %s(%ld))\n", edge->from->label, du->weight, edge->to->label, new_dv->weight);
+        stateDestroy( new_dv );
+        continue;
+      }
+
+      //psOffer may move the labels, but not their states
+      long v = psOffer( ret, edge->to, new_dv, u, edge->payload, hop+1, target_bag );
+      if( v != -1 ) {
+        heapInsert( q, (void*)v, new_dv->weight );
+      }
+    }
+  }
+
+  heapDestroy( q );
+  return ret;
+}
+
+void
+psDestroy( ParetoSearch* this ) {
+  long i;
+  for(i=0; i<this->n_labels; i++) {
+    stateDestroy( this->labels[i].state );
+  }
+  for(i=0; i<this->index_size; i++) {
+    free( this->bags[i].labels );
+  }
+  free( this->labels );
+  free( this->bags );
+  free( this );
+}
+
+long
+psNLabels( const ParetoSearch* this ) {
+  return this->n_labels;
+}
+
+int
+psBagSize( const ParetoSearch* this, long index ) {
+  if( index < 0 || index >= this->index_size ) {
+    return 0;
+  }
+  return this->bags[index].n;
+}
+
+long
+psBagLabel( const ParetoSearch* this, long index, int i ) {
+  return this->bags[index].labels[i];
+}
+
+State*
+psLabelState( const ParetoSearch* this, long label ) {
+  return this->labels[label].state;
+}
+
+long
+psLabelParent( const ParetoSearch* this, long label ) {
+  return this->labels[label].parent;
+}
+
+EdgePayload*
+psLabelPayload( const ParetoSearch* this, long label ) {
+  return this->labels[label].payload;
+}
+
+Vertex*
+psLabelVertex( const ParetoSearch* this, long label ) {
+  return this->labels[label].vertex;
+}
@@ -0,0 +1,78 @@
+#ifndef PARETO_H
+#define PARETO_H
+
+/*
+ * Multi-criteria search. Where gShortestPathTree keeps the one lightest State of each vertex,
+ * a ParetoSearch keeps a bag of the States no other State of the vertex beats on every chosen
+ * criterion, so one search finds, say, both the fastest way somewhere and the way with fewest
+ * transfers. Bags hold at most max_labels States; a full bag drops its heaviest.
+ */
+
+//criteria, or'd together. All are lower-is-better.
+#define PARETO_WEIGHT    1
+#define PARETO_TIME      2
+#define PARETO_TRANSFERS 4
+#define PARETO_WALK      8
+
+struct ParetoLabel {
+  State* state;
+  long parent;                  //the label this one was reached from, or -1 at the origin
+  EdgePayload* payload;         //of the edge walked from the parent
+  Vertex* vertex;
+  int hop;
+  int dropped;                  //set once the label left its bag; it's then not walked from
+};
+
+//the labels of a vertex still in the running, by label number. labels holds max_labels.
+struct ParetoBag {
+  int n;
+  long* labels;
+};
+
+struct ParetoSearch {
+  Graph* graph;
+  int criteria;
+  int max_labels;
+
+  ParetoLabel* labels;          //every label kept, so paths can be traced through dropped ones
+  long n_labels;
+  long labels_cap;
+
+  ParetoBag* bags;              //by vertex index
+  long index_size;
+};
+
+//searches from the origin until no label is left to walk from, or those left are past a limit.
+//With a target, labels its bag beats are not kept. Returns NULL if there's no origin vertex.
+//The search owns init_state.
+ParetoSearch*
+gParetoSearch( Graph* this, char* from, char* to, State* init_state, WalkOptions* options, int criteria, int max_labels, long maxtime, int hoplimit, long weightlimit );
+
+void
+psDestroy( ParetoSearch* this );
+
+//the number of labels kept, including those dropped from their bags
+long
+psNLabels( const ParetoSearch* this );
+
+//the number of labels in the bag of the vertex with the given index
+int
+psBagSize( const ParetoSearch* this, long index );
+
+//the i'th label in the bag of the vertex with the given index, by increasing weight
+long
+psBagLabel( const ParetoSearch* this, long index, int i );
+
+State*
+psLabelState( const ParetoSearch* this, long label );
+
+long
+psLabelParent( const ParetoSearch* this, long label );
+
+EdgePayload*
+psLabelPayload( const ParetoSearch* this, long label );
+
+Vertex*
+psLabelVertex( const ParetoSearch* this, long label );
+
+#endif
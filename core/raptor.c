@@ -0,0 +1,486 @@
+#include "graphserver.h"
+#include "raptor.h"
+
+#include <stdlib.h>
+#include <string.h>
+
+static long*
+copyLongs( const long* from, long n ) {
+  long* ret = (long*)malloc( (n+1)*sizeof(long) );
+  if( n > 0 ) {
+    memcpy( ret, from, n*sizeof(long) );
+  }
+  return ret;
+}
+
+//turns counts[0..n-1] into offsets[0..n], so that offsets[i] is the sum of the counts before i
+static void
+countsToOffsets( long* counts, long n ) {
+  long i, sum = 0;
+  for(i=0; i<n; i++) {
+    long count = counts[i];
+    counts[i] = sum;
+    sum += count;
+  }
+  counts[n] = sum;
+}
+
+Raptor*
+raptorNew( long n_stops, long n_patterns, const long* pattern_stop_offsets, const long* pattern_stops, const long* pattern_trips, const long* arrivals, const long* departures, long n_transfers, const long* transfer_from, const long* transfer_to, const long* transfer_times ) {
+  Raptor* this = (Raptor*)calloc( 1, sizeof(Raptor) );
+  long p, i, j;
+
+  this->n_stops = n_stops;
+  this->n_patterns = n_patterns;
+  this->n_trips = pattern_trips[n_patterns];
+  this->pattern_stop_offsets = copyLongs( pattern_stop_offsets, n_patterns+1 );
+  this->pattern_stops = copyLongs( pattern_stops, pattern_stop_offsets[n_patterns] );
+  this->pattern_trips = copyLongs( pattern_trips, n_patterns+1 );
+
+  this->pattern_time_offsets = (long*)malloc( (n_patterns+1)*sizeof(long) );
+  this->trip_patterns = (long*)malloc( (this->n_trips+1)*sizeof(long) );
+  long n_times = 0;
+  for(p=0; p<n_patterns; p++) {
+    this->pattern_time_offsets[p] = n_times;
+    n_times += (pattern_trips[p+1]-pattern_trips[p]) * (pattern_stop_offsets[p+1]-pattern_stop_offsets[p]);
+    for(i=pattern_trips[p]; i<pattern_trips[p+1]; i++) {
+      this->trip_patterns[i] = p;
+    }
+  }
+  this->pattern_time_offsets[n_patterns] = n_times;
+  this->arrivals = copyLongs( arrivals, n_times );
+  this->departures = copyLongs( departures, n_times );
+
+  //index the patterns by the stops they serve
+  this->stop_pattern_offsets = (long*)calloc( n_stops+1, sizeof(long) );
+  for(i=0; i<pattern_stop_offsets[n_patterns]; i++) {
+    this->stop_pattern_offsets[pattern_stops[i]]++;
+  }
+  countsToOffsets( this->stop_pattern_offsets, n_stops );
+  this->stop_patterns = (long*)malloc( (pattern_stop_offsets[n_patterns]+1)*sizeof(long) );
+  this->stop_positions = (long*)malloc( (pattern_stop_offsets[n_patterns]+1)*sizeof(long) );
+  long* fill = copyLongs( this->stop_pattern_offsets, n_stops );
+  for(p=0; p<n_patterns; p++) {
+    for(i=pattern_stop_offsets[p]; i<pattern_stop_offsets[p+1]; i++) {
+      j = fill[pattern_stops[i]]++;
+      this->stop_patterns[j] = p;
+      this->stop_positions[j] = i - pattern_stop_offsets[p];
+    }
+  }
+  free( fill );
+
+  //and the footpaths by the stops they leave
+  this->transfer_offsets = (long*)calloc( n_stops+1, sizeof(long) );
+  for(i=0; i<n_transfers; i++) {
+    this->transfer_offsets[transfer_from[i]]++;
+  }
+  countsToOffsets( this->transfer_offsets, n_stops );
+  this->transfer_targets = (long*)malloc( (n_transfers+1)*sizeof(long) );
+  this->transfer_times = (long*)malloc( (n_transfers+1)*sizeof(long) );
+  fill = copyLongs( this->transfer_offsets, n_stops );
+  for(i=0; i<n_transfers; i++) {
+    j = fill[transfer_from[i]]++;
+    this->transfer_targets[j] = transfer_to[i];
+    this->transfer_times[j] = transfer_times[i];
+  }
+  free( fill );
+
+  return this;
+}
+
+void
+raptorDestroy( Raptor* this ) {
+  free( this->pattern_stop_offsets );
+  free( this->pattern_stops );
+  free( this->pattern_trips );
+  free( this->pattern_time_offsets );
+  free( this->arrivals );
+  free( this->departures );
+  free( this->trip_patterns );
+  free( this->stop_pattern_offsets );
+  free( this->stop_patterns );
+  free( this->stop_positions );
+  free( this->transfer_offsets );
+  free( this->transfer_targets );
+  free( this->transfer_times );
+  free( this );
+}
+
+long
+raptorNStops( const Raptor* this ) {
+  return this->n_stops;
+}
+
+long
+raptorNTrips( const Raptor* this ) {
+  return this->n_trips;
+}
+
+long
+raptorTripPattern( const Raptor* this, long trip ) {
+  return this->trip_patterns[trip];
+}
+
+//writes the departures of the trips at a stop between earliest and latest, or just counts them
+static long
+raptorStopDepartures( const Raptor* this, long stop, long offset, long earliest, long latest, long* departures, long n ) {
+  long i, t;
+  for(i=this->stop_pattern_offsets[stop]; i<this->stop_pattern_offsets[stop+1]; i++) {
+    long p = this->stop_patterns[i];
+    long n_pattern_stops = this->pattern_stop_offsets[p+1] - this->pattern_stop_offsets[p];
+    long position = this->stop_positions[i];
+    if( position == n_pattern_stops-1 ) {
+      continue;
+    }
+    const long* times = this->departures + this->pattern_time_offsets[p] + position;
+    for(t=0; t<this->pattern_trips[p+1]-this->pattern_trips[p]; t++) {
+      long departure = times[t*n_pattern_stops] - offset;
+      if( departure >= earliest && departure <= latest ) {
+        if( departures ) {
+          departures[n] = departure;
+        }
+        n++;
+      }
+    }
+  }
+  return n;
+}
+
+long
+raptorDepartures( const Raptor* this, long origin, long earliest, long latest, long* departures ) {
+  long i;
+  long n = raptorStopDepartures( this, origin, 0, earliest, latest, departures, 0 );
+  for(i=this->transfer_offsets[origin]; i<this->transfer_offsets[origin+1]; i++) {
+    n = raptorStopDepartures( this, this->transfer_targets[i], this->transfer_times[i], earliest, latest, departures, n );
+  }
+  return n;
+}
+
+static long
+raptorWalkTime( const Raptor* this, long from, long to ) {
+  long i, ret = RAPTOR_UNREACHED;
+  for(i=this->transfer_offsets[from]; i<this->transfer_offsets[from+1]; i++) {
+    if( this->transfer_targets[i] == to && this->transfer_times[i] < ret ) {
+      ret = this->transfer_times[i];
+    }
+  }
+  return ret;
+}
+
+RaptorResult*
+rrNew( Raptor* raptor, int max_rounds ) {
+  RaptorResult* this = (RaptorResult*)calloc( 1, sizeof(RaptorResult) );
+  long n = raptor->n_stops;
+  long n_labels = (max_rounds+1)*n;
+
+  this->raptor = raptor;
+  this->max_rounds = max_rounds;
+  this->arrivals = (long*)malloc( (n_labels+1)*sizeof(long) );
+  this->ride_arrivals = (long*)malloc( (n_labels+1)*sizeof(long) );
+  this->ride_trips = (long*)malloc( (n_labels+1)*sizeof(long) );
+  this->ride_boards = (long*)malloc( (n_labels+1)*sizeof(long) );
+  this->ride_alights = (long*)malloc( (n_labels+1)*sizeof(long) );
+  this->walk_from = (long*)malloc( (n_labels+1)*sizeof(long) );
+  this->marked = (char*)calloc( n+1, sizeof(char) );
+  this->marked_stops = (long*)malloc( (n+1)*sizeof(long) );
+  this->ride_marked = (char*)calloc( n+1, sizeof(char) );
+  this->ride_marked_stops = (long*)malloc( (n+1)*sizeof(long) );
+  this->pattern_first = (long*)malloc( (raptor->n_patterns+1)*sizeof(long) );
+  this->queued = (long*)malloc( (raptor->n_patterns+1)*sizeof(long) );
+
+  rrReset( this );
+  return this;
+}
+
+void
+rrDestroy( RaptorResult* this ) {
+  free( this->arrivals );
+  free( this->ride_arrivals );
+  free( this->ride_trips );
+  free( this->ride_boards );
+  free( this->ride_alights );
+  free( this->walk_from );
+  free( this->marked );
+  free( this->marked_stops );
+  free( this->ride_marked );
+  free( this->ride_marked_stops );
+  free( this->pattern_first );
+  free( this->queued );
+  free( this );
+}
+
+void
+rrReset( RaptorResult* this ) {
+  long i;
+  long n_labels = (this->max_rounds+1)*this->raptor->n_stops;
+
+  for(i=0; i<n_labels; i++) {
+    this->arrivals[i] = RAPTOR_UNREACHED;
+    this->ride_trips[i] = -1;
+    this->walk_from[i] = -1;
+  }
+  for(i=0; i<this->raptor->n_patterns; i++) {
+    this->pattern_first[i] = -1;
+  }
+  this->n_rounds = 0;
+}
+
+//sets the arrival of a stop in a round, and in the later rounds it improves on, and marks the stop
+static void
+rrImprove( RaptorResult* this, int round, long stop, long arrival ) {
+  long n = this->raptor->n_stops;
+  int k;
+
+  this->arrivals[round*n+stop] = arrival;
+  for(k=round+1; k<=this->max_rounds && this->arrivals[k*n+stop] > arrival; k++) {
+    this->arrivals[k*n+stop] = arrival;
+  }
+  if( !this->marked[stop] ) {
+    this->marked[stop] = 1;
+    this->marked_stops[this->n_marked++] = stop;
+  }
+}
+
+static inline long
+rrBound( const RaptorResult* this, int round, long stop, long target ) {
+  long n = this->raptor->n_stops;
+  long ret = this->arrivals[round*n+stop];
+  if( target >= 0 && this->arrivals[round*n+target] < ret ) {
+    ret = this->arrivals[round*n+target];
+  }
+  return ret;
+}
+
+static void
+rrRideImprove( RaptorResult* this, int round, long stop, long arrival, long trip, long board, long alight ) {
+  long label = round*this->raptor->n_stops + stop;
+
+  rrImprove( this, round, stop, arrival );
+  this->ride_arrivals[label] = arrival;
+  this->ride_trips[label] = trip;
+  this->ride_boards[label] = board;
+  this->ride_alights[label] = alight;
+  this->walk_from[label] = -1;
+  if( !this->ride_marked[stop] ) {
+    this->ride_marked[stop] = 1;
+    this->ride_marked_stops[this->n_ride_marked++] = stop;
+  }
+}
+
+//walks the footpaths from the stops improved by the round's trips
+static long
+rrFootpaths( RaptorResult* this, int round, long target ) {
+  const Raptor* r = this->raptor;
+  long n = r->n_stops;
+  long i, j, improved = 0;
+
+  for(i=0; i<this->n_ride_marked; i++) {
+    long from = this->ride_marked_stops[i];
+    long start = this->ride_arrivals[round*n+from];
+    this->ride_marked[from] = 0;
+
+    for(j=r->transfer_offsets[from]; j<r->transfer_offsets[from+1]; j++) {
+      long to = r->transfer_targets[j];
+      long arrival = start + r->transfer_times[j];
+      if( arrival < rrBound( this, round, to, target ) ) {
+        rrImprove( this, round, to, arrival );
+        this->walk_from[round*n+to] = from;
+        improved++;
+      }
+    }
+  }
+  this->n_ride_marked = 0;
+
+  return improved;
+}
+
+//rides each pattern queued by the stops marked in the previous round
+static long
+rrScanPatterns( RaptorResult* this, int round, long target ) {
+  const Raptor* r = this->raptor;
+  long n = r->n_stops;
+  long q, i, improved = 0;
+  long n_queued = 0;
+
+  for(i=0; i<this->n_marked; i++) {
+    long stop = this->marked_stops[i];
+    long j;
+    this->marked[stop] = 0;
+    for(j=r->stop_pattern_offsets[stop]; j<r->stop_pattern_offsets[stop+1]; j++) {
+      long p = r->stop_patterns[j];
+      if( this->pattern_first[p] == -1 ) {
+        this->queued[n_queued++] = p;
+        this->pattern_first[p] = r->stop_positions[j];
+      } else if( r->stop_positions[j] < this->pattern_first[p] ) {
+        this->pattern_first[p] = r->stop_positions[j];
+      }
+    }
+  }
+  this->n_marked = 0;
+
+  for(q=0; q<n_queued; q++) {
+    long p = this->queued[q];
+    long first = this->pattern_first[p];
+    this->pattern_first[p] = -1;
+
+    const long* stops = r->pattern_stops + r->pattern_stop_offsets[p];
+    long n_pattern_stops = r->pattern_stop_offsets[p+1] - r->pattern_stop_offsets[p];
+    long first_trip = r->pattern_trips[p];
+    long n_pattern_trips = r->pattern_trips[p+1] - first_trip;
+    const long* arrivals = r->arrivals + r->pattern_time_offsets[p];
+    const long* departures = r->departures + r->pattern_time_offsets[p];
+
+    long trip = -1, board = -1;
+    for(i=first; i<n_pattern_stops; i++) {
+      long stop = stops[i];
+
+      if( trip != -1 ) {
+        long arrival = arrivals[trip*n_pattern_stops+i];
+        if( arrival < rrBound( this, round, stop, target ) ) {
+          rrRideImprove( this, round, stop, arrival, first_trip+trip, board, i );
+          improved++;
+        }
+      }
+
+      //catch the earliest trip departing after the arrival with one trip fewer, if it's earlier
+      long ready = this->arrivals[(round-1)*n+stop];
+      if( ready == RAPTOR_UNREACHED || (trip != -1 && departures[trip*n_pattern_stops+i] < ready) ) {
+        continue;
+      }
+      long lo = 0, hi = trip == -1 ? n_pattern_trips : trip;
+      while( lo < hi ) {
+        long mid = (lo+hi)/2;
+        if( departures[mid*n_pattern_stops+i] < ready ) {
+          lo = mid+1;
+        } else {
+          hi = mid;
+        }
+      }
+      if( lo < (trip == -1 ? n_pattern_trips : trip) ) {
+        trip = lo;
+        board = i;
+      }
+    }
+  }
+
+  return improved;
+}
+
+long
+rrRun( RaptorResult* this, long origin, long departure, long target ) {
+  long improved = 0;
+  int k;
+
+  if( departure >= this->arrivals[origin] ) {
+    return 0;
+  }
+
+  rrImprove( this, 0, origin, departure );
+  this->ride_arrivals[origin] = departure;
+  this->ride_trips[origin] = -1;
+  this->walk_from[origin] = -1;
+  this->ride_marked[origin] = 1;
+  this->ride_marked_stops[this->n_ride_marked++] = origin;
+  improved += 1 + rrFootpaths( this, 0, target );
+  if( this->n_rounds < 1 ) {
+    this->n_rounds = 1;
+  }
+
+  for(k=1; k<=this->max_rounds && this->n_marked > 0; k++) {
+    long round_improved = rrScanPatterns( this, k, target );
+    round_improved += rrFootpaths( this, k, target );
+    if( round_improved > 0 && this->n_rounds < k+1 ) {
+      this->n_rounds = k+1;
+    }
+    improved += round_improved;
+  }
+
+  //labels improved in the last round are not scanned
+  while( this->n_marked > 0 ) {
+    this->marked[this->marked_stops[--this->n_marked]] = 0;
+  }
+
+  return improved;
+}
+
+RaptorResult*
+raptorQuery( Raptor* this, long origin, long departure, long target, int max_rounds ) {
+  RaptorResult* ret = rrNew( this, max_rounds );
+  rrRun( ret, origin, departure, target );
+  return ret;
+}
+
+int
+rrRounds( const RaptorResult* this ) {
+  return this->n_rounds;
+}
+
+long
+rrArrival( const RaptorResult* this, int round, long stop ) {
+  if( round > this->max_rounds ) {
+    round = this->max_rounds;
+  }
+  return this->arrivals[round*this->raptor->n_stops+stop];
+}
+
+static long*
+rrAddLeg( long* leg, long kind, long from, long to, long trip, long departure, long arrival ) {
+  leg[0] = kind;
+  leg[1] = from;
+  leg[2] = to;
+  leg[3] = trip;
+  leg[4] = departure;
+  leg[5] = arrival;
+  return leg+6;
+}
+
+int
+rrLegs( const RaptorResult* this, int round, long stop, long* legs ) {
+  const Raptor* r = this->raptor;
+  long n = r->n_stops;
+  long* leg = legs;
+  int k = round > this->max_rounds ? this->max_rounds : round;
+  int i, n_legs;
+
+  if( this->arrivals[k*n+stop] == RAPTOR_UNREACHED ) {
+    return -1;
+  }
+
+  //trace back from the stop, writing the legs last first
+  for(;;) {
+    while( k > 0 && this->arrivals[k*n+stop] == this->arrivals[(k-1)*n+stop] ) {
+      k--;
+    }
+
+    long from = this->walk_from[k*n+stop];
+    if( from != -1 ) {
+      long start = this->ride_arrivals[k*n+from];
+      leg = rrAddLeg( leg, RAPTOR_LEG_WALK, from, stop, -1, start, start + raptorWalkTime( r, from, stop ) );
+      stop = from;
+    }
+    if( k == 0 ) {
+      break;
+    }
+
+    long label = k*n+stop;
+    long trip = this->ride_trips[label];
+    long p = r->trip_patterns[trip];
+    long n_pattern_stops = r->pattern_stop_offsets[p+1] - r->pattern_stop_offsets[p];
+    long times = r->pattern_time_offsets[p] + (trip - r->pattern_trips[p])*n_pattern_stops;
+    long board = this->ride_boards[label];
+    long alight = this->ride_alights[label];
+    from = r->pattern_stops[r->pattern_stop_offsets[p]+board];
+    leg = rrAddLeg( leg, RAPTOR_LEG_RIDE, from, stop, trip, r->departures[times+board], r->arrivals[times+alight] );
+    stop = from;
+    k--;
+  }
+
+  n_legs = (int)((leg - legs)/6);
+  for(i=0; i<n_legs/2; i++) {
+    long swap[6];
+    memcpy( swap, legs + i*6, sizeof(swap) );
+    memcpy( legs + i*6, legs + (n_legs-1-i)*6, sizeof(swap) );
+    memcpy( legs + (n_legs-1-i)*6, swap, sizeof(swap) );
+  }
+  return n_legs;
+}
@@ -0,0 +1,131 @@
+#ifndef RAPTOR_H
+#define RAPTOR_H
+
+/*
+ * Round-based public transit routing (RAPTOR) over a timetable of patterns: sequences of stops
+ * served by trips that don't overtake each other. Round k finds the earliest arrival at every stop
+ * with k trips, by scanning each pattern through a stop improved in round k-1 once, then walks the
+ * footpaths from the stops it improved.
+ *
+ * Stops, patterns and trips are numbered from 0. Trips are numbered in pattern order, and the stop
+ * times of trip t, which is trip t-pattern_trips[p] of its pattern p, are at
+ * (t-pattern_trips[p])*n + i of that pattern's stop times, for the i'th of its n stops. Times are
+ * seconds, usually since the midnight starting the service day of the timetable.
+ */
+
+#define RAPTOR_UNREACHED INFINITY
+
+//leg kinds written by rrLegs
+#define RAPTOR_LEG_WALK 0
+#define RAPTOR_LEG_RIDE 1
+
+struct Raptor {
+  long n_stops;
+  long n_patterns;
+  long n_trips;
+
+  long* pattern_stop_offsets;   //n_patterns+1, into pattern_stops
+  long* pattern_stops;
+  long* pattern_trips;          //n_patterns+1, the first trip of each pattern
+  long* pattern_time_offsets;   //n_patterns+1, into arrivals and departures
+  long* arrivals;
+  long* departures;
+  long* trip_patterns;          //n_trips
+
+  //the patterns serving each stop, and the stop's position along each
+  long* stop_pattern_offsets;   //n_stops+1
+  long* stop_patterns;
+  long* stop_positions;
+
+  //footpaths from each stop
+  long* transfer_offsets;       //n_stops+1
+  long* transfer_targets;
+  long* transfer_times;
+};
+
+/*
+ * The labels of a search. Labels are kept per round and stop: the earliest arrival with at most
+ * that many trips, how the stop was reached by the round's trip, and the stop walked from if the
+ * earliest arrival comes from a footpath. They are kept between runs until reset, so a later run
+ * from an earlier departure only improves on them, as range queries do.
+ */
+struct RaptorResult {
+  Raptor* raptor;
+  int max_rounds;
+  int n_rounds;                 //rounds that improved any stop, plus the walk round 0
+
+  long* arrivals;               //[round*n_stops+stop]
+  long* ride_arrivals;          //arrival by the round's trip
+  long* ride_trips;             //that trip, or -1
+  long* ride_boards;            //the positions along the trip's pattern where it was boarded
+  long* ride_alights;           //and left
+  long* walk_from;              //the stop walked from, or -1
+
+  //scratch space of a run: the stops improved in the current round, and by its trips
+  char* marked;
+  long* marked_stops;
+  long n_marked;
+  char* ride_marked;
+  long* ride_marked_stops;
+  long n_ride_marked;
+  long* pattern_first;          //earliest position along each pattern of a marked stop, or -1
+  long* queued;                 //the patterns with a position in pattern_first
+};
+
+//copies the timetable out of the given arrays. Each pattern's trips must be sorted by departure
+//and not overtake each other. Footpaths are the transfers from transfer_from to transfer_to.
+Raptor*
+raptorNew( long n_stops, long n_patterns, const long* pattern_stop_offsets, const long* pattern_stops, const long* pattern_trips, const long* arrivals, const long* departures, long n_transfers, const long* transfer_from, const long* transfer_to, const long* transfer_times );
+
+void
+raptorDestroy( Raptor* this );
+
+long
+raptorNStops( const Raptor* this );
+
+long
+raptorNTrips( const Raptor* this );
+
+//the pattern of a trip
+long
+raptorTripPattern( const Raptor* this, long trip );
+
+//writes the times to leave the origin, between earliest and latest, that catch a trip there or at
+//the end of a footpath from it, unsorted and possibly repeated. Pass NULL departures to count them.
+long
+raptorDepartures( const Raptor* this, long origin, long earliest, long latest, long* departures );
+
+RaptorResult*
+rrNew( Raptor* raptor, int max_rounds );
+
+void
+rrDestroy( RaptorResult* this );
+
+//forgets the labels of previous runs
+void
+rrReset( RaptorResult* this );
+
+//runs up to max_rounds rounds from the origin at the departure time, improving on the labels there
+//are. If target is a stop, stops reached no earlier than it are not explored further. Returns the
+//number of labels improved.
+long
+rrRun( RaptorResult* this, long origin, long departure, long target );
+
+//a new result with the labels of a run from the origin
+RaptorResult*
+raptorQuery( Raptor* this, long origin, long departure, long target, int max_rounds );
+
+int
+rrRounds( const RaptorResult* this );
+
+//the earliest arrival at the stop with at most round trips, or RAPTOR_UNREACHED
+long
+rrArrival( const RaptorResult* this, int round, long stop );
+
+//writes the legs of the journey arriving at the stop with at most round trips to legs, six longs a
+//leg: kind, from stop, to stop, trip or -1, departure and arrival time. legs holds 2*round+1 legs.
+//Returns the number of legs, or -1 if the stop wasn't reached.
+int
+rrLegs( const RaptorResult* this, int round, long stop, long* legs );
+
+#endif
@@ -1,8 +1,8 @@
 ShortestPathTree*
 #ifndef RETRO
-gShortestPathTree( Graph* this, char *from, char *to, State* init_state, WalkOptions* options, long maxtime, int hoplimit, long weightlimit ) {
+gShortestPathTree( Graph* this, char *from, char *to, State* init_state, WalkOptions* options, long maxtime, int hoplimit, long weightlimit, Heuristic* heuristic, SearchWorkspace* workspace ) {
 #else
-gShortestPathTreeRetro( Graph* this, char *from, char *to, State* init_state, WalkOptions* options, long mintime, int hoplimit, long weightlimit ) {
+gShortestPathTreeRetro( Graph* this, char *from, char *to, State* init_state, WalkOptions* options, long mintime, int hoplimit, long weightlimit, Heuristic* heuristic, SearchWorkspace* workspace ) {
 #endif
     
 /*
@@ -28,26 +28,45 @@ gShortestPathTreeRetro( Graph* this, char *from, char *to, State* init_state, Wa
   if( origin_v == NULL ) {
     return NULL;
   }
+  //The target vertex may not exist, in which case the search runs until the queue is exhausted
+  Vertex* target_v = target ? gGetVertex( this, target ) : NULL;
     
-  //Return Tree
-  ShortestPathTree* spt = sptNew();
+  //Return Tree, with SPT vertices looked up by vertex index, and Priority Queue. A workspace
+  //lends both, and the tree stays in it until destroyed.
+  ShortestPathTree* spt;
+  VertexQueue* q;
+  if( workspace ) {
+    if( !(spt = wsAcquire( workspace, this )) ) {
+      fprintf( stderr, "Search workspace still holds the tree of a previous search\n" );
+      return NULL;
+    }
+    q = wsQueue( workspace, (vqtype_t)options->queue_type );
+  } else {
+    spt = sptNew();
+    sptReserveIndex( spt, this->index_size );
+    q = vqNew( (vqtype_t)options->queue_type, this->index_size );
+  }
   sptAddVertex( spt, origin_v, 0 )->state = init_state;
-  //Priority Queue
-  dirfibheap_t q = dirfibheap_new( 1 );
-  dirfibheap_insert_or_dec_key( q, gGetVertex( this, origin ), 0 );
+  vqInsertOrDecKey( q, origin_v, 0 );
+  //With a heuristic and a target, vertices are queued by weight plus a lower bound on the weight
+  //remaining to the target (A*). Bounds are computed once per vertex and kept here, plus one.
+  long* bounds = NULL;
+  if( heuristic && target_v ) {
+    bounds = workspace ? wsBounds( workspace ) : (long*)calloc( this->index_size+1, sizeof(long) );
+  }
 
 /*
  *  CENTRAL ITERATION
  *
  */
 
-  while( !dirfibheap_empty( q ) ) {                  //Until the priority queue is empty:
-    u = dirfibheap_extract_min( q );                 //get the lowest-weight Vertex 'u',
+  while( !vqEmpty( q ) ) {                           //Until the priority queue is empty:
+    u = vqExtractMin( q );                           //get the lowest-weight Vertex 'u',
 
-    if( !strcmp( u->label, target ) )                //(end search if reached destination vertex)
+    if( u == target_v )                              //(end search if reached destination vertex)
       break;
 
-    spt_u = sptGetVertex( spt, u->label );             //get corresponding SPT Vertex,
+    spt_u = sptGetIndexed( spt, u->index );          //get corresponding SPT Vertex,
     
     if( spt_u->hop >= hoplimit ) {
       break;
@@ -67,13 +86,14 @@ gShortestPathTreeRetro( Graph* this, char *from, char *to, State* init_state, Wa
       break;
 #endif
 
+    EdgeIter edges;
 #ifndef RETRO
-    ListNode* edges = vGetOutgoingEdgeList( u );
+    edgeIterInit( &edges, this, u, 0 );
 #else
-    ListNode* edges = vGetIncomingEdgeList( u );
+    edgeIterInit( &edges, this, u, 1 );
 #endif
-    while( edges ) {                                 //For each Edge 'edge' connecting u
-      Edge* edge = edges->data;
+    Edge* edge;
+    while( (edge = edgeIterNext( &edges )) ) {       //For each Edge 'edge' connecting u
 #ifndef RETRO
       v = edge->to;                                  //to Vertex v:
 #else
@@ -81,7 +101,7 @@ gShortestPathTreeRetro( Graph* this, char *from, char *to, State* init_state, Wa
 #endif
 
       long old_w;
-      if( (spt_v = sptGetVertex( spt, v->label )) ) {        //get the SPT Vertex corresponding to 'v'
+      if( (spt_v = sptGetIndexed( spt, v->index )) ) {     //get the SPT Vertex corresponding to 'v'
         dv = (State*)spt_v->state;                     //and its State 'dv'
         old_w = dv->weight;
       } else {
@@ -97,14 +117,12 @@ gShortestPathTreeRetro( Graph* this, char *from, char *to, State* init_state, Wa
 
       // When an edge leads nowhere (as indicated by returning NULL), the iteration is over.
       if(!new_dv) {
-        edges = edges->next;
         continue;
       }
 
       // States cannot have weights lower than their parent State.
       if(new_dv->weight < du->weight) {
         fprintf(stderr, "Negative weight (%s(%ld) -> %s(%ld))\n",edge->from->label, du->weight, edge->to->label, new_dv->weight);
-        edges = edges->next;
 	stateDestroy( new_dv );
         continue;
       }
@@ -112,7 +130,18 @@ gShortestPathTreeRetro( Graph* this, char *from, char *to, State* init_state, Wa
       long new_w = new_dv->weight;
       // If the new way of getting there is better,
       if( new_w < old_w ) {
-        dirfibheap_insert_or_dec_key( q, v, new_w );    // rekey v in the priority queue
+        long priority = new_w;
+        if( bounds ) {
+          if( !bounds[v->index] ) {
+#ifndef RETRO
+            bounds[v->index] = heurEstimate( heuristic, v, target_v )+1;
+#else
+            bounds[v->index] = heurEstimate( heuristic, target_v, v )+1;
+#endif
+          }
+          priority += bounds[v->index]-1;
+        }
+        vqInsertOrDecKey( q, v, priority );             // rekey v in the priority queue
 
         // If this is the first time v has been reached
         if( !spt_v ) {
@@ -127,15 +156,17 @@ gShortestPathTreeRetro( Graph* this, char *from, char *to, State* init_state, Wa
             stateDestroy(spt_v->state);
         spt_v->state = new_dv;                      //Set the State of v in the SPT to the current winner
 
-        sptvSetParent( spt_v, spt_u, edge->payload );      //Make u the parent of v in the SPT
+        sptSetParent( spt, spt_v, spt_u, edge->payload );  //Make u the parent of v in the SPT
       } else {
         stateDestroy(new_dv); //new_dv will never be used; merge it with the infinite.
       }
-      edges = edges->next;
     }
   }
 
-  dirfibheap_delete( q );
+  if( !workspace ) {
+    vqDestroy( q );
+    free( bounds );
+  }
 
   //fprintf(stdout, "Final shortest path tree size: %d\n",count);
   return spt;
@@ -0,0 +1,234 @@
+#include "graphserver.h"
+#include "graph.h"
+#include "fibheap/fibheap.h"
+#include "fibheap/dirfibheap.h"
+#include "vertexqueue.h"
+#include "searchworkspace.h"
+
+#include <stdlib.h>
+
+SearchWorkspace*
+wsNew(void) {
+  SearchWorkspace* this = (SearchWorkspace*)calloc( 1, sizeof(SearchWorkspace) );
+  this->generation = 1;
+  this->tree.workspace = this;
+  return this;
+}
+
+void
+wsDestroy( SearchWorkspace* this ) {
+  if( this->in_use ) {
+    wsRelease( this );
+  }
+  if( this->queue ) {
+    vqDestroy( this->queue );
+  }
+  free( this->bounds );
+  free( this->touched );
+  free( this->slots );
+  free( this );
+}
+
+int
+wsInUse( const SearchWorkspace* this ) {
+  return this->in_use;
+}
+
+long
+wsCapacity( const SearchWorkspace* this ) {
+  return this->n_slots;
+}
+
+ShortestPathTree*
+wsAcquire( SearchWorkspace* this, Graph* graph ) {
+  if( this->in_use ) {
+    return NULL;
+  }
+
+  if( graph->index_size > this->n_slots ) {
+    //slots are zeroed, and so left out of every generation
+    free( this->slots );
+    free( this->touched );
+    free( this->bounds );
+    this->n_slots = graph->index_size;
+    this->slots = (WSSlot*)calloc( this->n_slots+1, sizeof(WSSlot) );
+    this->touched = (WSSlot**)malloc( (this->n_slots+1)*sizeof(WSSlot*) );
+    this->bounds = NULL;
+    if( this->queue ) {
+      vqDestroy( this->queue );
+      this->queue = NULL;
+    }
+  }
+
+  this->tree.vertices = NULL;
+  this->tree.vertex_index = NULL;
+  this->tree.index_size = this->n_slots;
+  this->tree.n_indexed = 0;
+  this->tree.indexed_labels = NULL;
+  this->graph = graph;
+  this->in_use = 1;
+  return &this->tree;
+}
+
+void
+wsRelease( SearchWorkspace* this ) {
+  long i;
+
+  for(i=0; i<this->n_touched; i++) {
+    SPTVertex* vtx = &this->touched[i]->vertex;
+    if( vtx->state ) {
+      stateDestroy( vtx->state );
+    }
+    if( this->bounds ) {
+      this->bounds[vtx->mirror->index] = 0;
+    }
+  }
+  this->n_touched = 0;
+  this->generation++;
+
+  if( this->queue ) {
+    vqClear( this->queue );
+  }
+
+  this->graph = NULL;
+  this->in_use = 0;
+}
+
+SPTVertex*
+wsAddVertex( SearchWorkspace* this, Vertex* mirror, int hop ) {
+  if( mirror->index < 0 || mirror->index >= this->n_slots ) {
+    return NULL;
+  }
+
+  WSSlot* slot = &this->slots[mirror->index];
+  if( slot->generation == this->generation ) {
+    return &slot->vertex;
+  }
+
+  SPTVertex* vtx = &slot->vertex;
+  vtx->degree_out = 0;
+  vtx->degree_in = 0;
+  slot->outgoing.data = NULL;
+  slot->outgoing.next = NULL;
+  slot->incoming.data = NULL;
+  slot->incoming.next = NULL;
+  vtx->outgoing = &slot->outgoing;
+  vtx->incoming = &slot->incoming;
+  vtx->label = mirror->label;
+  vtx->state = NULL;
+  vtx->hop = hop;
+  vtx->mirror = mirror;
+
+  slot->generation = this->generation;
+  this->touched[this->n_touched++] = slot;
+  return vtx;
+}
+
+static void
+wsDetachParent( WSSlot* slot ) {
+  if( !slot->vertex.degree_in ) {
+    return;
+  }
+
+  Vertex* parent = slot->parent.from;
+  ListNode* prev = parent->outgoing;
+  while( prev->next != &slot->parent_out ) {
+    prev = prev->next;
+  }
+  prev->next = slot->parent_out.next;
+  parent->degree_out--;
+
+  slot->incoming.next = NULL;
+  slot->vertex.degree_in = 0;
+}
+
+void
+wsRemoveVertex( SearchWorkspace* this, SPTVertex* vtx ) {
+  WSSlot* slot = (WSSlot*)vtx;
+  long i;
+
+  wsDetachParent( slot );
+
+  //orphan the children
+  ListNode* child_node = vtx->outgoing->next;
+  while( child_node ) {
+    WSSlot* child = (WSSlot*)child_node->data->to;
+    child->incoming.next = NULL;
+    child->vertex.degree_in = 0;
+    child_node = child_node->next;
+  }
+  slot->outgoing.next = NULL;
+  vtx->degree_out = 0;
+
+  if( vtx->state ) {
+    stateDestroy( vtx->state );
+    vtx->state = NULL;
+  }
+  if( this->bounds ) {
+    this->bounds[vtx->mirror->index] = 0;
+  }
+
+  for(i=0; i<this->n_touched; i++) {
+    if( this->touched[i] == slot ) {
+      this->touched[i] = this->touched[--this->n_touched];
+      break;
+    }
+  }
+  slot->generation = 0;
+}
+
+Edge*
+wsSetParent( SearchWorkspace* this, SPTVertex* vtx, SPTVertex* parent, EdgePayload* payload ) {
+  WSSlot* slot = (WSSlot*)vtx;
+
+  wsDetachParent( slot );
+
+  slot->parent.from = (Vertex*)parent;
+  slot->parent.to = (Vertex*)vtx;
+  slot->parent.payload = payload;
+  slot->parent.enabled = 1;
+
+  slot->parent_in.data = &slot->parent;
+  slot->parent_in.next = NULL;
+  slot->incoming.next = &slot->parent_in;
+  vtx->degree_in = 1;
+
+  slot->parent_out.data = &slot->parent;
+  liInsertAfter( parent->outgoing, &slot->parent_out );
+  parent->degree_out++;
+
+  return &slot->parent;
+}
+
+SPTVertex**
+wsVertices( const SearchWorkspace* this, long* num_vertices ) {
+  SPTVertex** ret = (SPTVertex**)malloc( (this->n_touched+1)*sizeof(SPTVertex*) );
+  long i;
+
+  for(i=0; i<this->n_touched; i++) {
+    ret[i] = &this->touched[i]->vertex;
+  }
+
+  *num_vertices = this->n_touched;
+  return ret;
+}
+
+VertexQueue*
+wsQueue( SearchWorkspace* this, vqtype_t type ) {
+  if( this->queue && (this->queue->type != type || this->queue->n_vertices < this->n_slots) ) {
+    vqDestroy( this->queue );
+    this->queue = NULL;
+  }
+  if( !this->queue ) {
+    this->queue = vqNew( type, this->n_slots );
+  }
+  return this->queue;
+}
+
+long*
+wsBounds( SearchWorkspace* this ) {
+  if( !this->bounds ) {
+    this->bounds = (long*)calloc( this->n_slots+1, sizeof(long) );
+  }
+  return this->bounds;
+}
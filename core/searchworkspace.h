@@ -0,0 +1,89 @@
+#ifndef SEARCHWORKSPACE_H
+#define SEARCHWORKSPACE_H
+
+/*
+ * Storage kept between searches, so that a search run in a workspace builds its shortest path
+ * tree without allocating vertices, edges, list nodes, labels or a hashtable, and reuses the
+ * priority queue and A* bounds of the previous search.
+ *
+ * Tree vertices live in slots indexed by graph vertex index. A slot belongs to the current tree
+ * when its generation matches the workspace's, so destroying the tree only has to free the
+ * states of the slots it touched and bump the generation. A workspace holds one tree at a time
+ * and is not safe to share between threads.
+ */
+
+typedef struct WSSlot {
+  SPTVertex vertex;      //first, so that a slot can be used as its SPTVertex
+  ListNode outgoing;     //dummy heads of the vertex's edge lists
+  ListNode incoming;
+  Edge parent;           //the tree edge from the vertex's parent
+  ListNode parent_in;    //node for the parent edge in this vertex's incoming list
+  ListNode parent_out;   //node for the parent edge in the parent's outgoing list
+  long generation;
+} WSSlot;
+
+struct SearchWorkspace {
+  WSSlot* slots;
+  long n_slots;
+  long generation;
+
+  //slots of the current tree, in the order they were reached
+  WSSlot** touched;
+  long n_touched;
+
+  //A* bounds by vertex index, plus one; cleared for the touched vertices when the tree is destroyed
+  long* bounds;
+  VertexQueue* queue;
+
+  ShortestPathTree tree;
+  Graph* graph;
+  int in_use;
+};
+
+SearchWorkspace*
+wsNew(void);
+
+void
+wsDestroy( SearchWorkspace* this );
+
+int
+wsInUse( const SearchWorkspace* this );
+
+long
+wsCapacity( const SearchWorkspace* this );
+
+//returns the workspace's empty tree, sized for the graph, or NULL if it still holds a tree
+ShortestPathTree*
+wsAcquire( SearchWorkspace* this, Graph* graph );
+
+//frees the states of the current tree and makes the workspace available to the next search
+void
+wsRelease( SearchWorkspace* this );
+
+static inline SPTVertex*
+wsGetVertex( const SearchWorkspace* this, long index ) {
+  WSSlot* slot = &this->slots[index];
+  return slot->generation == this->generation ? &slot->vertex : NULL;
+}
+
+SPTVertex*
+wsAddVertex( SearchWorkspace* this, Vertex* mirror, int hop );
+
+void
+wsRemoveVertex( SearchWorkspace* this, SPTVertex* vtx );
+
+Edge*
+wsSetParent( SearchWorkspace* this, SPTVertex* vtx, SPTVertex* parent, EdgePayload* payload );
+
+SPTVertex**
+wsVertices( const SearchWorkspace* this, long* num_vertices );
+
+//the workspace's queue, emptied, sized for the current tree and of the given type
+VertexQueue*
+wsQueue( SearchWorkspace* this, vqtype_t type );
+
+//the workspace's A* bound array, sized for the current tree
+long*
+wsBounds( SearchWorkspace* this );
+
+#endif
@@ -9,6 +9,9 @@ ServiceCalendar*
 scNew( ) {
     ServiceCalendar* ret = (ServiceCalendar*)malloc(sizeof(ServiceCalendar));
     ret->head = NULL;
+    ret->periods = NULL;
+    ret->n_periods = 0;
+    ret->periods_cap = 0;
     ret->num_sids = 0;
     ret->sid_str_to_int = create_hashtable_string(16);
     ret->sid_int_to_str = (char**)malloc(1024*sizeof(char*));
@@ -51,18 +54,38 @@ scGetServiceIdInt( ServiceCalendar* this, char* service_id ) {
     }
 }
 
+//index of the first period ending after the time, or n_periods
+static int
+scSearchEnd( const ServiceCalendar* this, long time ) {
+    int first = 0;
+    int last = this->n_periods;
+    while( first < last ) {
+        int mid = (first+last)/2;
+        if( this->periods[mid]->end_time <= time ) {
+            first = mid+1;
+        } else {
+            last = mid;
+        }
+    }
+    return first;
+}
+
 void
 scAddPeriod( ServiceCalendar* this, ServicePeriod* period ) {
+    int m = scSearchEnd( this, period->begin_time );
+    if( this->n_periods == this->periods_cap ) {
+        this->periods_cap = this->periods_cap ? this->periods_cap*2 : 16;
+        this->periods = (ServicePeriod**)realloc( this->periods, this->periods_cap*sizeof(ServicePeriod*) );
+    }
+    memmove( this->periods+m+1, this->periods+m, (this->n_periods-m)*sizeof(ServicePeriod*) );
+    this->periods[m] = period;
+    this->n_periods += 1;
+
     if(!this->head) {
         this->head = period;
     } else {
-        ServicePeriod* prev = NULL;
-        ServicePeriod* curs = this->head;
-        
-        while(curs && period->begin_time >= curs->end_time ) {
-            prev = curs;
-            curs = curs->next_period;
-        }
+        ServicePeriod* prev = m > 0 ? this->periods[m-1] : NULL;
+        ServicePeriod* curs = m+1 < this->n_periods ? this->periods[m+1] : NULL;
         
         //link last and period; replace the head if necessary
         if(prev) {
@@ -84,27 +107,24 @@ scAddPeriod( ServiceCalendar* this, ServicePeriod* period ) {
 
 ServicePeriod*
 scPeriodOfOrAfter( const ServiceCalendar* this, long time ) {
-  ServicePeriod* period = this->head;
-
-  while( period && period->end_time <= time ) {
-    period = period->next_period;
-  }
-  
-  return period;
+  int i = scSearchEnd( this, time );
+  return i < this->n_periods ? this->periods[i] : NULL;
 }
 
 ServicePeriod*
 scPeriodOfOrBefore( const ServiceCalendar* this, long time ) {
-  if(!this->head) {
-    return NULL;
-  }
-    
-  ServicePeriod* period = spFastForward( this->head );
-
-  while( period && period->begin_time > time ) {
-    period = period->prev_period;
+  //the last period beginning at or before the time
+  int first = 0;
+  int last = this->n_periods;
+  while( first < last ) {
+    int mid = (first+last)/2;
+    if( this->periods[mid]->begin_time <= time ) {
+      first = mid+1;
+    } else {
+      last = mid;
+    }
   }
-  return period;
+  return first > 0 ? this->periods[first-1] : NULL;
 }
 
 ServicePeriod*
@@ -120,6 +140,7 @@ scDestroy( ServiceCalendar* this ) {
       spDestroyPeriod(curs);
       curs = next;
     }
+    free(this->periods);
     
     hashtable_destroy( this->sid_str_to_int, 1 ); //destroy sid directory, and sid strings themselves
     int i;
@@ -140,6 +161,21 @@ ServicePeriod* spNew( long begin_time, long end_time, int n_service_ids, Service
   ret->n_service_ids = n_service_ids;
   ret->service_ids  = (ServiceId*)malloc(n_service_ids*sizeof(ServiceId));
   memcpy( ret->service_ids, service_ids, n_service_ids*sizeof(ServiceId) );
+
+  int i;
+  ServiceId max_sid = -1;
+  for(i=0; i<n_service_ids; i++) {
+    if( service_ids[i] > max_sid ) {
+      max_sid = service_ids[i];
+    }
+  }
+  ret->n_sid_words = max_sid/64+1;
+  ret->sid_bits = (uint64_t*)calloc( ret->n_sid_words, sizeof(uint64_t) );
+  for(i=0; i<n_service_ids; i++) {
+    if( service_ids[i] >= 0 ) {
+      ret->sid_bits[service_ids[i]/64] |= (uint64_t)1 << (service_ids[i]%64);
+    }
+  }
   ret->prev_period = NULL;
   ret->next_period = NULL;
 
@@ -149,19 +185,17 @@ ServicePeriod* spNew( long begin_time, long end_time, int n_service_ids, Service
 void
 spDestroyPeriod( ServicePeriod* this ) {
   free( this->service_ids );
+  free( this->sid_bits );
   free( this );
 }
 
 
 int
 spPeriodHasServiceId( const ServicePeriod* this, ServiceId service_id) {
-  int i;
-  for(i=0; i<this->n_service_ids; i++) {
-    if( this->service_ids[i] == service_id ) {
-      return 1;
-    }
+  if( service_id < 0 || service_id/64 >= this->n_sid_words ) {
+    return 0;
   }
-  return 0;
+  return (this->sid_bits[service_id/64] >> (service_id%64)) & 1;
 }
 
 ServicePeriod*
@@ -1,6 +1,8 @@
 #ifndef SERVICECALENDAR_H
 #define SERVICECALENDAR_H
 
+#include <stdint.h>
+
 struct ServiceCalendar {
     /* TripHops have service types, and the ServiceCalendar provides the correspondance between points in time and lists of service_ids.
     *  For example, A triphop that has a service_id attribute with the value "WKDY" will only run during service periods
@@ -12,6 +14,9 @@ struct ServiceCalendar {
     */
     
     ServicePeriod* head;
+    ServicePeriod** periods;      //the periods in order, for binary search
+    int n_periods;
+    int periods_cap;
     
     int num_sids;
     struct hashtable* sid_str_to_int;
@@ -23,6 +28,8 @@ struct ServicePeriod {
   long end_time;   //first moment after the period; exclusive.
   int n_service_ids;
   ServiceId* service_ids;
+  int n_sid_words;
+  uint64_t* sid_bits;           //bit i is set if service_ids has service id i
   ServicePeriod* prev_period;
   ServicePeriod* next_period;
 } ;
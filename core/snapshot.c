@@ -0,0 +1,995 @@
+#include "graphserver.h"
+#include "graph.h"
+#include "contraction.h"
+#include "snapshot.h"
+#include "hashtable/hashtable_gs.h"
+#include "hashtable/hashtable_itr.h"
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+
+#define SNAPSHOT_NO_REF INT64_MIN
+
+void snapshotResourcesDestroy( SnapshotResources* this ) {
+    long i;
+    for(i=0; i<this->n_calendars; i++) {
+        scDestroy( this->calendars[i] );
+    }
+    for(i=0; i<this->n_timezones; i++) {
+        tzDestroy( this->timezones[i] );
+    }
+    free( this->calendars );
+    free( this->timezones );
+    free( this );
+}
+
+/*
+ * WRITING
+ *
+ * Everything is gathered into growable arrays first, since the header needs the final counts,
+ * and then written section by section.
+ */
+
+typedef struct {
+    char* data;
+    size_t size;
+    size_t cap;
+} SnapBuffer;
+
+static void* sbReserve( SnapBuffer* this, size_t n ) {
+    if( this->size + n > this->cap ) {
+        this->cap = (this->size + n) * 2;
+        this->data = (char*)realloc( this->data, this->cap );
+    }
+    void* ret = this->data + this->size;
+    this->size += n;
+    return ret;
+}
+
+static int64_t sbAppend( SnapBuffer* this, const void* src, size_t n ) {
+    int64_t offset = this->size;
+    memcpy( sbReserve( this, n ), src, n );
+    return offset;
+}
+
+//number of items of size bytes in the buffer
+static int64_t sbCount( SnapBuffer* this, size_t size ) {
+    return this->size / size;
+}
+
+//appends value, returning its position in int64s
+static int64_t sbAppendInt( SnapBuffer* this, int64_t value ) {
+    return sbAppend( this, &value, sizeof(int64_t) ) / sizeof(int64_t);
+}
+
+static void sbPad( SnapBuffer* this ) {
+    while( this->size % 8 ) {
+        *(char*)sbReserve( this, 1 ) = '\0';
+    }
+}
+
+//pointers already written, mapped to their references by open addressing
+typedef struct {
+    const void** keys;
+    int64_t* refs;
+    size_t cap;
+    size_t n;
+} PtrMap;
+
+static size_t pmSlot( PtrMap* this, const void* key ) {
+    size_t i = (size_t)(((uintptr_t)key >> 3) * 11400714819323198485ull) & (this->cap-1);
+    while( this->keys[i] && this->keys[i] != key ) {
+        i = (i+1) & (this->cap-1);
+    }
+    return i;
+}
+
+static void pmPut( PtrMap* this, const void* key, int64_t ref ) {
+    if( 2*(this->n+1) > this->cap ) {
+        PtrMap grown = { NULL, NULL, this->cap ? this->cap*2 : 1024, 0 };
+        grown.keys = (const void**)calloc( grown.cap, sizeof(void*) );
+        grown.refs = (int64_t*)malloc( grown.cap*sizeof(int64_t) );
+        size_t i;
+        for(i=0; i<this->cap; i++) {
+            if( this->keys[i] ) {
+                pmPut( &grown, this->keys[i], this->refs[i] );
+            }
+        }
+        free( this->keys );
+        free( this->refs );
+        *this = grown;
+    }
+    size_t i = pmSlot( this, key );
+    this->keys[i] = key;
+    this->refs[i] = ref;
+    this->n++;
+}
+
+static int64_t pmGet( PtrMap* this, const void* key ) {
+    if( !this->cap ) {
+        return SNAPSHOT_NO_REF;
+    }
+    size_t i = pmSlot( this, key );
+    return this->keys[i] ? this->refs[i] : SNAPSHOT_NO_REF;
+}
+
+typedef struct {
+    SnapBuffer strings;
+    struct hashtable* string_offsets;
+    SnapBuffer labels;       //int64 offsets into strings
+    struct hashtable* label_ids;
+    SnapBuffer payloads;     //PayloadRecords
+    SnapBuffer combo_offsets;
+    SnapBuffer combo_items;
+    SnapBuffer aux;
+    SnapBuffer calendars;    //int64 offsets into aux
+    SnapBuffer timezones;    //int64 offsets into aux
+    PtrMap written;          //payloads, calendars and timezones
+    SnapBuffer graphs;       //the graph sections, complete
+    int64_t n_graphs;
+} SnapshotWriter;
+
+static void swInit( SnapshotWriter* this ) {
+    memset( this, 0, sizeof(SnapshotWriter) );
+    this->string_offsets = create_hashtable_string( 1024 );
+    this->label_ids = create_hashtable_string( 1024 );
+    sbAppendInt( &this->combo_offsets, 0 );
+}
+
+static void swDestroy( SnapshotWriter* this ) {
+    free( this->strings.data );
+    hashtable_destroy( this->string_offsets, 1 );
+    free( this->labels.data );
+    hashtable_destroy( this->label_ids, 1 );
+    free( this->payloads.data );
+    free( this->combo_offsets.data );
+    free( this->combo_items.data );
+    free( this->aux.data );
+    free( this->calendars.data );
+    free( this->timezones.data );
+    free( this->written.keys );
+    free( this->written.refs );
+    free( this->graphs.data );
+}
+
+//the offset of str in the string table, which holds each distinct string once
+static int64_t swString( SnapshotWriter* this, const char* str ) {
+    long* offset = (long*)hashtable_search( this->string_offsets, (char*)str );
+    if( offset ) {
+        return *offset;
+    }
+    int64_t ret = sbAppend( &this->strings, str, strlen( str )+1 );
+    hashtable_insert_str_long( this->string_offsets, str, ret );
+    return ret;
+}
+
+static int64_t swLabel( SnapshotWriter* this, const char* label ) {
+    long* id = (long*)hashtable_search( this->label_ids, (char*)label );
+    if( id ) {
+        return *id;
+    }
+    int64_t ret = sbAppendInt( &this->labels, swString( this, label ) );
+    hashtable_insert_str_long( this->label_ids, label, ret );
+    return ret;
+}
+
+//the index of calendar, written if it is new, or -1 for no calendar
+static int64_t swCalendar( SnapshotWriter* this, ServiceCalendar* calendar ) {
+    if( !calendar ) {
+        return -1;
+    }
+    int64_t ret = pmGet( &this->written, calendar );
+    if( ret != SNAPSHOT_NO_REF ) {
+        return ret;
+    }
+
+    int i;
+    int64_t start = sbAppendInt( &this->aux, calendar->num_sids );
+    for(i=0; i<calendar->num_sids; i++) {
+        sbAppendInt( &this->aux, swString( this, calendar->sid_int_to_str[i] ) );
+    }
+    int64_t n_periods = sbAppendInt( &this->aux, 0 );
+    ServicePeriod* period;
+    for( period=calendar->head; period; period=period->next_period ) {
+        ((int64_t*)this->aux.data)[n_periods]++;
+        sbAppendInt( &this->aux, period->begin_time );
+        sbAppendInt( &this->aux, period->end_time );
+        sbAppendInt( &this->aux, period->n_service_ids );
+        for(i=0; i<period->n_service_ids; i++) {
+            sbAppendInt( &this->aux, period->service_ids[i] );
+        }
+    }
+
+    ret = sbAppendInt( &this->calendars, start );
+    pmPut( &this->written, calendar, ret );
+    return ret;
+}
+
+//the index of timezone, written if it is new, or -1 for no timezone
+static int64_t swTimezone( SnapshotWriter* this, Timezone* timezone ) {
+    if( !timezone ) {
+        return -1;
+    }
+    int64_t ret = pmGet( &this->written, timezone );
+    if( ret != SNAPSHOT_NO_REF ) {
+        return ret;
+    }
+
+    int64_t start = sbAppendInt( &this->aux, 0 );
+    TimezonePeriod* period;
+    for( period=timezone->head; period; period=period->next_period ) {
+        ((int64_t*)this->aux.data)[start]++;
+        sbAppendInt( &this->aux, period->begin_time );
+        sbAppendInt( &this->aux, period->end_time );
+        sbAppendInt( &this->aux, period->utc_offset );
+    }
+
+    ret = sbAppendInt( &this->timezones, start );
+    pmPut( &this->written, timezone, ret );
+    return ret;
+}
+
+static void swSchedule( SnapshotWriter* this, PayloadRecord* record, ServiceCalendar* calendar, Timezone* timezone, int agency, ServiceId service_id ) {
+    record->calendar = swCalendar( this, calendar );
+    record->timezone = swTimezone( this, timezone );
+    record->agency = agency;
+    record->service_id = service_id;
+}
+
+//appends the (time, trip id[, stop sequence]) entries of a payload to aux
+static void swTrips( SnapshotWriter* this, PayloadRecord* record, int n, int* times, char** trip_ids, int* stop_sequences ) {
+    int i;
+    record->n = n;
+    record->data = sbCount( &this->aux, sizeof(int64_t) );
+    for(i=0; i<n; i++) {
+        sbAppendInt( &this->aux, times[i] );
+        sbAppendInt( &this->aux, swString( this, trip_ids[i] ) );
+        if( stop_sequences ) {
+            sbAppendInt( &this->aux, stop_sequences[i] );
+        }
+    }
+}
+
+//the reference of payload, written if it is new, or SNAPSHOT_NO_REF if it can't be stored
+static int64_t swPayload( SnapshotWriter* this, const EdgePayload* payload ) {
+    int64_t ret = pmGet( &this->written, payload );
+    if( ret != SNAPSHOT_NO_REF ) {
+        return ret;
+    }
+
+    if( payload->type == PL_COMBINATION ) {
+        Combination* combo = (Combination*)payload;
+        int64_t* items = (int64_t*)malloc( (combo->n+1)*sizeof(int64_t) );
+        int i;
+        for(i=0; i<combo->n; i++) {
+            items[i] = swPayload( this, combo->payloads[i] );
+            if( items[i] == SNAPSHOT_NO_REF ) {
+                free( items );
+                return SNAPSHOT_NO_REF;
+            }
+        }
+        sbAppend( &this->combo_items, items, combo->n*sizeof(int64_t) );
+        ret = -sbAppendInt( &this->combo_offsets, sbCount( &this->combo_items, sizeof(int64_t) ) );
+        free( items );
+        pmPut( &this->written, payload, ret );
+        return ret;
+    }
+
+    PayloadRecord record;
+    memset( &record, 0, sizeof(PayloadRecord) );
+    record.type = payload->type;
+    record.external_id = payload->external_id;
+    record.name = -1;
+    record.calendar = -1;
+    record.timezone = -1;
+    switch( payload->type ) {
+        case PL_STREET: {
+            Street* street = (Street*)payload;
+            record.name = swString( this, street->name );
+            record.length = street->length;
+            record.rise = street->rise;
+            record.fall = street->fall;
+            record.slog = street->slog;
+            record.way = street->way;
+            record.reverse_of_source = street->reverse_of_source;
+            break;
+        }
+        case PL_LINK:
+            break;
+        case PL_EGRESS: {
+            Egress* egress = (Egress*)payload;
+            record.name = swString( this, egress->name );
+            record.length = egress->length;
+            break;
+        }
+        case PL_ELAPSE_TIME:
+            record.way = ((ElapseTime*)payload)->seconds;
+            break;
+        case PL_WAIT:
+            record.way = ((Wait*)payload)->end;
+            record.timezone = swTimezone( this, ((Wait*)payload)->timezone );
+            break;
+        case PL_HEADWAY: {
+            Headway* headway = (Headway*)payload;
+            record.name = swString( this, headway->trip_id );
+            swSchedule( this, &record, headway->calendar, headway->timezone, headway->agency, headway->service_id );
+            record.times[0] = headway->begin_time;
+            record.times[1] = headway->end_time;
+            record.times[2] = headway->wait_period;
+            record.times[3] = headway->transit;
+            break;
+        }
+        case PL_HEADWAYBOARD: {
+            HeadwayBoard* hb = (HeadwayBoard*)payload;
+            record.name = swString( this, hb->trip_id );
+            swSchedule( this, &record, hb->calendar, hb->timezone, hb->agency, hb->service_id );
+            record.times[0] = hb->start_time;
+            record.times[1] = hb->end_time;
+            record.times[2] = hb->headway_secs;
+            break;
+        }
+        case PL_HEADWAYALIGHT: {
+            HeadwayAlight* ha = (HeadwayAlight*)payload;
+            record.name = swString( this, ha->trip_id );
+            swSchedule( this, &record, ha->calendar, ha->timezone, ha->agency, ha->service_id );
+            record.times[0] = ha->start_time;
+            record.times[1] = ha->end_time;
+            record.times[2] = ha->headway_secs;
+            break;
+        }
+        case PL_TRIPBOARD: {
+            TripBoard* tb = (TripBoard*)payload;
+            swSchedule( this, &record, tb->calendar, tb->timezone, tb->agency, tb->service_id );
+            record.overage = tb->overage;
+            swTrips( this, &record, tb->n, tb->departs, tb->trip_ids, tb->stop_sequences );
+            break;
+        }
+        case PL_ALIGHT: {
+            TripAlight* al = (TripAlight*)payload;
+            swSchedule( this, &record, al->calendar, al->timezone, al->agency, al->service_id );
+            record.overage = al->overage;
+            swTrips( this, &record, al->n, al->arrivals, al->trip_ids, al->stop_sequences );
+            break;
+        }
+        case PL_CROSSING: {
+            Crossing* crossing = (Crossing*)payload;
+            swTrips( this, &record, crossing->n, crossing->crossing_times, crossing->crossing_time_trip_ids, NULL );
+            break;
+        }
+        default:
+            return SNAPSHOT_NO_REF;
+    }
+    ret = sbCount( &this->payloads, sizeof(PayloadRecord) );
+    sbAppend( &this->payloads, &record, sizeof(PayloadRecord) );
+    pmPut( &this->written, payload, ret );
+    return ret;
+}
+
+//appends a graph section for gg; returns SNAPSHOT_ERR_PAYLOAD if one of its payloads can't be stored
+static int swGraph( SnapshotWriter* this, Graph* gg ) {
+    long i, n = 0;
+    int64_t flags = 0;
+    int64_t* positions = (int64_t*)malloc( (gg->index_size+1)*sizeof(int64_t) );
+    for(i=0; i<gg->index_size; i++) {
+        Vertex* vv = gg->vertex_index[i];
+        positions[i] = vv ? n++ : -1;
+        if( vv && vv->has_coordinates ) {
+            flags |= SNAPSHOT_COORDINATES;
+        }
+    }
+
+    SnapBuffer vertices = {NULL, 0, 0}, offsets = {NULL, 0, 0}, targets = {NULL, 0, 0}, refs = {NULL, 0, 0};
+    SnapBuffer enabled = {NULL, 0, 0};
+    int ret = 0;
+    sbAppendInt( &offsets, 0 );
+    for(i=0; i<gg->index_size && !ret; i++) {
+        Vertex* vv = gg->vertex_index[i];
+        if( !vv ) {
+            continue;
+        }
+        sbAppendInt( &vertices, swLabel( this, vv->label ) );
+        ListNode* outgoing;
+        for( outgoing=vGetOutgoingEdgeList( vv ); outgoing; outgoing=outgoing->next ) {
+            Edge* ee = outgoing->data;
+            int64_t ref = swPayload( this, ee->payload );
+            if( ref == SNAPSHOT_NO_REF ) {
+                ret = SNAPSHOT_ERR_PAYLOAD;
+                break;
+            }
+            sbAppendInt( &targets, positions[ee->to->index] );
+            sbAppendInt( &refs, ref );
+            sbAppendInt( &enabled, ee->enabled );
+            if( !ee->enabled ) {
+                flags |= SNAPSHOT_DISABLED_EDGES;
+            }
+        }
+        sbAppendInt( &offsets, sbCount( &targets, sizeof(int64_t) ) );
+    }
+
+    if( !ret ) {
+        SnapshotGraphHeader header = { n, sbCount( &targets, sizeof(int64_t) ), flags };
+        sbAppend( &this->graphs, &header, sizeof(SnapshotGraphHeader) );
+        sbAppend( &this->graphs, vertices.data, vertices.size );
+        sbAppend( &this->graphs, offsets.data, offsets.size );
+        sbAppend( &this->graphs, targets.data, targets.size );
+        sbAppend( &this->graphs, refs.data, refs.size );
+        if( flags & SNAPSHOT_COORDINATES ) {
+            for(i=0; i<gg->index_size; i++) {
+                if( gg->vertex_index[i] ) {
+                    sbAppendInt( &this->graphs, gg->vertex_index[i]->has_coordinates );
+                }
+            }
+            for(i=0; i<gg->index_size; i++) {
+                Vertex* vv = gg->vertex_index[i];
+                if( vv ) {
+                    sbAppend( &this->graphs, &vv->lat, sizeof(double) );
+                    sbAppend( &this->graphs, &vv->lon, sizeof(double) );
+                }
+            }
+        }
+        if( flags & SNAPSHOT_DISABLED_EDGES ) {
+            sbAppend( &this->graphs, enabled.data, enabled.size );
+        }
+        this->n_graphs++;
+    }
+
+    free( positions );
+    free( vertices.data );
+    free( offsets.data );
+    free( targets.data );
+    free( refs.data );
+    free( enabled.data );
+    return ret;
+}
+
+static int swWrite( SnapshotWriter* this, int64_t kind, const char* filename ) {
+    FILE* fp = fopen( filename, "wb" );
+    if( !fp ) {
+        return SNAPSHOT_ERR_IO;
+    }
+
+    SnapshotHeader header;
+    memset( &header, 0, sizeof(SnapshotHeader) );
+    memcpy( header.magic, SNAPSHOT_MAGIC, 8 );
+    header.version = SNAPSHOT_VERSION;
+    header.kind = kind;
+    sbPad( &this->strings );
+    header.n_string_bytes = this->strings.size;
+    header.n_labels = sbCount( &this->labels, sizeof(int64_t) );
+    header.n_payloads = sbCount( &this->payloads, sizeof(PayloadRecord) );
+    header.n_combos = sbCount( &this->combo_offsets, sizeof(int64_t) ) - 1;
+    header.n_combo_items = sbCount( &this->combo_items, sizeof(int64_t) );
+    header.n_aux = sbCount( &this->aux, sizeof(int64_t) );
+    header.n_calendars = sbCount( &this->calendars, sizeof(int64_t) );
+    header.n_timezones = sbCount( &this->timezones, sizeof(int64_t) );
+    header.n_graphs = this->n_graphs;
+
+    int ok = fwrite( &header, sizeof(SnapshotHeader), 1, fp ) == 1;
+    SnapBuffer* sections[] = { &this->strings, &this->labels, &this->payloads, &this->combo_offsets,
+                               &this->combo_items, &this->aux, &this->calendars, &this->timezones,
+                               &this->graphs };
+    int i;
+    for(i=0; i<9 && ok; i++) {
+        ok = sections[i]->size == 0 || fwrite( sections[i]->data, sections[i]->size, 1, fp ) == 1;
+    }
+    if( fclose( fp ) != 0 ) {
+        ok = 0;
+    }
+    return ok ? 0 : SNAPSHOT_ERR_IO;
+}
+
+int gSaveSnapshot( Graph* this, const char* filename ) {
+    SnapshotWriter writer;
+    swInit( &writer );
+    int ret = swGraph( &writer, this );
+    if( !ret ) {
+        ret = swWrite( &writer, SNAPSHOT_KIND_GRAPH, filename );
+    }
+    swDestroy( &writer );
+    return ret;
+}
+
+int chSave( CH* this, const char* filename ) {
+    SnapshotWriter writer;
+    swInit( &writer );
+    int ret = swGraph( &writer, this->up );
+    if( !ret ) {
+        ret = swGraph( &writer, this->down );
+    }
+    if( !ret ) {
+        ret = swWrite( &writer, SNAPSHOT_KIND_CH, filename );
+    }
+    swDestroy( &writer );
+    return ret;
+}
+
+/*
+ * READING
+ *
+ * The file is mapped and its sections read in place. Counts, offsets and references are checked
+ * against the size of the file, so a truncated or corrupt file is refused instead of crashing.
+ */
+
+typedef struct {
+    const char* data;
+    size_t size;
+    size_t pos;
+    int failed;
+
+    const SnapshotHeader* header;
+    const char* strings;
+    const int64_t* labels;
+    const PayloadRecord* records;
+    const int64_t* combo_offsets;
+    const int64_t* combo_items;
+    const int64_t* aux;
+    const int64_t* calendar_offsets;
+    const int64_t* timezone_offsets;
+
+    SnapshotResources* resources;
+    EdgePayload** payloads;  //the records then the combinations, as they are built
+    long n_payloads;
+} SnapshotReader;
+
+//the next n items of size bytes, or NULL if the file is too short
+static const void* srTake( SnapshotReader* this, int64_t n, size_t size ) {
+    if( this->failed || n < 0 || (size && (size_t)n > (this->size - this->pos) / size) ) {
+        this->failed = 1;
+        return NULL;
+    }
+    const void* ret = this->data + this->pos;
+    this->pos += ((size_t)n*size + 7) & ~(size_t)7;
+    if( this->pos > this->size ) {
+        this->pos = this->size;
+    }
+    return ret;
+}
+
+static const char* srString( SnapshotReader* this, int64_t offset ) {
+    if( offset < 0 || offset >= this->header->n_string_bytes ) {
+        this->failed = 1;
+        return "";
+    }
+    return this->strings + offset;
+}
+
+//the n int64s of aux from offset, or NULL if they run past its end
+static const int64_t* srAux( SnapshotReader* this, int64_t offset, int64_t n ) {
+    if( offset < 0 || n < 0 || offset > this->header->n_aux || n > this->header->n_aux - offset ) {
+        this->failed = 1;
+        return NULL;
+    }
+    return this->aux + offset;
+}
+
+static EdgePayload* srPayload( SnapshotReader* this, int64_t ref ) {
+    int64_t i = ref >= 0 ? ref : this->header->n_payloads - ref - 1;
+    if( i < 0 || i >= this->n_payloads ) {
+        this->failed = 1;
+        return NULL;
+    }
+    return this->payloads[i];
+}
+
+static ServiceCalendar* srCalendar( SnapshotReader* this, int64_t i ) {
+    if( i < -1 || i >= this->resources->n_calendars ) {
+        this->failed = 1;
+        return NULL;
+    }
+    return i < 0 ? NULL : this->resources->calendars[i];
+}
+
+static Timezone* srTimezone( SnapshotReader* this, int64_t i ) {
+    if( i < -1 || i >= this->resources->n_timezones ) {
+        this->failed = 1;
+        return NULL;
+    }
+    return i < 0 ? NULL : this->resources->timezones[i];
+}
+
+static ServiceCalendar* srBuildCalendar( SnapshotReader* this, int64_t pos ) {
+    const int64_t* num_sids = srAux( this, pos, 1 );
+    //a calendar has room for 1024 service ids
+    if( !num_sids || *num_sids > 1024 ) {
+        this->failed = 1;
+        return NULL;
+    }
+    const int64_t* sids = srAux( this, pos+1, *num_sids );
+    const int64_t* n_periods = srAux( this, pos+1+*num_sids, 1 );
+    if( !sids || !n_periods ) {
+        return NULL;
+    }
+
+    ServiceCalendar* ret = scNew();
+    int64_t i, j;
+    for(i=0; i<*num_sids; i++) {
+        scAddServiceId( ret, (char*)srString( this, sids[i] ) );
+    }
+    pos += 2+*num_sids;
+    for(i=0; i<*n_periods && !this->failed; i++) {
+        const int64_t* period = srAux( this, pos, 3 );
+        const int64_t* service_ids = period ? srAux( this, pos+3, period[2] ) : NULL;
+        if( !service_ids ) {
+            break;
+        }
+        ServiceId* ids = (ServiceId*)malloc( (period[2]+1)*sizeof(ServiceId) );
+        for(j=0; j<period[2]; j++) {
+            ids[j] = service_ids[j];
+        }
+        scAddPeriod( ret, spNew( period[0], period[1], period[2], ids ) );
+        free( ids );
+        pos += 3+period[2];
+    }
+    return ret;
+}
+
+static Timezone* srBuildTimezone( SnapshotReader* this, int64_t pos ) {
+    const int64_t* n_periods = srAux( this, pos, 1 );
+    if( !n_periods || *n_periods < 0 || *n_periods > this->header->n_aux ) {
+        this->failed = 1;
+        return NULL;
+    }
+    const int64_t* periods = srAux( this, pos+1, 3 * *n_periods );
+    if( !periods ) {
+        return NULL;
+    }
+
+    Timezone* ret = tzNew();
+    int64_t i;
+    for(i=0; i<*n_periods; i++) {
+        tzAddPeriod( ret, tzpNew( periods[3*i], periods[3*i+1], periods[3*i+2] ) );
+    }
+    return ret;
+}
+
+//copies the (time, trip id[, stop sequence]) entries of a record into new arrays and indexes their trips,
+//returning their number
+static int srTrips( SnapshotReader* this, const PayloadRecord* record, int** times, char*** trip_ids, int** trips, TripIndex* index, int** stop_sequences ) {
+    int width = stop_sequences ? 3 : 2;
+    const int64_t* entries = NULL;
+    if( record->n >= 0 && record->n <= INT32_MAX/width ) {
+        entries = srAux( this, record->data, width*record->n );
+    }
+    if( !entries ) {
+        this->failed = 1;
+        return 0;
+    }
+
+    int i, n = record->n;
+    *times = (int*)malloc( (n+1)*sizeof(int) );
+    *trip_ids = (char**)malloc( (n+1)*sizeof(char*) );
+    *trips = (int*)malloc( (n+1)*sizeof(int) );
+    if( stop_sequences ) {
+        *stop_sequences = (int*)malloc( (n+1)*sizeof(int) );
+    }
+    for(i=0; i<n; i++) {
+        (*times)[i] = entries[width*i];
+        (*trips)[i] = tripIntern( srString( this, entries[width*i+1] ) );
+        (*trip_ids)[i] = tripId( (*trips)[i] );
+        if( stop_sequences ) {
+            (*stop_sequences)[i] = entries[width*i+2];
+        }
+    }
+    tiBuild( index, *trips, n );
+    return n;
+}
+
+static EdgePayload* srBuildPayload( SnapshotReader* this, const PayloadRecord* record ) {
+    EdgePayload* ret;
+    ServiceCalendar* calendar = srCalendar( this, record->calendar );
+    Timezone* timezone = srTimezone( this, record->timezone );
+    char* name = record->name >= 0 ? (char*)srString( this, record->name ) : "";
+    switch( record->type ) {
+        case PL_STREET: {
+            Street* street = streetNew( name, record->length, record->reverse_of_source );
+            street->rise = record->rise;
+            street->fall = record->fall;
+            street->slog = record->slog;
+            street->way = record->way;
+            ret = (EdgePayload*)street;
+            break;
+        }
+        case PL_LINK:
+            ret = (EdgePayload*)linkNew();
+            break;
+        case PL_EGRESS:
+            ret = (EdgePayload*)egressNew( name, record->length );
+            break;
+        case PL_ELAPSE_TIME:
+            ret = (EdgePayload*)elapseTimeNew( record->way );
+            break;
+        case PL_WAIT:
+            ret = (EdgePayload*)waitNew( record->way, timezone );
+            break;
+        case PL_HEADWAY:
+            ret = (EdgePayload*)headwayNew( record->times[0], record->times[1], record->times[2], record->times[3], name,
+                                            calendar, timezone, record->agency, record->service_id );
+            break;
+        case PL_HEADWAYBOARD:
+            ret = (EdgePayload*)hbNew( record->service_id, calendar, timezone, record->agency, name,
+                                       record->times[0], record->times[1], record->times[2] );
+            break;
+        case PL_HEADWAYALIGHT:
+            ret = (EdgePayload*)haNew( record->service_id, calendar, timezone, record->agency, name,
+                                       record->times[0], record->times[1], record->times[2] );
+            break;
+        case PL_TRIPBOARD: {
+            TripBoard* tb = tbNew( record->service_id, calendar, timezone, record->agency );
+            tb->n = srTrips( this, record, &tb->departs, &tb->trip_ids, &tb->trips, &tb->index, &tb->stop_sequences );
+            tb->overage = record->overage;
+            ret = (EdgePayload*)tb;
+            break;
+        }
+        case PL_ALIGHT: {
+            TripAlight* al = alNew( record->service_id, calendar, timezone, record->agency );
+            al->n = srTrips( this, record, &al->arrivals, &al->trip_ids, &al->trips, &al->index, &al->stop_sequences );
+            al->overage = record->overage;
+            ret = (EdgePayload*)al;
+            break;
+        }
+        case PL_CROSSING: {
+            Crossing* crossing = crNew();
+            crossing->n = srTrips( this, record, &crossing->crossing_times, &crossing->crossing_time_trip_ids, &crossing->crossing_time_trips, &crossing->index, NULL );
+            ret = (EdgePayload*)crossing;
+            break;
+        }
+        default:
+            this->failed = 1;
+            return NULL;
+    }
+    ret->external_id = record->external_id;
+    return ret;
+}
+
+//builds the calendars and timezones the payloads refer to
+static int srResources( SnapshotReader* this ) {
+    const SnapshotHeader* header = this->header;
+    long i;
+
+    this->resources = (SnapshotResources*)calloc( 1, sizeof(SnapshotResources) );
+    this->resources->calendars = (ServiceCalendar**)malloc( (header->n_calendars+1)*sizeof(ServiceCalendar*) );
+    this->resources->timezones = (Timezone**)malloc( (header->n_timezones+1)*sizeof(Timezone*) );
+    for(i=0; i<header->n_calendars && !this->failed; i++) {
+        ServiceCalendar* calendar = srBuildCalendar( this, this->calendar_offsets[i] );
+        if( calendar ) {
+            this->resources->calendars[this->resources->n_calendars++] = calendar;
+        }
+    }
+    for(i=0; i<header->n_timezones && !this->failed; i++) {
+        Timezone* timezone = srBuildTimezone( this, this->timezone_offsets[i] );
+        if( timezone ) {
+            this->resources->timezones[this->resources->n_timezones++] = timezone;
+        }
+    }
+    return this->failed ? -1 : 0;
+}
+
+static int srPayloads( SnapshotReader* this ) {
+    const SnapshotHeader* header = this->header;
+    long i;
+    int64_t j;
+
+    this->payloads = (EdgePayload**)malloc( (header->n_payloads+header->n_combos+1)*sizeof(EdgePayload*) );
+    for(i=0; i<header->n_payloads && !this->failed; i++) {
+        EdgePayload* payload = srBuildPayload( this, this->records+i );
+        if( payload ) {
+            this->payloads[this->n_payloads++] = payload;
+        }
+    }
+
+    if( this->combo_offsets[0] != 0 || this->combo_offsets[header->n_combos] != header->n_combo_items ) {
+        this->failed = 1;
+    }
+    for(i=0; i<header->n_combos && !this->failed; i++) {
+        int64_t n = this->combo_offsets[i+1] - this->combo_offsets[i];
+        if( n < 0 || n > header->n_combo_items ) {
+            this->failed = 1;
+            break;
+        }
+        this->payloads[this->n_payloads++] = (EdgePayload*)comboNew( n );
+    }
+    for(i=0; i<header->n_combos && !this->failed; i++) {
+        Combination* combo = (Combination*)this->payloads[header->n_payloads+i];
+        for(j=this->combo_offsets[i]; j<this->combo_offsets[i+1] && !this->failed; j++) {
+            comboAdd( combo, srPayload( this, this->combo_items[j] ) );
+        }
+    }
+    return this->failed ? -1 : 0;
+}
+
+static Graph* srGraph( SnapshotReader* this ) {
+    const SnapshotGraphHeader* header = srTake( this, 1, sizeof(SnapshotGraphHeader) );
+    if( !header ) {
+        return NULL;
+    }
+    long i, n = header->n_vertices, n_edges = header->n_edges;
+    const int64_t* vertices = srTake( this, n, sizeof(int64_t) );
+    const int64_t* offsets = srTake( this, n+1, sizeof(int64_t) );
+    const int64_t* targets = srTake( this, n_edges, sizeof(int64_t) );
+    const int64_t* refs = srTake( this, n_edges, sizeof(int64_t) );
+    const int64_t* has_coordinates = NULL;
+    const double* coordinates = NULL;
+    const int64_t* enabled = NULL;
+    if( header->flags & SNAPSHOT_COORDINATES ) {
+        has_coordinates = srTake( this, n, sizeof(int64_t) );
+        coordinates = srTake( this, 2*n, sizeof(double) );
+    }
+    if( header->flags & SNAPSHOT_DISABLED_EDGES ) {
+        enabled = srTake( this, n_edges, sizeof(int64_t) );
+    }
+    if( this->failed ) {
+        return NULL;
+    }
+
+    FrozenGraphSpec spec;
+    memset( &spec, 0, sizeof(FrozenGraphSpec) );
+    spec.n_vertices = n;
+    spec.labels = (char**)malloc( (n+1)*sizeof(char*) );
+    spec.out_offsets = (long*)malloc( (n+1)*sizeof(long) );
+    spec.targets = (long*)malloc( (n_edges+1)*sizeof(long) );
+    spec.payloads = (EdgePayload**)malloc( (n_edges+1)*sizeof(EdgePayload*) );
+    if( coordinates ) {
+        spec.has_coordinates = (int*)malloc( (n+1)*sizeof(int) );
+        spec.lat = (double*)malloc( (n+1)*sizeof(double) );
+        spec.lon = (double*)malloc( (n+1)*sizeof(double) );
+    }
+    if( enabled ) {
+        spec.enabled = (int*)malloc( (n_edges+1)*sizeof(int) );
+    }
+
+    for(i=0; i<n && !this->failed; i++) {
+        if( vertices[i] < 0 || vertices[i] >= this->header->n_labels ) {
+            this->failed = 1;
+            break;
+        }
+        spec.labels[i] = (char*)srString( this, this->labels[vertices[i]] );
+        if( coordinates ) {
+            spec.has_coordinates[i] = has_coordinates[i];
+            spec.lat[i] = coordinates[2*i];
+            spec.lon[i] = coordinates[2*i+1];
+        }
+    }
+    for(i=0; i<=n && !this->failed; i++) {
+        spec.out_offsets[i] = offsets[i];
+        if( offsets[i] < (i ? offsets[i-1] : 0) || offsets[i] > n_edges || (i == n && offsets[i] != n_edges) ) {
+            this->failed = 1;
+        }
+    }
+    for(i=0; i<n_edges && !this->failed; i++) {
+        if( targets[i] < 0 || targets[i] >= n ) {
+            this->failed = 1;
+        }
+        spec.targets[i] = targets[i];
+        spec.payloads[i] = srPayload( this, refs[i] );
+        if( enabled ) {
+            spec.enabled[i] = enabled[i] != 0;
+        }
+    }
+
+    Graph* ret = this->failed ? NULL : gNewFrozen( &spec );
+    free( spec.labels );
+    free( spec.out_offsets );
+    free( spec.targets );
+    free( spec.payloads );
+    free( spec.has_coordinates );
+    free( spec.lat );
+    free( spec.lon );
+    free( spec.enabled );
+    return ret;
+}
+
+//maps filename and reads up to the graph sections; returns -1 if it isn't a snapshot of kind
+static int srOpen( SnapshotReader* this, const char* filename, int64_t kind ) {
+    memset( this, 0, sizeof(SnapshotReader) );
+
+    int fd = open( filename, O_RDONLY );
+    if( fd < 0 ) {
+        return -1;
+    }
+    struct stat st;
+    if( fstat( fd, &st ) != 0 || (size_t)st.st_size < sizeof(SnapshotHeader) ) {
+        close( fd );
+        return -1;
+    }
+    void* data = mmap( NULL, st.st_size, PROT_READ, MAP_PRIVATE, fd, 0 );
+    close( fd );
+    if( data == MAP_FAILED ) {
+        return -1;
+    }
+    this->data = (const char*)data;
+    this->size = st.st_size;
+
+    this->header = srTake( this, 1, sizeof(SnapshotHeader) );
+    const SnapshotHeader* header = this->header;
+    if( memcmp( header->magic, SNAPSHOT_MAGIC, 8 ) != 0 || header->version != SNAPSHOT_VERSION ||
+        header->kind != kind ) {
+        return -1;
+    }
+    this->strings = srTake( this, header->n_string_bytes, 1 );
+    this->labels = srTake( this, header->n_labels, sizeof(int64_t) );
+    this->records = srTake( this, header->n_payloads, sizeof(PayloadRecord) );
+    this->combo_offsets = srTake( this, header->n_combos+1, sizeof(int64_t) );
+    this->combo_items = srTake( this, header->n_combo_items, sizeof(int64_t) );
+    this->aux = srTake( this, header->n_aux, sizeof(int64_t) );
+    this->calendar_offsets = srTake( this, header->n_calendars, sizeof(int64_t) );
+    this->timezone_offsets = srTake( this, header->n_timezones, sizeof(int64_t) );
+    if( this->failed || (header->n_string_bytes > 0 && this->strings[header->n_string_bytes-1] != '\0') ) {
+        return -1;
+    }
+    if( srResources( this ) != 0 ) {
+        return -1;
+    }
+    return srPayloads( this );
+}
+
+//unmaps the file, destroying the payloads and resources too if they weren't handed over
+static void srClose( SnapshotReader* this, int keep ) {
+    long i;
+    if( !keep ) {
+        for(i=0; i<this->n_payloads; i++) {
+            if( this->payloads[i]->type == PL_COMBINATION ) {
+                comboDestroy( (Combination*)this->payloads[i] );
+            } else {
+                epDestroy( this->payloads[i] );
+            }
+        }
+        free( this->payloads );
+        if( this->resources ) {
+            snapshotResourcesDestroy( this->resources );
+        }
+    }
+    if( this->data ) {
+        munmap( (void*)this->data, this->size );
+    }
+}
+
+Graph* gLoadSnapshot( const char* filename ) {
+    SnapshotReader reader;
+    Graph* ret = NULL;
+
+    if( srOpen( &reader, filename, SNAPSHOT_KIND_GRAPH ) == 0 && reader.header->n_graphs == 1 ) {
+        ret = srGraph( &reader );
+    }
+    if( !ret ) {
+        srClose( &reader, FALSE );
+        return NULL;
+    }
+
+    //the edges own their payloads, as in any other graph
+    ret->resources = reader.resources;
+    free( reader.payloads );
+    srClose( &reader, TRUE );
+    return ret;
+}
+
+CH* chLoad( const char* filename ) {
+    SnapshotReader reader;
+    Graph* up = NULL;
+    Graph* down = NULL;
+
+    if( srOpen( &reader, filename, SNAPSHOT_KIND_CH ) == 0 && reader.header->n_graphs == 2 ) {
+        up = srGraph( &reader );
+        down = up ? srGraph( &reader ) : NULL;
+    }
+    if( !down ) {
+        if( up ) {
+            gDestroyBasic( up, 0 );
+        }
+        srClose( &reader, FALSE );
+        return NULL;
+    }
+
+    CH* ret = (CH*)malloc( sizeof(CH) );
+    ret->up = up;
+    ret->down = down;
+    ret->payloads = reader.payloads;
+    ret->n_payloads = reader.n_payloads;
+    ret->resources = reader.resources;
+    srClose( &reader, TRUE );
+    return ret;
+}
@@ -0,0 +1,118 @@
+#ifndef SNAPSHOT_H
+#define SNAPSHOT_H
+
+#include <stdint.h>
+
+/*
+ * Snapshot files are written in the machine's native byte order and laid out so that they can be
+ * memory-mapped and read in place:
+ *
+ *   SnapshotHeader
+ *   strings         char[n_string_bytes], NUL-terminated labels, names and trip ids
+ *   labels          int64[n_labels], offsets into strings
+ *   payloads        PayloadRecord[n_payloads]
+ *   combo offsets   int64[n_combos+1], offsets into the combo items
+ *   combo items     int64[n_combo_items], payload references
+ *   aux             int64[n_aux], the variable-length parts of payloads, calendars and timezones
+ *   calendars       int64[n_calendars], offsets into aux
+ *   timezones       int64[n_timezones], offsets into aux
+ *   n_graphs times:
+ *     SnapshotGraphHeader
+ *     vertices      int64[n_vertices], label ids
+ *     out offsets   int64[n_vertices+1]
+ *     targets       int64[n_edges], vertex positions within the graph
+ *     edge payloads int64[n_edges], payload references
+ *     coordinates   if SNAPSHOT_COORDINATES is set: int64[n_vertices] flags, double[2*n_vertices]
+ *     enabled       if SNAPSHOT_DISABLED_EDGES is set: int64[n_edges]
+ *
+ * Every section starts on an 8 byte boundary. A payload reference r >= 0 is payload record r and
+ * r < 0 is combination -r-1, whose items are unpacked recursively, so shortcuts are stored as
+ * lists of the payloads they stand for.
+ *
+ * In aux, a calendar is its number of service ids, their string offsets, its number of periods
+ * and then each period's begin time, end time, number of service ids and service ids. A timezone
+ * is its number of periods and each period's begin time, end time and utc offset. The boardings,
+ * alightings or crossings of a payload are (time, trip id offset, stop sequence) triples, or
+ * (time, trip id offset) pairs for a Crossing.
+ */
+
+#define SNAPSHOT_MAGIC "GSSNAP\0"
+#define SNAPSHOT_VERSION 2
+
+#define SNAPSHOT_KIND_CH 1
+#define SNAPSHOT_KIND_GRAPH 2
+
+#define SNAPSHOT_COORDINATES 1
+#define SNAPSHOT_DISABLED_EDGES 2
+
+#define SNAPSHOT_ERR_IO -1
+#define SNAPSHOT_ERR_PAYLOAD -2
+
+typedef struct SnapshotHeader {
+    char magic[8];
+    int64_t version;
+    int64_t kind;
+    int64_t n_string_bytes;
+    int64_t n_labels;
+    int64_t n_payloads;
+    int64_t n_combos;
+    int64_t n_combo_items;
+    int64_t n_aux;
+    int64_t n_calendars;
+    int64_t n_timezones;
+    int64_t n_graphs;
+} SnapshotHeader;
+
+typedef struct SnapshotGraphHeader {
+    int64_t n_vertices;
+    int64_t n_edges;
+    int64_t flags;
+} SnapshotGraphHeader;
+
+// an edge payload; fields its type doesn't have are zero
+typedef struct PayloadRecord {
+    int32_t type;
+    int32_t reverse_of_source;
+    int64_t external_id;
+    int64_t name;       //offset into strings of a name or trip id, or -1
+    double length;
+    float rise;
+    float fall;
+    float slog;
+    int32_t agency;
+    int64_t way;        //also the seconds of an ElapseTime and the end of a Wait
+    int32_t service_id;
+    int32_t overage;
+    int64_t calendar;   //index, or -1
+    int64_t timezone;   //index, or -1
+    int32_t times[4];   //begin, end, headway and, for a Headway, transit seconds
+    int64_t n;          //boardings, alightings or crossings in aux
+    int64_t data;       //offset into aux
+} PayloadRecord;
+
+// the service calendars and timezones read from a snapshot, owned by what it was read into
+struct SnapshotResources {
+    ServiceCalendar** calendars;
+    long n_calendars;
+    Timezone** timezones;
+    long n_timezones;
+};
+
+void snapshotResourcesDestroy( SnapshotResources* this );
+
+//writes the graph to filename. Returns 0 on success, SNAPSHOT_ERR_IO if the file can't be written
+//or SNAPSHOT_ERR_PAYLOAD if an edge carries a payload that can't be stored, such as a python one.
+int gSaveSnapshot( Graph* this, const char* filename );
+
+//reads a graph written by gSaveSnapshot, or returns NULL. The graph is frozen; its edges own their
+//payloads as usual, and the calendars and timezones those refer to are destroyed with it.
+Graph* gLoadSnapshot( const char* filename );
+
+//writes the hierarchy to filename, returning as gSaveSnapshot does
+int chSave( CH* this, const char* filename );
+
+//reads a hierarchy written by chSave, or returns NULL. Its graphs are frozen, and it owns its
+//edge payloads.
+CH* chLoad( const char* filename );
+
+#endif
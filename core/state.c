@@ -10,6 +10,7 @@ stateNew(int n_agencies, long time) {
   ret->dist_walked = 0;
   ret->num_transfers = 0;
   ret->trip_id = NULL;
+  ret->trip = NO_TRIP;
   ret->stop_sequence = -1;
   ret->prev_edge = NULL;
   ret->n_agencies = n_agencies;
@@ -59,6 +60,9 @@ stateGetPrevEdge( const State* this ) { return this->prev_edge; }
 char*
 stateGetTripId( const State* this ) { return this->trip_id; }
 
+int
+stateGetTrip( const State* this ) { return this->trip; }
+
 int
 stateGetStopSequence( const State* this ) { return this->stop_sequence; }
 
@@ -83,10 +87,12 @@ stateSetNumTransfers( State* this, int n) { this->num_transfers = n; }
 void
 stateSetServicePeriod( State* this,  int agency, ServicePeriod* cal ) { this->service_periods[agency] = cal; }
 
-// the state does not keep ownership of the trip_id, so the state
-// may not live longer than whatever object set its trip_id
+// the trip id is interned, so the state may outlive whatever set it
 void
-stateDangerousSetTripId( State* this, char* trip_id ) { this->trip_id = trip_id; }
+stateDangerousSetTripId( State* this, char* trip_id ) {
+  this->trip = trip_id ? tripIntern( trip_id ) : NO_TRIP;
+  this->trip_id = tripId( this->trip );
+}
 
 void
 stateSetPrevEdge( State* this, EdgePayload* edge ) { this->prev_edge = edge; }
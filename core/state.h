@@ -10,6 +10,7 @@ struct State {
    int           num_transfers;
    EdgePayload*  prev_edge;
    char*         trip_id;
+   int           trip;           //trip index of trip_id, or NO_TRIP
    int           stop_sequence;
    int           n_agencies;
    ServicePeriod** service_periods;
@@ -42,6 +43,9 @@ stateGetPrevEdge( const State* this );
 char*
 stateGetTripId( const State* this );
 
+int
+stateGetTrip( const State* this );
+
 int
 stateGetStopSequence( const State* this );
 
@@ -66,8 +70,7 @@ stateSetDistWalked( State* this, double dist );
 void
 stateSetNumTransfers( State* this, int n);
 
-// the state does not keep ownership of the trip_id, so the state
-// may not live longer than whatever object set its trip_id
+// the trip id is interned, so the state may outlive whatever set it
 void
 stateDangerousSetTripId( State* this, char* trip_id );
 
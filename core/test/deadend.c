@@ -29,7 +29,7 @@ int main() {
     
     State* initstate = stateNew(1, 20);
     WalkOptions* wo = woNew();
-    ShortestPathTree* spt = gShortestPathTree( gg, "A", "B", initstate, wo, 1000000, 1000000, 1000000 );
+    ShortestPathTree* spt = gShortestPathTree( gg, "A", "B", initstate, wo, 1000000, 1000000, 1000000, NULL, NULL );
     
     sptDestroy(spt);
     woDestroy( wo );
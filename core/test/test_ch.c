@@ -11,7 +11,7 @@ void test_empty_graph() {
   Graph *gg = gNew();
   WalkOptions *wo = woNew();
 
-  CH *ch = get_contraction_hierarchies( gg, wo, 1 ); 
+  CH *ch = get_contraction_hierarchies( gg, wo, 1, CH_DEFAULT_SETTLED_LIMIT, 1, NULL ); 
 
   assert( gSize( ch->up ) == 0 );
   assert( gSize( ch->down ) == 0 );
@@ -32,7 +32,7 @@ void test_simple_graph() {
 
   // create a contraction hierarchy of the graph
   WalkOptions *wo = woNew();
-  CH *ch = get_contraction_hierarchies( gg, wo, 1 );
+  CH *ch = get_contraction_hierarchies( gg, wo, 1, CH_DEFAULT_SETTLED_LIMIT, 1, NULL );
 
   // asserts
   assert( gSize( ch->up ) == 2 );
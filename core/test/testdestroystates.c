@@ -14,7 +14,7 @@ int main() {
     WalkOptions *wo = woNew();
     
     State* initstate = stateNew(1, 0);
-    ShortestPathTree* spt = gShortestPathTree( gg, "A", "B", initstate, wo, 1000001, 100000, 100000 );
+    ShortestPathTree* spt = gShortestPathTree( gg, "A", "B", initstate, wo, 1000001, 100000, 100000, NULL, NULL );
     
     woDestroy(wo);
     sptDestroy(spt);
@@ -5,22 +5,45 @@ Timezone*
 tzNew( ) {
     Timezone* ret = (Timezone*)malloc(sizeof(Timezone));
     ret->head = NULL;
+    ret->periods = NULL;
+    ret->n_periods = 0;
+    ret->periods_cap = 0;
     
     return ret;
 }
 
+//index of the first period ending at or after the time, or n_periods
+static int
+tzSearchEnd( const Timezone* this, long time ) {
+    int first = 0;
+    int last = this->n_periods;
+    while( first < last ) {
+        int mid = (first+last)/2;
+        if( this->periods[mid]->end_time < time ) {
+            first = mid+1;
+        } else {
+            last = mid;
+        }
+    }
+    return first;
+}
+
 void
 tzAddPeriod( Timezone* this, TimezonePeriod* period ) {
+    int m = tzSearchEnd( this, period->begin_time );
+    if( this->n_periods == this->periods_cap ) {
+        this->periods_cap = this->periods_cap ? this->periods_cap*2 : 16;
+        this->periods = (TimezonePeriod**)realloc( this->periods, this->periods_cap*sizeof(TimezonePeriod*) );
+    }
+    memmove( this->periods+m+1, this->periods+m, (this->n_periods-m)*sizeof(TimezonePeriod*) );
+    this->periods[m] = period;
+    this->n_periods += 1;
+
     if(!this->head) {
         this->head = period;
     } else {
-        TimezonePeriod* prev = NULL;
-        TimezonePeriod* curs = this->head;
-        
-        while(curs && period->begin_time > curs->end_time ) {
-            prev = curs;
-            curs = curs->next_period;
-        }
+        TimezonePeriod* prev = m > 0 ? this->periods[m-1] : NULL;
+        TimezonePeriod* curs = m+1 < this->n_periods ? this->periods[m+1] : NULL;
         
         //link last and period; replace the head if necessary
         if(prev) {
@@ -37,11 +60,8 @@ tzAddPeriod( Timezone* this, TimezonePeriod* period ) {
 
 TimezonePeriod*
 tzPeriodOf( const Timezone* this, long time) {
-  TimezonePeriod* period = this->head;
-
-  while( period && period->end_time < time ) {
-    period = period->next_period;
-  }
+  int i = tzSearchEnd( this, time );
+  TimezonePeriod* period = i < this->n_periods ? this->periods[i] : NULL;
   
   if( period && time < period->begin_time ) {
       return NULL;
@@ -89,6 +109,7 @@ tzDestroy( Timezone* this ) {
       tzpDestroy(curs);
       curs = next;
     }
+    free(this->periods);
 
     free(this);
 }
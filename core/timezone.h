@@ -10,6 +10,9 @@ struct TimezonePeriod {
 
 struct Timezone {
     TimezonePeriod* head;
+    TimezonePeriod** periods;     //the periods in order, for binary search
+    int n_periods;
+    int periods_cap;
 } ; 
 
 Timezone*
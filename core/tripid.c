@@ -0,0 +1,101 @@
+#include "graphserver.h"
+#include "hashtable/hashtable_gs.h"
+#include "hashtable/hashtable.h"
+
+#include <pthread.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+//payloads may be built on several threads, as snapshots are read
+static pthread_mutex_t trips_lock = PTHREAD_MUTEX_INITIALIZER;
+static struct hashtable* trip_indices = NULL;   //trip id -> trip index+1
+static char** trip_ids = NULL;
+static int n_trips = 0;
+static int trips_cap = 0;
+
+static int
+tripFind( const char* trip_id ) {
+  if( !trip_indices ) {
+    return NO_TRIP;
+  }
+  void* found = hashtable_search( trip_indices, (void*)trip_id );
+  return found ? (int)((intptr_t)found - 1) : NO_TRIP;
+}
+
+int
+tripIntern( const char* trip_id ) {
+  pthread_mutex_lock( &trips_lock );
+  int ret = tripFind( trip_id );
+  if( ret == NO_TRIP ) {
+    if( !trip_indices ) {
+      trip_indices = create_hashtable_string( 1024 );
+    }
+    if( n_trips == trips_cap ) {
+      trips_cap = trips_cap ? trips_cap*2 : 1024;
+      trip_ids = (char**)realloc( trip_ids, trips_cap*sizeof(char*) );
+    }
+    ret = n_trips++;
+    trip_ids[ret] = strdup( trip_id );
+    hashtable_insert( trip_indices, trip_ids[ret], (void*)(intptr_t)(ret+1) );
+  }
+  pthread_mutex_unlock( &trips_lock );
+  return ret;
+}
+
+int
+tripLookup( const char* trip_id ) {
+  pthread_mutex_lock( &trips_lock );
+  int ret = tripFind( trip_id );
+  pthread_mutex_unlock( &trips_lock );
+  return ret;
+}
+
+char*
+tripId( int trip ) {
+  pthread_mutex_lock( &trips_lock );
+  char* ret = trip >= 0 && trip < n_trips ? trip_ids[trip] : NULL;
+  pthread_mutex_unlock( &trips_lock );
+  return ret;
+}
+
+int
+tripCount( void ) {
+  return n_trips;
+}
+
+void
+tiBuild( TripIndex* this, const int* trips, int n ) {
+  int i, cap = 4;
+  while( cap < 2*n ) {
+    cap *= 2;
+  }
+  free( this->trips );
+  free( this->positions );
+  this->mask = cap-1;
+  this->trips = (int*)malloc( cap*sizeof(int) );
+  this->positions = (int*)malloc( cap*sizeof(int) );
+  for(i=0; i<cap; i++) {
+    this->trips[i] = NO_TRIP;
+  }
+
+  for(i=0; i<n; i++) {
+    unsigned int j = ((unsigned int)trips[i] * 2654435761u) & this->mask;
+    while( this->trips[j] != NO_TRIP && this->trips[j] != trips[i] ) {
+      j = (j+1) & this->mask;
+    }
+    if( this->trips[j] == NO_TRIP ) {
+      this->trips[j] = trips[i];
+      this->positions[j] = i;
+    }
+  }
+}
+
+void
+tiClear( TripIndex* this ) {
+  free( this->trips );
+  free( this->positions );
+  this->trips = NULL;
+  this->positions = NULL;
+  this->mask = 0;
+}
@@ -0,0 +1,58 @@
+#ifndef TRIPID_H
+#define TRIPID_H
+
+/*
+ * Trip ids are interned: each distinct trip id string gets a small integer, its trip index, the
+ * first time a payload is built with it, and the string is kept for the life of the process.
+ * States carry the trip index of the trip they're on, and payloads look trips up by it instead of
+ * comparing strings.
+ */
+
+#define NO_TRIP -1
+
+//the trip index of the trip id, interning it if it's new
+int
+tripIntern( const char* trip_id );
+
+//the trip index of the trip id, or NO_TRIP if it was never interned
+int
+tripLookup( const char* trip_id );
+
+//the interned string of a trip index
+char*
+tripId( int trip );
+
+int
+tripCount( void );
+
+//an open-addressed hash of trip indices to positions in a payload's list of trips
+struct TripIndex {
+  int mask;                     //capacity-1; the capacity is a power of two
+  int* trips;                   //NO_TRIP where empty
+  int* positions;
+};
+
+//indexes trips[0..n-1] by trip; a trip listed twice is found at its first position
+void
+tiBuild( TripIndex* this, const int* trips, int n );
+
+void
+tiClear( TripIndex* this );
+
+//the position of the trip, or -1
+static inline int
+tiGet( const TripIndex* this, int trip ) {
+  if( !this->trips || trip < 0 ) {
+    return -1;
+  }
+  unsigned int i = ((unsigned int)trip * 2654435761u) & this->mask;
+  while( this->trips[i] != NO_TRIP ) {
+    if( this->trips[i] == trip ) {
+      return this->positions[i];
+    }
+    i = (i+1) & this->mask;
+  }
+  return -1;
+}
+
+#endif
@@ -0,0 +1,298 @@
+#include "graphserver.h"
+#include "graph.h"
+#include "fibheap/fibheap.h"
+#include "fibheap/dirfibheap.h"
+#include "vertexqueue.h"
+
+#include <stdlib.h>
+
+#define VQ_ARITY 4
+#define VQ_INIT_CAPACITY 64
+
+// D-ARY HEAP
+
+static inline void
+daryPlace( VertexQueue* this, long i, VQEntry entry ) {
+  this->heap[i] = entry;
+  this->pos[entry.vertex->index] = i+1;
+}
+
+static void
+darySiftUp( VertexQueue* this, long i ) {
+  VQEntry entry = this->heap[i];
+  while( i > 0 ) {
+    long parent = (i-1)/VQ_ARITY;
+    if( this->heap[parent].priority <= entry.priority ) {
+      break;
+    }
+    daryPlace( this, i, this->heap[parent] );
+    i = parent;
+  }
+  daryPlace( this, i, entry );
+}
+
+static void
+darySiftDown( VertexQueue* this, long i ) {
+  VQEntry entry = this->heap[i];
+  while( 1 ) {
+    long first = i*VQ_ARITY+1;
+    if( first >= this->size ) {
+      break;
+    }
+    long last = first+VQ_ARITY < this->size ? first+VQ_ARITY : this->size;
+    long best = first;
+    long child;
+    for(child=first+1; child<last; child++) {
+      if( this->heap[child].priority < this->heap[best].priority ) {
+        best = child;
+      }
+    }
+    if( this->heap[best].priority >= entry.priority ) {
+      break;
+    }
+    daryPlace( this, i, this->heap[best] );
+    i = best;
+  }
+  daryPlace( this, i, entry );
+}
+
+static void
+daryInsertOrDecKey( VertexQueue* this, Vertex* vtx, long priority ) {
+  long i = this->pos[vtx->index]-1;
+
+  if( i >= 0 ) {
+    if( priority < this->heap[i].priority ) {
+      this->heap[i].priority = priority;
+      darySiftUp( this, i );
+    }
+    return;
+  }
+
+  if( this->size == this->capacity ) {
+    this->capacity *= 2;
+    this->heap = (VQEntry*)realloc( this->heap, this->capacity*sizeof(VQEntry) );
+  }
+  this->heap[this->size].priority = priority;
+  this->heap[this->size].vertex = vtx;
+  this->size++;
+  darySiftUp( this, this->size-1 );
+}
+
+static Vertex*
+daryExtractMin( VertexQueue* this ) {
+  if( this->size == 0 ) {
+    return NULL;
+  }
+
+  Vertex* best = this->heap[0].vertex;
+  this->pos[best->index] = 0;
+  this->size--;
+  if( this->size > 0 ) {
+    daryPlace( this, 0, this->heap[this->size] );
+    darySiftDown( this, 0 );
+  }
+  return best;
+}
+
+// RADIX HEAP
+
+static inline int
+radixBucket( long last, long priority ) {
+  if( priority <= last ) {
+    return 0;
+  }
+  return 64 - __builtin_clzl( (unsigned long)(priority ^ last) );
+}
+
+static void
+radixPush( VertexQueue* this, int bucket, VQEntry entry ) {
+  if( this->bucket_size[bucket] == this->bucket_cap[bucket] ) {
+    this->bucket_cap[bucket] = this->bucket_cap[bucket] ? this->bucket_cap[bucket]*2 : VQ_INIT_CAPACITY;
+    this->buckets[bucket] = (VQEntry*)realloc( this->buckets[bucket], this->bucket_cap[bucket]*sizeof(VQEntry) );
+  }
+  long i = this->bucket_size[bucket]++;
+  this->buckets[bucket][i] = entry;
+  this->pos[entry.vertex->index] = i+1;
+  this->bucket_of[entry.vertex->index] = bucket+1;
+}
+
+static void
+radixRemove( VertexQueue* this, int bucket, long i ) {
+  VQEntry* entries = this->buckets[bucket];
+  long last = --this->bucket_size[bucket];
+  if( i != last ) {
+    entries[i] = entries[last];
+    this->pos[entries[i].vertex->index] = i+1;
+  }
+}
+
+static void
+radixInsertOrDecKey( VertexQueue* this, Vertex* vtx, long priority ) {
+  int bucket = this->bucket_of[vtx->index]-1;
+
+  if( bucket >= 0 ) {
+    long i = this->pos[vtx->index]-1;
+    if( priority >= this->buckets[bucket][i].priority ) {
+      return;
+    }
+    radixRemove( this, bucket, i );
+    this->count--;
+  }
+
+  VQEntry entry;
+  entry.priority = priority < this->last ? this->last : priority;
+  entry.vertex = vtx;
+  radixPush( this, radixBucket( this->last, entry.priority ), entry );
+  this->count++;
+}
+
+static Vertex*
+radixExtractMin( VertexQueue* this ) {
+  if( this->count == 0 ) {
+    return NULL;
+  }
+
+  if( this->bucket_size[0] == 0 ) {
+    //find the first non-empty bucket and redistribute it around its smallest priority
+    int bucket = 1;
+    while( this->bucket_size[bucket] == 0 ) {
+      bucket++;
+    }
+
+    VQEntry* entries = this->buckets[bucket];
+    long n = this->bucket_size[bucket];
+    long i;
+    long min = entries[0].priority;
+    for(i=1; i<n; i++) {
+      if( entries[i].priority < min ) {
+        min = entries[i].priority;
+      }
+    }
+
+    this->last = min;
+    this->bucket_size[bucket] = 0;
+    for(i=0; i<n; i++) {
+      radixPush( this, radixBucket( this->last, entries[i].priority ), entries[i] );
+    }
+  }
+
+  Vertex* best = this->buckets[0][--this->bucket_size[0]].vertex;
+  this->bucket_of[best->index] = 0;
+  this->pos[best->index] = 0;
+  this->count--;
+  return best;
+}
+
+// VERTEX QUEUE
+
+VertexQueue*
+vqNew( vqtype_t type, long n_vertices ) {
+  VertexQueue* this = (VertexQueue*)calloc( 1, sizeof(VertexQueue) );
+  this->type = type;
+  this->n_vertices = n_vertices;
+
+  switch( type ) {
+    case VQ_DARY:
+      this->pos = (long*)calloc( n_vertices+1, sizeof(long) );
+      this->capacity = VQ_INIT_CAPACITY;
+      this->heap = (VQEntry*)malloc( this->capacity*sizeof(VQEntry) );
+      break;
+    case VQ_RADIX:
+      this->pos = (long*)calloc( n_vertices+1, sizeof(long) );
+      this->bucket_of = (int*)calloc( n_vertices+1, sizeof(int) );
+      break;
+    default:
+      this->type = VQ_FIBONACCI;
+      this->fib = dirfibheap_new( n_vertices );
+      break;
+  }
+
+  return this;
+}
+
+void
+vqDestroy( VertexQueue* this ) {
+  int i;
+
+  if( this->fib ) {
+    dirfibheap_delete( this->fib );
+  }
+  for(i=0; i<VQ_RADIX_BUCKETS; i++) {
+    free( this->buckets[i] );
+  }
+  free( this->bucket_of );
+  free( this->heap );
+  free( this->pos );
+  free( this );
+}
+
+void
+vqInsertOrDecKey( VertexQueue* this, Vertex* vtx, long priority ) {
+  switch( this->type ) {
+    case VQ_DARY:
+      daryInsertOrDecKey( this, vtx, priority );
+      break;
+    case VQ_RADIX:
+      radixInsertOrDecKey( this, vtx, priority );
+      break;
+    default:
+      dirfibheap_insert_or_dec_key( this->fib, vtx, priority );
+      break;
+  }
+}
+
+Vertex*
+vqExtractMin( VertexQueue* this ) {
+  switch( this->type ) {
+    case VQ_DARY:
+      return daryExtractMin( this );
+    case VQ_RADIX:
+      return radixExtractMin( this );
+    default:
+      return dirfibheap_extract_min( this->fib );
+  }
+}
+
+void
+vqClear( VertexQueue* this ) {
+  long i;
+  int bucket;
+
+  switch( this->type ) {
+    case VQ_DARY:
+      for(i=0; i<this->size; i++) {
+        this->pos[this->heap[i].vertex->index] = 0;
+      }
+      this->size = 0;
+      break;
+    case VQ_RADIX:
+      for(bucket=0; bucket<VQ_RADIX_BUCKETS; bucket++) {
+        for(i=0; i<this->bucket_size[bucket]; i++) {
+          Vertex* vtx = this->buckets[bucket][i].vertex;
+          this->pos[vtx->index] = 0;
+          this->bucket_of[vtx->index] = 0;
+        }
+        this->bucket_size[bucket] = 0;
+      }
+      this->count = 0;
+      this->last = 0;
+      break;
+    default:
+      while( !dirfibheap_empty( this->fib ) ) {
+        dirfibheap_extract_min( this->fib );
+      }
+      break;
+  }
+}
+
+int
+vqEmpty( VertexQueue* this ) {
+  switch( this->type ) {
+    case VQ_DARY:
+      return this->size == 0;
+    case VQ_RADIX:
+      return this->count == 0;
+    default:
+      return dirfibheap_empty( this->fib );
+  }
+}
@@ -0,0 +1,72 @@
+#ifndef VERTEXQUEUE_H
+#define VERTEXQUEUE_H
+
+/*
+ * Min-priority queue of graph vertices with decrease-key, used by the router. Queued vertices are
+ * tracked by their integer index, so a queue is sized for the graph it searches.
+ *
+ * VQ_FIBONACCI  the fibonacci heap in fibheap/
+ * VQ_DARY       a 4-ary implicit heap
+ * VQ_RADIX      a monotone radix heap over integer priorities. The priority passed to
+ *               vqInsertOrDecKey may not be lower than that of the last vertex extracted, which
+ *               holds for Dijkstra over non-negative weights; lower priorities are queued as if
+ *               they were equal to it.
+ */
+
+typedef enum {
+  VQ_FIBONACCI = 0,
+  VQ_DARY = 1,
+  VQ_RADIX = 2
+} vqtype_t;
+
+#define VQ_RADIX_BUCKETS 65
+
+typedef struct VQEntry {
+  long priority;
+  Vertex* vertex;
+} VQEntry;
+
+struct VertexQueue {
+  vqtype_t type;
+  long n_vertices;
+
+  //VQ_FIBONACCI
+  dirfibheap_t fib;
+
+  //VQ_DARY and VQ_RADIX: position of each queued vertex in its array, plus one, by vertex index
+  long* pos;
+
+  //VQ_DARY
+  VQEntry* heap;
+  long size;
+  long capacity;
+
+  //VQ_RADIX: bucket of each queued vertex, plus one, by vertex index
+  int* bucket_of;
+  VQEntry* buckets[VQ_RADIX_BUCKETS];
+  long bucket_size[VQ_RADIX_BUCKETS];
+  long bucket_cap[VQ_RADIX_BUCKETS];
+  long last;
+  long count;
+};
+
+VertexQueue*
+vqNew( vqtype_t type, long n_vertices );
+
+void
+vqDestroy( VertexQueue* this );
+
+void
+vqInsertOrDecKey( VertexQueue* this, Vertex* vtx, long priority );
+
+Vertex*
+vqExtractMin( VertexQueue* this );
+
+int
+vqEmpty( VertexQueue* this );
+
+//empties the queue in time proportional to the number of vertices still queued
+void
+vqClear( VertexQueue* this );
+
+#endif
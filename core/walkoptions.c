@@ -17,6 +17,7 @@ woNew() {
     ret->hill_reluctance = 0; //Factor by which an uphill stretch is penalized, in addition to whatever time is lost by simply gaining.
     ret->max_walk = 10000; //meters
     ret->walking_overage = 0.1F;
+    ret->queue_type = 0; //fibonacci heap
 
     // velocity between 0 grade and the phase change grade is Ax^2+Bx+C, where A is the phase_change_velocity_factor, B is the downhill fastness, and C is the average speed
     float phase_change_speed = (ret->uphill_slowness*ret->walking_speed)/(ret->uphill_slowness+ret->phase_change_grade);
@@ -118,4 +119,14 @@ woGetTurnPenalty( WalkOptions* this ) {
 void
 woSetTurnPenalty( WalkOptions* this, int turn_penalty ) {
     this->turn_penalty = turn_penalty;
-}
\ No newline at end of file
+}
+
+int
+woGetQueueType( WalkOptions* this ) {
+    return this->queue_type;
+}
+
+void
+woSetQueueType( WalkOptions* this, int queue_type ) {
+    this->queue_type = queue_type;
+}
@@ -16,6 +16,8 @@ struct WalkOptions {
     int turn_penalty;
     
     float phase_change_velocity_factor;
+
+    int queue_type; //vqtype_t of the router's priority queue
 } ;
 
 WalkOptions*
@@ -60,4 +62,10 @@ woGetTurnPenalty( WalkOptions* this );
 void
 woSetTurnPenalty( WalkOptions* this, int turn_penalty );
 
+int
+woGetQueueType( WalkOptions* this );
+
+void
+woSetQueueType( WalkOptions* this, int queue_type );
+
 #endif // WALKOPTIONS_H
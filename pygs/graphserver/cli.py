@@ -19,7 +19,9 @@ from graphserver.ext.ned.profile import populate_profile_db
 from graphserver.ext.osm.osmdb import OSMDB, osm_to_osmdb
 from graphserver.ext.osm.osmfilters import OSMDBFilter
 from graphserver.ext.osm.profiledb import ProfileDB
-from graphserver.ext.routeserver.routeserver import create_app
+from graphserver.ext.routeserver.asyncserver import create_asgi_app
+from graphserver.ext.routeserver.geocoders import OSMReverseGeocoder
+from graphserver.ext.routeserver.routeserver import create_app, load_graph, serve
 from graphserver.graphdb import GraphDatabase
 from graphserver.vincenty import vincenty
 
@@ -90,6 +92,16 @@ def new(graphdb_filename, overwrite):
         )
 
 
+@cli.command()
+@click.argument("graphdb_filename", type=click.Path(exists=True))
+def migrate(graphdb_filename):
+    """Move a graph database keyed by vertex label to integer vertex ids."""
+    if GraphDatabase(graphdb_filename).migrate():
+        click.echo(f"Migrated graph database '{graphdb_filename}'")
+    else:
+        click.echo(f"Graph database '{graphdb_filename}' is up to date")
+
+
 @cli.group(name="import")
 def import_cmd():
     """Import compiled data into a graph database."""
@@ -165,19 +177,30 @@ def gtfsdb(gtfsdb_filename, query):
 @click.argument("graphdb_filename")
 @click.argument("vertex1", required=False)
 @click.argument("time", required=False, type=int)
-def gdb(graphdb_filename, vertex1, time):
+@click.option(
+    "--hops",
+    type=int,
+    default=None,
+    help="Show the edges within this many hops of VERTEX1 in either direction",
+)
+def gdb(graphdb_filename, vertex1, time, hops):
     """Show information about a graph database."""
     gdb = GraphDatabase(graphdb_filename)
 
     if vertex1 is None:
         click.echo("vertices:")
-        for vertex_label in sorted(gdb.all_vertex_labels()):
+        for vertex_label in gdb.vertex_labels():
             click.echo(vertex_label)
         click.echo("resources:")
         for name, resource in gdb.resources():
             click.echo(f"{name} {resource}")
     else:
-        for v1, v2, edgetype in gdb.all_outgoing(vertex1):
+        if hops is None:
+            edges = gdb.all_outgoing(vertex1)
+        else:
+            edges = gdb.neighborhood(vertex1, hops)
+
+        for v1, v2, edgetype in edges:
             click.echo(f"{v1} -> {v2}\n\t{repr(edgetype)}")
 
             if time is not None:
@@ -292,20 +315,18 @@ def link(graphdb_filename, osm_file, gtfs_files, link_range):
         gdb = GraphDatabase(graphdb_filename)
 
         n_stops = gtfsdb.count_stops()
-        c = gdb.get_cursor()
-        for i, (stop_id, _name, stop_lat, stop_lon) in enumerate(gtfsdb.stops()):
-            click.echo(f"{i}/{n_stops}")
+        with gdb.bulk_writer() as writer:
+            for i, (stop_id, _name, stop_lat, stop_lon) in enumerate(gtfsdb.stops()):
+                click.echo(f"{i}/{n_stops}")
 
-            nd_id, nd_lat, nd_lon, nd_dist = osmdb.nearest_node(stop_lat, stop_lon)
-            station_vertex_id = f"sta-{stop_id}"
-            osm_vertex_id = f"osm-{nd_id}"
+                nd_id, nd_lat, nd_lon, nd_dist = osmdb.nearest_node(stop_lat, stop_lon)
+                station_vertex_id = f"sta-{stop_id}"
+                osm_vertex_id = f"osm-{nd_id}"
 
-            click.echo(f"{station_vertex_id} {osm_vertex_id}")
+                click.echo(f"{station_vertex_id} {osm_vertex_id}")
 
-            gdb.add_edge(station_vertex_id, osm_vertex_id, Link(), c)
-            gdb.add_edge(osm_vertex_id, station_vertex_id, Link(), c)
-
-        gdb.commit()
+                writer.add_edge(station_vertex_id, osm_vertex_id, Link())
+                writer.add_edge(osm_vertex_id, station_vertex_id, Link())
 
     elif len(gtfs_files) == 2:
         # GTFS-GTFS linking
@@ -318,31 +339,36 @@ def link(graphdb_filename, osm_file, gtfs_files, link_range):
 
         n_stops = gtfsdb.count_stops()
 
-        for i, (stop_id, stop_name, stop_lat, stop_lon) in enumerate(gtfsdb.stops()):
-            click.echo(f"{i}/{n_stops} {stop_id}")
-
-            station_vertex_id = f"sta-{stop_id}"
-
-            for (
-                link_stop_id,
-                link_stop_name,
-                link_stop_lat,
-                link_stop_lon,
-            ) in gtfsdb.nearby_stops(stop_lat, stop_lon, link_range):
-                if link_stop_id == stop_id:
-                    continue
-
-                click.echo(".")
-
-                link_length = vincenty(stop_lat, stop_lon, link_stop_lat, link_stop_lon)
-                link_station_vertex_id = f"sta-{link_stop_id}"
-                gdb.add_edge(
-                    station_vertex_id,
-                    link_station_vertex_id,
-                    Street("link", link_length),
-                )
-
-            click.echo("")
+        with gdb.bulk_writer() as writer:
+            for i, (stop_id, stop_name, stop_lat, stop_lon) in enumerate(
+                gtfsdb.stops()
+            ):
+                click.echo(f"{i}/{n_stops} {stop_id}")
+
+                station_vertex_id = f"sta-{stop_id}"
+
+                for (
+                    link_stop_id,
+                    link_stop_name,
+                    link_stop_lat,
+                    link_stop_lon,
+                ) in gtfsdb.nearby_stops(stop_lat, stop_lon, link_range):
+                    if link_stop_id == stop_id:
+                        continue
+
+                    click.echo(".")
+
+                    link_length = vincenty(
+                        stop_lat, stop_lon, link_stop_lat, link_stop_lon
+                    )
+                    link_station_vertex_id = f"sta-{link_stop_id}"
+                    writer.add_edge(
+                        station_vertex_id,
+                        link_station_vertex_id,
+                        Street("link", link_length),
+                    )
+
+                click.echo("")
 
     else:
         raise click.UsageError(
@@ -367,14 +393,81 @@ def crawl(graphdb_filename, port):
     gc.run_test_server(port=port)
 
 
+@cli.command()
+@click.argument("graphdb_filename")
+@click.argument("snapshot_filename")
+@click.option("--osmdb", "osmdb_filename", help="OSM database for vertex coordinates")
+def snapshot(graphdb_filename, snapshot_filename, osmdb_filename):
+    """Write a graph database to a snapshot file the route server loads quickly."""
+    geocoders = [OSMReverseGeocoder(osmdb_filename)] if osmdb_filename else []
+    graph = load_graph(graphdb_filename, geocoders)
+    graph.save_snapshot(snapshot_filename)
+    click.echo(f"Wrote {graph.size} vertices to '{snapshot_filename}'")
+
+
 @cli.command()
 @click.argument("graphdb_filename")
 @click.argument("config_filename", required=False)
 @click.option("-p", "--port", default=8080, type=int, help="Port to serve HTTP")
-def routeserver(graphdb_filename, config_filename, port):
+@click.option(
+    "-w",
+    "--workers",
+    default=1,
+    type=int,
+    help="Number of worker processes, which share one copy of the graph",
+)
+@click.option(
+    "--asgi",
+    is_flag=True,
+    help="Serve with uvicorn, batching path queries from the same origin",
+)
+@click.option(
+    "--threads",
+    type=int,
+    help="Number of search threads of the ASGI server (default: one per processor)",
+)
+@click.option(
+    "--spt-cache",
+    "spt_cache_vertices",
+    default=0,
+    type=int,
+    help="Cache shortest path trees of up to this many vertices in all (not --asgi)",
+)
+@click.option(
+    "--time-bucket",
+    default=60,
+    type=int,
+    help="Seconds of departure time that share a cached shortest path tree",
+)
+def routeserver(
+    graphdb_filename,
+    config_filename,
+    port,
+    workers,
+    asgi,
+    threads,
+    spt_cache_vertices,
+    time_bucket,
+):
     """Start a route server for path planning."""
-    app = create_app(graphdb_filename, config_filename)
-    app.run(host="0.0.0.0", port=port)
+    if not asgi:
+        app = create_app(
+            graphdb_filename,
+            config_filename,
+            spt_cache_vertices=spt_cache_vertices,
+            time_bucket=time_bucket,
+        )
+        serve(app, port=port, workers=workers)
+        return
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise click.UsageError("--asgi requires uvicorn: pip install uvicorn")
+    if workers != 1:
+        raise click.UsageError("--asgi searches on --threads, not --workers")
+    app = create_asgi_app(graphdb_filename, config_filename, threads=threads)
+    uvicorn.run(app, host="0.0.0.0", port=port)
 
 
 if __name__ == "__main__":
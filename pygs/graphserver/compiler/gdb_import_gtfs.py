@@ -9,6 +9,7 @@ from graphserver.core import (
     HeadwayAlight,
     HeadwayBoard,
     Link,
+    Raptor,
     Timezone,
     TripAlight,
     TripBoard,
@@ -24,6 +25,23 @@ def cons(ary):
         yield (ary[i], ary[i + 1])
 
 
+def split_overtaking(trips):
+    """Splits (trip_id, arrivals, departures) trips of one pattern into lists sorted
+    by departure in which no trip overtakes another, as Raptor needs."""
+    ret = []
+    for trip in sorted(trips, key=lambda trip: (trip[2][0], trip[1][-1])):
+        for fifo_trips in ret:
+            last = fifo_trips[-1]
+            if all(a >= b for a, b in zip(trip[1], last[1])) and all(
+                a >= b for a, b in zip(trip[2], last[2])
+            ):
+                fifo_trips.append(trip)
+                break
+        else:
+            ret.append([trip])
+    return ret
+
+
 class GTFSGraphCompiler:
     def __init__(self, gtfsdb, agency_namespace, agency_id=None, reporter=None):
         self.gtfsdb = gtfsdb
@@ -411,6 +429,57 @@ class GTFSGraphCompiler:
                     "WARNING: Support for no-transfer (transfers.txt transfer_type=3) not implemented."
                 )
 
+    def gtfsdb_to_raptor(self, maxtrips=None, service_ids=None):
+        """Returns a Raptor of the trip bundles running on the given service ids,
+        or all of them, with the transfers as footpaths. Frequency-based trips are
+        left out, since their stop times only give the spacing of their stops."""
+        bundles = self.gtfsdb.compile_trip_bundles(
+            maxtrips=maxtrips, reporter=self.reporter
+        )
+        trip_service_ids = dict(
+            self.gtfsdb.execute("SELECT trip_id, service_id FROM trips")
+        )
+        frequency_trip_ids = set(
+            row[0] for row in self.gtfsdb.execute("SELECT trip_id FROM frequencies")
+        )
+        stop_times = {}
+        for trip_id, arrival_time, departure_time in self.gtfsdb.execute(
+            "SELECT trip_id, arrival_time, departure_time FROM stop_times WHERE arrival_time NOT NULL AND departure_time NOT NULL ORDER BY trip_id, stop_sequence"
+        ):
+            times = stop_times.setdefault(trip_id, ([], []))
+            times[0].append(arrival_time)
+            times[1].append(departure_time)
+
+        patterns = []
+        for bundle in bundles:
+            if len(bundle.pattern.stop_ids) < 2:
+                continue
+            trips = [
+                (trip_id,) + stop_times[trip_id]
+                for trip_id in bundle.trip_ids
+                if trip_id not in frequency_trip_ids
+                and (service_ids is None or trip_service_ids[trip_id] in service_ids)
+            ]
+            for fifo_trips in split_overtaking(trips):
+                patterns.append((bundle.pattern.stop_ids, fifo_trips))
+
+        transfers = []
+        for s1, s2, edge in self.gtfsdb_to_transfer_edges():
+            seconds = edge.seconds if isinstance(edge, ElapseTime) else 0
+            transfers.append((s1[len("sta-") :], s2[len("sta-") :], seconds))
+
+        stop_ids = [row[0] for row in self.gtfsdb.execute("SELECT stop_id FROM stops")]
+        if self.reporter:
+            self.reporter.write(
+                "%d patterns of %d trips at %d stops\n"
+                % (
+                    len(patterns),
+                    sum(len(trips) for stop_ids, trips in patterns),
+                    len(stop_ids),
+                )
+            )
+        return Raptor(stop_ids, patterns, transfers)
+
     def gtfsdb_to_edges(self, maxtrips=None, service_ids=None):
         for edge_tuple in self.gtfsdb_to_scheduled_edges(
             maxtrips, service_ids=service_ids
@@ -446,20 +515,11 @@ def gdb_load_gtfsdb(
         acceptable_service_ids = None
 
     compiler = GTFSGraphCompiler(gtfsdb, agency_namespace, agency_id, reporter)
-    c = gdb.get_cursor()
-    v_added = set([])
-    for fromv_label, tov_label, edge in compiler.gtfsdb_to_edges(
-        maxtrips, service_ids=acceptable_service_ids
-    ):
-        if fromv_label not in v_added:
-            gdb.add_vertex(fromv_label, c)
-            v_added.add(fromv_label)
-        if tov_label not in v_added:
-            gdb.add_vertex(tov_label, c)
-            v_added.add(tov_label)
-        gdb.add_edge(fromv_label, tov_label, edge, c)
-    c.close()
-    gdb.commit()
+    with gdb.bulk_writer() as writer:
+        for fromv_label, tov_label, edge in compiler.gtfsdb_to_edges(
+            maxtrips, service_ids=acceptable_service_ids
+        ):
+            writer.add_edge(fromv_label, tov_label, edge)
 
 
 def graph_load_gtfsdb(
@@ -468,10 +528,21 @@ def graph_load_gtfsdb(
     compiler = GTFSGraphCompiler(gtfsdb, agency_namespace, agency_id, reporter)
 
     gg = Graph()
-
-    for fromv_label, tov_label, edge in compiler.gtfsdb_to_edges(maxtrips):
-        gg.add_vertex(fromv_label)
-        gg.add_vertex(tov_label)
-        gg.add_edge(fromv_label, tov_label, edge)
+    gg.add_edges(compiler.gtfsdb_to_edges(maxtrips), add_vertices=True)
 
     return gg
+
+
+def raptor_from_gtfsdb(
+    gtfsdb, agency_id=None, maxtrips=None, sample_date=None, reporter=sys.stdout
+):
+    """Returns a Raptor of the trips of a GTFS database, or only of those running on
+    sample_date, a "YYYYMMDD" string, with times in seconds since the start of
+    their service day."""
+    service_ids = None
+    if sample_date is not None:
+        sample_date = datetime.date(*parse_gtfs_date(sample_date))
+        service_ids = set(gtfsdb.service_periods(sample_date))
+
+    compiler = GTFSGraphCompiler(gtfsdb, "raptor", agency_id, reporter)
+    return compiler.gtfsdb_to_raptor(maxtrips, service_ids=service_ids)
@@ -58,23 +58,17 @@ def edges_from_osmdb(osmdb, vertex_namespace, slogs, profiledb=None):
 
 
 def gdb_import_osm(gdb, osmdb, vertex_namespace, slogs, profiledb=None):
-    cursor = gdb.get_cursor()
-
     n_edges = osmdb.count_edges() * 2  # two edges for each bidirectional edge
 
     # for each edge in the osmdb
-    for i, (vertex1_label, vertex2_label, edge) in enumerate(
-        edges_from_osmdb(osmdb, vertex_namespace, slogs, profiledb)
-    ):
-        if i % (n_edges // 100 + 1) == 0:
-            sys.stdout.write("%d/~%d edges loaded\r\n" % (i, n_edges))
-
-        gdb.add_vertex(vertex1_label, cursor)
-        gdb.add_vertex(vertex2_label, cursor)
-
-        gdb.add_edge(vertex1_label, vertex2_label, edge, cursor)
-
-    gdb.commit()
+    with gdb.bulk_writer() as writer:
+        for i, (vertex1_label, vertex2_label, edge) in enumerate(
+            edges_from_osmdb(osmdb, vertex_namespace, slogs, profiledb)
+        ):
+            if i % (n_edges // 100 + 1) == 0:
+                sys.stdout.write("%d/~%d edges loaded\r\n" % (i, n_edges))
+
+            writer.add_edge(vertex1_label, vertex2_label, edge)
 
     print("indexing vertices...")
     gdb.index()
@@ -14,16 +14,24 @@ from .graph import Edge, Graph, Vertex
 from .headway import Headway
 from .headwayalight import HeadwayAlight
 from .headwayboard import HeadwayBoard
+from .heuristic import GreatCircleHeuristic, Heuristic
 from .link import Link
 from .list import ListNode
 from .nooppayload import NoOpPyPayload
+from .pareto import ParetoPath, ParetoSearch, pareto_search
+from .queryexecutor import QueryExecutor
+from .raptor import Journey, Raptor, RaptorLeg
+from .searchworkspace import SearchWorkspace
 from .servicecalendar import ServiceCalendar
 from .serviceperiod import ServicePeriod
 from .shortestpathtree import (
     Path,
     ShortestPathTree,
+    SPTArrays,
     SPTEdge,
     SPTVertex,
+    shortest_path_arrays,
+    shortest_path_bidirectional,
     shortest_path_tree,
     shortest_path_tree_retro,
 )
@@ -1,8 +1,9 @@
 from ctypes import c_void_p
+import os
 
-from ..gsdll import CShadow, ccast, cproperty, lgs
-from .graph import Graph
-from .state import State
+from ..gsdll import CShadow, LGSTypes, ccast, cproperty, lgs
+from .edgepayload import EdgePayload
+from .graph import SNAPSHOT_ERR_PAYLOAD, Graph
 from .walkoptions import WalkOptions
 
 
@@ -13,43 +14,89 @@ class ContractionHierarchy(CShadow):
     def __init__(self):
         self.soul = lgs.chNew()
 
-    def shortest_path(self, fromv_label, tov_label, init_state, walk_options):
-        # GET UPGRAPH AND DOWNGRAPH SPTS
-        sptup = self.upgraph.shortest_path_tree(
-            fromv_label, None, init_state, walk_options
-        )
-        sptdown = self.downgraph.shortest_path_tree_retro(
-            None, tov_label, State(0, 10000000), walk_options
-        )
+    def destroy(self):
+        self.check_destroyed()
+
+        lgs.chDestroy(self.soul)
+        self.soul = None
 
-        # FIND SMALLEST MEETUP VERTEX
-        meetup_vertices = []
-        for upvv in sptup.vertices:
-            downvv = sptdown.get_vertex(upvv.label)
-            if downvv is not None:
-                meetup_vertices.append(
-                    (upvv.state.weight + downvv.state.weight, upvv.label)
-                )
-        min_meetup = min(meetup_vertices)[1]
+    def save(self, path):
+        """Writes the hierarchy to a binary file that load() maps back in.
 
-        # GET AND JOIN PATHS TO MEETUP VERTEX
-        upvertices, upedges = sptup.path(min_meetup)
-        downvertices, downedges = sptdown.path_retro(min_meetup)
+        Python payloads can't be stored and raise ValueError."""
+        self.check_destroyed()
 
-        edges = upedges + downedges
+        ret = lgs.chSave(self.soul, os.fsencode(path))
+        if ret == SNAPSHOT_ERR_PAYLOAD:
+            raise ValueError("hierarchy has edge payloads that can't be saved")
+        if ret != 0:
+            raise IOError("could not write %s" % path)
 
-        ret = [ee.payload for ee in edges]
+    @classmethod
+    def load(cls, path):
+        """Reads a hierarchy written by save(). Its graphs are frozen and it owns
+        its edge payloads, which are freed by destroy()."""
+        ret = cls.from_pointer(lgs.chLoad(os.fsencode(path)))
+        if ret is None:
+            raise IOError("%s is not a readable contraction hierarchy" % path)
+        return ret
+
+    def shortest_path(self, fromv_label, tov_label, init_state, walk_options):
+        """Returns the edge payloads of the lightest path between two vertices, with
+        shortcuts unpacked into the payloads they stand for, or None if there is no
+        path."""
+        path = lgs.chShortestPath(
+            self.soul,
+            fromv_label.encode("utf-8"),
+            tov_label.encode("utf-8"),
+            init_state.soul,
+            walk_options.soul,
+        )
+        if path is None:
+            return None
 
-        sptup.destroy()
-        sptdown.destroy()
+        ret = [
+            EdgePayload.from_pointer(lgs.chpGetPayload(path, i))
+            for i in range(lgs.chpN(path))
+        ]
+        lgs.chpDestroy(path)
 
         return ret
 
 
 def get_contraction_hierarchies(
-    graph: Graph, walk_options: WalkOptions, search_limit: int = 1
+    graph: Graph,
+    walk_options: WalkOptions,
+    search_limit: int = 8,
+    settled_limit: int = 1000,
+    threads: int = 0,
+    reporter=None,
 ) -> ContractionHierarchy:
-    """Get the global ContractionHierarchy instance."""
+    """Contracts every vertex of the graph into a ContractionHierarchy.
+
+    Each witness search gives up after search_limit hops or settled_limit
+    settled vertices, adding a shortcut instead. Vertices are contracted in
+    rounds of independent sets by the given number of threads, one per
+    processor if 0; graphs with python payloads use a single thread. If a
+    reporter is given, progress is written to it after each round."""
+    # contraction removes vertices from the graph as it goes
+    graph.check_mutable()
+
+    progress = LGSTypes.CHProgress()  # NULL
+    if reporter is not None:
+
+        def report(n_contracted, n_vertices):
+            reporter.write("contracted %d/%d vertices\n" % (n_contracted, n_vertices))
+
+        progress = LGSTypes.CHProgress(report)
+
     return ContractionHierarchy.from_pointer(
-        lgs.get_contraction_hierarchies(graph.soul, walk_options.soul, search_limit)
+        lgs.get_contraction_hierarchies(
+            graph.soul,
+            walk_options.soul,
+            search_limit,
+            settled_limit,
+            threads,
+            progress,
+        )
     )
@@ -1,2 +1,10 @@
 class VertexNotFoundError(Exception):
     pass
+
+
+class FrozenGraphError(Exception):
+    pass
+
+
+class WorkspaceInUseError(Exception):
+    pass
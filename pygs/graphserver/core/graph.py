@@ -1,20 +1,35 @@
 from ctypes import POINTER, byref, c_char_p, c_int, c_long, c_void_p, cast
-from typing import TYPE_CHECKING, Any, Optional, Union
+from itertools import islice
+import os
+from typing import TYPE_CHECKING, Any, Iterable, Optional, Union
 
-from ..gsdll import CShadow, ccast, cproperty, lgs, libc
+from ..gsdll import CShadow, LGSTypes, ccast, cproperty, lgs, lgs_nogil, libc
 from .edgepayload import EdgePayload
-from .exceptions import VertexNotFoundError
+from .exceptions import FrozenGraphError, VertexNotFoundError
 from .list import ListNode
 from .state import State
 from .walkable import Walkable
 from .walkoptions import WalkOptions
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# the first bytes of a snapshot file, and gSaveSnapshot's return value when a payload
+# type can't be stored
+SNAPSHOT_MAGIC = b"GSSNAP\0\0"
+SNAPSHOT_ERR_PAYLOAD = -2
+
 if TYPE_CHECKING:
     from .state import State
 
 
 class Graph(CShadow):
     size = cproperty(lgs.gSize, c_long)  # type: ignore
+    finalized = cproperty(lgs.gIsFinalized, c_int)  # type: ignore
+    frozen = cproperty(lgs.gIsFrozen, c_int)  # type: ignore
+    time_dependent = cproperty(lgs.gIsTimeDependent, c_int)  # type: ignore
 
     def __init__(self, numagencies: int = 1) -> None:
         self.soul = self._cnew()  # type: ignore
@@ -32,6 +47,7 @@ class Graph(CShadow):
     def add_vertex(self, label: Union[str, bytes]) -> Optional[Any]:
         # Vertex* gAddVertex( Graph* this, char *label );
         self.check_destroyed()
+        self.check_mutable()
 
         if isinstance(label, str):
             label = label.encode("utf-8")
@@ -42,6 +58,7 @@ class Graph(CShadow):
         self, label: Union[str, bytes], free_edge_payloads: bool = True
     ) -> Optional[Any]:
         # void gRemoveVertex( Graph* this, char *label, int free_vertex_payload, int free_edge_payloads );
+        self.check_mutable()
 
         if isinstance(label, str):
             label = label.encode("utf-8")
@@ -62,6 +79,7 @@ class Graph(CShadow):
     ) -> Optional[Any]:
         # Edge* gAddEdge( Graph* this, char *from, char *to, EdgePayload *payload );
         self.check_destroyed()
+        self.check_mutable()
 
         if isinstance(fromv, str):
             fromv = fromv.encode("utf-8")
@@ -77,6 +95,176 @@ class Graph(CShadow):
             raise VertexNotFoundError(fromv)
         raise VertexNotFoundError(tov)
 
+    def add_edges(
+        self,
+        edges: Iterable[tuple[Union[str, bytes], Union[str, bytes], EdgePayload]],
+        add_vertices: bool = False,
+        batch_size: int = 10000,
+    ) -> None:
+        """Adds (from label, to label, payload) edges, with one call into the library
+        for every batch_size edges. Missing vertices are added if add_vertices is
+        set and otherwise raise VertexNotFoundError, keeping the edges before it."""
+        self.check_destroyed()
+        self.check_mutable()
+
+        def encode(label: Union[str, bytes]) -> bytes:
+            return label.encode("utf-8") if isinstance(label, str) else label
+
+        edges = iter(edges)
+        while True:
+            batch = list(islice(edges, batch_size))
+            if not batch:
+                break
+
+            n = len(batch)
+            froms = (c_char_p * n)(*[encode(fromv) for fromv, tov, payload in batch])
+            tos = (c_char_p * n)(*[encode(tov) for fromv, tov, payload in batch])
+            payloads = (c_void_p * n)(*[payload.soul for fromv, tov, payload in batch])
+
+            added = lgs.gAddEdges(  # type: ignore
+                self.soul, froms, tos, payloads, n, add_vertices
+            )
+            if added < n:
+                if not self.get_vertex(froms[added]):
+                    raise VertexNotFoundError(froms[added])
+                raise VertexNotFoundError(tos[added])
+
+    def travel_time_matrix(
+        self,
+        origins: list[Union[str, bytes]],
+        destinations: list[Union[str, bytes]],
+        init_state: State,
+        walk_options: WalkOptions,
+        maxtime: int = 2000000000,
+        threads: int = 0,
+    ) -> tuple[Any, Any]:
+        """Returns (times, weights), where times[i][j] and weights[i][j] are the
+        seconds and weight it takes to get from origins[i] to destinations[j]
+        starting in init_state, or -1 if there's no path. They're numpy arrays if
+        numpy is installed and lists of lists otherwise.
+
+        One shortest path tree is grown from each origin, the origins shared among
+        the given number of threads, one per processor if 0."""
+        self.check_destroyed()
+
+        def encode(label: Union[str, bytes]) -> bytes:
+            return label.encode("utf-8") if isinstance(label, str) else label
+
+        n_origins, n_destinations = len(origins), len(destinations)
+        times = (c_long * (n_origins * n_destinations))()
+        weights = (c_long * (n_origins * n_destinations))()
+        self.search_lib.gTravelTimeMatrix(
+            self.soul,
+            (c_char_p * n_origins)(*[encode(label) for label in origins]),
+            n_origins,
+            (c_char_p * n_destinations)(*[encode(label) for label in destinations]),
+            n_destinations,
+            init_state.soul,
+            walk_options.soul,
+            int(maxtime),
+            threads,
+            times,
+            weights,
+        )
+
+        if numpy is not None:
+            shape = (n_origins, n_destinations)
+            return (
+                numpy.ctypeslib.as_array(times).reshape(shape),
+                numpy.ctypeslib.as_array(weights).reshape(shape),
+            )
+        n = n_destinations
+        return (
+            [times[i * n : (i + 1) * n] for i in range(n_origins)],
+            [weights[i * n : (i + 1) * n] for i in range(n_origins)],
+        )
+
+    def get_vertex_by_index(self, index: int) -> Optional[Any]:
+        # Vertex* gGetVertexByIndex( Graph* this, long index );
+        self.check_destroyed()
+
+        return self._cget_vertex_by_index(self.soul, index)  # type: ignore
+
+    def finalize(self) -> None:
+        """Compact the integer vertex index and lay the edges out in CSR arrays.
+
+        Searches over a finalized graph scan contiguous edge arrays instead of
+        following per-vertex edge lists. Adding or removing vertices or edges
+        clears the finalized flag until the next call."""
+        # void gFinalize( Graph* this );
+        self.check_destroyed()
+
+        lgs.gFinalize(self.soul)  # type: ignore
+
+    def freeze(self) -> None:
+        """Pack the vertices, edges and edge lists into a single arena.
+
+        A frozen graph is finalized and read-only: searches walk the packed
+        edge arrays, and adding or removing vertices or edges raises
+        FrozenGraphError. Vertex and Edge objects obtained before freezing
+        point at the old structures and must not be used afterwards; edge
+        payloads are carried over unchanged."""
+        # void gFreeze( Graph* this );
+        self.check_destroyed()
+
+        lgs.gFreeze(self.soul)  # type: ignore
+
+    def save_snapshot(self, path: Union[str, os.PathLike]) -> None:
+        """Write the graph to a binary snapshot file that load_snapshot() maps back in.
+
+        Vertices, coordinates, edges and every built-in payload type are stored,
+        along with the service calendars and timezones the payloads refer to.
+        Python payloads can't be stored and raise ValueError."""
+        # int gSaveSnapshot( Graph* this, const char* filename );
+        self.check_destroyed()
+
+        ret = lgs.gSaveSnapshot(self.soul, os.fsencode(path))  # type: ignore
+        if ret == SNAPSHOT_ERR_PAYLOAD:
+            raise ValueError("graph has edge payloads that can't be saved")
+        if ret != 0:
+            raise IOError("could not write %s" % path)
+
+    @classmethod
+    def load_snapshot(cls, path: Union[str, os.PathLike]) -> "Graph":
+        """Read a graph written by save_snapshot().
+
+        The file is memory-mapped and the graph packed directly from it, so no
+        Python code runs per vertex or edge. The graph is frozen."""
+        # Graph* gLoadSnapshot( const char* filename );
+        ret = cls.from_pointer(lgs.gLoadSnapshot(os.fsencode(path)))  # type: ignore
+        if ret is None:
+            raise IOError("%s is not a readable graph snapshot" % path)
+        ret.numagencies = 1  # type: ignore
+        return ret  # type: ignore
+
+    @staticmethod
+    def is_snapshot(path: Union[str, os.PathLike]) -> bool:
+        """Whether path is a snapshot file rather than, say, a graph database."""
+        try:
+            with open(path, "rb") as fp:
+                return fp.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+        except OSError:
+            return False
+
+    @property
+    def search_lib(self) -> Any:
+        """The library handle to search the graph through. Searches of a frozen
+        graph without python payloads release the interpreter lock, so other
+        threads run meanwhile; the graph can't change under them and they never
+        call back into python."""
+        if not self.frozen:
+            return lgs
+        if getattr(self, "_search_lib", None) is None:
+            has_py_payloads = lgs.gHasPayloadType(  # type: ignore
+                self.soul, LGSTypes.ENUM_edgepayload_t.PL_EXTERNVALUE
+            )
+            self._search_lib = lgs if has_py_payloads else lgs_nogil
+        return self._search_lib
+
+    def check_mutable(self) -> None:
+        if self.frozen:
+            raise FrozenGraphError("graph is frozen")
+
     def set_vertex_enabled(
         self, vertex_label: Union[str, bytes], enabled: bool
     ) -> None:
@@ -104,6 +292,7 @@ class Graph(CShadow):
         return verts
 
     def add_vertices(self, vs: list[str]) -> None:
+        self.check_mutable()
         a = (c_char_p * len(vs))()
         for i, v in enumerate(vs):
             a[i] = str(v).encode("utf-8")
@@ -144,6 +333,26 @@ class Vertex(CShadow):
 
     degree_in = cproperty(lgs.vDegreeIn, c_int)  # type: ignore
     degree_out = cproperty(lgs.vDegreeOut, c_int)  # type: ignore
+    index = cproperty(lgs.vGetIndex, c_long)  # type: ignore
+
+    @property
+    def lat(self) -> Optional[float]:
+        self.check_destroyed()
+        if not lgs.vHasCoordinates(self.soul):  # type: ignore
+            return None
+        return lgs.vGetLat(self.soul)  # type: ignore
+
+    @property
+    def lon(self) -> Optional[float]:
+        self.check_destroyed()
+        if not lgs.vHasCoordinates(self.soul):  # type: ignore
+            return None
+        return lgs.vGetLon(self.soul)  # type: ignore
+
+    def set_coordinates(self, lat: float, lon: float) -> None:
+        # void vSetCoordinates( Vertex* this, double lat, double lon );
+        self.check_destroyed()
+        lgs.vSetCoordinates(self.soul, lat, lon)  # type: ignore
 
     def __init__(self, label: Union[str, bytes]) -> None:
         if isinstance(label, str):
@@ -269,4 +478,5 @@ Graph._cdel = lgs.gDestroy  # type: ignore
 Graph._cadd_vertex = ccast(lgs.gAddVertex, Vertex)  # type: ignore
 Graph._cremove_vertex = lgs.gRemoveVertex  # type: ignore
 Graph._cget_vertex = ccast(lgs.gGetVertex, Vertex)  # type: ignore
+Graph._cget_vertex_by_index = ccast(lgs.gGetVertexByIndex, Vertex)  # type: ignore
 Graph._cadd_edge = ccast(lgs.gAddEdge, Edge)  # type: ignore
@@ -0,0 +1,44 @@
+from ctypes import c_double
+
+from ..gsdll import CShadow, cproperty, lgs
+
+
+class Heuristic(CShadow):
+    """A lower bound on the weight of getting from one vertex to another.
+
+    Passed as ``heuristic`` to shortest_path_tree or shortest_path_tree_retro
+    along with a target vertex, it turns the search into A*."""
+
+    def destroy(self):
+        self.check_destroyed()
+
+        self._cdel(self.soul)
+        self.soul = None
+
+    def estimate(self, from_v, to_v):
+        self.check_destroyed()
+
+        return lgs.heurEstimate(self.soul, from_v.soul, to_v.soul)
+
+
+class GreatCircleHeuristic(Heuristic):
+    """Great-circle distance between vertex coordinates divided by max_speed.
+
+    max_speed is in meters per unit of weight and must be at least as fast as
+    any edge in the graph: the walking speed over walking_reluctance for a
+    street network, or the fastest vehicle for a transit network. Downhill
+    streets and streets with a slog below 1 cover more than that. Vertices
+    without coordinates are estimated at 0.
+
+    Edge weights are truncated to whole units, so over many short edges the
+    estimate can exceed the true weight by up to one unit per edge; pad
+    max_speed where exact optimality matters."""
+
+    max_speed = cproperty(lgs.heurGetMaxSpeed, c_double)
+
+    def __init__(self, max_speed):
+        self.soul = self._cnew(max_speed)
+
+
+Heuristic._cdel = lgs.heurDestroy
+GreatCircleHeuristic._cnew = lgs.heurNewGreatCircle
@@ -0,0 +1,139 @@
+from ctypes import c_int, c_long
+
+from ..gsdll import CShadow, cproperty, lgs
+from .edgepayload import EdgePayload
+from .exceptions import VertexNotFoundError
+from .graph import Vertex
+from .state import State
+from .walkoptions import WalkOptions
+
+# as in pareto.h
+PARETO_CRITERIA = {"weight": 1, "time": 2, "transfers": 4, "walk": 8}
+
+
+class ParetoPath:
+    """One of the ways to a vertex found by a ParetoSearch: the vertices from the
+    origin, the payloads of the edges between them and the State at each vertex.
+    The States belong to the search."""
+
+    def __init__(self, vertices, payloads, states):
+        self.vertices = vertices
+        self.payloads = payloads
+        self.states = states
+
+    @property
+    def state(self):
+        return self.states[-1]
+
+    def __repr__(self):
+        state = self.state
+        return "<ParetoPath %d vertices weight=%d time=%d transfers=%d walked=%.1f>" % (
+            len(self.vertices),
+            state.weight,
+            state.time,
+            state.num_transfers,
+            state.dist_walked,
+        )
+
+
+class ParetoSearch(CShadow):
+    """The bags of States found by pareto_search, kept by the vertices they reach."""
+
+    n_labels = cproperty(lgs.psNLabels, c_long)
+
+    def __init__(self, graph, soul):
+        self.graph = graph
+        self.soul = soul
+
+    def destroy(self):
+        self.check_destroyed()
+
+        lgs.psDestroy(self.soul)
+        self.soul = None
+
+    def _path(self, label):
+        vertices = []
+        payloads = []
+        states = []
+        while label != -1:
+            vertices.append(Vertex.from_pointer(lgs.psLabelVertex(self.soul, label)))
+            states.append(State.from_pointer(lgs.psLabelState(self.soul, label)))
+            payload = lgs.psLabelPayload(self.soul, label)
+            if payload:
+                payloads.append(EdgePayload.from_pointer(payload))
+            label = lgs.psLabelParent(self.soul, label)
+
+        vertices.reverse()
+        payloads.reverse()
+        states.reverse()
+        return ParetoPath(vertices, payloads, states)
+
+    def paths(self, label):
+        """Returns the ways to the vertex that no other beats on every criterion,
+        lightest first."""
+        self.check_destroyed()
+
+        vertex = self.graph.get_vertex(label)
+        if vertex is None:
+            raise VertexNotFoundError(label)
+
+        index = vertex.index
+        return [
+            self._path(lgs.psBagLabel(self.soul, index, i))
+            for i in range(lgs.psBagSize(self.soul, index))
+        ]
+
+
+def pareto_search(
+    graph,
+    fromv,
+    tov,
+    initstate,
+    walk_options=None,
+    criteria=("weight", "transfers"),
+    max_labels=8,
+    maxtime=2000000000,
+    hoplimit=1000000,
+    weightlimit=2000000000,
+):
+    """Searches for every way from fromv that no other way to the same vertex beats
+    on all of the criteria, some of "weight", "time", "transfers" (the State's
+    num_transfers) and "walk" (its dist_walked), keeping at most max_labels ways
+    to each vertex. Given tov, ways that tov's beat are cut short.
+
+    Returns a ParetoSearch, which owns initstate."""
+    graph.check_destroyed()
+
+    flags = 0
+    for criterion in criteria:
+        flags |= PARETO_CRITERIA[criterion]
+
+    if isinstance(fromv, str):
+        fromv = fromv.encode("utf-8")
+    if isinstance(tov, str):
+        tov = tov.encode("utf-8")
+
+    own_walk_options = walk_options is None
+    if own_walk_options:
+        walk_options = WalkOptions()
+
+    soul = graph.search_lib.gParetoSearch(
+        graph.soul,
+        fromv,
+        tov,
+        initstate.soul,
+        walk_options.soul,
+        c_int(flags),
+        c_int(max_labels),
+        c_long(int(maxtime)),
+        c_int(hoplimit),
+        c_long(int(weightlimit)),
+    )
+
+    if own_walk_options:
+        walk_options.destroy()
+
+    if soul is None:
+        raise VertexNotFoundError(fromv)
+
+    return ParetoSearch(graph, soul)
@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from .searchworkspace import SearchWorkspace
+from .shortestpathtree import shortest_path_tree
+
+
+class QueryExecutor:
+    """Runs shortest_path_tree searches of a shared frozen graph on a pool of
+    threads, each searching in its own SearchWorkspace.
+
+    Searches of a graph without python payloads release the interpreter lock
+    (see Graph.search_lib), so they run in parallel. Use it as a context manager,
+    or call shutdown() when done."""
+
+    def __init__(self, graph, threads=None):
+        graph.check_destroyed()
+        if not graph.frozen:
+            raise ValueError("freeze the graph before searching it from many threads")
+
+        self.graph = graph
+        self._executor = ThreadPoolExecutor(threads)
+        self._local = threading.local()
+        self._workspaces = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    @property
+    def workspace(self):
+        """the search workspace of the calling pool thread"""
+        if not hasattr(self._local, "workspace"):
+            self._local.workspace = SearchWorkspace()
+            with self._lock:
+                self._workspaces.append(self._local.workspace)
+        return self._local.workspace
+
+    def _search(self, extract, fromv, tov, init_state, walk_options, kwargs):
+        spt = shortest_path_tree(
+            self.graph,
+            fromv,
+            tov,
+            init_state,
+            walk_options,
+            workspace=self.workspace,
+            **kwargs,
+        )
+        try:
+            return extract(spt)
+        finally:
+            spt.destroy()
+
+    def submit(self, extract, fromv, tov, init_state, walk_options=None, **kwargs):
+        """Searches from fromv as shortest_path_tree does and returns a Future of
+        extract(spt). The tree is destroyed as soon as extract returns, so extract
+        must copy out what it needs. init_state is taken over by the search."""
+        return self._executor.submit(
+            self._search, extract, fromv, tov, init_state, walk_options, kwargs
+        )
+
+    def map(self, extract, queries, walk_options=None, **kwargs):
+        """Runs a search for each (fromv, tov, init_state) query and yields the
+        results of extract in the order of the queries."""
+        futures = [
+            self.submit(extract, fromv, tov, init_state, walk_options, **kwargs)
+            for fromv, tov, init_state in queries
+        ]
+        return (future.result() for future in futures)
+
+    def shutdown(self):
+        """Waits for the pending searches and frees the workspaces."""
+        self._executor.shutdown(wait=True)
+        for workspace in self._workspaces:
+            workspace.destroy()
+        self._workspaces = []
@@ -0,0 +1,240 @@
+from ctypes import c_long
+
+from ..gsdll import CShadow, lgs, lgs_nogil
+from .exceptions import VertexNotFoundError
+
+# the arrival at a stop not reached, as in raptor.h
+RAPTOR_UNREACHED = 2147483647
+RAPTOR_LEG_WALK = 0
+RAPTOR_LEG_RIDE = 1
+
+
+class RaptorLeg:
+    def __init__(self, kind, from_stop, to_stop, trip_id, departure, arrival):
+        self.kind = kind
+        self.from_stop = from_stop
+        self.to_stop = to_stop
+        self.trip_id = trip_id
+        self.departure = departure
+        self.arrival = arrival
+
+    def to_jsonable(self):
+        return {
+            "kind": self.kind,
+            "from": self.from_stop,
+            "to": self.to_stop,
+            "trip_id": self.trip_id,
+            "departure": self.departure,
+            "arrival": self.arrival,
+        }
+
+    def __repr__(self):
+        return "<RaptorLeg %s %s-%s %s %d-%d>" % (
+            self.kind,
+            self.from_stop,
+            self.to_stop,
+            self.trip_id,
+            self.departure,
+            self.arrival,
+        )
+
+
+class Journey:
+    """A journey found by Raptor, as a list of RaptorLegs that walk or ride a trip."""
+
+    def __init__(self, departure, arrival, legs):
+        self.departure = departure
+        self.arrival = arrival
+        self.legs = legs
+
+    @property
+    def n_transfers(self):
+        return max(len([leg for leg in self.legs if leg.kind == "ride"]) - 1, 0)
+
+    def to_jsonable(self):
+        return {
+            "departure": self.departure,
+            "arrival": self.arrival,
+            "n_transfers": self.n_transfers,
+            "legs": [leg.to_jsonable() for leg in self.legs],
+        }
+
+    def __repr__(self):
+        return "<Journey %d-%d transfers=%d>" % (
+            self.departure,
+            self.arrival,
+            self.n_transfers,
+        )
+
+
+def _longs(values):
+    return (c_long * len(values))(*values)
+
+
+class Raptor(CShadow):
+    """A transit timetable searched round by round (RAPTOR) instead of as a graph.
+
+    Each pattern is a sequence of stops and the trips serving them, as
+    (stop_ids, trips) where trips is a list of (trip_id, arrivals, departures), one
+    time per stop. A pattern's trips must be sorted by departure and not overtake
+    each other. Transfers are footpaths (from_stop_id, to_stop_id, seconds). Times
+    are seconds since the start of the timetable's service day."""
+
+    def __init__(self, stop_ids, patterns, transfers=()):
+        self.stop_ids = list(stop_ids)
+        self.stop_index = {stop_id: i for i, stop_id in enumerate(self.stop_ids)}
+        self.trip_ids = []
+
+        pattern_stop_offsets = [0]
+        pattern_stops = []
+        pattern_trips = [0]
+        arrivals = []
+        departures = []
+        for stop_ids, trips in patterns:
+            pattern_stops.extend(self.stop_index[stop_id] for stop_id in stop_ids)
+            pattern_stop_offsets.append(len(pattern_stops))
+            for trip_id, trip_arrivals, trip_departures in trips:
+                self.trip_ids.append(trip_id)
+                arrivals.extend(trip_arrivals)
+                departures.extend(trip_departures)
+            pattern_trips.append(len(self.trip_ids))
+
+        transfers = [
+            (self.stop_index[from_stop], self.stop_index[to_stop], int(seconds))
+            for from_stop, to_stop, seconds in transfers
+        ]
+
+        self.soul = lgs.raptorNew(
+            len(self.stop_ids),
+            len(pattern_trips) - 1,
+            _longs(pattern_stop_offsets),
+            _longs(pattern_stops),
+            _longs(pattern_trips),
+            _longs(arrivals),
+            _longs(departures),
+            len(transfers),
+            _longs([t[0] for t in transfers]),
+            _longs([t[1] for t in transfers]),
+            _longs([t[2] for t in transfers]),
+        )
+
+    def destroy(self):
+        self.check_destroyed()
+
+        lgs.raptorDestroy(self.soul)
+        self.soul = None
+
+    def _stop(self, stop_id):
+        try:
+            return self.stop_index[stop_id]
+        except KeyError:
+            raise VertexNotFoundError(stop_id)
+
+    def _legs(self, result, round, stop):
+        buf = (c_long * (6 * (2 * round + 1)))()
+        n_legs = lgs.rrLegs(result, round, stop, buf)
+        return [
+            RaptorLeg(
+                "ride" if buf[i * 6] == RAPTOR_LEG_RIDE else "walk",
+                self.stop_ids[buf[i * 6 + 1]],
+                self.stop_ids[buf[i * 6 + 2]],
+                self.trip_ids[buf[i * 6 + 3]] if buf[i * 6 + 3] != -1 else None,
+                buf[i * 6 + 4],
+                buf[i * 6 + 5],
+            )
+            for i in range(n_legs)
+        ]
+
+    def _journeys(self, result, departure, target):
+        """the journeys to target that arrive earlier with each extra trip"""
+        ret = []
+        best = RAPTOR_UNREACHED
+        for round in range(lgs.rrRounds(result)):
+            arrival = lgs.rrArrival(result, round, target)
+            if arrival < best:
+                best = arrival
+                legs = self._legs(result, round, target)
+                start = legs[0].departure if legs else departure
+                ret.append(Journey(start, arrival, legs))
+        return ret
+
+    def journeys(self, origin, destination, departure, max_rounds=8):
+        """Returns the Pareto-optimal journeys from origin to destination leaving
+        no earlier than departure: the earliest arrival with at most one trip, at
+        most two trips and so on up to max_rounds trips, with journeys that arrive
+        no earlier than one with fewer trips left out."""
+        self.check_destroyed()
+
+        target = self._stop(destination)
+        result = lgs_nogil.raptorQuery(
+            self.soul, self._stop(origin), departure, target, max_rounds
+        )
+        try:
+            return self._journeys(result, departure, target)
+        finally:
+            lgs.rrDestroy(result)
+
+    def departures(self, origin, earliest, latest):
+        """Returns the times between earliest and latest, latest first, at which
+        leaving origin catches a trip there or at the end of a footpath from it."""
+        self.check_destroyed()
+
+        stop = self._stop(origin)
+        n = lgs.raptorDepartures(self.soul, stop, earliest, latest, None)
+        buf = (c_long * n)()
+        lgs.raptorDepartures(self.soul, stop, earliest, latest, buf)
+        return sorted(set(buf), reverse=True)
+
+    def profile(self, origin, destination, earliest, latest, max_rounds=8):
+        """Returns every journey from origin to destination leaving between earliest
+        and latest that no other journey beats by leaving later, arriving earlier
+        or riding fewer trips, in order of departure. Walking the whole way, if
+        there are footpaths to walk, is given once, leaving at latest.
+
+        The departures are searched latest first, each run starting from the labels
+        of the last (rRAPTOR), so a run only explores what leaving earlier
+        improves."""
+        self.check_destroyed()
+
+        source = self._stop(origin)
+        target = self._stop(destination)
+        result = lgs.rrNew(self.soul, max_rounds)
+        best = [RAPTOR_UNREACHED] * (max_rounds + 1)
+        ret = []
+        departures = self.departures(origin, earliest, latest)
+        if latest >= earliest and latest not in departures:
+            departures.insert(0, latest)
+        try:
+            for departure in departures:
+                lgs_nogil.rrRun(result, source, departure, target)
+
+                # the legs are traced now, before earlier departures relabel them
+                fewer = RAPTOR_UNREACHED
+                for round in range(max_rounds + 1):
+                    arrival = lgs.rrArrival(result, round, target)
+                    walking = round == 0 and departure != latest
+                    if arrival < best[round] and arrival < fewer and not walking:
+                        legs = self._legs(result, round, target)
+                        ret.append(Journey(departure, arrival, legs))
+                    best[round] = fewer = arrival
+        finally:
+            lgs.rrDestroy(result)
+
+        ret.reverse()
+        return ret
+
+    def earliest_arrivals(self, origin, departure, max_rounds=8):
+        """Returns the earliest arrival at each stop reached from origin within
+        max_rounds trips, by stop id."""
+        self.check_destroyed()
+
+        result = lgs_nogil.raptorQuery(
+            self.soul, self._stop(origin), departure, -1, max_rounds
+        )
+        ret = {}
+        for i, stop_id in enumerate(self.stop_ids):
+            arrival = lgs.rrArrival(result, max_rounds, i)
+            if arrival != RAPTOR_UNREACHED:
+                ret[stop_id] = arrival
+        lgs.rrDestroy(result)
+        return ret
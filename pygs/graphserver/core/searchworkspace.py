@@ -0,0 +1,29 @@
+from ctypes import c_int, c_long
+
+from ..gsdll import CShadow, cproperty, lgs
+
+
+class SearchWorkspace(CShadow):
+    """Storage reused from one search to the next.
+
+    Passed as ``workspace`` to shortest_path_tree or shortest_path_tree_retro,
+    the returned tree is built in the workspace instead of being allocated
+    vertex by vertex. The workspace holds one tree at a time: destroy the tree
+    before searching with the workspace again. A workspace must not be shared
+    between threads."""
+
+    in_use = cproperty(lgs.wsInUse, c_int)
+    capacity = cproperty(lgs.wsCapacity, c_long)
+
+    def __init__(self):
+        self.soul = self._cnew()
+
+    def destroy(self):
+        self.check_destroyed()
+
+        self._cdel(self.soul)
+        self.soul = None
+
+
+SearchWorkspace._cnew = lgs.wsNew
+SearchWorkspace._cdel = lgs.wsDestroy
@@ -1,15 +1,30 @@
-from ctypes import POINTER, Structure, addressof, byref, c_int, c_long, c_void_p, cast
+from ctypes import (
+    POINTER,
+    Structure,
+    addressof,
+    byref,
+    c_int,
+    c_long,
+    c_size_t,
+    c_void_p,
+    cast,
+)
 from typing import Optional
 
 from ..gsdll import CShadow, ccast, cproperty, lgs
 from ..vector import Vector
 from .edgepayload import EdgePayload
-from .exceptions import VertexNotFoundError
+from .exceptions import VertexNotFoundError, WorkspaceInUseError
 from .graph import Edge, Vertex
 from .list import ListNode
 from .state import State
 from .walkoptions import WalkOptions
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class SPTEdge(Edge):
     def to_xml(self):
@@ -323,9 +338,15 @@ def shortest_path_tree(
     maxtime=2000000000,
     hoplimit=1000000,
     weightlimit=2000000000,
+    heuristic=None,
+    workspace=None,
 ):
     # Graph* gShortestPathTree( Graph* this, char *from, char *to, State* init_state )
     graph.check_destroyed()
+    if workspace is not None and workspace.in_use:
+        raise WorkspaceInUseError(
+            "destroy the tree of the previous search before reusing its workspace"
+        )
     if not tov:
         tov = "*bogus^*^vertex*"
 
@@ -337,7 +358,7 @@ def shortest_path_tree(
     if walk_options is None:
         walk_options = WalkOptions()
         ret = ShortestPathTree.from_pointer(
-            lgs.gShortestPathTree(
+            graph.search_lib.gShortestPathTree(
                 graph.soul,
                 fromv,
                 tov,
@@ -346,12 +367,14 @@ def shortest_path_tree(
                 c_long(int(maxtime)),
                 c_int(hoplimit),
                 c_long(int(weightlimit)),
+                heuristic.soul if heuristic is not None else None,
+                workspace.soul if workspace is not None else None,
             )
         )
         walk_options.destroy()
     else:
         ret = ShortestPathTree.from_pointer(
-            lgs.gShortestPathTree(
+            graph.search_lib.gShortestPathTree(
                 graph.soul,
                 fromv,
                 tov,
@@ -360,6 +383,8 @@ def shortest_path_tree(
                 c_long(int(maxtime)),
                 c_int(hoplimit),
                 c_long(int(weightlimit)),
+                heuristic.soul if heuristic is not None else None,
+                workspace.soul if workspace is not None else None,
             )
         )
 
@@ -380,9 +405,15 @@ def shortest_path_tree_retro(
     mintime=0,
     hoplimit=1000000,
     weightlimit=2000000000,
+    heuristic=None,
+    workspace=None,
 ):
     # Graph* gShortestPathTree( Graph* this, char *from, char *to, State* init_state )
     graph.check_destroyed()
+    if workspace is not None and workspace.in_use:
+        raise WorkspaceInUseError(
+            "destroy the tree of the previous search before reusing its workspace"
+        )
     if not fromv:
         fromv = "*bogus^*^vertex*"
 
@@ -394,7 +425,7 @@ def shortest_path_tree_retro(
     if walk_options is None:
         walk_options = WalkOptions()
         ret = ShortestPathTree.from_pointer(
-            lgs.gShortestPathTreeRetro(
+            graph.search_lib.gShortestPathTreeRetro(
                 graph.soul,
                 fromv,
                 tov,
@@ -403,12 +434,14 @@ def shortest_path_tree_retro(
                 c_long(int(mintime)),
                 c_int(hoplimit),
                 c_long(int(weightlimit)),
+                heuristic.soul if heuristic is not None else None,
+                workspace.soul if workspace is not None else None,
             )
         )
         walk_options.destroy()
     else:
         ret = ShortestPathTree.from_pointer(
-            lgs.gShortestPathTreeRetro(
+            graph.search_lib.gShortestPathTreeRetro(
                 graph.soul,
                 fromv,
                 tov,
@@ -417,6 +450,8 @@ def shortest_path_tree_retro(
                 c_long(int(mintime)),
                 c_int(hoplimit),
                 c_long(int(weightlimit)),
+                heuristic.soul if heuristic is not None else None,
+                workspace.soul if workspace is not None else None,
             )
         )
 
@@ -426,3 +461,163 @@ def shortest_path_tree_retro(
         )  # this shouldn't happen; TODO: more descriptive error
 
     return ret
+
+
+def shortest_path_bidirectional(
+    graph,
+    fromv,
+    tov,
+    initstate,
+    walk_options=None,
+    maxtime=2000000000,
+    hoplimit=1000000,
+    weightlimit=2000000000,
+    workspace=None,
+):
+    """Searches from both ends and meets in the middle, returning a forward
+    shortest path tree that contains the path from fromv to tov.
+
+    Falls back to shortest_path_tree on graphs with time-dependent payloads
+    (see Graph.time_dependent), with a turn penalty, or when the path walks
+    further than walk_options.max_walk."""
+    graph.check_destroyed()
+    if workspace is not None and workspace.in_use:
+        raise WorkspaceInUseError(
+            "destroy the tree of the previous search before reusing its workspace"
+        )
+
+    if isinstance(fromv, str):
+        fromv = fromv.encode("utf-8")
+    if isinstance(tov, str):
+        tov = tov.encode("utf-8")
+
+    own_walk_options = walk_options is None
+    if own_walk_options:
+        walk_options = WalkOptions()
+
+    ret = ShortestPathTree.from_pointer(
+        graph.search_lib.gShortestPathBidirectional(
+            graph.soul,
+            fromv,
+            tov,
+            initstate.soul,
+            walk_options.soul,
+            c_long(int(maxtime)),
+            c_int(hoplimit),
+            c_long(int(weightlimit)),
+            workspace.soul if workspace is not None else None,
+        )
+    )
+
+    if own_walk_options:
+        walk_options.destroy()
+
+    if ret is None:
+        raise Exception("Could not create shortest path tree")
+
+    return ret
+
+
+def _view(array, fmt):
+    if numpy is not None:
+        return numpy.ctypeslib.as_array(array)
+    return memoryview(array).cast("B").cast(fmt)
+
+
+class SPTArrays:
+    """The arrival time and weight of every vertex of a graph, with its parent in
+    the shortest path tree and the payload of the edge from it, as found by
+    shortest_path_arrays.
+
+    The times, weights, parents and parent_payloads arrays are indexed by vertex
+    index (see Vertex.index) and are numpy arrays if numpy is installed, or else
+    memoryviews. Vertices not reached have a time, weight and parent of -1, as does
+    the parent of the origin."""
+
+    def __init__(self, graph, n_reached, times, weights, parents, parent_payloads):
+        self.graph = graph
+        self.n_reached = n_reached
+        self.times = _view(times, "l")
+        self.weights = _view(weights, "l")
+        self.parents = _view(parents, "l")
+        self.parent_payloads = _view(parent_payloads, "N")
+
+    def index(self, label):
+        vertex = self.graph.get_vertex(label)
+        if vertex is None:
+            raise VertexNotFoundError(label)
+        return vertex.index
+
+    def path(self, label):
+        """Returns the vertex indices of the path from the origin to a vertex, or
+        None if it wasn't reached."""
+        i = self.index(label)
+        if self.weights[i] == -1:
+            return None
+
+        ret = [i]
+        while self.parents[i] != -1:
+            i = int(self.parents[i])
+            ret.append(i)
+        ret.reverse()
+        return ret
+
+    def parent_payload(self, index):
+        """the payload of the tree edge into the vertex with the given index"""
+        return EdgePayload.from_pointer(int(self.parent_payloads[index]) or None)
+
+
+def shortest_path_arrays(
+    graph,
+    fromv,
+    initstate,
+    walk_options=None,
+    maxtime=2000000000,
+    hoplimit=1000000,
+    weightlimit=2000000000,
+    workspace=None,
+):
+    """Searches from fromv as shortest_path_tree does, to every vertex, and returns
+    SPTArrays of the result instead of the tree. No python object is made per
+    vertex, and the tree is freed before returning."""
+    graph.check_destroyed()
+    if workspace is not None and workspace.in_use:
+        raise WorkspaceInUseError(
+            "destroy the tree of the previous search before reusing its workspace"
+        )
+
+    if isinstance(fromv, str):
+        fromv = fromv.encode("utf-8")
+
+    own_walk_options = walk_options is None
+    if own_walk_options:
+        walk_options = WalkOptions()
+
+    n = lgs.gIndexSize(graph.soul)
+    times = (c_long * n)()
+    weights = (c_long * n)()
+    parents = (c_long * n)()
+    # payload addresses, as size_t since numpy has no dtype for c_void_p arrays
+    parent_payloads = (c_size_t * n)()
+    n_reached = graph.search_lib.gShortestPathArrays(
+        graph.soul,
+        fromv,
+        initstate.soul,
+        walk_options.soul,
+        c_long(int(maxtime)),
+        c_int(hoplimit),
+        c_long(int(weightlimit)),
+        workspace.soul if workspace is not None else None,
+        times,
+        weights,
+        parents,
+        parent_payloads,
+    )
+
+    if own_walk_options:
+        walk_options.destroy()
+
+    if n_reached == -1:
+        raise VertexNotFoundError(fromv.decode("utf-8"))
+
+    return SPTArrays(graph, n_reached, times, weights, parents, parent_payloads)
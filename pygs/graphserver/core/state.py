@@ -62,8 +62,8 @@ class State(CShadow):
                 ret += self.service_period(i).to_xml()
         return ret + "</state>"
 
-    # the state does not keep ownership of the trip_id, so the state
-    # may not live longer than whatever object set its trip_id
+    # trip ids are interned for the life of the process, so the state may
+    # outlive whatever object set its trip_id
     def dangerous_set_trip_id(self, trip_id):
         if isinstance(trip_id, str):
             trip_id = trip_id.encode("utf-8")
@@ -89,6 +89,8 @@ class State(CShadow):
     prev_edge = property(_get_prev_edge, _set_prev_edge)
     num_agencies = cproperty(lgs.stateGetNumAgencies, c_int)
     trip_id = cproperty(lgs.stateGetTripId, c_char_p)
+    # the interned index of trip_id, or -1 off a trip
+    trip = cproperty(lgs.stateGetTrip, c_int)
     stop_sequence = cproperty(lgs.stateGetStopSequence, c_int)
 
 
@@ -4,6 +4,11 @@ from ..gsdll import CShadow, cproperty, instantiate, lgs
 
 
 class WalkOptions(CShadow):
+    # priority queue implementations for queue_type; see core/vertexqueue.h
+    QUEUE_FIBONACCI = 0
+    QUEUE_DARY = 1
+    QUEUE_RADIX = 2
+
     def __init__(self):
         self.soul = self._cnew()
 
@@ -45,6 +50,7 @@ class WalkOptions(CShadow):
     walking_overage = cproperty(
         lgs.woGetWalkingOverage, c_float, setter=lgs.woSetWalkingOverage
     )
+    queue_type = cproperty(lgs.woGetQueueType, c_int, setter=lgs.woSetQueueType)
 
 
 WalkOptions._cnew = lgs.woNew
@@ -21,26 +21,18 @@ class GraphCrawler(Servable):
     def __init__(self, graphdb_filename):
         self.graphdb = GraphDatabase(graphdb_filename)
 
-    def vertices(self, like=None):
-        if like:
-            return "\n".join(
-                [
-                    '<a href="/vertex?label=&quot;%s&quot;">%s</a><br>' % (vl[0], vl[0])
-                    for vl in self.graphdb.execute(
-                        "SELECT label from vertices where label like ? order by label",
-                        (like,),
-                    )
-                ]
-            )
-        else:
-            return "\n".join(
-                [
-                    '<a href="/vertex?label=&quot;%s&quot;">%s</a><br>' % (vl[0], vl[0])
-                    for vl in self.graphdb.execute(
-                        "SELECT label from vertices order by label"
-                    )
-                ]
+    def vertices(self, like=None, offset=0, limit=1000):
+        offset, limit = int(offset), int(limit)
+        ret = [
+            '<a href="/vertex?label=&quot;%s&quot;">%s</a><br>' % (vl, vl)
+            for vl in self.graphdb.vertex_labels(like or None, offset, limit)
+        ]
+        if len(ret) == limit:
+            ret.append(
+                '<a href="/vertices?like=&quot;%s&quot;&offset=%d&limit=%d">more</a>'
+                % (like or "", offset + limit, limit)
             )
+        return "\n".join(ret)
 
     vertices.mime = "text/html"
 
@@ -140,5 +132,12 @@ class GraphCrawler(Servable):
 
         return edge.expound()
 
+    def neighborhood(self, label, hops=1):
+        edges = self.graphdb.neighborhood(label, int(hops))
+        return "\n".join(
+            "%s -> %s\n\t%s" % (vertex1, vertex2, repr(edgetype))
+            for vertex1, vertex2, edgetype in edges
+        )
+
     def str(self):
         return str(self.graphdb)
@@ -0,0 +1,199 @@
+import asyncio
+from functools import partial
+import time
+from urllib.parse import parse_qs
+
+from graphserver.core import QueryExecutor, State
+
+from .routeserver import (
+    SelfEncoderHelper,
+    create_routeserver,
+    json,
+    postprocess_path,
+    walk_options,
+)
+
+# query arguments of /path passed on to walk_options, with their types
+WALK_OPTION_ARGS = {
+    "transfer_penalty": int,
+    "walking_speed": float,
+    "hill_reluctance": float,
+    "turn_penalty": float,
+    "walking_reluctance": float,
+    "max_walk": float,
+}
+
+
+class AsyncRouteServer:
+    """ASGI app answering the path queries of a RouteServer from a pool of threads.
+
+    Path queries from the same origin, departure time and walk options that arrive
+    within window seconds of each other are answered from a single shortest path
+    tree, grown from the origin until every vertex is reached. This pays off when
+    many queries start at a few busy vertices; a lone query costs one full tree
+    rather than a search stopped at its destination."""
+
+    def __init__(self, routeserver, window=0.005, threads=None):
+        self.rs = routeserver
+        self.window = window
+        self.executor = QueryExecutor(routeserver.graph, threads)
+        # (origin, currtime, walk options) -> [(dest, asyncio future)]
+        self._pending = {}
+        self.n_searches = 0
+
+    async def path(self, origin, dest, currtime=None, time_offset=None, **options):
+        """Returns the narrative of the path from origin to dest as a dict with
+        "narrative" and "performance" keys, or with an "error" key if there is no
+        path. Options are the keyword arguments of walk_options."""
+        if time_offset is not None:
+            currtime = (currtime or int(time.time())) + time_offset
+        key = (origin, currtime, tuple(sorted(options.items())))
+
+        loop = asyncio.get_running_loop()
+        if key not in self._pending:
+            self._pending[key] = []
+            loop.call_later(self.window, self._dispatch, key)
+        future = loop.create_future()
+        self._pending[key].append((dest, future))
+        return await future
+
+    def _dispatch(self, key):
+        batch = self._pending.pop(key)
+        asyncio.ensure_future(self._search(key, batch))
+
+    async def _search(self, key, batch):
+        origin, currtime, options = key
+        if currtime is None:
+            currtime = int(time.time())
+        dests = [dest for dest, future in batch]
+
+        wo = walk_options(**dict(options))
+        t0 = time.time()
+        self.n_searches += 1
+        try:
+            results = await asyncio.wrap_future(
+                self.executor.submit(
+                    partial(self._narratives, dests, t0),
+                    origin,
+                    None,
+                    State(1, currtime),
+                    wo,
+                )
+            )
+        except Exception as e:
+            results = [{"error": str(e)}] * len(batch)
+        finally:
+            wo.destroy()
+
+        for (dest, future), result in zip(batch, results):
+            # the client of a cancelled query has gone away
+            if not future.done():
+                future.set_result(result)
+
+    def _narratives(self, dests, t0, spt):
+        # runs in a pool thread before the tree is destroyed
+        path_query_time = time.time() - t0
+
+        ret = []
+        for dest in dests:
+            try:
+                vertices, edges = spt.path(dest)
+            except Exception as e:
+                ret.append({"error": str(e)})
+                continue
+
+            t0 = time.time()
+            narrative = list(
+                postprocess_path(
+                    vertices, edges, self.rs.vertex_events, self.rs.edge_events
+                )
+            )
+            performance = {
+                "path_query_time": path_query_time,
+                "narrative_postprocess_time": time.time() - t0,
+                "batch_size": len(dests),
+            }
+            ret.append({"narrative": narrative, "performance": performance})
+        return ret
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            args = parse_qs(scope["query_string"].decode("latin-1"))
+            handler = getattr(self, "_route_" + scope["path"].strip("/"), None)
+            if handler is None:
+                await self._respond(send, 404, "text/plain", [b"not found"])
+            else:
+                try:
+                    await handler(send, {k: v[-1] for k, v in args.items()})
+                except (KeyError, ValueError) as e:
+                    body = "bad query argument %s" % e
+                    await self._respond(send, 400, "text/plain", [body.encode()])
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _respond(self, send, status, content_type, chunks):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", content_type.encode())],
+            }
+        )
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _route_bounds(self, send, args):
+        body = self.rs.bounds().encode()
+        await self._respond(send, 200, "application/json", [body])
+
+    async def _route_vertices(self, send, args):
+        await self._respond(send, 200, "text/plain", [self.rs.vertices().encode()])
+
+    async def _route_get_vertex_id(self, send, args):
+        body = self.rs.get_vertex_id(float(args["lat"]), float(args["lon"]))
+        await self._respond(send, 200, "application/json", [body.encode()])
+
+    async def _route_path(self, send, args):
+        options = {
+            name: parse(args[name])
+            for name, parse in WALK_OPTION_ARGS.items()
+            if args.get(name)
+        }
+        result = await self.path(
+            args["origin"],
+            args["dest"],
+            currtime=int(args["currtime"]) if args.get("currtime") else None,
+            time_offset=int(args["time_offset"]) if args.get("time_offset") else None,
+            **options,
+        )
+        await self._respond(send, 200, "application/json", stream_json(result))
+
+
+def stream_json(result):
+    """Yields the JSON of a path result in chunks, one per narrative event."""
+    if "narrative" not in result:
+        yield json.dumps(result).encode()
+        return
+
+    encoder = SelfEncoderHelper()
+    yield b'{"narrative": ['
+    for i, event in enumerate(result["narrative"]):
+        yield ((", " if i else "") + encoder.encode(event)).encode()
+    yield ('], "performance": %s}' % json.dumps(result["performance"])).encode()
+
+
+def create_asgi_app(graphdb_filename, config_filename=None, window=0.005, threads=None):
+    return AsyncRouteServer(
+        create_routeserver(graphdb_filename, config_filename), window, threads
+    )
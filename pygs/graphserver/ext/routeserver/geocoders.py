@@ -9,6 +9,11 @@ class OSMReverseGeocoder:
         nearby_vertex = list(self.osmdb.nearest_node(lat, lon))
         return "osm-%s" % (nearby_vertex[0])
 
+    def vertex_coordinates(self):
+        """yields (vertex label, lat, lon) for every OSM node"""
+        for id, tags, lat, lon, endnode_refs in self.osmdb.nodes():
+            yield "osm-%s" % id, lat, lon
+
     def bounds(self):
         """return tuple representing bounding box of reverse geocoder with form (left, bottom, right, top)"""
 
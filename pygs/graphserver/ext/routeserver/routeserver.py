@@ -1,12 +1,28 @@
 import argparse
+from contextlib import contextmanager
+from functools import partial
+import gc
+import signal
 import sys
+import threading
 import time
 
 from flask import Flask, Response, request
 
-from graphserver.core import State, WalkOptions
+from graphserver.core import (
+    Graph,
+    GreatCircleHeuristic,
+    SearchWorkspace,
+    State,
+    WalkOptions,
+    shortest_path_bidirectional,
+    shortest_path_tree,
+    shortest_path_tree_retro,
+)
 from graphserver.graphdb import GraphDatabase
 
+from .sptcache import SPTCache
+
 try:
     import json
 except ImportError:
@@ -64,15 +80,92 @@ def postprocess_path(vertices, edges, vertex_events, edge_events):
                     yield handler.__class__.__name__, event
 
 
+def walk_options(
+    transfer_penalty=0,
+    walking_speed=1.0,
+    hill_reluctance=1.5,
+    turn_penalty=None,
+    walking_reluctance=None,
+    max_walk=None,
+):
+    """Returns WalkOptions for the options of a path query; None leaves the default."""
+    wo = WalkOptions()
+    wo.transfer_penalty = transfer_penalty
+    wo.walking_speed = walking_speed
+    wo.hill_reluctance = hill_reluctance
+    if turn_penalty is not None:
+        wo.turn_penalty = turn_penalty
+    if walking_reluctance is not None:
+        wo.walking_reluctance = walking_reluctance
+    if max_walk is not None:
+        wo.max_walk = max_walk
+    return wo
+
+
+def load_graph(graphdb_filename, vertex_reverse_geocoders=()):
+    """Returns the frozen graph of a graph database or snapshot file.
+
+    A graph database is incarnated and its vertices given coordinates by the
+    reverse geocoders; a snapshot already has them."""
+    if Graph.is_snapshot(graphdb_filename):
+        return Graph.load_snapshot(graphdb_filename)
+
+    graph = GraphDatabase(graphdb_filename).incarnate()
+    # vertex coordinates let path queries run A* when given a heuristic_speed
+    for reverse_geocoder in vertex_reverse_geocoders:
+        if hasattr(reverse_geocoder, "vertex_coordinates"):
+            for label, lat, lon in reverse_geocoder.vertex_coordinates():
+                vertex = graph.get_vertex(label)
+                if vertex is not None:
+                    vertex.set_coordinates(lat, lon)
+    # queries only read the graph; pack it for faster edge scans
+    graph.freeze()
+    return graph
+
+
 class RouteServer:
     def __init__(
-        self, graphdb_filename, vertex_events, edge_events, vertex_reverse_geocoders
+        self,
+        graphdb_filename,
+        vertex_events,
+        edge_events,
+        vertex_reverse_geocoders,
+        spt_cache_vertices=0,
+        time_bucket=60,
+        max_idle_workspaces=8,
     ):
-        graphdb = GraphDatabase(graphdb_filename)
-        self.graph = graphdb.incarnate()
+        self.graph = load_graph(graphdb_filename, vertex_reverse_geocoders)
         self.vertex_events = vertex_events
         self.edge_events = edge_events
         self.vertex_reverse_geocoders = vertex_reverse_geocoders
+        # search workspaces not held by a query, at most max_idle_workspaces of them
+        self.max_idle_workspaces = max_idle_workspaces
+        self._workspaces = []
+        self._workspaces_lock = threading.Lock()
+        # path queries departing within the same time bucket share a cached tree
+        self.spt_cache = None
+        if spt_cache_vertices > 0:
+            self.spt_cache = SPTCache(spt_cache_vertices, time_bucket)
+
+    @contextmanager
+    def workspace(self):
+        """Yields a search workspace for the calling query alone. The tree searched
+        in it must be destroyed by the end of the with block, when the workspace
+        goes back to the idle ones, or is destroyed if there are enough of those."""
+        with self._workspaces_lock:
+            workspace = self._workspaces.pop() if self._workspaces else None
+        if workspace is None:
+            workspace = SearchWorkspace()
+
+        try:
+            yield workspace
+        finally:
+            with self._workspaces_lock:
+                if len(self._workspaces) < self.max_idle_workspaces:
+                    self._workspaces.append(workspace)
+                    workspace = None
+            if workspace is not None:
+                workspace.destroy()
 
     def bounds(self, jsoncallback=None):
         """returns bounding box that encompases the bounding box from all member reverse geocoders"""
@@ -118,6 +211,7 @@ class RouteServer:
         walking_reluctance=None,
         max_walk=None,
         jsoncallback=None,
+        heuristic_speed=None,
     ):
         performance = {}
 
@@ -129,22 +223,71 @@ class RouteServer:
 
         # time path query
         t0 = time.time()
-        wo = WalkOptions()
-        wo.transfer_penalty = transfer_penalty
-        wo.walking_speed = walking_speed
-        wo.hill_reluctance = hill_reluctance
-        if turn_penalty is not None:
-            wo.turn_penalty = turn_penalty
-        if walking_reluctance is not None:
-            wo.walking_reluctance = walking_reluctance
-        if max_walk is not None:
-            wo.max_walk = max_walk
-        spt = self.graph.shortest_path_tree(origin, dest, State(1, currtime), wo)
+        options = (
+            transfer_penalty,
+            walking_speed,
+            hill_reluctance,
+            turn_penalty,
+            walking_reluctance,
+            max_walk,
+        )
+        # A* trees stop short of most vertices, so only full trees are cached
+        if self.spt_cache is not None and heuristic_speed is None:
+            with self.spt_cache.tree(
+                origin, currtime, options, partial(self.full_tree, options=options)
+            ) as (spt, hit):
+                performance["spt_cache"] = dict(self.spt_cache.stats(), hit=hit)
+                ret = self._narrative(spt, dest, t0, performance)
+            return self._dumps(ret, jsoncallback)
+
+        wo = walk_options(*options)
+        with self.workspace() as workspace:
+            # heuristic_speed bounds the meters covered per unit of weight on any edge
+            if heuristic_speed is not None:
+                heuristic = GreatCircleHeuristic(heuristic_speed)
+                spt = shortest_path_tree(
+                    self.graph,
+                    origin,
+                    dest,
+                    State(1, currtime),
+                    wo,
+                    heuristic=heuristic,
+                    workspace=workspace,
+                )
+                heuristic.destroy()
+            else:
+                spt = shortest_path_bidirectional(
+                    self.graph,
+                    origin,
+                    dest,
+                    State(1, currtime),
+                    wo,
+                    workspace=workspace,
+                )
+
+            wo.destroy()
+            try:
+                ret = self._narrative(spt, dest, t0, performance)
+            finally:
+                t0 = time.time()
+                spt.destroy()
+                performance["cleanup_time"] = time.time() - t0
+
+        return self._dumps(ret, jsoncallback)
+
+    def full_tree(self, origin, currtime, options):
+        """Returns the shortest path tree from origin to every vertex, searched
+        without a workspace so it can outlive the query."""
+        wo = walk_options(*options)
+        spt = shortest_path_tree(self.graph, origin, None, State(1, currtime), wo)
+        wo.destroy()
+        return spt
 
+    def _narrative(self, spt, dest, t0, performance):
         try:
             vertices, edges = spt.path(dest)
         except Exception as e:
-            return json.dumps({"error": str(e)})
+            return {"error": str(e)}
 
         performance["path_query_time"] = time.time() - t0
 
@@ -154,12 +297,11 @@ class RouteServer:
         )
         performance["narrative_postprocess_time"] = time.time() - t0
 
-        t0 = time.time()
-        wo.destroy()
-        spt.destroy()
-        performance["cleanup_time"] = time.time() - t0
+        return {"narrative": narrative, "performance": performance}
 
-        ret = {"narrative": narrative, "performance": performance}
+    def _dumps(self, ret, jsoncallback):
+        if "error" in ret:
+            return json.dumps(ret)
 
         if jsoncallback is None:
             return json.dumps(ret, indent=2, cls=SelfEncoderHelper)
@@ -184,6 +326,7 @@ class RouteServer:
         walking_reluctance=None,
         max_walk=None,
         jsoncallback=None,
+        heuristic_speed=None,
     ):
         origin_vertex_label = self.get_vertex_id_raw(lat1, lon1)
         dest_vertex_label = self.get_vertex_id_raw(lat2, lon2)
@@ -205,7 +348,61 @@ class RouteServer:
             walking_reluctance,
             max_walk,
             jsoncallback,
+            heuristic_speed,
+        )
+
+    def matrix(
+        self,
+        origins,
+        dests,
+        currtime=None,
+        time_offset=None,
+        transfer_penalty=0,
+        walking_speed=1.0,
+        hill_reluctance=1.5,
+        turn_penalty=None,
+        walking_reluctance=None,
+        max_walk=None,
+        jsoncallback=None,
+    ):
+        """returns the seconds and weight of the lightest path from each origin to
+        each destination, null where there's no path, with the walk options of path"""
+        if currtime is None:
+            currtime = int(time.time())
+
+        if time_offset is not None:
+            currtime += time_offset
+
+        wo = walk_options(
+            transfer_penalty,
+            walking_speed,
+            hill_reluctance,
+            turn_penalty,
+            walking_reluctance,
+            max_walk,
+        )
+
+        t0 = time.time()
+        times, weights = self.graph.travel_time_matrix(
+            origins, dests, State(1, currtime), wo
         )
+        wo.destroy()
+
+        def jsonable(rows):
+            return [[int(x) if x >= 0 else None for x in row] for row in rows]
+
+        ret = {
+            "origins": origins,
+            "dests": dests,
+            "times": jsonable(times),
+            "weights": jsonable(weights),
+            "performance": {"matrix_query_time": time.time() - t0},
+        }
+
+        if jsoncallback is None:
+            return json.dumps(ret)
+        else:
+            return "%s(%s)" % (jsoncallback, json.dumps(ret))
 
     def path_retro(
         self,
@@ -225,16 +422,22 @@ class RouteServer:
         wo = WalkOptions()
         wo.transfer_penalty = transfer_penalty
         wo.walking_speed = walking_speed
-        spt = self.graph.shortest_path_tree_retro(origin, dest, State(1, currtime), wo)
-        wo.destroy()
-
-        vertices, edges = spt.path_retro(origin)
+        with self.workspace() as workspace:
+            spt = shortest_path_tree_retro(
+                self.graph, origin, dest, State(1, currtime), wo, workspace=workspace
+            )
+            wo.destroy()
 
-        ret = list(
-            postprocess_path(vertices, edges, self.vertex_events, self.edge_events)
-        )
+            try:
+                vertices, edges = spt.path_retro(origin)
 
-        spt.destroy()
+                ret = list(
+                    postprocess_path(
+                        vertices, edges, self.vertex_events, self.edge_events
+                    )
+                )
+            finally:
+                spt.destroy()
 
         return json.dumps(ret, indent=2, cls=SelfEncoderHelper)
 
@@ -243,27 +446,35 @@ class RouteServer:
             currtime = int(time.time())
 
         wo = WalkOptions()
-        spt = self.graph.shortest_path_tree(origin, dest, State(1, currtime), wo)
-        wo.destroy()
-
-        vertices, edges = spt.path(dest)
+        with self.workspace() as workspace:
+            spt = shortest_path_tree(
+                self.graph, origin, dest, State(1, currtime), wo, workspace=workspace
+            )
+            wo.destroy()
 
-        ret = postprocess_path_raw(vertices, edges)
+            try:
+                vertices, edges = spt.path(dest)
 
-        spt.destroy()
+                ret = postprocess_path_raw(vertices, edges)
+            finally:
+                spt.destroy()
 
         return ret
 
     def path_raw_retro(self, origin, dest, currtime):
         wo = WalkOptions()
-        spt = self.graph.shortest_path_tree_retro(origin, dest, State(1, currtime), wo)
-        wo.destroy()
-
-        vertices, edges = spt.path_retro(origin)
+        with self.workspace() as workspace:
+            spt = shortest_path_tree_retro(
+                self.graph, origin, dest, State(1, currtime), wo, workspace=workspace
+            )
+            wo.destroy()
 
-        ret = postprocess_path_raw(vertices, edges)
+            try:
+                vertices, edges = spt.path_retro(origin)
 
-        spt.destroy()
+                ret = postprocess_path_raw(vertices, edges)
+            finally:
+                spt.destroy()
 
         return ret
 
@@ -300,7 +511,9 @@ def get_handler_instances(handler_definitions, handler_type):
         yield handler_instance
 
 
-def create_app(graphdb_filename, config_filename=None):
+def create_routeserver(graphdb_filename, config_filename=None, **kwargs):
+    """Returns a RouteServer for the graph with the handlers of a YAML config file.
+    Keyword arguments are passed on to RouteServer."""
     if config_filename is None:
         # Default configuration with no handlers
         handler_definitions = {
@@ -327,9 +540,17 @@ def create_app(graphdb_filename, config_filename=None):
     for g in vertex_reverse_geocoders:
         print(f"   {g}")
 
-    rs = RouteServer(
-        graphdb_filename, vertex_events, edge_events, vertex_reverse_geocoders
+    return RouteServer(
+        graphdb_filename,
+        vertex_events,
+        edge_events,
+        vertex_reverse_geocoders,
+        **kwargs,
     )
+
+
+def create_app(graphdb_filename, config_filename=None, **kwargs):
+    rs = create_routeserver(graphdb_filename, config_filename, **kwargs)
     app = Flask(__name__)
 
     @app.route("/")
@@ -343,6 +564,7 @@ def create_app(graphdb_filename, config_filename=None):
                 "/get_vertex_id": "Get vertex ID by coordinates",
                 "/path": "Calculate path between two points",
                 "/geompath": "Calculate path with geometry",
+                "/matrix": "Calculate travel times between origins and destinations",
                 "/path_retro": "Calculate path with retro processing",
                 "/path_raw": "Calculate raw path",
                 "/path_raw_retro": "Calculate raw path with retro processing",
@@ -379,7 +601,7 @@ def create_app(graphdb_filename, config_filename=None):
             transfer_penalty=int(args.get("transfer_penalty", 0)),
             walking_speed=float(args.get("walking_speed", 1.0)),
             hill_reluctance=float(args.get("hill_reluctance", 1.5)),
-            turn_penalty=float(args.get("turn_penalty"))
+            turn_penalty=int(args.get("turn_penalty"))
             if args.get("turn_penalty")
             else None,
             walking_reluctance=float(args.get("walking_reluctance"))
@@ -387,6 +609,9 @@ def create_app(graphdb_filename, config_filename=None):
             else None,
             max_walk=float(args.get("max_walk")) if args.get("max_walk") else None,
             jsoncallback=args.get("callback"),
+            heuristic_speed=float(args.get("heuristic_speed"))
+            if args.get("heuristic_speed")
+            else None,
         )
         mimetype = (
             "application/javascript" if args.get("callback") else "application/json"
@@ -408,7 +633,38 @@ def create_app(graphdb_filename, config_filename=None):
             transfer_penalty=int(args.get("transfer_penalty", 0)),
             walking_speed=float(args.get("walking_speed", 1.0)),
             hill_reluctance=float(args.get("hill_reluctance", 1.5)),
-            turn_penalty=float(args.get("turn_penalty"))
+            turn_penalty=int(args.get("turn_penalty"))
+            if args.get("turn_penalty")
+            else None,
+            walking_reluctance=float(args.get("walking_reluctance"))
+            if args.get("walking_reluctance")
+            else None,
+            max_walk=float(args.get("max_walk")) if args.get("max_walk") else None,
+            jsoncallback=args.get("callback"),
+            heuristic_speed=float(args.get("heuristic_speed"))
+            if args.get("heuristic_speed")
+            else None,
+        )
+        mimetype = (
+            "application/javascript" if args.get("callback") else "application/json"
+        )
+        return Response(data, mimetype=mimetype)
+
+    @app.route("/matrix")
+    def matrix_route():
+        # origins and destinations are given as repeated origin= and dest= arguments
+        args = request.args
+        data = rs.matrix(
+            origins=args.getlist("origin"),
+            dests=args.getlist("dest"),
+            currtime=int(args.get("currtime")) if args.get("currtime") else None,
+            time_offset=int(args.get("time_offset"))
+            if args.get("time_offset")
+            else None,
+            transfer_penalty=int(args.get("transfer_penalty", 0)),
+            walking_speed=float(args.get("walking_speed", 1.0)),
+            hill_reluctance=float(args.get("hill_reluctance", 1.5)),
+            turn_penalty=int(args.get("turn_penalty"))
             if args.get("turn_penalty")
             else None,
             walking_reluctance=float(args.get("walking_reluctance"))
@@ -452,3 +708,51 @@ def create_app(graphdb_filename, config_filename=None):
         return Response(data, mimetype="text/plain")
 
     return app
+
+
+def serve(app, host="0.0.0.0", port=8080, workers=1):
+    """Serves app over HTTP with the given number of worker processes.
+
+    Workers are forked from this process once the app, and so its graph, has been
+    loaded, and accept connections on a socket bound here. Searches only read the
+    frozen graph, so its memory stays shared between the workers rather than each
+    holding a copy."""
+    if workers <= 1:
+        app.run(host=host, port=port, threaded=True)
+        return
+
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    # keep the garbage collector from writing to, and so copying, the parent's objects
+    gc.freeze()
+
+    children = []
+    for i in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+    # the port the server bound, if asked for any free one with port 0
+    print("serving on %s:%d with %d workers" % (host, server.port, workers), flush=True)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        stop(signal.SIGINT, None)
+        for pid in children:
+            os.waitpid(pid, 0)
+    finally:
+        server.server_close()
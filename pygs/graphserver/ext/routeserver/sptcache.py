@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import threading
+
+
+class _Entry:
+    def __init__(self, spt):
+        self.spt = spt
+        self.size = spt.size
+        self.readers = 1
+        self.evicted = False
+
+
+class SPTCache:
+    """Least recently used cache of the full shortest path trees of path queries.
+
+    Trees are keyed on their origin, departure time rounded down to time_bucket
+    seconds and walk options fingerprint. The cached trees hold at most
+    max_vertices vertices between them, which bounds their memory. Trees are
+    searched without a workspace, since they outlive the query that grew them, and
+    an evicted tree is destroyed once the last query reading it is done."""
+
+    def __init__(self, max_vertices, time_bucket=60):
+        self.max_vertices = max_vertices
+        self.time_bucket = time_bucket
+        self.n_vertices = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def bucket(self, currtime):
+        return currtime - currtime % self.time_bucket
+
+    @contextmanager
+    def tree(self, origin, currtime, fingerprint, search):
+        """Yields the cached tree of a query and whether it was cached, calling
+        search(origin, bucketed currtime) to grow it if not. The tree must not be
+        used after the with block."""
+        key = (origin, self.bucket(currtime), fingerprint)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.readers += 1
+                self.hits += 1
+            else:
+                self.misses += 1
+        hit = entry is not None
+
+        if entry is None:
+            entry = _Entry(search(origin, key[1]))
+            with self._lock:
+                if key in self._entries:
+                    # grown by another thread meanwhile; ours goes when we're done
+                    entry.evicted = True
+                else:
+                    self._entries[key] = entry
+                    self.n_vertices += entry.size
+                    self._evict(self.max_vertices)
+
+        try:
+            yield entry.spt, hit
+        finally:
+            with self._lock:
+                entry.readers -= 1
+                if entry.evicted and entry.readers == 0:
+                    entry.spt.destroy()
+
+    def _evict(self, max_vertices):
+        while self.n_vertices > max_vertices and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self.n_vertices -= entry.size
+            entry.evicted = True
+            if entry.readers == 0:
+                entry.spt.destroy()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "trees": len(self._entries),
+                "vertices": self.n_vertices,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._evict(-1)
@@ -1,3 +1,4 @@
+import importlib
 import os
 import sqlite3
 
@@ -19,6 +20,7 @@ class GraphDatabase:
         elif not os.path.exists(sqlite_filename):
             overwrite = True  # force an init of the tables
 
+        self.sqlite_filename = sqlite_filename
         self.conn = sqlite3.connect(sqlite_filename)
 
         if overwrite:
@@ -26,21 +28,118 @@ class GraphDatabase:
 
         self.resources_cache = {}
         self.payloads_cache = {}
+        self.payload_type_ids = None  # payload type name -> id, loaded on first write
+        self.payload_types = {}  # id -> payload class
+        self.stored_resources = set()
 
     def setup(self):
         c = self.conn.cursor()
-        c.execute("CREATE TABLE vertices (label)")
+        self.create_graph_tables(c)
         c.execute(
             "CREATE TABLE payloads (id TEXT UNIQUE ON CONFLICT IGNORE, type TEXT, state TEXT)"
         )
-        c.execute("CREATE TABLE edges (vertex1 TEXT, vertex2 TEXT, epid TEXT)")
         c.execute(
             "CREATE TABLE resources (name TEXT UNIQUE ON CONFLICT IGNORE, image TEXT)"
         )
+        c.execute(
+            "CREATE TABLE payload_types (id INTEGER PRIMARY KEY, name TEXT UNIQUE)"
+        )
 
         self.conn.commit()
         c.close()
 
+        self.index()
+
+    def create_graph_tables(self, c):
+        c.execute(
+            "CREATE TABLE vertices (id INTEGER PRIMARY KEY, label TEXT UNIQUE ON CONFLICT IGNORE)"
+        )
+        c.execute(
+            "CREATE TABLE edges (id INTEGER PRIMARY KEY, vertex1 INTEGER REFERENCES vertices (id), vertex2 INTEGER REFERENCES vertices (id), epid TEXT)"
+        )
+
+    def table_columns(self, table):
+        return [record[1] for record in self.execute("PRAGMA table_info(%s)" % table)]
+
+    def needs_migration(self):
+        """True if the vertices and edges are keyed by label, as in databases
+        written before vertices had integer ids (see migrate)."""
+        columns = self.table_columns("vertices")
+        return bool(columns) and "id" not in columns
+
+    def migrate(self):
+        """Moves a database whose vertices and edges are keyed by label to
+        integer vertex ids, keeping the order of the edges, in one transaction.
+        Returns whether there was anything to migrate."""
+        if not self.needs_migration():
+            return False
+
+        self.conn.commit()
+        isolation_level = self.conn.isolation_level
+        # sqlite3 would otherwise commit before each schema change
+        self.conn.isolation_level = None
+        c = self.conn.cursor()
+        try:
+            c.execute("BEGIN")
+            c.execute("DROP INDEX IF EXISTS vertices_label")
+            c.execute("ALTER TABLE vertices RENAME TO old_vertices")
+            c.execute("ALTER TABLE edges RENAME TO old_edges")
+            self.create_graph_tables(c)
+            c.execute(
+                "INSERT INTO vertices (label) SELECT label FROM old_vertices UNION SELECT vertex1 FROM old_edges UNION SELECT vertex2 FROM old_edges"
+            )
+            c.execute(
+                "INSERT INTO edges (vertex1, vertex2, epid) SELECT v1.id, v2.id, e.epid FROM old_edges e JOIN vertices v1 ON v1.label = e.vertex1 JOIN vertices v2 ON v2.label = e.vertex2 ORDER BY e.rowid"
+            )
+            c.execute("DROP TABLE old_vertices")
+            c.execute("DROP TABLE old_edges")
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        finally:
+            c.close()
+            self.conn.isolation_level = isolation_level
+
+        self.index()
+        return True
+
+    def payload_type_id(self, payload_class, cc):
+        """Returns the id of payload_class in the payload_types table, adding it
+        the first time the class is written."""
+        if self.payload_type_ids is None:
+            # databases written before payload types were interned lack the table
+            cc.execute(
+                "CREATE TABLE IF NOT EXISTS payload_types (id INTEGER PRIMARY KEY, name TEXT UNIQUE)"
+            )
+            self.payload_type_ids = dict(
+                (name, id)
+                for id, name in cc.execute("SELECT id, name FROM payload_types")
+            )
+
+        name = "%s:%s" % (payload_class.__module__, payload_class.__qualname__)
+        if name not in self.payload_type_ids:
+            cc.execute("INSERT INTO payload_types (name) VALUES (?)", (name,))
+            self.payload_type_ids[name] = cc.lastrowid
+        return self.payload_type_ids[name]
+
+    def get_payload_type(self, type):
+        # older databases store the pickled class instead of a payload type id
+        if isinstance(type, bytes):
+            return pickle.loads(type)
+
+        type = int(type)  # the type column has text affinity
+        if type not in self.payload_types:
+            name = list(
+                self.execute("SELECT name FROM payload_types WHERE id=?", (type,))
+            )[0][0]
+            module, qualname = name.split(":")
+            ret = importlib.import_module(module)
+            for attr in qualname.split("."):
+                ret = getattr(ret, attr)
+            self.payload_types[type] = ret
+        return self.payload_types[type]
+
     def put_edge_payload(self, edgepayload, cc):
         if edgepayload.__class__ == Combination:
             for component in edgepayload.components:
@@ -50,7 +149,7 @@ class GraphDatabase:
             "INSERT INTO payloads VALUES (?, ?, ?)",
             (
                 str(edgepayload.soul),
-                pickle.dumps(edgepayload.__class__),
+                self.payload_type_id(edgepayload.__class__, cc),
                 pickle.dumps(edgepayload.__getstate__()),
             ),
         )
@@ -58,6 +157,9 @@ class GraphDatabase:
         return str(edgepayload.soul)
 
     def get_edge_payload(self, id):
+        if id in self.payloads_cache:
+            return self.payloads_cache[id]
+
         queryresult = list(
             self.execute("SELECT id, type, state FROM payloads WHERE id=?", (id,))
         )
@@ -66,51 +168,59 @@ class GraphDatabase:
 
         id, type, state = queryresult[0]
 
-        if id in self.payloads_cache:
-            return self.payloads_cache[id]
+        return self.reconstitute_payload(id, type, pickle.loads(state))
 
-        typeclass = pickle.loads(type)
-        ret = typeclass.reconstitute(pickle.loads(state), self)
+    def reconstitute_payload(self, id, type, state):
+        typeclass = self.get_payload_type(type)
+        ret = typeclass.reconstitute(state, self)
         ret.external_id = int(id)
         self.payloads_cache[id] = ret
         return ret
 
     def populate(self, graph, reporter=None):
-        c = self.conn.cursor()
-
-        n = len(graph.vertices)
+        vertices = graph.vertices
+        n = len(vertices)
         nseg = max(n, 100)
-        for i, vv in enumerate(graph.vertices):
-            if reporter and i % (nseg // 100) == 0:
-                reporter.write("%d/%d vertices dumped\n" % (i, n))
-
-            c.execute("INSERT INTO vertices VALUES (?)", (vv.label,))
-            for ee in vv.outgoing:
-                epid = self.put_edge_payload(ee.payload, c)
-                c.execute(
-                    "INSERT INTO edges VALUES (?, ?, ?)",
-                    (ee.from_v.label, ee.to_v.label, epid),
-                )
+        with self.bulk_writer() as writer:
+            for i, vv in enumerate(vertices):
+                if reporter and i % (nseg // 100) == 0:
+                    reporter.write("%d/%d vertices dumped\n" % (i, n))
 
-                if hasattr(ee.payload, "__resources__"):
-                    for name, resource in ee.payload.__resources__():
-                        self.store(name, resource, c)
-
-        self.conn.commit()
-        c.close()
+                writer.add_vertex(vv.label)
+                for ee in vv.outgoing:
+                    writer.add_edge(ee.from_v.label, ee.to_v.label, ee.payload)
 
         self.index()
 
+    def bulk_writer(self, batch_size=100000):
+        """Returns a BulkWriter for importing many vertices and edges at once."""
+        return BulkWriter(self, batch_size)
+
     def get_cursor(self):
         return self.conn.cursor()
 
     def commit(self):
         self.conn.commit()
 
+    def get_vertex_id(self, vertex_label):
+        """Returns the integer id of a vertex, or None if there's no such vertex."""
+        for (id,) in self.execute(
+            "SELECT id FROM vertices WHERE label=?", (vertex_label,)
+        ):
+            return id
+        return None
+
+    def put_vertex(self, vertex_label, cc):
+        # labels are unique, so this is ignored if the vertex exists
+        cc.execute("INSERT INTO vertices (label) VALUES (?)", (vertex_label,))
+        return list(
+            cc.execute("SELECT id FROM vertices WHERE label=?", (vertex_label,))
+        )[0][0]
+
     def add_vertex(self, vertex_label, outside_c=None):
         c = outside_c or self.conn.cursor()
 
-        c.execute("INSERT INTO vertices VALUES (?)", (vertex_label,))
+        self.put_vertex(vertex_label, c)
 
         if outside_c is None:
             self.conn.commit()
@@ -119,7 +229,7 @@ class GraphDatabase:
     def remove_edge(self, oid, outside_c=None):
         c = outside_c or self.conn.cursor()
 
-        c.execute("DELETE FROM edges WHERE oid=?", (oid,))
+        c.execute("DELETE FROM edges WHERE id=?", (oid,))
 
         if outside_c is None:
             self.conn.commit()
@@ -130,12 +240,13 @@ class GraphDatabase:
 
         epid = self.put_edge_payload(payload, c)
         c.execute(
-            "INSERT INTO edges VALUES (?, ?, ?)", (from_v_label, to_v_label, epid)
+            "INSERT INTO edges (vertex1, vertex2, epid) VALUES (?, ?, ?)",
+            (self.put_vertex(from_v_label, c), self.put_vertex(to_v_label, c), epid),
         )
 
         if hasattr(payload, "__resources__"):
             for name, resource in payload.__resources__():
-                self.store(name, resource)
+                self.store(name, resource, c)
 
         if outside_c is None:
             self.conn.commit()
@@ -154,41 +265,98 @@ class GraphDatabase:
         c.close()
 
     def all_vertex_labels(self):
+        for (vertex_label,) in self.execute("SELECT label FROM vertices ORDER BY id"):
+            yield vertex_label
+
+    def vertex_labels(self, like=None, offset=0, limit=-1):
+        """Yields vertex labels in order, optionally only those matching the SQL
+        LIKE pattern `like`, a page at a time."""
+        where = "WHERE label LIKE ?" if like is not None else ""
+        args = ((like,) if like is not None else ()) + (limit, offset)
         for (vertex_label,) in self.execute(
-            "SELECT DISTINCT label FROM (SELECT vertex1 AS label FROM edges UNION SELECT vertex2 AS label FROM edges)"
+            "SELECT label FROM vertices %s ORDER BY label LIMIT ? OFFSET ?" % where,
+            args,
         ):
             yield vertex_label
 
-    def all_edges(self):
-        for vertex1, vertex2, epid in self.execute(
-            "SELECT vertex1, vertex2, epid FROM edges"
+    # edges with their vertex labels, to be filtered on e.vertex1 or e.vertex2
+    EDGES_QUERY = (
+        "SELECT e.id, v1.label, v2.label, e.epid FROM edges e "
+        "JOIN vertices v1 ON v1.id = e.vertex1 JOIN vertices v2 ON v2.id = e.vertex2 "
+    )
+
+    def all_edges(self, include_oid=False):
+        for oid, vertex1, vertex2, epid in self.execute(
+            self.EDGES_QUERY + "ORDER BY e.id"
         ):
             ep = self.get_edge_payload(epid)
 
-            yield vertex1, vertex2, ep
+            if include_oid:
+                yield oid, vertex1, vertex2, ep
+            else:
+                yield vertex1, vertex2, ep
 
     def all_outgoing(self, vertex1_label):
-        for vertex1, vertex2, epid in self.execute(
-            "SELECT vertex1, vertex2, epid FROM edges WHERE vertex1=?", (vertex1_label,)
+        for oid, vertex1, vertex2, epid in self.execute(
+            self.EDGES_QUERY
+            + "WHERE e.vertex1 = (SELECT id FROM vertices WHERE label=?) ORDER BY e.id",
+            (vertex1_label,),
         ):
             yield vertex1, vertex2, self.get_edge_payload(epid)
 
     def all_incoming(self, vertex2_label):
-        for vertex1, vertex2, epid in self.execute(
-            "SELECT vertex1, vertex2, epid FROM edges WHERE vertex2=?", (vertex2_label,)
+        for oid, vertex1, vertex2, epid in self.execute(
+            self.EDGES_QUERY
+            + "WHERE e.vertex2 = (SELECT id FROM vertices WHERE label=?) ORDER BY e.id",
+            (vertex2_label,),
         ):
             yield vertex1, vertex2, self.get_edge_payload(epid)
 
+    def neighborhood(self, vertex_label, hops=1):
+        """Returns the (vertex1, vertex2, payload) edges, in either direction,
+        between vertices at most `hops` edges away from the given vertex. Each
+        hop is one indexed lookup, however large the database."""
+        vertex_id = self.get_vertex_id(vertex_label)
+        if vertex_id is None:
+            return []
+
+        seen = set([vertex_id])
+        frontier = [vertex_id]
+        edges = {}
+        for i in range(hops):
+            next_frontier = []
+            # keep well under sqlite's limit on the number of query parameters
+            for j in range(0, len(frontier), 400):
+                chunk = frontier[j : j + 400]
+                marks = ",".join("?" * len(chunk))
+                for oid, vertex1, vertex2, v1, v2, epid in self.execute(
+                    "SELECT e.id, v1.label, v2.label, e.vertex1, e.vertex2, e.epid FROM edges e "
+                    "JOIN vertices v1 ON v1.id = e.vertex1 JOIN vertices v2 ON v2.id = e.vertex2 "
+                    "WHERE e.vertex1 IN (%s) OR e.vertex2 IN (%s)" % (marks, marks),
+                    chunk + chunk,
+                ):
+                    edges[oid] = (vertex1, vertex2, epid)
+                    for neighbor in (v1, v2):
+                        if neighbor not in seen:
+                            seen.add(neighbor)
+                            next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        return [
+            (vertex1, vertex2, self.get_edge_payload(epid))
+            for oid, (vertex1, vertex2, epid) in sorted(edges.items())
+        ]
+
     def store(self, name, obj, c=None):
+        if name in self.stored_resources:
+            return
+
         cc = self.conn.cursor() if c is None else c
-        resource_count = list(
-            cc.execute("SELECT count(*) FROM resources WHERE name = ?", (name,))
-        )[0][0]
-        if resource_count == 0:
-            cc.execute("INSERT INTO resources VALUES (?, ?)", (name, pickle.dumps(obj)))
-            if not c:
-                self.conn.commit()
+        # resource names are unique; storing one again is ignored
+        cc.execute("INSERT INTO resources VALUES (?, ?)", (name, pickle.dumps(obj)))
+        self.stored_resources.add(name)
         if not c:
+            self.conn.commit()
             cc.close()
 
     def resolve(self, name):
@@ -204,12 +372,13 @@ class GraphDatabase:
 
     def resources(self):
         for name, image in self.execute("SELECT name, image from resources"):
-            yield name, pickle.loads(str(image))
+            yield name, pickle.loads(image)
 
     def index(self):
         c = self.conn.cursor()
-        c.execute("CREATE INDEX vertices_label ON vertices (label)")
-        c.execute("CREATE INDEX ep_ids ON payloads (id)")
+        c.execute("CREATE INDEX IF NOT EXISTS ep_ids ON payloads (id)")
+        c.execute("CREATE INDEX IF NOT EXISTS edges_vertex1 ON edges (vertex1)")
+        c.execute("CREATE INDEX IF NOT EXISTS edges_vertex2 ON edges (vertex2)")
         self.conn.commit()
         c.close()
 
@@ -219,26 +388,197 @@ class GraphDatabase:
     def num_edges(self):
         return list(self.execute("SELECT count(*) from edges"))[0][0]
 
-    def incarnate(self, reporter=sys.stdout):
+    def payload_pages(self, page_size):
+        """Returns (first, last) rowid ranges covering the payloads table."""
+        [(first, last)] = self.execute("SELECT min(rowid), max(rowid) FROM payloads")
+        if first is None:
+            return []
+        return [
+            (i, min(i + page_size - 1, last)) for i in range(first, last + 1, page_size)
+        ]
+
+    def decoded_payload_page(self, first, last):
+        """Returns the payload rows with rowids from first to last as (id, type,
+        state) tuples with their states unpickled, in rowid order."""
+        return [
+            (id, type, pickle.loads(state))
+            for id, type, state in self.execute(
+                "SELECT id, type, state FROM payloads WHERE rowid BETWEEN ? AND ? ORDER BY rowid",
+                (first, last),
+            )
+        ]
+
+    def incarnate(self, reporter=sys.stdout, page_size=50000):
+        """Builds a Graph from the database.
+
+        The payloads are streamed and reconstituted in pages of page_size rows.
+        Vertices are added in one call and edges a page at a
+        time with Graph.add_edges."""
         g = Graph()
-        num_vertices = self.num_vertices()
 
-        for i, vertex_label in enumerate(self.all_vertex_labels()):
-            if reporter and i % 5000 == 0:
-                reporter.write("\r%d/%d vertices" % (i, num_vertices))
+        num_payloads = list(self.execute("SELECT count(*) FROM payloads"))[0][0]
+        i = 0
+        for first, last in self.payload_pages(page_size):
+            rows = self.decoded_payload_page(first, last)
+            for id, type, state in rows:
+                if id not in self.payloads_cache:
+                    self.reconstitute_payload(id, type, state)
+            i += len(rows)
+            if reporter:
+                reporter.write("\r%d/%d payloads" % (i, num_payloads))
                 reporter.flush()
-            g.add_vertex(vertex_label)
 
         if reporter:
-            reporter.write("\rLoaded %d vertices %s\n" % (num_vertices, " " * 10))
+            reporter.write("\rLoaded %d payloads %s\n" % (num_payloads, " " * 10))
+
+        labels = dict(self.execute("SELECT id, label FROM vertices ORDER BY id"))
+        g.add_vertices(list(labels.values()))
+        for id, label in labels.items():
+            labels[id] = label.encode("utf-8")
+
+        if reporter:
+            reporter.write("Loaded %d vertices\n" % len(labels))
 
         num_edges = self.num_edges()
-        for i, (vertex1, vertex2, edgetype) in enumerate(self.all_edges()):
-            if i % 5000 == 0:
+        payloads = self.payloads_cache
+        last_id = 0
+        i = 0
+        while True:
+            page = list(
+                self.execute(
+                    "SELECT id, vertex1, vertex2, epid FROM edges WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, page_size),
+                )
+            )
+            if not page:
+                break
+            g.add_edges(
+                (labels[vertex1], labels[vertex2], payloads[epid])
+                for id, vertex1, vertex2, epid in page
+            )
+            last_id = page[-1][0]
+            i += len(page)
+            if reporter:
                 reporter.write("\r%d/%d edges" % (i, num_edges))
                 reporter.flush()
-            g.add_edge(vertex1, vertex2, edgetype)
+
         if reporter:
             reporter.write("\rLoaded %d edges %s\n" % (num_edges, " " * 10))
 
         return g
+
+
+class BulkWriter:
+    """Writes vertices, edges and their payloads and resources to a GraphDatabase
+    in large batches.
+
+    Rows are buffered and inserted with executemany, committing once per batch,
+    and the journal is kept in memory without syncing to disk until the writer
+    is closed. Vertices, payloads and resources are written once however often
+    they are added; a payload is stored as it was when first added. Use it as a
+    context manager, or call close() when done."""
+
+    PRAGMAS = (("journal_mode", "MEMORY"), ("synchronous", "OFF"))
+
+    def __init__(self, gdb, batch_size=100000):
+        self.gdb = gdb
+        self.batch_size = batch_size
+
+        # pragmas can't be changed inside a transaction
+        gdb.commit()
+        self.cursor = gdb.get_cursor()
+        self.restore_pragmas = []
+        for pragma, value in self.PRAGMAS:
+            old_value = self.cursor.execute("PRAGMA %s" % pragma).fetchone()[0]
+            self.restore_pragmas.append((pragma, old_value))
+            self.cursor.execute("PRAGMA %s=%s" % (pragma, value))
+
+        # vertex ids are assigned here, so edges can refer to vertices not yet written
+        self.vertex_ids = dict(
+            (label, id)
+            for (id, label) in self.cursor.execute("SELECT id, label FROM vertices")
+        )
+        self.next_vertex_id = max(self.vertex_ids.values(), default=0) + 1
+        self.payload_ids = set()
+        self.vertices = []
+        self.payloads = []
+        self.edges = []
+        self.resources = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_vertex(self, label):
+        """Buffers a vertex unless it has already been added, and returns its id."""
+        id = self.vertex_ids.get(label)
+        if id is None:
+            id = self.vertex_ids[label] = self.next_vertex_id
+            self.next_vertex_id += 1
+            self.vertices.append((id, label))
+        return id
+
+    def add_payload(self, payload):
+        """Buffers payload, with the components of a Combination and the
+        resources it refers to, and returns its id."""
+        epid = str(payload.soul)
+        if epid in self.payload_ids:
+            return epid
+        self.payload_ids.add(epid)
+
+        if payload.__class__ == Combination:
+            for component in payload.components:
+                self.add_payload(component)
+
+        self.payloads.append(
+            (
+                epid,
+                self.gdb.payload_type_id(payload.__class__, self.cursor),
+                pickle.dumps(payload.__getstate__()),
+            )
+        )
+
+        if hasattr(payload, "__resources__"):
+            for name, resource in payload.__resources__():
+                if name not in self.gdb.stored_resources:
+                    self.gdb.stored_resources.add(name)
+                    self.resources.append((name, pickle.dumps(resource)))
+
+        return epid
+
+    def add_edge(self, from_v_label, to_v_label, payload):
+        """Buffers an edge along with its vertices and payload."""
+        self.edges.append(
+            (
+                self.add_vertex(from_v_label),
+                self.add_vertex(to_v_label),
+                self.add_payload(payload),
+            )
+        )
+
+        if len(self.edges) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows in a single transaction."""
+        c = self.cursor
+        c.executemany("INSERT INTO vertices (id, label) VALUES (?, ?)", self.vertices)
+        c.executemany("INSERT INTO payloads VALUES (?, ?, ?)", self.payloads)
+        c.executemany(
+            "INSERT INTO edges (vertex1, vertex2, epid) VALUES (?, ?, ?)", self.edges
+        )
+        c.executemany("INSERT INTO resources VALUES (?, ?)", self.resources)
+        self.gdb.commit()
+
+        self.vertices = []
+        self.payloads = []
+        self.edges = []
+        self.resources = []
+
+    def close(self):
+        self.flush()
+        for pragma, value in self.restore_pragmas:
+            self.cursor.execute("PRAGMA %s=%s" % (pragma, value))
+        self.cursor.close()
@@ -1,5 +1,6 @@
 import atexit
 from ctypes import (
+    CDLL,
     CFUNCTYPE,
     POINTER,
     PyDLL,
@@ -45,6 +46,10 @@ if not lgs:
         % "\n".join(_dlldirs)
     )
 
+# The same library through a handle whose calls release the interpreter lock, for searches
+# that never call back into python. See Graph.search_lib.
+lgs_nogil = CDLL(_dllpath)
+
 libc_path = find_library("c")
 if libc_path is None:
     raise ImportError("unable to find libc")
@@ -132,6 +137,13 @@ class LGSTypes:
     CH = c_void_p
     Heap = c_void_p
     HeapNode = c_void_p
+    VertexQueue = c_void_p
+    Heuristic = c_void_p
+    SearchWorkspace = c_void_p
+    Raptor = c_void_p
+    RaptorResult = c_void_p
+    ParetoSearch = c_void_p
+    CHProgress = CFUNCTYPE(None, c_long, c_long)
     edgepayload_t = c_int
 
     class ENUM_edgepayload_t:
@@ -181,9 +193,26 @@ declarations = [
     (
         lgs.get_contraction_hierarchies,
         LGSTypes.CH,
-        [LGSTypes.Graph, LGSTypes.WalkOptions, c_int],
+        [
+            LGSTypes.Graph,
+            LGSTypes.WalkOptions,
+            c_int,
+            c_int,
+            c_int,
+            LGSTypes.CHProgress,
+        ],
+    ),
+    (
+        lgs.chShortestPath,
+        LGSTypes.CHPath,
+        [LGSTypes.CH, c_char_p, c_char_p, LGSTypes.State, LGSTypes.WalkOptions],
     ),
+    (lgs.chpN, c_int, [LGSTypes.CHPath]),
+    (lgs.chpGetPayload, LGSTypes.EdgePayload, [LGSTypes.CHPath, c_int]),
     (lgs.chNew, LGSTypes.CH, []),
+    (lgs.chDestroy, None, [LGSTypes.CH]),
+    (lgs.chSave, c_int, [LGSTypes.CH, c_char_p]),
+    (lgs.chLoad, LGSTypes.CH, [c_char_p]),
     (lgs.chUpGraph, LGSTypes.Graph, [LGSTypes.CH]),
     (lgs.chDownGraph, LGSTypes.Graph, [LGSTypes.CH]),
     (lgs.epNew, LGSTypes.EdgePayload, [LGSTypes.edgepayload_t, c_void_p]),
@@ -213,6 +242,18 @@ declarations = [
         LGSTypes.Edge,
         [LGSTypes.Graph, c_char_p, c_char_p, LGSTypes.EdgePayload],
     ),
+    (
+        lgs.gAddEdges,
+        c_long,
+        [
+            LGSTypes.Graph,
+            POINTER(c_char_p),
+            POINTER(c_char_p),
+            POINTER(LGSTypes.EdgePayload),
+            c_long,
+            c_int,
+        ],
+    ),
     (lgs.gVertices, POINTER(LGSTypes.Vertex), [LGSTypes.Graph, POINTER(c_long)]),
     (
         lgs.gShortestPathTree,
@@ -226,6 +267,8 @@ declarations = [
             c_long,
             c_int,
             c_long,
+            LGSTypes.Heuristic,
+            LGSTypes.SearchWorkspace,
         ],
     ),
     (
@@ -240,6 +283,23 @@ declarations = [
             c_long,
             c_int,
             c_long,
+            LGSTypes.Heuristic,
+            LGSTypes.SearchWorkspace,
+        ],
+    ),
+    (
+        lgs.gShortestPathBidirectional,
+        LGSTypes.ShortestPathTree,
+        [
+            LGSTypes.Graph,
+            c_char_p,
+            c_char_p,
+            LGSTypes.State,
+            LGSTypes.WalkOptions,
+            c_long,
+            c_int,
+            c_long,
+            LGSTypes.SearchWorkspace,
         ],
     ),
     (
@@ -258,7 +318,52 @@ declarations = [
             c_long,
         ],
     ),
+    (
+        lgs.gTravelTimeMatrix,
+        None,
+        [
+            LGSTypes.Graph,
+            POINTER(c_char_p),
+            c_long,
+            POINTER(c_char_p),
+            c_long,
+            LGSTypes.State,
+            LGSTypes.WalkOptions,
+            c_long,
+            c_int,
+            POINTER(c_long),
+            POINTER(c_long),
+        ],
+    ),
+    (
+        lgs.gShortestPathArrays,
+        c_long,
+        [
+            LGSTypes.Graph,
+            c_char_p,
+            LGSTypes.State,
+            LGSTypes.WalkOptions,
+            c_long,
+            c_int,
+            c_long,
+            LGSTypes.SearchWorkspace,
+            POINTER(c_long),
+            POINTER(c_long),
+            POINTER(c_long),
+            POINTER(c_size_t),
+        ],
+    ),
+    (lgs.gHasPayloadType, c_int, [LGSTypes.Graph, LGSTypes.edgepayload_t]),
     (lgs.gSize, c_long, [LGSTypes.Graph]),
+    (lgs.gFinalize, None, [LGSTypes.Graph]),
+    (lgs.gIsFinalized, c_int, [LGSTypes.Graph]),
+    (lgs.gIsTimeDependent, c_int, [LGSTypes.Graph]),
+    (lgs.gFreeze, None, [LGSTypes.Graph]),
+    (lgs.gIsFrozen, c_int, [LGSTypes.Graph]),
+    (lgs.gSaveSnapshot, c_int, [LGSTypes.Graph, c_char_p]),
+    (lgs.gLoadSnapshot, LGSTypes.Graph, [c_char_p]),
+    (lgs.gIndexSize, c_long, [LGSTypes.Graph]),
+    (lgs.gGetVertexByIndex, LGSTypes.Vertex, [LGSTypes.Graph, c_long]),
     (lgs.gSetVertexEnabled, None, [LGSTypes.Graph, c_char_p, c_int]),
     (lgs.sptNew, LGSTypes.ShortestPathTree, []),
     (lgs.sptDestroy, None, [LGSTypes.ShortestPathTree]),
@@ -300,6 +405,20 @@ declarations = [
     (lgs.vGetLabel, c_char_p, [LGSTypes.Vertex]),
     (lgs.vDegreeOut, c_int, [LGSTypes.Vertex]),
     (lgs.vDegreeIn, c_int, [LGSTypes.Vertex]),
+    (lgs.vGetIndex, c_long, [LGSTypes.Vertex]),
+    (lgs.vSetCoordinates, None, [LGSTypes.Vertex, c_double, c_double]),
+    (lgs.vHasCoordinates, c_int, [LGSTypes.Vertex]),
+    (lgs.vGetLat, c_double, [LGSTypes.Vertex]),
+    (lgs.vGetLon, c_double, [LGSTypes.Vertex]),
+    (lgs.heurNewGreatCircle, LGSTypes.Heuristic, [c_double]),
+    (lgs.heurDestroy, None, [LGSTypes.Heuristic]),
+    (lgs.heurEstimate, c_long, [LGSTypes.Heuristic, LGSTypes.Vertex, LGSTypes.Vertex]),
+    (lgs.heurGetMaxSpeed, c_double, [LGSTypes.Heuristic]),
+    (lgs.wsNew, LGSTypes.SearchWorkspace, []),
+    (lgs.wsDestroy, None, [LGSTypes.SearchWorkspace]),
+    (lgs.wsInUse, c_int, [LGSTypes.SearchWorkspace]),
+    (lgs.wsCapacity, c_long, [LGSTypes.SearchWorkspace]),
+    (lgs.greatCircleDistance, c_double, [c_double, c_double, c_double, c_double]),
     (lgs.sptvNew, LGSTypes.SPTVertex, [LGSTypes.Vertex, c_int]),
     (lgs.sptvDestroy, None, [LGSTypes.SPTVertex]),
     (
@@ -397,6 +516,7 @@ declarations = [
     (lgs.stateGetNumTransfers, c_int, [LGSTypes.State]),
     (lgs.stateGetPrevEdge, LGSTypes.EdgePayload, [LGSTypes.State]),
     (lgs.stateGetTripId, c_char_p, [LGSTypes.State]),
+    (lgs.stateGetTrip, c_int, [LGSTypes.State]),
     (lgs.stateGetStopSequence, c_int, [LGSTypes.State]),
     (lgs.stateGetNumAgencies, c_int, [LGSTypes.State]),
     (lgs.stateServicePeriod, LGSTypes.ServicePeriod, [LGSTypes.State, c_int]),
@@ -452,6 +572,8 @@ declarations = [
     (lgs.woSetWalkingOverage, None, [LGSTypes.WalkOptions, c_float]),
     (lgs.woGetTurnPenalty, c_int, [LGSTypes.WalkOptions]),
     (lgs.woSetTurnPenalty, None, [LGSTypes.WalkOptions, c_int]),
+    (lgs.woGetQueueType, c_int, [LGSTypes.WalkOptions]),
+    (lgs.woSetQueueType, None, [LGSTypes.WalkOptions, c_int]),
     (lgs.comboNew, LGSTypes.Combination, [c_int]),
     (lgs.comboAdd, None, [LGSTypes.Combination, LGSTypes.EdgePayload]),
     (lgs.comboDestroy, None, [LGSTypes.Combination]),
@@ -471,6 +593,7 @@ declarations = [
     (lgs.crDestroy, None, [LGSTypes.Crossing]),
     (lgs.crAddCrossingTime, None, [LGSTypes.Crossing, c_char_p, c_int]),
     (lgs.crGetCrossingTime, c_int, [LGSTypes.Crossing, c_char_p]),
+    (lgs.crGetCrossingTimeByTrip, c_int, [LGSTypes.Crossing, c_int]),
     (lgs.crGetCrossingTimeTripIdByIndex, c_char_p, [LGSTypes.Crossing, c_int]),
     (lgs.crGetCrossingTimeByIndex, c_int, [LGSTypes.Crossing, c_int]),
     (lgs.crGetSize, c_int, [LGSTypes.Crossing]),
@@ -697,6 +820,7 @@ declarations = [
     (lgs.alGetLastAlightingIndex, c_int, [LGSTypes.TripAlight, c_int]),
     (lgs.alGetOverage, c_int, [LGSTypes.TripAlight]),
     (lgs.alGetAlightingIndexByTripId, c_int, [LGSTypes.TripAlight, c_char_p]),
+    (lgs.alGetAlightingIndexByTrip, c_int, [LGSTypes.TripAlight, c_int]),
     (
         lgs.alWalk,
         LGSTypes.State,
@@ -736,6 +860,7 @@ declarations = [
         [LGSTypes.EdgePayload, LGSTypes.State, LGSTypes.WalkOptions],
     ),
     (lgs.tbGetBoardingIndexByTripId, c_int, [LGSTypes.TripBoard, c_char_p]),
+    (lgs.tbGetBoardingIndexByTrip, c_int, [LGSTypes.TripBoard, c_int]),
     (lgs.waitNew, LGSTypes.Wait, [c_long, LGSTypes.Timezone]),
     (lgs.waitDestroy, None, [LGSTypes.Wait]),
     (
@@ -750,11 +875,89 @@ declarations = [
     ),
     (lgs.waitGetEnd, c_long, [LGSTypes.Wait]),
     (lgs.waitGetTimezone, LGSTypes.Timezone, [LGSTypes.Wait]),
+    (
+        lgs.raptorNew,
+        LGSTypes.Raptor,
+        [
+            c_long,
+            c_long,
+            POINTER(c_long),
+            POINTER(c_long),
+            POINTER(c_long),
+            POINTER(c_long),
+            POINTER(c_long),
+            c_long,
+            POINTER(c_long),
+            POINTER(c_long),
+            POINTER(c_long),
+        ],
+    ),
+    (lgs.raptorDestroy, None, [LGSTypes.Raptor]),
+    (lgs.raptorNStops, c_long, [LGSTypes.Raptor]),
+    (lgs.raptorNTrips, c_long, [LGSTypes.Raptor]),
+    (lgs.raptorTripPattern, c_long, [LGSTypes.Raptor, c_long]),
+    (
+        lgs.raptorDepartures,
+        c_long,
+        [LGSTypes.Raptor, c_long, c_long, c_long, POINTER(c_long)],
+    ),
+    (lgs.rrNew, LGSTypes.RaptorResult, [LGSTypes.Raptor, c_int]),
+    (lgs.rrDestroy, None, [LGSTypes.RaptorResult]),
+    (lgs.rrReset, None, [LGSTypes.RaptorResult]),
+    (lgs.rrRun, c_long, [LGSTypes.RaptorResult, c_long, c_long, c_long]),
+    (
+        lgs.raptorQuery,
+        LGSTypes.RaptorResult,
+        [LGSTypes.Raptor, c_long, c_long, c_long, c_int],
+    ),
+    (lgs.rrRounds, c_int, [LGSTypes.RaptorResult]),
+    (lgs.rrArrival, c_long, [LGSTypes.RaptorResult, c_int, c_long]),
+    (lgs.rrLegs, c_int, [LGSTypes.RaptorResult, c_int, c_long, POINTER(c_long)]),
+    (
+        lgs.gParetoSearch,
+        LGSTypes.ParetoSearch,
+        [
+            LGSTypes.Graph,
+            c_char_p,
+            c_char_p,
+            LGSTypes.State,
+            LGSTypes.WalkOptions,
+            c_int,
+            c_int,
+            c_long,
+            c_int,
+            c_long,
+        ],
+    ),
+    (lgs.psDestroy, None, [LGSTypes.ParetoSearch]),
+    (lgs.psNLabels, c_long, [LGSTypes.ParetoSearch]),
+    (lgs.psBagSize, c_int, [LGSTypes.ParetoSearch, c_long]),
+    (lgs.psBagLabel, c_long, [LGSTypes.ParetoSearch, c_long, c_int]),
+    (lgs.psLabelState, LGSTypes.State, [LGSTypes.ParetoSearch, c_long]),
+    (lgs.psLabelParent, c_long, [LGSTypes.ParetoSearch, c_long]),
+    (lgs.psLabelPayload, LGSTypes.EdgePayload, [LGSTypes.ParetoSearch, c_long]),
+    (lgs.psLabelVertex, LGSTypes.Vertex, [LGSTypes.ParetoSearch, c_long]),
 ]
 
 for d in declarations:
     _declare(*d)
 
+for _name in (
+    "gShortestPathTree",
+    "gShortestPathTreeRetro",
+    "gShortestPathBidirectional",
+    "gTravelTimeMatrix",
+    "gShortestPathArrays",
+    "rrRun",
+    "raptorQuery",
+    "gParetoSearch",
+):
+    _declare(
+        getattr(lgs_nogil, _name),
+        getattr(lgs, _name).restype,
+        getattr(lgs, _name).argtypes,
+    )
+
 
 def caccessor(
     cfunc: Any, restype: Any, ptrclass: Optional[Type[Any]] = None
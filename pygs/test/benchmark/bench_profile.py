@@ -0,0 +1,99 @@
+"""Compare a range (profile) query with one query per minute of the window.
+
+Usage: python bench_profile.py [gtfsdb_filename sample_date]
+
+Finds the journeys between random pairs of stops leaving between 7 and 9am
+with Raptor.profile, and by querying once a minute of the window, over a
+synthetic grid of bus lines or the trips of the given GTFS database running on
+sample_date ("YYYYMMDD"). Given a GTFS database, also times the per-minute
+shortest path trees of its compiled graph.
+"""
+
+from random import Random
+import sys
+
+from bench_utils import timeit
+
+from graphserver.compiler.gdb_import_gtfs import graph_load_gtfsdb, raptor_from_gtfsdb
+from graphserver.core import Raptor, State, WalkOptions, shortest_path_tree
+from graphserver.ext.gtfs.gtfsdb import GTFSDatabase, parse_gtfs_date
+from graphserver.util import TimeHelpers
+
+EARLIEST = 7 * 3600
+LATEST = 9 * 3600
+
+
+def grid_timetable(n: int, headway: int = 600, hop: int = 90, seed: int = 0):
+    """a line along each row and column of an n x n grid of stops, both ways, with
+    trips every headway seconds from 6 to 10am"""
+    rand = Random(seed)
+    stop_ids = ["%d-%d" % (i, j) for i in range(n) for j in range(n)]
+    lines = [["%d-%d" % (i, j) for j in range(n)] for i in range(n)]
+    lines += [["%d-%d" % (i, j) for i in range(n)] for j in range(n)]
+    lines += [list(reversed(line)) for line in lines]
+
+    patterns = []
+    for li, line in enumerate(lines):
+        start = 6 * 3600 + rand.randrange(headway)
+        trips = []
+        for t in range(start, 10 * 3600, headway):
+            times = [t + i * hop for i in range(len(line))]
+            trips.append(("%d.%d" % (li, t), times, times))
+        patterns.append((line, trips))
+    return Raptor(stop_ids, patterns)
+
+
+def naive(raptor, origin, destination):
+    for departure in range(EARLIEST, LATEST + 1, 60):
+        raptor.journeys(origin, destination, departure)
+
+
+def naive_graph(graph, day_start, origin, destination):
+    wo = WalkOptions()
+    for departure in range(EARLIEST, LATEST + 1, 60):
+        state = State(1, day_start + departure)
+        spt = shortest_path_tree(
+            graph, "sta-" + origin, "sta-" + destination, state, wo
+        )
+        spt.destroy()
+    wo.destroy()
+
+
+def main():
+    graph = None
+    if len(sys.argv) > 2:
+        gtfsdb = GTFSDatabase(sys.argv[1])
+        raptor = raptor_from_gtfsdb(gtfsdb, sample_date=sys.argv[2], reporter=None)
+        graph = graph_load_gtfsdb("a", gtfsdb, reporter=None)
+        year, month, day = parse_gtfs_date(sys.argv[2])
+        day_start = TimeHelpers.localtime_to_unix(
+            year, month, day, 0, 0, 0, gtfsdb.agency_timezone_name()
+        )
+    else:
+        raptor = grid_timetable(30)
+
+    rand = Random(0)
+    pairs = [tuple(rand.sample(raptor.stop_ids, 2)) for _ in range(10)]
+    print(
+        "%d stops, %d trips, %d pairs"
+        % (len(raptor.stop_ids), len(raptor.trip_ids), len(pairs))
+    )
+
+    n_profile = sum(len(raptor.profile(o, d, EARLIEST, LATEST)) for o, d in pairs)
+    print("%d profile journeys" % n_profile)
+
+    secs = timeit(
+        lambda: [raptor.profile(o, d, EARLIEST, LATEST) for o, d in pairs], repeat=3
+    )
+    print("profile             %8.2f ms/pair" % (1000 * secs / len(pairs)))
+    secs = timeit(lambda: [naive(raptor, o, d) for o, d in pairs], repeat=3)
+    print("raptor per minute   %8.2f ms/pair" % (1000 * secs / len(pairs)))
+    if graph is not None:
+        secs = timeit(
+            lambda: [naive_graph(graph, day_start, o, d) for o, d in pairs], repeat=1
+        )
+        print("graph per minute    %8.2f ms/pair" % (1000 * secs / len(pairs)))
+
+
+if __name__ == "__main__":
+    main()
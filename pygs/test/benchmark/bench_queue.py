@@ -0,0 +1,76 @@
+"""Compare the router's priority queue implementations.
+
+Usage: python bench_queue.py [graphdb_filename]
+
+Runs full shortest path trees from a fixed set of random origins with each
+WalkOptions.queue_type, over the given graph database or a synthetic street
+grid, on the mutable form of the graph and on the frozen form loaded from a
+snapshot, each in its own process.
+"""
+
+import multiprocessing
+import os
+from random import Random
+import sys
+import tempfile
+
+from bench_utils import grid_graph, load_graph, timeit
+
+from graphserver.core import Graph, State, WalkOptions, shortest_path_tree
+
+QUEUE_TYPES = [
+    ("fibonacci", WalkOptions.QUEUE_FIBONACCI),
+    ("4-ary", WalkOptions.QUEUE_DARY),
+    ("radix", WalkOptions.QUEUE_RADIX),
+]
+
+
+def run(graph, origins, queue_type):
+    wo = WalkOptions()
+    wo.queue_type = queue_type
+    for origin in origins:
+        spt = shortest_path_tree(graph, origin, None, State(1, 0), wo)
+        spt.destroy()
+    wo.destroy()
+
+
+def bench_form(form, graphdb_filename, snapshot_filename):
+    if form == "frozen":
+        graph = Graph.load_snapshot(snapshot_filename)
+    elif graphdb_filename is not None:
+        graph = load_graph(graphdb_filename)
+    else:
+        graph = grid_graph(200)
+
+    labels = [vv.label for vv in graph.vertices]
+    origins = Random(0).sample(labels, min(20, len(labels)))
+    if form == "mutable":
+        print("%d vertices, %d origins" % (len(labels), len(origins)))
+
+    for name, queue_type in QUEUE_TYPES:
+        secs = timeit(lambda: run(graph, origins, queue_type), repeat=3)
+        print("%-8s %-10s %8.1f ms/query" % (form, name, 1000 * secs / len(origins)))
+
+
+def main():
+    graphdb_filename = sys.argv[1] if len(sys.argv) > 1 else None
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        snapshot_filename = os.path.join(tmpdir, "graph.snapshot")
+        graph = load_graph(graphdb_filename) if graphdb_filename else grid_graph(200)
+        graph.save_snapshot(snapshot_filename)
+        graph.destroy()
+
+        # each form is timed in a fresh process, on a graph built or mapped in
+        # directly, so neither runs on a heap fragmented by the other or by freezing
+        ctx = multiprocessing.get_context("spawn")
+        for form in ("mutable", "frozen"):
+            proc = ctx.Process(
+                target=bench_form, args=(form, graphdb_filename, snapshot_filename)
+            )
+            proc.start()
+            proc.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import os
+from random import Random
+import sys
+import time
+
+# the graphs shared with the unit tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import fixtures
+
+from graphserver.core import Graph
+
+
+def grid_graph(n: int, seed: int = 0) -> Graph:
+    """n x n grid of two-way streets with randomized lengths, a stand-in for a
+    street network when no graph database is given."""
+    rand = Random(seed)
+    return fixtures.grid_graph(n, length=lambda i, j, ii, jj: rand.uniform(50, 250))
+
+
+def load_graph(graphdb_filename: str) -> Graph:
+    from graphserver.graphdb import GraphDatabase
+
+    return GraphDatabase(graphdb_filename).incarnate(reporter=None)
+
+
+def timeit(func, repeat: int) -> float:
+    """best wall-clock seconds of 'repeat' calls to func"""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
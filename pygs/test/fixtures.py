@@ -0,0 +1,113 @@
+"""Graphs and feeds shared by the unit tests and the benchmarks."""
+
+from math import ceil
+import os
+from zipfile import ZipFile
+
+from graphserver.core import Graph, Street
+from graphserver.ext.gtfs.gtfsdb import GTFSDatabase
+from graphserver.vincenty import vincenty
+
+
+def grid_graph(n, spacing=0.001, length=None):
+    """n x n grid of two-way streets at 47.6N, spacing degrees apart.
+
+    Each street is as long as its grid step, or length(i, j, ii, jj) for the
+    street between vertices "i-j" and "ii-jj" if length is given."""
+    gg = Graph()
+    for i in range(n):
+        for j in range(n):
+            vv = gg.add_vertex("%d-%d" % (i, j))
+            vv.set_coordinates(47.6 + i * spacing, -122.3 + j * spacing)
+    for i in range(n):
+        for j in range(n):
+            for ii, jj in ((i + 1, j), (i, j + 1)):
+                if ii == n or jj == n:
+                    continue
+                here = gg.get_vertex("%d-%d" % (i, j))
+                there = gg.get_vertex("%d-%d" % (ii, jj))
+                if length is None:
+                    ll = ceil(vincenty(here.lat, here.lon, there.lat, there.lon))
+                else:
+                    ll = length(i, j, ii, jj)
+                gg.add_edge(here.label, there.label, Street("s", ll))
+                gg.add_edge(there.label, here.label, Street("s", ll))
+    return gg
+
+
+FEED = {
+    "agency": [
+        "agency_id,agency_name,agency_url,agency_timezone",
+        "A,Agency,http://example.com,America/Los_Angeles",
+    ],
+    "stops": ["stop_id,stop_name,stop_lat,stop_lon"]
+    + ["S%d,Stop %d,47.6%d,-122.3" % (i, i, i) for i in range(1, 7)],
+    "routes": [
+        "route_id,agency_id,route_short_name,route_long_name,route_type",
+        "R1,A,1,Local,3",
+        "R2,A,2,Crosstown,3",
+        "R3,A,3,Direct,3",
+    ],
+    "calendar": [
+        "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,"
+        "start_date,end_date",
+        "WK,1,1,1,1,1,0,0,20240101,20241231",
+        "WE,0,0,0,0,0,1,1,20240101,20241231",
+    ],
+    "trips": [
+        "route_id,service_id,trip_id",
+        "R1,WK,t1",
+        "R1,WK,t2",
+        "R1,WK,t7",
+        "R1,WE,t6",
+        "R2,WK,t3",
+        "R2,WK,t4",
+        "R3,WK,t5",
+    ],
+    "stop_times": ["trip_id,arrival_time,departure_time,stop_id,stop_sequence"]
+    + [
+        "%s,%s:00,%s:00,%s,%d" % (trip, t, t, stop, i)
+        for trip, times in (
+            ("t1", ("08:00", "08:10", "08:20", "08:30")),
+            ("t2", ("08:30", "08:40", "08:50", "09:00")),
+            # overtakes t1
+            ("t7", ("08:15", "08:19", "08:24", "08:28")),
+            ("t6", ("06:00", "06:10", "06:20", "06:30")),
+        )
+        for i, (stop, t) in enumerate(zip(("S1", "S2", "S3", "S4"), times))
+    ]
+    + [
+        "t3,08:25:00,08:25:00,S3,0",
+        "t3,08:40:00,08:40:00,S5,1",
+        "t4,08:55:00,08:55:00,S3,0",
+        "t4,09:10:00,09:10:00,S5,1",
+        "t5,08:05:00,08:05:00,S1,0",
+        "t5,09:00:00,09:00:00,S5,1",
+    ],
+    "transfers": [
+        "from_stop_id,to_stop_id,transfer_type,min_transfer_time",
+        "S4,S6,2,120",
+    ],
+}
+
+
+def hms(h, m):
+    return h * 3600 + m * 60
+
+
+def load_feed(dirname, feed=FEED):
+    """feed as a GTFSDatabase in dirname"""
+    zip_filename = os.path.join(dirname, "feed.zip")
+    with ZipFile(zip_filename, "w") as zf:
+        for name, table_def in GTFSDatabase.GTFS_DEF:
+            if name not in feed:
+                continue
+            # the loader wants every column of the table
+            header = feed[name][0].split(",")
+            missing = [f[0] for f in table_def if f[0] not in header]
+            lines = [",".join(header + missing)]
+            lines += [line + "," * len(missing) for line in feed[name][1:]]
+            zf.writestr(name + ".txt", "\n".join(lines) + "\n")
+    gtfsdb = GTFSDatabase(os.path.join(dirname, "gtfs.db"))
+    gtfsdb.load_gtfs(zip_filename)
+    return gtfsdb
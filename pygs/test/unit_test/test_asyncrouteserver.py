@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from graphserver.ext.routeserver.asyncserver import AsyncRouteServer
+from graphserver.ext.routeserver.events import AllEdgeEvent, AllVertexEvent
+from graphserver.ext.routeserver.routeserver import RouteServer
+from graphserver.graphdb import GraphDatabase
+
+from ..fixtures import grid_graph
+
+
+async def get(app, path, query):
+    """Runs an ASGI http request and returns the status and the body chunks"""
+    scope = {"type": "http", "path": path, "query_string": query.encode()}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    assert messages[0]["type"] == "http.response.start"
+    assert not messages[-1].get("more_body")
+    return messages[0]["status"], [m["body"] for m in messages[1:]]
+
+
+class TestAsyncRouteServer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        gdb_file = os.path.join(self.tmpdir.name, "grid.db")
+        gg = grid_graph(5)
+        GraphDatabase(gdb_file).populate(gg)
+        gg.destroy()
+
+        self.rs = RouteServer(gdb_file, [AllVertexEvent()], [AllEdgeEvent()], [])
+
+    def tearDown(self):
+        self.rs.graph.destroy()
+        self.tmpdir.cleanup()
+
+    def test_path(self):
+        app = AsyncRouteServer(self.rs, window=0.05, threads=2)
+
+        async def queries():
+            # two busy origins and a query with other walk options
+            return await asyncio.gather(
+                *[
+                    get(app, "/path", "origin=0-0&dest=4-%d&currtime=0" % j)
+                    for j in range(5)
+                ],
+                *[
+                    get(app, "/path", "origin=2-2&dest=%d-0&currtime=0" % i)
+                    for i in range(5)
+                ],
+                get(app, "/path", "origin=0-0&dest=4-4&currtime=0&walking_speed=2"),
+                get(app, "/path", "origin=0-0&dest=bogus&currtime=0"),
+                get(app, "/path", "origin=0-0"),
+            )
+
+        results = asyncio.run(queries())
+        assert app.n_searches == 3
+
+        for status, chunks in results[:11]:
+            assert status == 200
+            # a chunk per narrative event
+            assert len(chunks) > 3
+            ret = json.loads(b"".join(chunks))
+            assert ret["narrative"][0][0] == "AllVertexEvent"
+            assert ret["performance"]["batch_size"] in (1, 5, 6)
+
+        # the paths are as short as those of separate searches
+        def n_edges(body):
+            narrative = json.loads(body)["narrative"]
+            return len([event for event in narrative if event[0] == "AllEdgeEvent"])
+
+        expected = n_edges(self.rs.path("0-0", "4-2", currtime=0))
+        assert n_edges(b"".join(results[2][1])) == expected
+
+        status, chunks = results[11]
+        assert status == 200
+        assert "error" in json.loads(b"".join(chunks))
+        assert results[12][0] == 400
+
+        assert asyncio.run(get(app, "/nothing", ""))[0] == 404
+        status, chunks = asyncio.run(get(app, "/vertices", ""))
+        assert "0-0" in b"".join(chunks).decode().split("\n")
+
+        app.executor.shutdown()
+
+    def test_workspaces(self):
+        self.rs.max_idle_workspaces = 1
+        with self.rs.workspace() as ws1:
+            with self.rs.workspace() as ws2:
+                assert ws1 is not ws2
+        # one is kept for the next query, the other destroyed
+        assert self.rs._workspaces == [ws2]
+        assert ws1.soul is None
+
+        json.loads(self.rs.path("0-0", "4-4", currtime=0))
+        json.loads(self.rs.path("0-0", "bogus", currtime=0))
+        assert self.rs._workspaces == [ws2]
+        assert not ws2.in_use
+
+
+if __name__ == "__main__":
+    tl = unittest.TestLoader()
+
+    suite = tl.loadTestsFromTestCase(TestAsyncRouteServer)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -1,6 +1,36 @@
+import io
+import os
 import unittest
 
-from graphserver.core import ContractionHierarchy
+from graphserver.core import (
+    ContractionHierarchy,
+    NoOpPyPayload,
+    State,
+    Street,
+    WalkOptions,
+    get_contraction_hierarchies,
+    shortest_path_tree,
+)
+
+from .. import fixtures
+
+
+def grid_graph(n):
+    def length(i, j, ii, jj):
+        if ii > i:
+            return 100 + (i * 37 + j * 11) % 50
+        return 100 + (i * 13 + j * 29) % 50
+
+    return fixtures.grid_graph(n, length=length)
+
+
+def ch_weight(ch, fromv, tov, wo):
+    # walk the unpacked path, which only holds the original payloads
+    state = State(0, 0)
+    for payload in ch.shortest_path(fromv, tov, State(0, 0), wo):
+        assert isinstance(payload, Street)
+        state = payload.walk(state, wo)
+    return state.weight
 
 
 class TestCH(unittest.TestCase):
@@ -11,6 +41,91 @@ class TestCH(unittest.TestCase):
         assert ch.upgraph.soul
         assert ch.downgraph.soul
 
+    def test_preserves_weights(self):
+        wo = WalkOptions()
+        gg = grid_graph(6)
+        expected = {}
+        for origin in ("0-0", "2-3", "5-1"):
+            spt = shortest_path_tree(gg, origin, None, State(0, 0), wo)
+            for vv in spt.vertices:
+                expected[(origin, vv.label)] = vv.state.weight
+            spt.destroy()
+
+        reporter = io.StringIO()
+        ch = get_contraction_hierarchies(gg, wo, threads=2, reporter=reporter)
+        assert gg.size == 0
+        assert ch.upgraph.size == ch.downgraph.size == 36
+        assert reporter.getvalue().endswith("contracted 36/36 vertices\n")
+
+        for (origin, target), weight in expected.items():
+            if origin != target:
+                assert ch_weight(ch, origin, target, wo) == weight
+
+        # tight witness search limits only add shortcuts
+        gg = grid_graph(6)
+        limited = get_contraction_hierarchies(gg, wo, search_limit=1, settled_limit=2)
+        assert len(limited.upgraph.edges) >= len(ch.upgraph.edges)
+        for (origin, target), weight in expected.items():
+            if origin != target:
+                assert ch_weight(limited, origin, target, wo) == weight
+
+        wo.destroy()
+
+    def test_shortest_path(self):
+        wo = WalkOptions()
+        gg = grid_graph(5)
+        gg.add_vertex("island")
+        ch = get_contraction_hierarchies(gg, wo)
+
+        path = ch.shortest_path("0-0", "4-4", State(0, 0), wo)
+        assert len(path) == 8
+        assert ch.shortest_path("2-2", "2-2", State(0, 0), wo) == []
+        assert ch.shortest_path("0-0", "island", State(0, 0), wo) is None
+        assert ch.shortest_path("0-0", "nowhere", State(0, 0), wo) is None
+        wo.destroy()
+
+    def test_save_load(self):
+        wo = WalkOptions()
+        ch = get_contraction_hierarchies(grid_graph(5), wo)
+        ch_file = os.path.join(os.path.dirname(__file__), "unit_test.ch")
+        ch.save(ch_file)
+
+        loaded = ContractionHierarchy.load(ch_file)
+        os.remove(ch_file)
+        assert loaded.upgraph.frozen and loaded.downgraph.frozen
+        assert loaded.upgraph.size == loaded.downgraph.size == 25
+        assert len(loaded.upgraph.edges) == len(ch.upgraph.edges)
+        for origin, target in (("0-0", "4-4"), ("3-1", "0-2"), ("2-2", "2-3")):
+            weight = ch_weight(ch, origin, target, wo)
+            assert ch_weight(loaded, origin, target, wo) == weight
+
+        path = loaded.shortest_path("0-0", "4-4", State(0, 0), wo)
+        assert [payload.name for payload in path] == [
+            payload.name for payload in ch.shortest_path("0-0", "4-4", State(0, 0), wo)
+        ]
+        loaded.destroy()
+
+        self.assertRaises(IOError, ContractionHierarchy.load, ch_file)
+
+        ch.upgraph.add_edge("0-0", "0-1", NoOpPyPayload(1.1))
+        self.assertRaises(ValueError, ch.save, ch_file)
+        assert not os.path.exists(ch_file)
+        wo.destroy()
+
+    def test_threads(self):
+        wo = WalkOptions()
+        hierarchies = []
+        for threads in (1, 4):
+            ch = get_contraction_hierarchies(grid_graph(8), wo, threads=threads)
+            hierarchies.append(
+                sorted(
+                    (ee.from_v.label, ee.to_v.label, ee.payload.__class__.__name__)
+                    for ee in ch.upgraph.edges
+                )
+            )
+        assert hierarchies[0] == hierarchies[1]
+        wo.destroy()
+
 
 if __name__ == "__main__":
     tl = unittest.TestLoader()
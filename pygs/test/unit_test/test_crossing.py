@@ -33,6 +33,25 @@ class TestCrossing(unittest.TestCase):
         assert cr.get_crossing(1) == ("2", 20)
         assert cr.get_crossing(2) == ("3", 30)
 
+    def test_many_crossings(self):
+        cr = Crossing()
+        for i in range(500):
+            cr.add_crossing_time("many-%d" % i, i)
+        # a trip listed twice crosses in its first time
+        cr.add_crossing_time("many-7", 1000)
+
+        assert cr.size == 501
+        for i in range(500):
+            assert cr.get_crossing_time("many-%d" % i) == i
+        assert cr.get_crossing(500) == ("many-7", 1000)
+        assert cr.get_crossing_time("many-500") is None
+
+        s = State(1, 0)
+        assert s.trip == -1
+        s.dangerous_set_trip_id("many-250")
+        assert s.trip != -1
+        assert cr.walk(s, WalkOptions()).time == 250
+
     def test_pickle_and_reconstitute(self):
         cr = Crossing()
 
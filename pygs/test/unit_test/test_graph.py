@@ -1,16 +1,31 @@
+import os
 import unittest
 
 from graphserver.core import (
+    Crossing,
     Graph,
     Link,
+    NoOpPyPayload,
+    ServiceCalendar,
     ShortestPathTree,
     State,
     Street,
+    Timezone,
+    TimezonePeriod,
+    TripAlight,
+    TripBoard,
+    Wait,
     WalkOptions,
     get_contraction_hierarchies,
+    shortest_path_bidirectional,
     shortest_path_tree,
     shortest_path_tree_retro,
 )
+from graphserver.core.exceptions import FrozenGraphError, VertexNotFoundError
+
+
+def label(i, j):
+    return "%d-%d" % (i, j)
 
 
 class TestGraph(unittest.TestCase):
@@ -79,6 +94,65 @@ class TestGraph(unittest.TestCase):
 
         g.destroy()
 
+    def test_add_edges(self):
+        g = Graph()
+
+        g.add_edges(
+            (("a%d" % i, b"a%d" % (i + 1), Street("s%d" % i, 1)) for i in range(25)),
+            add_vertices=True,
+            batch_size=10,
+        )
+        assert g.size == 26
+        assert len(g.edges) == 25
+        assert g.get_vertex("a3").outgoing[0].payload.name == "s3"
+        assert g.get_vertex("a3").incoming[0].from_v.label == "a2"
+
+        # the edges before a missing vertex are kept
+        edges = [("a0", "a25", Link()), ("a0", "nowhere", Link())]
+        self.assertRaises(VertexNotFoundError, g.add_edges, edges)
+        assert len(g.edges) == 26
+
+        g.freeze()
+        self.assertRaises(FrozenGraphError, g.add_edges, [("a0", "a1", Link())])
+        g.destroy()
+
+    def test_travel_time_matrix(self):
+        g = Graph()
+        g.add_edges(
+            [
+                (label(i, j), label(i + di, j + dj), Street("s", 100 + 10 * i + j))
+                for i in range(6)
+                for j in range(6)
+                for di, dj in ((0, 1), (1, 0), (0, -1), (-1, 0))
+                if 0 <= i + di < 6 and 0 <= j + dj < 6
+            ],
+            add_vertices=True,
+        )
+        g.add_vertex("island")
+
+        wo = WalkOptions()
+        origins = ["0-0", "2-3", "5-5", "nowhere"]
+        destinations = ["0-0", "4-1", "1-5", "island", "nowhere"]
+        expected_times, expected_weights = [], []
+        for origin in origins[:3]:
+            spt = shortest_path_tree(g, origin, None, State(0, 1000), wo)
+            states = [spt.get_vertex(dest).state for dest in destinations[:3]]
+            expected_times.append([state.time - 1000 for state in states] + [-1, -1])
+            expected_weights.append([state.weight for state in states] + [-1, -1])
+            spt.destroy()
+        expected_times.append([-1] * 5)
+        expected_weights.append([-1] * 5)
+
+        for threads in (1, 3):
+            times, weights = g.travel_time_matrix(
+                origins, destinations, State(0, 1000), wo, threads=threads
+            )
+            assert [list(row) for row in times] == expected_times
+            assert [list(row) for row in weights] == expected_weights
+
+        wo.destroy()
+        g.destroy()
+
     def test_add_edge_effects_vertices(self):
         g = Graph()
 
@@ -423,6 +497,293 @@ class TestGraph(unittest.TestCase):
         assert ch.upgraph.get_vertex("A").outgoing[0].payload.soul == absoul
         assert ch.downgraph.get_vertex("B").outgoing[0].payload.soul == basoul
 
+    def test_vertex_index(self):
+        gg = Graph()
+        gg.add_vertex("A")
+        gg.add_vertex("B")
+        gg.add_vertex("C")
+
+        assert [gg.get_vertex(x).index for x in "ABC"] == [0, 1, 2]
+        assert gg.get_vertex_by_index(1).label == "B"
+        assert gg.get_vertex_by_index(3) is None
+
+        gg.remove_vertex("B")
+        assert gg.get_vertex_by_index(1) is None
+
+        gg.finalize()
+        assert gg.get_vertex("A").index == 0
+        assert gg.get_vertex("C").index == 1
+        assert gg.get_vertex_by_index(1).label == "C"
+
+        gg.destroy()
+
+    def test_finalize(self):
+        gg = Graph()
+        for label in "ABCDE":
+            gg.add_vertex(label)
+        gg.add_edge("A", "B", Street("AB", 1000))
+        gg.add_edge("A", "C", Street("AC", 500))
+        gg.add_edge("C", "B", Street("CB", 100))
+        gg.add_edge("B", "D", Street("BD", 1000))
+        gg.add_edge("D", "E", Street("DE", 1000))
+        assert not gg.finalized
+
+        spt = shortest_path_tree(gg, "A", None, State(0, 0), WalkOptions())
+        expected = dict((x, spt.get_vertex(x).state.weight) for x in "ABCDE")
+        spt.destroy()
+
+        gg.finalize()
+        assert gg.finalized
+
+        spt = shortest_path_tree(gg, "A", None, State(0, 0), WalkOptions())
+        assert dict((x, spt.get_vertex(x).state.weight) for x in "ABCDE") == expected
+        vertices, edges = spt.path("B")
+        assert [vv.label for vv in vertices] == ["A", "C", "B"]
+        spt.destroy()
+
+        retro = shortest_path_tree_retro(gg, None, "E", State(0, 100000), WalkOptions())
+        assert retro.get_vertex("A") is not None
+        retro.destroy()
+
+        # structural changes invalidate the CSR adjacency
+        gg.add_edge("E", "A", Street("EA", 1))
+        assert not gg.finalized
+
+        gg.destroy()
+
+    def test_queue_types(self):
+        def label(i, j):
+            return "%d-%d" % (i, j)
+
+        gg = Graph()
+        for i in range(10):
+            for j in range(10):
+                gg.add_vertex(label(i, j))
+        for i in range(10):
+            for j in range(10):
+                if i < 9:
+                    length = 100 + (i * 37 + j * 11) % 50
+                    gg.add_edge(label(i, j), label(i + 1, j), Street("x", length))
+                    gg.add_edge(label(i + 1, j), label(i, j), Street("x", length))
+                if j < 9:
+                    length = 100 + (i * 13 + j * 29) % 50
+                    gg.add_edge(label(i, j), label(i, j + 1), Street("y", length))
+                    gg.add_edge(label(i, j + 1), label(i, j), Street("y", length))
+
+        weights = []
+        for queue_type in (
+            WalkOptions.QUEUE_FIBONACCI,
+            WalkOptions.QUEUE_DARY,
+            WalkOptions.QUEUE_RADIX,
+        ):
+            wo = WalkOptions()
+            wo.queue_type = queue_type
+            spt = shortest_path_tree(gg, "0-0", None, State(0, 0), wo)
+            assert spt.size == 100
+            weights.append(dict((vv.label, vv.state.weight) for vv in spt.vertices))
+            spt.destroy()
+
+            retro = shortest_path_tree_retro(gg, None, "0-0", State(0, 100000), wo)
+            assert retro.size == 100
+            retro.destroy()
+            wo.destroy()
+
+        assert weights[0] == weights[1] == weights[2]
+
+        gg.destroy()
+
+    def test_bidirectional(self):
+        def label(i, j):
+            return "%d-%d" % (i, j)
+
+        gg = Graph()
+        for i in range(20):
+            for j in range(20):
+                gg.add_vertex(label(i, j))
+        for i in range(20):
+            for j in range(20):
+                if i < 19:
+                    length = 100 + (i * 37 + j * 11) % 50
+                    gg.add_edge(label(i, j), label(i + 1, j), Street("x", length))
+                    gg.add_edge(label(i + 1, j), label(i, j), Street("x", length))
+                if j < 19:
+                    length = 100 + (i * 13 + j * 29) % 50
+                    gg.add_edge(label(i, j), label(i, j + 1), Street("y", length))
+                    gg.add_edge(label(i, j + 1), label(i, j), Street("y", length))
+        assert not gg.time_dependent
+
+        full = shortest_path_tree(gg, "5-5", None, State(0, 0))
+        for target in ("5-5", "5-6", "8-9", "12-3", "19-19", "0-0"):
+            spt = shortest_path_bidirectional(gg, "5-5", target, State(0, 0))
+            assert spt.size < full.size or target in ("19-19", "0-0")
+            weight = full.get_vertex(target).state.weight
+            assert spt.get_vertex(target).state.weight == weight
+
+            vertices, edges = spt.path(target)
+            assert vertices[0].label == "5-5"
+            assert vertices[-1].label == target
+            assert len(edges) == len(vertices) - 1
+            spt.destroy()
+        full.destroy()
+
+        # turn penalties make the weight of an edge depend on the edge before it
+        wo = WalkOptions()
+        wo.turn_penalty = 10
+        full = shortest_path_tree(gg, "5-5", "8-9", State(0, 0), wo)
+        spt = shortest_path_bidirectional(gg, "5-5", "8-9", State(0, 0), wo)
+        assert spt.size == full.size
+        spt.destroy()
+        full.destroy()
+        wo.destroy()
+
+        # as does the walked distance, past max_walk
+        wo = WalkOptions()
+        wo.max_walk = 500
+        full = shortest_path_tree(gg, "5-5", "8-9", State(0, 0), wo)
+        spt = shortest_path_bidirectional(gg, "5-5", "8-9", State(0, 0), wo)
+        weight = full.get_vertex("8-9").state.weight
+        assert spt.get_vertex("8-9").state.weight == weight
+        spt.destroy()
+        full.destroy()
+        wo.destroy()
+
+        # time-dependent payloads fall back to a forward search
+        tz = Timezone()
+        tz.add_period(TimezonePeriod(0, 100000, 0))
+        gg.add_edge("0-0", "0-1", Wait(100, tz))
+        assert gg.time_dependent
+        gg.finalize()
+        assert gg.time_dependent
+        full = shortest_path_tree(gg, "5-5", "8-9", State(0, 0))
+        spt = shortest_path_bidirectional(gg, "5-5", "8-9", State(0, 0))
+        assert spt.size == full.size
+        spt.destroy()
+        full.destroy()
+
+        gg.destroy()
+
+    def test_freeze(self):
+        gg = Graph()
+        for label in "ABCDE":
+            gg.add_vertex(label)
+        gg.add_edge("A", "B", Street("AB", 1000))
+        gg.add_edge("A", "C", Street("AC", 500))
+        gg.add_edge("C", "B", Street("CB", 100))
+        gg.add_edge("B", "D", Street("BD", 1000))
+        gg.add_edge("D", "E", Street("DE", 1000))
+        gg.remove_vertex("E")
+
+        spt = shortest_path_tree(gg, "A", None, State(0, 0), WalkOptions())
+        expected = dict((x, spt.get_vertex(x).state.weight) for x in "ABCD")
+        spt.destroy()
+
+        gg.freeze()
+        assert gg.frozen
+        assert gg.finalized
+        assert gg.size == 4
+        assert sorted(vv.label for vv in gg.vertices) == ["A", "B", "C", "D"]
+        assert gg.get_vertex("B").degree_in == 2
+        assert [ee.to_v.label for ee in gg.get_vertex("A").outgoing] == ["C", "B"]
+        assert [ee.from_v.label for ee in gg.get_vertex("B").incoming] == ["C", "A"]
+        assert gg.get_vertex("C").outgoing[0].payload.name == "CB"
+
+        spt = shortest_path_tree(gg, "A", None, State(0, 0), WalkOptions())
+        assert dict((x, spt.get_vertex(x).state.weight) for x in "ABCD") == expected
+        vertices, edges = spt.path("B")
+        assert [vv.label for vv in vertices] == ["A", "C", "B"]
+        spt.destroy()
+
+        retro = shortest_path_tree_retro(gg, None, "D", State(0, 100000), WalkOptions())
+        assert retro.get_vertex("A") is not None
+        retro.destroy()
+
+        self.assertRaises(FrozenGraphError, gg.add_vertex, "F")
+        self.assertRaises(FrozenGraphError, gg.add_edge, "A", "D", Street("AD", 1))
+        self.assertRaises(FrozenGraphError, gg.remove_vertex, "A")
+        assert gg.size == 4
+
+        gg.destroy()
+
+    def test_snapshot(self):
+        sc = ServiceCalendar()
+        sc.add_period(0, 86400, ["WKDY"])
+        sc.add_period(86400, 2 * 86400, ["SAT"])
+        tz = Timezone()
+        tz.add_period(TimezonePeriod(0, 2 * 86400, -3600))
+
+        gg = Graph()
+        for label in "ABCDEW":
+            gg.add_vertex(label)
+        gg.get_vertex("A").set_coordinates(45.5, -122.6)
+        gg.add_edge("A", "B", Street("AB", 100))
+        tb = TripBoard("WKDY", sc, tz, 0)
+        tb.add_boarding("trip1", 7200, 1)
+        tb.add_boarding("trip2", 9000, 1)
+        gg.add_edge("B", "C", tb)
+        cr = Crossing()
+        cr.add_crossing_time("trip1", 600)
+        cr.add_crossing_time("trip2", 540)
+        gg.add_edge("C", "D", cr)
+        al = TripAlight("WKDY", sc, tz, 0)
+        al.add_alighting("trip1", 7800, 2)
+        al.add_alighting("trip2", 9540, 2)
+        gg.add_edge("D", "E", al)
+        gg.add_edge("A", "W", Wait(7000, tz))
+        gg.add_edge("B", "A", Street("BA", 100)).enabled = False
+
+        def weights(graph):
+            spt = shortest_path_tree(graph, "A", None, State(1, 7000), WalkOptions())
+            ret = dict(
+                (vv.label, (vv.state.time, vv.state.weight)) for vv in spt.vertices
+            )
+            spt.destroy()
+            return ret
+
+        expected = weights(gg)
+        assert set(expected) == set("ABCDEW")
+
+        snapshot_file = os.path.join(os.path.dirname(__file__), "unit_test.gsnap")
+        gg.save_snapshot(snapshot_file)
+        assert Graph.is_snapshot(snapshot_file)
+        loaded = Graph.load_snapshot(snapshot_file)
+        os.remove(snapshot_file)
+
+        assert loaded.frozen
+        assert loaded.size == 6
+        assert (loaded.get_vertex("A").lat, loaded.get_vertex("A").lon) == (
+            45.5,
+            -122.6,
+        )
+        assert loaded.get_vertex("B").lat is None
+        assert weights(loaded) == expected
+
+        out = dict((ee.to_v.label, ee) for ee in loaded.get_vertex("B").outgoing)
+        board = out["C"].payload
+        assert [board.get_boarding(i) for i in range(2)] == [
+            ("trip1", 7200, 1),
+            ("trip2", 9000, 1),
+        ]
+        assert board.service_id == "WKDY"
+        calendar = board.calendar
+        assert [
+            [calendar.get_service_id_string(x) for x in period.service_ids]
+            for period in calendar.periods
+        ] == [["WKDY"], ["SAT"]]
+        assert board.timezone.utc_offset(100) == -3600
+        assert list(loaded.get_vertex("C").outgoing[0].payload.get_all_crossings()) == [
+            ("trip1", 600),
+            ("trip2", 540),
+        ]
+        assert out["C"].enabled and not out["A"].enabled
+        loaded.destroy()
+
+        self.assertRaises(IOError, Graph.load_snapshot, snapshot_file)
+        assert not Graph.is_snapshot(__file__)
+
+        gg.add_edge("A", "E", NoOpPyPayload(1.1))
+        self.assertRaises(ValueError, gg.save_snapshot, snapshot_file)
+        assert not os.path.exists(snapshot_file)
+
 
 if __name__ == "__main__":
     unittest.main()
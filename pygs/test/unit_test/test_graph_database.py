@@ -1,10 +1,16 @@
 import os
+import pickle
+import sqlite3
 import unittest
 
 from graphserver.core import (
     Graph,
     Link,
+    ServiceCalendar,
     Street,
+    Timezone,
+    TimezonePeriod,
+    TripBoard,
     WalkOptions,
     get_contraction_hierarchies,
 )
@@ -80,6 +86,146 @@ class TestGraphDatabase(unittest.TestCase):
         self.assertEqual(combo.payload.get(0).name, "baz")
         self.assertEqual(combo.payload.get(1).name, "foo")
 
+        # payloads read a page of two at a time
+        paged = GraphDatabase(gdb_file).incarnate(reporter=None, page_size=2)
+        self.assertEqual(
+            [(ee.from_v.label, ee.to_v.label) for ee in paged.edges],
+            [(ee.from_v.label, ee.to_v.label) for ee in laz.edges],
+        )
+        combo = paged.edges[1]
+        self.assertEqual(combo.payload.get(0).name, "baz")
+        self.assertEqual(combo.payload.get(1).name, "foo")
+
+        os.remove(gdb_file)
+
+    def test_bulk_writer(self):
+        sc = ServiceCalendar()
+        sc.add_period(0, 86400, ["WKDY"])
+        tz = Timezone()
+        tz.add_period(TimezonePeriod(0, 86400, 0))
+
+        gdb_file = os.path.join(os.path.dirname(__file__), "unit_test_bulk.db")
+        gdb = GraphDatabase(gdb_file, overwrite=True)
+        link = Link()
+        with gdb.bulk_writer(batch_size=3) as writer:
+            for i in range(10):
+                tb = TripBoard("WKDY", sc, tz, 0)
+                tb.add_boarding("trip%d" % i, 100 * i, 0)
+                writer.add_edge("sta-%d" % i, "psv-%d" % i, tb)
+                writer.add_edge("psv-%d" % i, "sta-%d" % i, link)
+                writer.add_edge("sta-%d" % i, "sta-%d" % (i + 1), Street("s", 10))
+        assert list(gdb.execute("PRAGMA synchronous")) != [(0,)]
+
+        assert gdb.num_vertices() == 21
+        assert gdb.num_edges() == 30
+        # each payload, payload type and resource is written once
+        assert list(gdb.execute("SELECT count(*) FROM payloads")) == [(21,)]
+        assert list(gdb.execute("SELECT count(*) FROM payload_types")) == [(3,)]
+        assert glen(gdb.resources()) == 2
+
+        [(vertex1, vertex2, board)] = gdb.all_incoming("psv-3")
+        assert vertex1 == "sta-3"
+        assert board.get_boarding(0) == ("trip3", 300, 0)
+        assert board.service_id == "WKDY"
+
+        # payloads written before types were interned store the pickled class
+        c = gdb.get_cursor()
+        c.execute(
+            "INSERT INTO payloads VALUES (?, ?, ?)",
+            ("1", pickle.dumps(Street), pickle.dumps(Street("old", 5).__getstate__())),
+        )
+        gdb.commit()
+        assert gdb.get_edge_payload("1").name == "old"
+
+        g = gdb.incarnate(reporter=None)
+        assert g.size == 21
+        assert len(g.edges) == 30
+        os.remove(gdb_file)
+
+    def test_neighborhood(self):
+        gdb_file = os.path.dirname(__file__) + "unit_test.db"
+        if os.path.exists(gdb_file):
+            os.remove(gdb_file)
+        gdb = GraphDatabase(gdb_file)
+        with gdb.bulk_writer() as writer:
+            for i in range(5):
+                writer.add_edge("v%d" % i, "v%d" % (i + 1), Street("s%d" % i, 10))
+        gdb.add_vertex("island")
+        gdb.add_vertex("v0")
+
+        assert gdb.num_vertices() == 7
+        assert list(gdb.vertex_labels(offset=2, limit=2)) == ["v1", "v2"]
+        assert list(gdb.vertex_labels(like="v%", limit=3)) == ["v0", "v1", "v2"]
+        plan = " ".join(
+            str(row)
+            for row in gdb.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM edges WHERE vertex1 = 1"
+            )
+        )
+        assert "edges_vertex1" in plan
+
+        def names(edges):
+            return [payload.name for vertex1, vertex2, payload in edges]
+
+        assert names(gdb.neighborhood("v2")) == ["s1", "s2"]
+        assert names(gdb.neighborhood("v2", hops=2)) == ["s0", "s1", "s2", "s3"]
+        assert names(gdb.neighborhood("v5", hops=10)) == ["s0", "s1", "s2", "s3", "s4"]
+        assert gdb.neighborhood("island") == []
+        assert gdb.neighborhood("nowhere") == []
+
+        (oid, vertex1, vertex2, payload) = list(gdb.all_edges(include_oid=True))[2]
+        gdb.remove_edge(oid)
+        assert names(gdb.all_outgoing("v2")) == []
+        assert names(gdb.all_incoming("v2")) == ["s1"]
+        os.remove(gdb_file)
+
+    def test_migrate(self):
+        gdb_file = os.path.dirname(__file__) + "unit_test.db"
+        if os.path.exists(gdb_file):
+            os.remove(gdb_file)
+
+        def label_keyed():
+            gdb = GraphDatabase(gdb_file)
+            c = gdb.get_cursor()
+            c.execute("DROP TABLE vertices")
+            c.execute("DROP TABLE edges")
+            c.execute("CREATE TABLE vertices (label)")
+            c.execute("CREATE TABLE edges (vertex1 TEXT, vertex2 TEXT, epid TEXT)")
+            c.execute("INSERT INTO vertices VALUES ('A')")
+            epid = gdb.put_edge_payload(Link(), c)
+            c.execute("INSERT INTO edges VALUES ('A', 'B', ?)", (epid,))
+            gdb.commit()
+            gdb.conn.close()
+
+        # databases keyed by vertex label are left alone until migrated
+        label_keyed()
+        gdb = GraphDatabase(gdb_file)
+        assert gdb.needs_migration()
+        assert gdb.migrate()
+        assert not gdb.needs_migration()
+        assert not gdb.migrate()
+        assert gdb.num_vertices() == 2
+        assert [(v1, v2) for v1, v2, payload in gdb.all_outgoing("A")] == [("A", "B")]
+        assert len(gdb.neighborhood("B")) == 1
+        gdb.conn.close()
+        os.remove(gdb_file)
+
+        # a failed migration changes nothing
+        label_keyed()
+        gdb = GraphDatabase(gdb_file)
+        gdb.get_cursor().execute("CREATE TABLE old_edges (x)")
+        self.assertRaises(sqlite3.OperationalError, gdb.migrate)
+        assert gdb.table_columns("vertices") == ["label"]
+        assert gdb.table_columns("edges") == ["vertex1", "vertex2", "epid"]
+        assert gdb.table_columns("old_vertices") == []
+        gdb.conn.close()
+        os.remove(gdb_file)
+
+        # an empty file has nothing to migrate
+        open(gdb_file, "w").close()
+        gdb = GraphDatabase(gdb_file)
+        assert not gdb.migrate()
+        gdb.conn.close()
         os.remove(gdb_file)
 
 
@@ -0,0 +1,77 @@
+import unittest
+
+from graphserver.core import (
+    Graph,
+    GreatCircleHeuristic,
+    State,
+    Street,
+    WalkOptions,
+    shortest_path_tree,
+    shortest_path_tree_retro,
+)
+from graphserver.vincenty import vincenty
+
+from ..fixtures import grid_graph
+
+
+class TestHeuristic(unittest.TestCase):
+    def test_great_circle(self):
+        gg = Graph()
+        aa = gg.add_vertex("A")
+        bb = gg.add_vertex("B")
+        cc = gg.add_vertex("C")
+        aa.set_coordinates(47.6, -122.3)
+        bb.set_coordinates(47.61, -122.3)
+
+        hh = GreatCircleHeuristic(2.0)
+        assert hh.max_speed == 2.0
+
+        # about 1112m apart; the estimate never exceeds the ellipsoidal distance
+        dist = vincenty(47.6, -122.3, 47.61, -122.3)
+        assert dist / 2.0 * 0.99 < hh.estimate(aa, bb) <= dist / 2.0
+        assert hh.estimate(aa, bb) == hh.estimate(bb, aa)
+        assert hh.estimate(aa, aa) == 0
+
+        # vertices without coordinates are estimated at 0
+        assert hh.estimate(aa, cc) == 0
+
+        hh.destroy()
+        gg.destroy()
+
+    def test_astar(self):
+        gg = grid_graph(30)
+        wo = WalkOptions()
+        wo.walking_speed = 1.0
+        hh = GreatCircleHeuristic(1.0)
+
+        spt = shortest_path_tree(gg, "15-0", "15-29", State(0, 0), wo)
+        expected = spt.get_vertex("15-29").state.weight
+        dijkstra_size = spt.size
+        spt.destroy()
+
+        spt = shortest_path_tree(gg, "15-0", "15-29", State(0, 0), wo, heuristic=hh)
+        assert spt.get_vertex("15-29").state.weight == expected
+        vertices, edges = spt.path("15-29")
+        assert vertices[0].label == "15-0"
+        assert spt.size * 4 < dijkstra_size
+        spt.destroy()
+
+        retro = shortest_path_tree_retro(
+            gg, "15-0", "15-29", State(0, 1000000), wo, heuristic=hh
+        )
+        assert 1000000 - retro.get_vertex("15-0").state.time == expected
+        assert retro.size * 4 < dijkstra_size
+        retro.destroy()
+
+        # without a target the heuristic has nothing to aim at
+        spt = shortest_path_tree(gg, "15-0", None, State(0, 0), wo, heuristic=hh)
+        assert spt.size == 900
+        spt.destroy()
+
+        hh.destroy()
+        wo.destroy()
+        gg.destroy()
+
+
+if __name__ == "__main__":
+    unittest.main()
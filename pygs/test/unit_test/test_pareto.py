@@ -0,0 +1,94 @@
+import calendar
+import tempfile
+import unittest
+
+from graphserver.compiler.gdb_import_gtfs import graph_load_gtfsdb
+from graphserver.core import (
+    ElapseTime,
+    Graph,
+    State,
+    Street,
+    WalkOptions,
+    pareto_search,
+    shortest_path_tree,
+)
+from graphserver.core.exceptions import VertexNotFoundError
+
+from ..fixtures import grid_graph, hms, load_feed
+
+
+class TestPareto(unittest.TestCase):
+    def test_walk_or_wait(self):
+        # a short walk, or a ride that takes longer but walks nowhere
+        gg = Graph()
+        for label in ("a", "b", "c"):
+            gg.add_vertex(label)
+        gg.add_edge("a", "b", Street("s", 100))
+        gg.add_edge("a", "b", ElapseTime(1000))
+        gg.add_edge("b", "c", Street("s", 10))
+
+        ps = pareto_search(gg, "a", None, State(1, 0), criteria=("weight", "walk"))
+        paths = ps.paths("c")
+        assert [type(p.payloads[0]) for p in paths] == [Street, ElapseTime]
+        assert paths[0].state.weight < paths[1].state.weight
+        assert paths[0].state.dist_walked > paths[1].state.dist_walked
+        assert [v.label for v in paths[1].vertices] == ["a", "b", "c"]
+        assert len(paths[1].states) == 3
+        ps.destroy()
+
+        # on weight alone, or with one label a vertex, the walk wins
+        for kwargs in ({"criteria": ("weight",)}, {"max_labels": 1}):
+            ps = pareto_search(gg, "a", "c", State(1, 0), **kwargs)
+            assert [type(p.payloads[0]) for p in ps.paths("c")] == [Street]
+            ps.destroy()
+
+        self.assertRaises(
+            VertexNotFoundError, pareto_search, gg, "x", None, State(1, 0)
+        )
+        gg.destroy()
+
+    def test_single_criterion(self):
+        """searching on weight alone finds the weights of a shortest path tree"""
+        gg = grid_graph(6)
+        wo = WalkOptions()
+        spt = shortest_path_tree(gg, "0-0", None, State(1, 0), wo)
+        ps = pareto_search(gg, "0-0", None, State(1, 0), wo, criteria=("weight",))
+        for vertex in gg.vertices:
+            paths = ps.paths(vertex.label)
+            assert len(paths) == 1
+            assert paths[0].state.weight == spt.get_vertex(vertex.label).state.weight
+        ps.destroy()
+        spt.destroy()
+        wo.destroy()
+        gg.destroy()
+
+    def test_transfers(self):
+        """the fast way with a transfer and the slower direct trip, in one search"""
+        with tempfile.TemporaryDirectory() as dirname:
+            gg = graph_load_gtfsdb("a", load_feed(dirname), reporter=None)
+        day_start = calendar.timegm((2024, 1, 3, 8, 0, 0))
+
+        ps = pareto_search(
+            gg, "sta-S1", "sta-S5", State(1, day_start + hms(8, 0)), max_labels=4
+        )
+        paths = ps.paths("sta-S5")
+        arrivals = sorted(
+            (p.state.time - day_start, p.state.num_transfers) for p in paths
+        )
+        assert [arrival for arrival, n in arrivals] == [hms(8, 40), hms(9, 0)]
+        assert arrivals[0][1] > arrivals[1][1]
+
+        # the fastest is the shortest path tree's
+        state = State(1, day_start + hms(8, 0))
+        spt = shortest_path_tree(gg, "sta-S1", "sta-S5", state)
+        assert paths[0].state.weight == spt.get_vertex("sta-S5").state.weight
+        spt.destroy()
+        ps.destroy()
+        gg.destroy()
+
+
+if __name__ == "__main__":
+    tl = unittest.TestLoader()
+
+    suite = tl.loadTestsFromTestCase(TestPareto)
+    unittest.TextTestRunner(verbosity=2).run(suite)
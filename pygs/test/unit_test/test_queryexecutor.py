@@ -0,0 +1,75 @@
+import unittest
+
+from graphserver.core import (
+    NoOpPyPayload,
+    QueryExecutor,
+    State,
+    WalkOptions,
+    shortest_path_tree,
+)
+from graphserver.gsdll import lgs, lgs_nogil
+
+from ..fixtures import grid_graph
+
+
+def weight_to(label):
+    def extract(spt):
+        return spt.get_vertex(label).state.weight
+
+    return extract
+
+
+class TestQueryExecutor(unittest.TestCase):
+    def test_search_lib(self):
+        gg = grid_graph(3)
+        assert gg.search_lib is lgs
+        gg.freeze()
+        assert gg.search_lib is lgs_nogil
+        gg.destroy()
+
+        # python payloads call back into the interpreter
+        gg = grid_graph(3)
+        gg.add_edge("0-0", "2-2", NoOpPyPayload(1.1))
+        gg.freeze()
+        assert gg.search_lib is lgs
+        gg.destroy()
+
+    def test_queries(self):
+        gg = grid_graph(12)
+        self.assertRaises(ValueError, QueryExecutor, gg)
+        gg.freeze()
+
+        wo = WalkOptions()
+        queries = [("%d-%d" % (i, i % 5), "11-11") for i in range(12)]
+        expected = []
+        for fromv, tov in queries:
+            spt = shortest_path_tree(gg, fromv, tov, State(0, 0), wo)
+            expected.append(spt.get_vertex(tov).state.weight)
+            spt.destroy()
+
+        with QueryExecutor(gg, threads=4) as executor:
+            weights = executor.map(
+                weight_to("11-11"),
+                [(fromv, tov, State(0, 0)) for fromv, tov in queries],
+                wo,
+            )
+            assert list(weights) == expected
+
+            future = executor.submit(weight_to("bogus"), "0-0", None, State(0, 0), wo)
+            self.assertRaises(AttributeError, future.result)
+
+            # the workspace of the failed search was freed for the next one
+            future = executor.submit(weight_to("11-11"), "0-0", None, State(0, 0), wo)
+            assert future.result() == expected[0]
+            assert 1 <= len(executor._workspaces) <= 4
+
+        assert executor._workspaces == []
+        wo.destroy()
+        gg.destroy()
+
+
+if __name__ == "__main__":
+    tl = unittest.TestLoader()
+
+    suite = tl.loadTestsFromTestCase(TestQueryExecutor)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,187 @@
+import calendar
+import tempfile
+import unittest
+
+from graphserver.compiler.gdb_import_gtfs import (
+    graph_load_gtfsdb,
+    raptor_from_gtfsdb,
+    split_overtaking,
+)
+from graphserver.core import Raptor, State, WalkOptions, shortest_path_tree
+from graphserver.core.exceptions import VertexNotFoundError
+
+from ..fixtures import FEED, hms, load_feed
+
+
+class TestRaptor(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.gtfsdb = load_feed(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_split_overtaking(self):
+        trips = [
+            ("b", [10, 20], [10, 20]),
+            ("a", [0, 30], [0, 30]),
+            ("c", [15, 25], [15, 25]),
+        ]
+        groups = split_overtaking(trips)
+        assert [[trip[0] for trip in group] for group in groups] == [["a"], ["b", "c"]]
+
+    def test_patterns(self):
+        raptor = Raptor(
+            ["a", "b", "c", "d"],
+            [
+                (
+                    ["a", "b", "c"],
+                    [
+                        ("x1", [0, 10, 20], [0, 12, 20]),
+                        ("x2", [30, 40, 50], [30, 42, 50]),
+                    ],
+                ),
+                (["d", "c"], [("y1", [5, 25], [5, 25])]),
+            ],
+            [("b", "d", 3)],
+        )
+        # a trip can't be boarded before it reaches the stop
+        assert raptor.earliest_arrivals("a", 1) == {"a": 1, "b": 40, "c": 50, "d": 43}
+        journeys = raptor.journeys("b", "c", 0)
+        assert [(j.departure, j.arrival, j.n_transfers) for j in journeys] == [
+            (12, 20, 0)
+        ]
+        # walking to the other pattern is no trip
+        assert [leg.kind for leg in raptor.journeys("a", "d", 0)[0].legs] == [
+            "ride",
+            "walk",
+        ]
+        raptor.destroy()
+
+    def test_journeys(self):
+        raptor = raptor_from_gtfsdb(self.gtfsdb, sample_date="20240103", reporter=None)
+
+        # the direct trip, and a faster journey with a transfer
+        journeys = raptor.journeys("S1", "S5", hms(8, 0))
+        assert [(j.arrival, j.n_transfers) for j in journeys] == [
+            (hms(9, 0), 0),
+            (hms(8, 40), 1),
+        ]
+        assert [leg.trip_id for leg in journeys[0].legs] == ["t5"]
+        assert journeys[0].departure == hms(8, 5)
+        legs = journeys[1].legs
+        assert [leg.kind for leg in legs] == ["ride", "ride"]
+        assert legs[1].trip_id == "t3"
+        assert (legs[1].from_stop, legs[1].to_stop) == ("S3", "S5")
+        assert legs[0].arrival <= legs[1].departure
+
+        # the overtaking trip, then a footpath
+        journeys = raptor.journeys("S1", "S6", hms(8, 0))
+        assert len(journeys) == 1
+        legs = journeys[0].legs
+        assert [(leg.kind, leg.trip_id) for leg in legs] == [
+            ("ride", "t7"),
+            ("walk", None),
+        ]
+        assert journeys[0].arrival == hms(8, 30)
+
+        # nothing reaches S5 after the last trips leave
+        assert raptor.journeys("S1", "S5", hms(9, 1)) == []
+        assert raptor.journeys("S1", "S5", hms(8, 0), max_rounds=0) == []
+
+        arrivals = raptor.earliest_arrivals("S1", hms(8, 0), max_rounds=1)
+        assert arrivals["S1"] == hms(8, 0)
+        assert arrivals["S4"] == hms(8, 28)
+        assert arrivals["S5"] == hms(9, 0)
+        assert "S5" not in raptor.earliest_arrivals("S1", hms(8, 0), max_rounds=0)
+
+        self.assertRaises(VertexNotFoundError, raptor.journeys, "S1", "bogus", 0)
+        raptor.destroy()
+
+    def test_profile(self):
+        raptor = raptor_from_gtfsdb(self.gtfsdb, sample_date="20240103", reporter=None)
+
+        assert raptor.departures("S1", hms(7, 50), hms(8, 40)) == [
+            hms(8, 30),
+            hms(8, 15),
+            hms(8, 5),
+            hms(8, 0),
+        ]
+        # the last stop of a pattern has no departures
+        assert raptor.departures("S4", 0, hms(24, 0)) == []
+
+        profile = raptor.profile("S1", "S5", hms(7, 50), hms(8, 40))
+        assert [(j.departure, j.arrival, j.n_transfers) for j in profile] == [
+            (hms(8, 5), hms(9, 0), 0),
+            (hms(8, 15), hms(8, 40), 1),
+            (hms(8, 30), hms(9, 10), 1),
+        ]
+        assert [leg.trip_id for leg in profile[1].legs] == ["t7", "t3"]
+
+        # each is what a query at its departure finds
+        for journey in profile:
+            journeys = raptor.journeys("S1", "S5", journey.departure)
+            assert journey.arrival in [j.arrival for j in journeys]
+
+        assert raptor.profile("S1", "S5", hms(9, 1), hms(10, 0)) == []
+        walks = raptor.profile("S4", "S6", hms(7, 0), hms(9, 0))
+        assert [(j.departure, j.arrival) for j in walks] == [(hms(9, 0), hms(9, 2))]
+        raptor.destroy()
+
+    def test_service_date(self):
+        # only the weekend trip runs on saturdays
+        raptor = raptor_from_gtfsdb(self.gtfsdb, sample_date="20240106", reporter=None)
+        assert raptor.trip_ids == ["t6"]
+        assert raptor.journeys("S1", "S5", hms(5, 0)) == []
+        assert raptor.journeys("S1", "S4", hms(5, 0))[0].arrival == hms(6, 30)
+        raptor.destroy()
+
+    def test_frequencies(self):
+        # t8 runs every 10 minutes, with stop times relative to its start
+        feed = dict(FEED)
+        feed["trips"] = FEED["trips"] + ["R3,WK,t8"]
+        feed["stop_times"] = FEED["stop_times"] + [
+            "t8,00:00:00,00:00:00,S1,0",
+            "t8,00:20:00,00:20:00,S5,1",
+        ]
+        feed["frequencies"] = [
+            "trip_id,start_time,end_time,headway_secs",
+            "t8,08:00:00,09:00:00,600",
+        ]
+        with tempfile.TemporaryDirectory() as dirname:
+            raptor = raptor_from_gtfsdb(
+                load_feed(dirname, feed), sample_date="20240103", reporter=None
+            )
+        assert "t8" not in raptor.trip_ids
+        assert raptor.journeys("S1", "S5", 0)[0].departure == hms(8, 5)
+        raptor.destroy()
+
+    def test_graph_search(self):
+        """the earliest arrival matches that of a search of the compiled graph"""
+        raptor = raptor_from_gtfsdb(self.gtfsdb, sample_date="20240103", reporter=None)
+        gg = graph_load_gtfsdb("a", self.gtfsdb, reporter=None)
+
+        # midnight, pacific standard time
+        day_start = calendar.timegm((2024, 1, 3, 8, 0, 0))
+        wo = WalkOptions()
+        for origin, dest, departure in (
+            ("S1", "S5", hms(8, 0)),
+            ("S2", "S5", hms(8, 5)),
+        ):
+            spt = shortest_path_tree(
+                gg, "sta-" + origin, "sta-" + dest, State(1, day_start + departure), wo
+            )
+            expected = spt.get_vertex("sta-" + dest).state.time - day_start
+            spt.destroy()
+            journeys = raptor.journeys(origin, dest, departure)
+            assert journeys[-1].arrival == expected
+        wo.destroy()
+        gg.destroy()
+        raptor.destroy()
+
+
+if __name__ == "__main__":
+    tl = unittest.TestLoader()
+
+    suite = tl.loadTestsFromTestCase(TestRaptor)
+    unittest.TextTestRunner(verbosity=2).run(suite)
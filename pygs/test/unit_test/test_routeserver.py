@@ -0,0 +1,134 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+import urllib.request
+
+import graphserver
+from graphserver.core import State, shortest_path_tree
+from graphserver.ext.routeserver.events import AllEdgeEvent
+from graphserver.ext.routeserver.routeserver import (
+    RouteServer,
+    create_app,
+    walk_options,
+)
+from graphserver.graphdb import GraphDatabase
+
+from ..fixtures import grid_graph
+
+
+class TestRouteServer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.gdb_file = os.path.join(self.tmpdir.name, "grid.db")
+        gg = grid_graph(5)
+        GraphDatabase(self.gdb_file).populate(gg)
+        gg.destroy()
+
+        self.rs = RouteServer(self.gdb_file, [], [AllEdgeEvent()], [])
+
+    def tearDown(self):
+        self.rs.graph.destroy()
+        self.tmpdir.cleanup()
+
+    def test_matrix(self):
+        def weight(dest, **options):
+            wo = walk_options(**options)
+            spt = shortest_path_tree(self.rs.graph, "0-0", dest, State(1, 0), wo)
+            ret = spt.get_vertex(dest).state.weight
+            spt.destroy()
+            wo.destroy()
+            return ret
+
+        # the walk options of a path query apply to the matrix as well
+        options = {"walking_reluctance": 3.0, "turn_penalty": 100}
+        ret = json.loads(
+            self.rs.matrix(["0-0"], ["4-4", "2-3", "bogus"], currtime=0, **options)
+        )
+        assert ret["weights"][0][:2] == [
+            weight("4-4", **options),
+            weight("2-3", **options),
+        ]
+        assert ret["weights"][0][0] > weight("4-4")
+        assert ret["weights"][0][2] is None
+
+        # and are read from the query string
+        client = create_app(self.gdb_file).test_client()
+        response = client.get(
+            "/matrix?origin=0-0&dest=4-4&currtime=0"
+            "&walking_reluctance=3&turn_penalty=100"
+        )
+        assert response.get_json()["weights"] == [[weight("4-4", **options)]]
+
+    @unittest.skipUnless(
+        os.path.exists("/proc/self/task/%d/children" % os.getpid()),
+        "needs fork and /proc children lists",
+    )
+    def test_serve_workers(self):
+        script = (
+            "import sys\n"
+            "from graphserver.ext.routeserver.routeserver import create_app, serve\n"
+            "serve(create_app(sys.argv[1]), '127.0.0.1', 0, workers=2)\n"
+        )
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            [os.path.dirname(os.path.dirname(graphserver.__file__))]
+            + env.get("PYTHONPATH", "").split(os.pathsep)
+        )
+        parent = subprocess.Popen(
+            [sys.executable, "-c", script, self.gdb_file],
+            stdout=subprocess.PIPE,
+            text=True,
+            env=env,
+        )
+        try:
+            children = []
+            for line in parent.stdout:
+                if line.startswith("serving on"):
+                    port = int(line.split()[2].split(":")[1])
+                    break
+            with open("/proc/%d/task/%d/children" % (parent.pid, parent.pid)) as fp:
+                children = [int(pid) for pid in fp.read().split()]
+            assert len(children) == 2
+
+            def get_path():
+                url = "http://127.0.0.1:%d/path?origin=0-0&dest=4-4&currtime=0" % port
+                with urllib.request.urlopen(url, timeout=10) as response:
+                    return json.loads(response.read())
+
+            # with the other worker stopped, each answers on its own
+            for i, child in enumerate(children):
+                other = children[1 - i]
+                os.kill(other, signal.SIGSTOP)
+                try:
+                    assert "narrative" in get_path()
+                finally:
+                    os.kill(other, signal.SIGCONT)
+
+            # SIGTERM to the parent stops the workers, and it reaps them
+            parent.send_signal(signal.SIGTERM)
+            assert parent.wait(timeout=10) == 0
+            for child in children:
+                self.assertRaises(ProcessLookupError, os.kill, child, 0)
+            children = []
+        finally:
+            # don't leave workers of a failed test serving
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            if parent.poll() is None:
+                parent.kill()
+                parent.wait()
+            parent.stdout.close()
+
+
+if __name__ == "__main__":
+    tl = unittest.TestLoader()
+
+    suite = tl.loadTestsFromTestCase(TestRouteServer)
+    unittest.TextTestRunner(verbosity=2).run(suite)
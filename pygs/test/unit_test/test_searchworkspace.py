@@ -0,0 +1,190 @@
+import unittest
+
+from graphserver.core import (
+    Graph,
+    GreatCircleHeuristic,
+    SearchWorkspace,
+    State,
+    Street,
+    WalkOptions,
+    shortest_path_bidirectional,
+    shortest_path_tree,
+    shortest_path_tree_retro,
+)
+from graphserver.core.exceptions import WorkspaceInUseError
+
+from ..fixtures import grid_graph
+
+
+def tree_weights(spt):
+    return dict((vv.label, vv.state.weight) for vv in spt.vertices)
+
+
+class TestSearchWorkspace(unittest.TestCase):
+    def test_basic(self):
+        ws = SearchWorkspace()
+        assert not ws.in_use
+        assert ws.capacity == 0
+        ws.destroy()
+
+    def test_reuse(self):
+        gg = grid_graph(10)
+        ws = SearchWorkspace()
+
+        for origin in ("0-0", "3-4", "9-9", "0-0"):
+            expected = shortest_path_tree(gg, origin, None, State(0, 0))
+            spt = shortest_path_tree(gg, origin, None, State(0, 0), workspace=ws)
+            assert ws.in_use
+            assert ws.capacity == 100
+            assert spt.size == expected.size == 100
+            assert tree_weights(spt) == tree_weights(expected)
+
+            vertices, edges = spt.path("5-5")
+            assert vertices[0].label == origin
+            assert vertices[-1].label == "5-5"
+            assert len(edges) == len(vertices) - 1
+            assert spt.get_vertex("bogus") is None
+
+            expected.destroy()
+            spt.destroy()
+            assert not ws.in_use
+
+        # searches ending at a target leave vertices queued
+        for queue_type in (
+            WalkOptions.QUEUE_FIBONACCI,
+            WalkOptions.QUEUE_DARY,
+            WalkOptions.QUEUE_RADIX,
+        ):
+            wo = WalkOptions()
+            wo.queue_type = queue_type
+            for target in ("2-2", "7-1", "9-9"):
+                expected = shortest_path_tree(gg, "0-0", target, State(0, 0), wo)
+                spt = shortest_path_tree(
+                    gg, "0-0", target, State(0, 0), wo, workspace=ws
+                )
+                assert tree_weights(spt) == tree_weights(expected)
+                expected.destroy()
+                spt.destroy()
+            wo.destroy()
+
+        ws.destroy()
+        gg.destroy()
+
+    def test_retro_and_astar(self):
+        gg = grid_graph(10)
+        ws = SearchWorkspace()
+
+        expected = shortest_path_tree_retro(gg, None, "4-4", State(0, 100000))
+        spt = shortest_path_tree_retro(gg, None, "4-4", State(0, 100000), workspace=ws)
+        assert tree_weights(spt) == tree_weights(expected)
+        vertices, edges = spt.path_retro("0-0")
+        assert vertices[-1].label == "4-4"
+        expected.destroy()
+        spt.destroy()
+
+        wo = WalkOptions()
+        wo.walking_speed = 1.0
+        for target in ("9-9", "2-7"):
+            hh = GreatCircleHeuristic(1.0)
+            expected = shortest_path_tree(
+                gg, "0-0", target, State(0, 0), wo, heuristic=hh
+            )
+            spt = shortest_path_tree(
+                gg, "0-0", target, State(0, 0), wo, heuristic=hh, workspace=ws
+            )
+            assert tree_weights(spt) == tree_weights(expected)
+            expected.destroy()
+            spt.destroy()
+            hh.destroy()
+        wo.destroy()
+
+        ws.destroy()
+        gg.destroy()
+
+    def test_bidirectional(self):
+        gg = grid_graph(10)
+        ws = SearchWorkspace()
+
+        # the second walks past max_walk and falls back to a forward search
+        for max_walk in (10000, 200):
+            wo = WalkOptions()
+            wo.max_walk = max_walk
+            expected = shortest_path_bidirectional(gg, "1-1", "6-8", State(0, 0), wo)
+            spt = shortest_path_bidirectional(
+                gg, "1-1", "6-8", State(0, 0), wo, workspace=ws
+            )
+            assert tree_weights(spt) == tree_weights(expected)
+            vertices, edges = spt.path("6-8")
+            assert vertices[0].label == "1-1"
+            expected.destroy()
+            spt.destroy()
+            assert not ws.in_use
+            wo.destroy()
+
+        ws.destroy()
+        gg.destroy()
+
+    def test_in_use(self):
+        gg = grid_graph(3)
+        ws = SearchWorkspace()
+
+        spt = shortest_path_tree(gg, "0-0", None, State(0, 0), workspace=ws)
+        self.assertRaises(
+            WorkspaceInUseError,
+            shortest_path_tree,
+            gg,
+            "0-0",
+            None,
+            State(0, 0),
+            workspace=ws,
+        )
+        spt.destroy()
+
+        spt = shortest_path_tree(gg, "0-0", None, State(0, 0), workspace=ws)
+        assert spt.size == 9
+        spt.destroy()
+
+        ws.destroy()
+        gg.destroy()
+
+    def test_graph_changes(self):
+        ws = SearchWorkspace()
+
+        gg = Graph()
+        gg.add_vertex("A")
+        gg.add_vertex("B")
+        gg.add_edge("A", "B", Street("AB", 100))
+        spt = shortest_path_tree(gg, "A", None, State(0, 0), workspace=ws)
+        assert spt.size == 2
+        assert ws.capacity == 2
+        spt.destroy()
+
+        gg.add_vertex("C")
+        gg.add_edge("B", "C", Street("BC", 100))
+        spt = shortest_path_tree(gg, "A", None, State(0, 0), workspace=ws)
+        assert spt.size == 3
+        assert ws.capacity == 3
+
+        # removing a vertex orphans its children
+        spt.remove_vertex("B")
+        assert spt.size == 2
+        assert spt.get_vertex("B") is None
+        assert spt.get_vertex("A").degree_out == 0
+        assert spt.get_vertex("C").degree_in == 0
+        spt.destroy()
+        gg.destroy()
+
+        # a smaller graph reuses the slots
+        gg = Graph()
+        gg.add_vertex("X")
+        spt = shortest_path_tree(gg, "X", None, State(0, 0), workspace=ws)
+        assert [vv.label for vv in spt.vertices] == ["X"]
+        assert ws.capacity == 3
+        spt.destroy()
+        gg.destroy()
+
+        ws.destroy()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -134,6 +134,21 @@ class TestServiceCalendar(unittest.TestCase):
         assert c.period_of_or_after(2000) is None
         assert c.period_of_or_after(2001) is None
 
+    def test_many_periods(self):
+        c = ServiceCalendar()
+        days = list(range(0, 400, 2))
+        # out of order, with a gap between each day
+        for day in days[1::2] + days[::2]:
+            c.add_period(day * 1000, day * 1000 + 1000, [str(day)])
+
+        assert [x.begin_time for x in c.periods] == [day * 1000 for day in days]
+        assert c.period_of_or_before(-1) is None
+        assert c.period_of_or_after(400000) is None
+        for day in days:
+            assert c.period_of_or_before(day * 1000 + 1500).begin_time == day * 1000
+            assert c.period_of_or_after(day * 1000 - 500).begin_time == day * 1000
+            assert c.period_of_or_after(day * 1000 + 999).begin_time == day * 1000
+
     def test_add_three(self):
         c = ServiceCalendar()
         c.add_period(0, 10, ["A", "B", "C"])
@@ -3,6 +3,7 @@ import unittest
 from graphserver.core import (
     Graph,
     Link,
+    SearchWorkspace,
     ShortestPathTree,
     SPTEdge,
     SPTVertex,
@@ -10,8 +11,12 @@ from graphserver.core import (
     Street,
     Vertex,
     WalkOptions,
+    shortest_path_arrays,
     shortest_path_tree,
 )
+from graphserver.core.exceptions import VertexNotFoundError
+
+from ..fixtures import grid_graph
 
 
 class TestShortestPathTree(unittest.TestCase):
@@ -179,5 +184,49 @@ class TestShortestPathTree(unittest.TestCase):
         assert vv.outgoing[0].to_v.__class__ == SPTVertex
 
 
+class TestShortestPathArrays(unittest.TestCase):
+    def test_arrays(self):
+        gg = grid_graph(6)
+        gg.add_vertex("island")
+        gg.freeze()
+        wo = WalkOptions()
+
+        spt = shortest_path_tree(gg, "0-0", None, State(1, 100), wo)
+        workspace = SearchWorkspace()
+        for ws in (None, workspace):
+            arrays = shortest_path_arrays(gg, "0-0", State(1, 100), wo, workspace=ws)
+            assert arrays.n_reached == 36
+            assert len(arrays.times) == len(arrays.weights) == gg.size
+
+            for label in ("0-0", "3-2", "5-5"):
+                i = arrays.index(label)
+                state = spt.get_vertex(label).state
+                assert arrays.times[i] == state.time
+                assert arrays.weights[i] == state.weight
+
+            i = arrays.index("island")
+            assert (arrays.times[i], arrays.weights[i], arrays.parents[i]) == (-1,) * 3
+            assert arrays.path("island") is None
+            assert arrays.parents[arrays.index("0-0")] == -1
+
+            # the path follows the tree parents, as long as that of the tree
+            path = arrays.path("5-5")
+            assert len(path) == len(spt.path("5-5")[0]) == 11
+            assert gg.get_vertex_by_index(path[0]).label == "0-0"
+            payload = arrays.parent_payload(path[-1])
+            assert payload.__class__ == Street and payload.length > 0
+            assert arrays.parent_payload(path[0]) is None
+
+        assert not workspace.in_use
+        self.assertRaises(
+            VertexNotFoundError, shortest_path_arrays, gg, "bogus", State(1, 100), wo
+        )
+
+        spt.destroy()
+        workspace.destroy()
+        wo.destroy()
+        gg.destroy()
+
+
 if __name__ == "__main__":
     unittest.main()
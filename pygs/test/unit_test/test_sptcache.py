@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+
+from graphserver.ext.routeserver.events import AllEdgeEvent
+from graphserver.ext.routeserver.routeserver import RouteServer
+from graphserver.ext.routeserver.sptcache import SPTCache
+from graphserver.graphdb import GraphDatabase
+
+from ..fixtures import grid_graph
+
+
+class TestSPTCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.gdb_file = os.path.join(self.tmpdir.name, "grid.db")
+        gg = grid_graph(5)
+        GraphDatabase(self.gdb_file).populate(gg)
+        gg.destroy()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_cache(self):
+        rs = RouteServer(self.gdb_file, [], [AllEdgeEvent()], [])
+        searches = []
+
+        def search(origin, currtime):
+            searches.append((origin, currtime))
+            return rs.full_tree(origin, currtime, (0, 1.0, 1.5, None, None, None))
+
+        # each full tree of the 5x5 grid has 25 vertices
+        cache = SPTCache(60, time_bucket=60)
+        with cache.tree("0-0", 130, (), search) as (spt, hit):
+            assert not hit
+            assert spt.get_vertex("4-4") is not None
+        with cache.tree("0-0", 179, (), search) as (spt, hit):
+            assert hit
+        assert searches == [("0-0", 120)]
+
+        with cache.tree("0-0", 180, (), search) as (spt, hit):
+            assert not hit
+            # the least recently used tree is evicted, but not while it's read
+            with cache.tree("1-1", 0, (), search) as (spt2, hit):
+                assert not hit
+                assert (len(cache), cache.n_vertices) == (2, 50)
+            assert spt.soul is not None
+        assert cache.stats() == {"hits": 1, "misses": 3, "trees": 2, "vertices": 50}
+
+        # a tree over the budget is used once and destroyed
+        small = SPTCache(10)
+        with small.tree("0-0", 0, (), search) as (spt, hit):
+            assert len(small) == 0
+        assert spt.soul is None
+
+        cache.clear()
+        assert (len(cache), cache.n_vertices) == (0, 0)
+        rs.graph.destroy()
+
+    def test_path(self):
+        rs = RouteServer(
+            self.gdb_file, [], [AllEdgeEvent()], [], spt_cache_vertices=100
+        )
+        plain = RouteServer(self.gdb_file, [], [AllEdgeEvent()], [])
+
+        ret1 = json.loads(rs.path("0-0", "4-4", currtime=61))
+        ret2 = json.loads(rs.path("0-0", "2-3", currtime=100))
+        assert not ret1["performance"]["spt_cache"]["hit"]
+        assert ret2["performance"]["spt_cache"]["hit"]
+        assert ret2["performance"]["spt_cache"]["hits"] == 1
+
+        # cached trees give paths as short as separate searches
+        expected = json.loads(plain.path("0-0", "2-3", currtime=60))
+        assert len(ret2["narrative"]) == len(expected["narrative"])
+
+        ret = json.loads(rs.path("0-0", "bogus", currtime=100))
+        assert "error" in ret
+
+        # another walk options fingerprint grows another tree
+        ret = json.loads(rs.path("0-0", "2-3", currtime=100, walking_speed=2.0))
+        assert not ret["performance"]["spt_cache"]["hit"]
+        assert ret["performance"]["spt_cache"]["trees"] == 2
+
+        rs.spt_cache.clear()
+        rs.graph.destroy()
+        plain.graph.destroy()
+
+
+if __name__ == "__main__":
+    tl = unittest.TestLoader()
+
+    suite = tl.loadTestsFromTestCase(TestSPTCache)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -450,6 +450,8 @@ class TestTripBoard(unittest.TestCase):
         assert ret.weight == 1
         assert ret.num_transfers == 1
         assert ret.dist_walked == 0.0
+        assert ret.trip_id == b"2"
+        assert ret.trip == tb.walk(State(1, 60), WalkOptions()).trip != s.trip
 
         s = State(1, 200)
         ret = tb.walk(s, WalkOptions())
@@ -462,6 +464,18 @@ class TestTripBoard(unittest.TestCase):
         ret = tb.walk(s, WalkOptions())
         assert ret is None
 
+    def test_many_service_ids(self):
+        sc = ServiceCalendar()
+        sids = ["S%d" % i for i in range(200)]
+        sc.add_period(0, 1 * 3600 * 24 - 1, sids[:70] + sids[130:])
+        tz = Timezone()
+        tz.add_period(TimezonePeriod(0, 1 * 3600 * 24, 0))
+
+        for sid, runs in (("S0", True), ("S69", True), ("S100", False), ("S199", True)):
+            tb = TripBoard(sid, sc, tz, 0)
+            tb.add_boarding("1", 50, 0)
+            assert (tb.walk(State(1, 0), WalkOptions()) is not None) == runs
+
     def test_walk_back(self):
         sc = ServiceCalendar()
         sc.add_period(0, 1 * 3600 * 24 - 1, ["WKDY"])
@@ -475,9 +489,12 @@ class TestTripBoard(unittest.TestCase):
         tb.add_boarding("3", 200, 0)
 
         s = State(1, 100)
+        s.dangerous_set_trip_id("2")
         ret = tb.walk_back(s, WalkOptions())
         assert ret.time == 100
         assert ret.weight == 0
+        assert ret.trip_id is None
+        assert ret.trip == -1
 
     def test_check_yesterday(self):
         """check the previous day for viable departures"""
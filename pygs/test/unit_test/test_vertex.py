@@ -39,6 +39,15 @@ class TestVertex(unittest.TestCase):
         assert v.outgoing == []
         assert v.degree_out == 0
 
+    def test_coordinates(self):
+        """vertex coordinates are unset until given"""
+        v = Vertex("home")
+        assert v.lat is None
+        assert v.lon is None
+        v.set_coordinates(47.6, -122.3)
+        assert v.lat == 47.6
+        assert v.lon == -122.3
+
     def test_prettyprint(self):
         """vertex can output itself to xml"""
         v = Vertex("home")
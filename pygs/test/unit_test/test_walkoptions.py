@@ -43,6 +43,10 @@ class TestWalkOptions(unittest.TestCase):
         wo.hill_reluctance = 1.4
         assert round(wo.hill_reluctance, 3) == 1.4
 
+        assert wo.queue_type == WalkOptions.QUEUE_FIBONACCI
+        wo.queue_type = WalkOptions.QUEUE_RADIX
+        assert wo.queue_type == WalkOptions.QUEUE_RADIX
+
         wo.destroy()
         assert wo.soul is None
 